@@ -312,6 +312,45 @@ GLM_MODEL = config('GLM_MODEL', default='z-ai/glm-4-air:free')  # Tareas rápida
 AI_MODEL = config('AI_MODEL', default='anthropic/claude-3-5-haiku')  # Modelo para chatbot educativo
 AI_MAX_TOKENS = config('AI_MAX_TOKENS', default=2000, cast=int)
 AI_TEMPERATURE = config('AI_TEMPERATURE', default=0.3, cast=float)  # Más determinista para evidencia
+RESEARCH_SEARCH_DEADLINE = config('RESEARCH_SEARCH_DEADLINE', default=8, cast=int)  # Segundos para Semantic Scholar + OpenAlex en paralelo
+RESEARCH_SEARCH_CACHE_TTL = config('RESEARCH_SEARCH_CACHE_TTL', default=21600, cast=int)  # Caché de búsquedas (6 h)
+RESEARCH_LOCAL_MIN_HITS = config('RESEARCH_LOCAL_MIN_HITS', default=3, cast=int)  # Papers locales necesarios para no ir a las APIs
+RESEARCH_LOCAL_MIN_COVERAGE = config('RESEARCH_LOCAL_MIN_COVERAGE', default=0.5, cast=float)  # Fracción de términos de la pregunta que debe cubrir un paper local
+CHAT_MEMORY_TOKEN_BUDGET = config('CHAT_MEMORY_TOKEN_BUDGET', default=1500, cast=int)  # Tokens para los mensajes recientes del chat
+CHAT_MEMORY_SUMMARY_EVERY = config('CHAT_MEMORY_SUMMARY_EVERY', default=4, cast=int)  # Turnos sin resumir que disparan el resumen
+CHAT_MEMORY_KEEP_RECENT = config('CHAT_MEMORY_KEEP_RECENT', default=4, cast=int)  # Mensajes que quedan fuera del resumen
+CHAT_MEMORY_SUMMARY_ASYNC = config('CHAT_MEMORY_SUMMARY_ASYNC', default=True, cast=bool)  # Resumir en segundo plano tras responder
+
+# Autoevaluaciones por QR
+CUSTOM_EVAL_CACHE_TTL = config('CUSTOM_EVAL_CACHE_TTL', default=300, cast=int)  # Definición + lista de alumnos cacheadas (s)
+CUSTOM_EVAL_SUBMIT_ATTEMPTS = config('CUSTOM_EVAL_SUBMIT_ATTEMPTS', default=5, cast=int)  # Reintentos del envío ante bloqueos de la BD
+
+# Informes trimestrales
+REPORT_SNAPSHOT_TTL = config('REPORT_SNAPSHOT_TTL', default=3600, cast=int)  # Instantáneas de informes versionadas (s)
+EXPORT_CHUNK_SIZE = config('EXPORT_CHUNK_SIZE', default=2000, cast=int)  # Filas por lote en los volcados en streaming
+EXPORT_TMP_DIR = config('EXPORT_TMP_DIR', default=None)  # Directorio de los xlsx temporales (por defecto el del sistema)
+BULK_PDF_WORKERS = config('BULK_PDF_WORKERS', default=0, cast=int)  # Procesos del pool compartido de PDFs masivos (0 = uno por CPU, máx. 4)
+PDF_CACHE_MAX_BYTES = config('PDF_CACHE_MAX_BYTES', default=200 * 1024 * 1024, cast=int)  # Tamaño máximo del almacén de PDFs generados
+
+# Ámbito de acceso del profesor (grupos, asignaturas y alumnos)
+ACCESS_SCOPE_TTL = config('ACCESS_SCOPE_TTL', default=60, cast=int)  # Caché por usuario; se invalida al cambiar grupos o pertenencias (s)
+
+# Registro de consultas SQL para el comando index_advisor (vacío = desactivado)
+QUERY_LOG_PATH = config('QUERY_LOG_PATH', default='')  # Fichero JSONL donde se añade cada consulta ejecutada
+
+# Dashboard del docente
+DASHBOARD_CACHE_TTL = config('DASHBOARD_CACHE_TTL', default=300, cast=int)  # Secciones cacheadas por profesor y versión de datos (s)
+DASHBOARD_MAX_WORKERS = config('DASHBOARD_MAX_WORKERS', default=4, cast=int)  # Hilos para calcular las secciones en paralelo (1 = secuencial)
+DASHBOARD_PENDING_PRECOMPUTED = config('DASHBOARD_PENDING_PRECOMPUTED', default=True, cast=bool)  # Alumnos pendientes desde la última evaluación precalculada por profesor
+
+# LanguageTool (corrección gramatical)
+LANGUAGETOOL_URL = config('LANGUAGETOOL_URL', default='')  # Servidor propio, ej. http://localhost:8081/v2
+LANGUAGETOOL_PUBLIC_FALLBACK = config('LANGUAGETOOL_PUBLIC_FALLBACK', default=True, cast=bool)  # Usar api.languagetool.org si el propio falla
+LANGUAGETOOL_RETRY_AFTER = config('LANGUAGETOOL_RETRY_AFTER', default=30, cast=int)  # Segundos sin usar un backend tras un fallo
+LANGUAGETOOL_HEALTH_TTL = config('LANGUAGETOOL_HEALTH_TTL', default=60, cast=int)  # Segundos entre health checks de cada backend
+LANGUAGETOOL_CHUNK_LENGTH = config('LANGUAGETOOL_CHUNK_LENGTH', default=5000, cast=int)  # Tamaño máximo de cada trozo enviado
+LANGUAGETOOL_CONCURRENCY = config('LANGUAGETOOL_CONCURRENCY', default=4, cast=int)  # Párrafos corregidos en paralelo
+LANGUAGETOOL_CACHE_TTL = config('LANGUAGETOOL_CACHE_TTL', default=86400, cast=int)  # Caché de párrafos ya corregidos
 
 # Google Cloud Vision OCR Configuration
 GOOGLE_CLOUD_PROJECT_ID = config('GOOGLE_CLOUD_PROJECT_ID', default='evalai-education')
@@ -339,6 +378,14 @@ else:
     GOOGLE_CLOUD_CREDENTIALS_PATH = config('GOOGLE_CLOUD_CREDENTIALS_PATH', default=None)
 
 GOOGLE_VISION_MAX_FILE_SIZE = config('GOOGLE_VISION_MAX_FILE_SIZE', default=20 * 1024 * 1024, cast=int)  # 20MB
+GOOGLE_VISION_BATCH_SIZE = config('GOOGLE_VISION_BATCH_SIZE', default=16, cast=int)  # Imágenes por llamada batch (máx. 16)
+GOOGLE_VISION_BATCH_CONCURRENCY = config('GOOGLE_VISION_BATCH_CONCURRENCY', default=4, cast=int)  # Llamadas batch simultáneas
+
+# OCR local (Tesseract) como alternativa a Google Vision
+TESSERACT_CMD = config('TESSERACT_CMD', default=None)  # Ruta al binario si no está en el PATH
+OCR_VISION_COOLDOWN_SECONDS = config('OCR_VISION_COOLDOWN_SECONDS', default=300, cast=int)  # Pausa de Vision tras agotar cuota
+OCR_VISION_NETWORK_COOLDOWN_SECONDS = config('OCR_VISION_NETWORK_COOLDOWN_SECONDS', default=60, cast=int)  # Pausa de Vision tras un error de red
+OCR_AUTO_PRINTED_CONFIDENCE = config('OCR_AUTO_PRINTED_CONFIDENCE', default=0.85, cast=float)  # Umbral para aceptar Tesseract en modo auto
 
 # OpenAI Whisper Configuration (Cloud Audio Transcription)
 # Google Speech-to-Text Configuration (60 min/mes GRATIS)
@@ -1,7 +1,7 @@
 from django.contrib import admin
 from .models import (
     Student, Subject, Group, CalendarEvent, Comment, Attendance, StudentRecommendation,
-    CustomEvaluation, EvaluationResponse, UserProfile, ChatSession, ChatMessage
+    CustomEvaluation, EvaluationResponse, UserProfile, ChatSession, ChatMessage, ResearchPaper
 )
 
 # Importar admin personalizado para usuarios
@@ -115,3 +115,11 @@ class ChatMessageAdmin(admin.ModelAdmin):
         return obj.content[:100] + '...' if len(obj.content) > 100 else obj.content
     content_preview.short_description = 'Contenido'
 
+
+@admin.register(ResearchPaper)
+class ResearchPaperAdmin(admin.ModelAdmin):
+    list_display = ['id', 'title', 'year', 'citations', 'source', 'times_retrieved', 'created_at']
+    list_filter = ['source', 'year']
+    search_fields = ['title', 'abstract']
+    readonly_fields = ['title_key', 'times_retrieved', 'created_at', 'updated_at']
+    list_per_page = 50
@@ -4,3 +4,19 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from django.conf import settings
+
+        # Registro de consultas para el comando index_advisor (desactivado por defecto)
+        if getattr(settings, 'QUERY_LOG_PATH', ''):
+            from django.db.backends.signals import connection_created
+            from core.services.index_advisor import QueryLogRecorder
+
+            recorder = QueryLogRecorder(settings.QUERY_LOG_PATH)
+
+            def install_recorder(sender, connection, **kwargs):
+                if recorder not in connection.execute_wrappers:
+                    connection.execute_wrappers.append(recorder)
+
+            connection_created.connect(install_recorder, weak=False, dispatch_uid='core_query_log')
@@ -0,0 +1,58 @@
+"""
+DDL del índice a texto completo de core_researchpaper (única fuente)
+
+Lo usan la migración 0010 y PaperIndexService.ensure_index. No importa modelos para que la
+migración no dependa del estado actual de core.models.
+
+- PostgreSQL: columna generada tsvector + índice GIN
+- SQLite: tabla virtual FTS5 sincronizada por triggers
+"""
+from typing import List
+
+TABLE = 'core_researchpaper'
+FTS_TABLE = f"{TABLE}_fts"
+PG_INDEX = f"{TABLE}_search_idx"
+
+PG_INDEX_SQL = [
+    f"""ALTER TABLE {TABLE} ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(abstract, '')), 'B')
+        ) STORED""",
+    f"CREATE INDEX IF NOT EXISTS {PG_INDEX} ON {TABLE} USING GIN (search_vector)",
+]
+
+SQLITE_INDEX_SQL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, abstract, content='{TABLE}', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, abstract) VALUES (new.id, new.title, new.abstract);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, abstract) VALUES ('delete', old.id, old.title, old.abstract);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF title, abstract ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, abstract) VALUES ('delete', old.id, old.title, old.abstract);
+        INSERT INTO {FTS_TABLE}(rowid, title, abstract) VALUES (new.id, new.title, new.abstract);
+    END""",
+]
+
+
+def create_statements(vendor: str) -> List[str]:
+    """Sentencias idempotentes que crean el índice (vacío si el motor no está soportado)"""
+    if vendor == 'postgresql':
+        return PG_INDEX_SQL
+    if vendor == 'sqlite':
+        return SQLITE_INDEX_SQL
+    return []
+
+
+def drop_statements(vendor: str) -> List[str]:
+    if vendor == 'postgresql':
+        return [f"DROP INDEX IF EXISTS {PG_INDEX}"]
+    if vendor == 'sqlite':
+        return [f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{trigger}" for trigger in ('ai', 'ad', 'au')] + [
+            f"DROP TABLE IF EXISTS {FTS_TABLE}"
+        ]
+    return []
@@ -0,0 +1,116 @@
+"""
+Comando Django para comparar los backends de LanguageTool (servidor propio vs API pública).
+Uso: python manage.py benchmark_languagetool --from-db 50 --concurrency 4
+     python manage.py benchmark_languagetool --corpus textos.txt --backends local,public
+"""
+import json
+import time
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand, CommandError
+from core.models import CorrectionEvidence
+from core.services.languagetool_service import languagetool_service, LanguageToolBackend
+
+
+class Command(BaseCommand):
+    help = 'Ejecuta el mismo corpus de textos contra cada backend de LanguageTool y compara latencia y throughput'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--corpus',
+            type=str,
+            help='Fichero .json (lista de textos) o .txt (textos separados por una línea "---")',
+        )
+        parser.add_argument(
+            '--from-db',
+            type=int,
+            default=0,
+            help='Usar los textos originales de las N evidencias de corrección más recientes',
+        )
+        parser.add_argument('--idioma', type=str, default='es', help='Código de idioma (es, ca, en)')
+        parser.add_argument('--concurrency', type=int, default=4, help='Peticiones simultáneas por backend')
+        parser.add_argument('--repeat', type=int, default=1, help='Veces que se repite el corpus')
+        parser.add_argument(
+            '--backends',
+            type=str,
+            default='',
+            help='Backends a comparar separados por comas (por defecto todos los configurados)',
+        )
+        parser.add_argument('--url', type=str, help='URL adicional a comparar como backend "custom"')
+
+    def _cargar_corpus(self, options):
+        textos = []
+        if options['corpus']:
+            with open(options['corpus'], encoding='utf-8') as f:
+                contenido = f.read()
+            if options['corpus'].endswith('.json'):
+                textos = [t for t in json.loads(contenido) if t]
+            else:
+                textos = [t.strip() for t in contenido.split('\n---\n') if t.strip()]
+        if options['from_db']:
+            textos.extend(
+                CorrectionEvidence.objects.order_by('-created_at')
+                .values_list('original_text', flat=True)[:options['from_db']]
+            )
+        return [t for t in textos if t.strip()]
+
+    def _medir(self, backend, texto, language_code):
+        inicio = time.perf_counter()
+        try:
+            response = backend.check({'text': texto, 'language': language_code, 'enabledOnly': 'false'})
+            ok = response.status_code == 200
+            matches = len(response.json().get('matches', [])) if ok else 0
+        except Exception:
+            ok, matches = False, 0
+        return time.perf_counter() - inicio, ok, matches
+
+    def handle(self, *args, **options):
+        corpus = self._cargar_corpus(options) * max(options['repeat'], 1)
+        if not corpus:
+            raise CommandError('Corpus vacío: usa --corpus y/o --from-db')
+
+        backends = list(languagetool_service.backends)
+        if options['url']:
+            backends.append(LanguageToolBackend('custom', options['url'], languagetool_service.timeout))
+        if options['backends']:
+            nombres = {n.strip() for n in options['backends'].split(',')}
+            backends = [b for b in backends if b.name in nombres]
+        if not backends:
+            raise CommandError('No hay backends que comparar')
+
+        language_code = languagetool_service.LANGUAGE_MAP.get(options['idioma'], options['idioma'])
+        total_chars = sum(len(t) for t in corpus)
+        self.stdout.write(
+            f'Corpus: {len(corpus)} textos, {total_chars} caracteres, concurrencia {options["concurrency"]}'
+        )
+
+        for backend in backends:
+            estado = backend.health_check()
+            self.stdout.write('=' * 60)
+            self.stdout.write(f'{backend.name} ({backend.base_url})')
+            if not estado['healthy']:
+                self.stdout.write(self.style.ERROR('  No disponible, se omite'))
+                continue
+
+            # Calentamiento: abre la conexión y carga el modelo de idioma en el servidor
+            self._medir(backend, corpus[0], language_code)
+
+            inicio = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+                resultados = list(executor.map(lambda t: self._medir(backend, t, language_code), corpus))
+            total = time.perf_counter() - inicio
+
+            latencias = sorted(r[0] * 1000 for r in resultados if r[1])
+            errores = sum(1 for r in resultados if not r[1])
+            if not latencias:
+                self.stdout.write(self.style.ERROR(f'  Todas las peticiones fallaron ({errores})'))
+                continue
+            p95 = latencias[min(len(latencias) - 1, int(round(0.95 * (len(latencias) - 1))))]
+            self.stdout.write(f'  Peticiones OK:   {len(latencias)} (errores: {errores})')
+            self.stdout.write(f'  Latencia media:  {statistics.mean(latencias):.1f} ms')
+            self.stdout.write(f'  Latencia p50:    {statistics.median(latencias):.1f} ms')
+            self.stdout.write(f'  Latencia p95:    {p95:.1f} ms')
+            self.stdout.write(f'  Throughput:      {len(corpus) / total:.2f} textos/s, {total_chars / total:.0f} caracteres/s')
+            self.stdout.write(f'  Errores gramaticales detectados: {sum(r[2] for r in resultados)}')
+
+        self.stdout.write(self.style.SUCCESS('Benchmark completado'))
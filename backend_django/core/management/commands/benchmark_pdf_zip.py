@@ -0,0 +1,71 @@
+"""
+Comando Django para medir la exportación masiva de PDFs de un grupo según el número de procesos.
+Los datos de los alumnos se calculan una vez; solo se mide el renderizado y el empaquetado en ZIP.
+Uso: python manage.py benchmark_pdf_zip <grupo_id> --fecha-inicio 2025-01-07 --fecha-fin 2025-03-31
+     python manage.py benchmark_pdf_zip <grupo_id> --workers 1,2,4,8 --repeat 3
+"""
+import time
+import statistics
+from datetime import date, datetime
+from django.core.management.base import BaseCommand, CommandError
+from core.models import Group
+from core.services.bulk_pdf_export import bulk_pdf_export_service
+
+
+class Command(BaseCommand):
+    help = 'Mide el tiempo de la exportación masiva de PDFs de un grupo frente al número de procesos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('grupo_id', type=int, help='ID del grupo')
+        parser.add_argument('--fecha-inicio', type=str, help='Inicio del trimestre (YYYY-MM-DD, por defecto hace 3 meses)')
+        parser.add_argument('--fecha-fin', type=str, help='Fin del trimestre (YYYY-MM-DD, por defecto hoy)')
+        parser.add_argument('--workers', type=str, default='1,2,4', help='Números de procesos a probar, separados por comas')
+        parser.add_argument('--repeat', type=int, default=1, help='Repeticiones por configuración (se toma la mediana)')
+        parser.add_argument('--copies', type=int, default=1, help='Multiplicar los alumnos para simular grupos grandes')
+
+    def _fecha(self, valor, defecto):
+        if not valor:
+            return defecto
+        try:
+            return datetime.strptime(valor, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f'Fecha no válida: {valor}')
+
+    def handle(self, *args, **options):
+        grupo = Group.objects.select_related('teacher').filter(pk=options['grupo_id']).first()
+        if not grupo:
+            raise CommandError('Grupo no encontrado')
+        fecha_fin = self._fecha(options['fecha_fin'], date.today())
+        fecha_inicio = self._fecha(options['fecha_inicio'], date.fromordinal(fecha_fin.toordinal() - 90))
+        try:
+            configuraciones = [int(w) for w in options['workers'].split(',') if w.strip()]
+        except ValueError:
+            raise CommandError('--workers debe ser una lista de enteros, ej. 1,2,4')
+
+        tareas = bulk_pdf_export_service.build_tasks(grupo, fecha_inicio, fecha_fin, 'T1')
+        if not tareas:
+            raise CommandError('El grupo no tiene alumnos')
+        tareas = [
+            (f"{copia}_{tarea[0]}",) + tarea[1:]
+            for copia in range(max(options['copies'], 1)) for tarea in tareas
+        ]
+
+        self.stdout.write(f'Grupo {grupo.name}: {len(tareas)} PDFs, {options["repeat"]} repetición(es) por configuración')
+        self.stdout.write('=' * 60)
+        self.stdout.write(f'  {"Procesos":>8}  {"Tiempo (s)":>10}  {"PDF/s":>8}  {"Aceleración":>11}  {"ZIP (KB)":>9}')
+
+        base = None
+        for workers in configuraciones:
+            tiempos = []
+            tamano = 0
+            for _ in range(max(options['repeat'], 1)):
+                inicio = time.perf_counter()
+                tamano = sum(len(chunk) for chunk in bulk_pdf_export_service.iter_zip(tareas, workers=workers))
+                tiempos.append(time.perf_counter() - inicio)
+            tiempo = statistics.median(tiempos)
+            base = base or tiempo
+            self.stdout.write(
+                f'  {workers:>8}  {tiempo:>10.2f}  {len(tareas) / tiempo:>8.1f}  {base / tiempo:>10.2f}x  {tamano / 1024:>9.0f}'
+            )
+
+        self.stdout.write(self.style.SUCCESS('Benchmark completado'))
@@ -0,0 +1,84 @@
+"""
+Comando Django para medir el efecto de ?fields= / ?expand= en los listados de alumnos, grupos y asignaturas.
+Para cada variante informa del número de consultas SQL, el tamaño de la respuesta y la mediana del tiempo.
+Las peticiones se hacen en proceso con el cliente de test, autenticado como el profesor indicado.
+Uso: python manage.py benchmark_sparse_fields <username>
+     python manage.py benchmark_sparse_fields <username> --endpoint students --repeat 10
+"""
+import time
+import statistics
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+VARIANTES = {
+    'students': [
+        {},
+        {'fields': 'id,name'},
+        {'fields': 'id,name,apellidos,grupo_principal_name'},
+        {'fields': 'id,name', 'expand': 'grupo_principal'},
+    ],
+    'groups': [
+        {},
+        {'fields': 'id,name'},
+        {'fields': 'id,name,total_students'},
+        {'fields': 'id,name', 'expand': 'teacher'},
+    ],
+    'subjects': [
+        {},
+        {'fields': 'id,name'},
+        {'fields': 'id,name,days,start_time,end_time'},
+        {'fields': 'id,name', 'expand': 'teacher'},
+    ],
+}
+
+
+class Command(BaseCommand):
+    help = 'Compara consultas, tamaño y tiempo de los listados con y sin ?fields= / ?expand='
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', type=str, help='Profesor con el que se autentican las peticiones')
+        parser.add_argument('--endpoint', choices=sorted(VARIANTES), help='Medir solo este listado')
+        parser.add_argument('--repeat', type=int, default=5, help='Repeticiones por variante (se toma la mediana)')
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(username=options['username']).first()
+        if not user:
+            raise CommandError('Usuario no encontrado')
+        host = next((h for h in settings.ALLOWED_HOSTS if h not in ('*',) and not h.startswith('.')), 'localhost')
+        client = APIClient(HTTP_HOST=host)
+        client.force_authenticate(user)
+
+        endpoints = [options['endpoint']] if options['endpoint'] else sorted(VARIANTES)
+        repeat = max(options['repeat'], 1)
+        self.stdout.write(f'Usuario {user.username}, {repeat} repetición(es) por variante')
+
+        for endpoint in endpoints:
+            self.stdout.write('=' * 78)
+            self.stdout.write(f'/api/{endpoint}/')
+            self.stdout.write(f'  {"Parámetros":<44}  {"Consultas":>9}  {"Bytes":>9}  {"ms":>8}')
+            base = None
+            for params in VARIANTES[endpoint]:
+                tiempos, consultas, tamano = [], 0, 0
+                for _ in range(repeat):
+                    with CaptureQueriesContext(connection) as ctx:
+                        inicio = time.perf_counter()
+                        response = client.get(f'/api/{endpoint}/', params)
+                        tiempos.append((time.perf_counter() - inicio) * 1000)
+                    if response.status_code != 200:
+                        raise CommandError(f'/api/{endpoint}/ {params}: HTTP {response.status_code}')
+                    consultas, tamano = len(ctx.captured_queries), len(response.content)
+
+                etiqueta = '&'.join(f'{k}={v}' for k, v in params.items()) or '(todos los campos)'
+                mediana = statistics.median(tiempos)
+                linea = f'  {etiqueta:<44}  {consultas:>9}  {tamano:>9}  {mediana:>8.1f}'
+                if base is None:
+                    base = tamano
+                elif base:
+                    linea += f'  ({100 * tamano / base:.1f}% del tamaño)'
+                self.stdout.write(linea)
+
+        self.stdout.write(self.style.SUCCESS('Medición completada'))
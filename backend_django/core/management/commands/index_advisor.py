@@ -0,0 +1,76 @@
+"""
+Comando Django que reproduce un registro de consultas con EXPLAIN y propone índices.
+Agrupa las consultas por forma, analiza el plan de un ejemplo de cada una y muestra las lecturas
+secuenciales y ordenaciones en memoria con el índice candidato (si no existe ya).
+El registro se graba con QUERY_LOG_PATH (JSONL) o con el logger django.db.backends en DEBUG.
+Uso: python manage.py index_advisor /tmp/consultas.jsonl
+     python manage.py index_advisor /tmp/consultas.jsonl --top 20 --min-count 5 --plan
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connections
+
+from core.services.index_advisor import analyze, group_queries, read_query_log
+
+
+class Command(BaseCommand):
+    help = 'Ejecuta EXPLAIN sobre las consultas registradas y propone índices compuestos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('log', nargs='?', help='Registro de consultas (por defecto QUERY_LOG_PATH)')
+        parser.add_argument('--top', type=int, default=50, help='Formas de consulta analizadas (las de más tiempo total)')
+        parser.add_argument('--min-count', type=int, default=1, help='Ignorar formas con menos ejecuciones')
+        parser.add_argument('--plan', action='store_true', help='Mostrar el plan completo de cada forma')
+        parser.add_argument('--database', default='default', help='Alias de la base de datos')
+
+    def handle(self, *args, **options):
+        path = options['log'] or getattr(settings, 'QUERY_LOG_PATH', '')
+        if not path:
+            raise CommandError('Indica el registro de consultas o define QUERY_LOG_PATH')
+        if connections[options['database']].vendor not in ('sqlite', 'postgresql'):
+            raise CommandError('Solo se admiten SQLite y PostgreSQL')
+        try:
+            with open(path, encoding='utf-8') as f:
+                formas = group_queries(read_query_log(f))
+        except OSError as e:
+            raise CommandError(f'No se pudo leer {path}: {e}')
+
+        formas = [(forma, item) for forma, item in formas.items() if item['count'] >= options['min_count']]
+        self.stdout.write(f'{len(formas)} formas de consulta SELECT en {path}')
+        self.stdout.write('=' * 60)
+
+        candidatos, con_problemas, errores = {}, 0, 0
+        for forma, item in formas[:options['top']]:
+            try:
+                resultado = analyze(item['sql'], item['params'], options['database'])
+            except DatabaseError as e:
+                errores += 1
+                self.stdout.write(self.style.WARNING(f'EXPLAIN falló ({e}): {forma[:120]}'))
+                continue
+            if not resultado['issues'] and not options['plan']:
+                continue
+
+            con_problemas += bool(resultado['issues'])
+            self.stdout.write(f'{item["count"]}x, {item["total_ms"]:.1f} ms en total: {forma[:200]}')
+            if options['plan']:
+                for linea in resultado['plan']:
+                    self.stdout.write(f'    | {linea}')
+            for tipo, tabla in resultado['issues']:
+                etiqueta = 'Lectura secuencial' if tipo == 'scan' else 'Ordenación en memoria'
+                self.stdout.write(self.style.WARNING(f'  {etiqueta}' + (f': {tabla}' if tabla else '')))
+            for candidato in resultado['candidates']:
+                self.stdout.write(f'  -> {candidato["hint"]}')
+                clave = (candidato['table'], tuple(candidato['columns']))
+                candidatos.setdefault(clave, [candidato['hint'], 0, 0.0])
+                candidatos[clave][1] += item['count']
+                candidatos[clave][2] += item['total_ms']
+
+        self.stdout.write('=' * 60)
+        if errores:
+            self.stdout.write(self.style.WARNING(f'{errores} formas no se pudieron analizar'))
+        if not candidatos:
+            self.stdout.write(self.style.SUCCESS(f'Sin índices candidatos ({con_problemas} formas con lecturas completas u ordenaciones)'))
+            return
+        self.stdout.write(self.style.SUCCESS(f'Índices candidatos ({len(candidatos)}), por tiempo total de las consultas afectadas:'))
+        for hint, ejecuciones, total_ms in sorted(candidatos.values(), key=lambda c: -c[2]):
+            self.stdout.write(f'  {hint}  ({ejecuciones} ejecuciones, {total_ms:.1f} ms)')
@@ -0,0 +1,128 @@
+"""
+Comando Django para simular la ráfaga de envíos de una autoevaluación por QR.
+Reproduce N alumnos enviando a la vez (más reintentos) y mide la latencia del endpoint submit.
+Uso: python manage.py loadtest_autoevaluacion <evaluation_id> --students 30 --retries 1 --cleanup
+     python manage.py loadtest_autoevaluacion <evaluation_id> --url https://evalai2.onrender.com
+"""
+import random
+import time
+import statistics
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.test import Client
+from core.models import CustomEvaluation, EvaluationResponse, SelfEvaluation, Student
+
+
+class Command(BaseCommand):
+    help = 'Simula la ráfaga de envíos de alumnos a una autoevaluación por QR e informa de la latencia p95'
+
+    def add_arguments(self, parser):
+        parser.add_argument('evaluation_id', type=str, help='UUID de la autoevaluación')
+        parser.add_argument('--students', type=int, default=30, help='Alumnos que envían (los primeros del grupo)')
+        parser.add_argument('--concurrency', type=int, default=30, help='Envíos simultáneos')
+        parser.add_argument('--retries', type=int, default=1, help='Reenvíos idénticos por alumno (reintentos del móvil)')
+        parser.add_argument('--url', type=str, help='Servidor a atacar por HTTP (por defecto, en proceso con el cliente de test)')
+        parser.add_argument(
+            '--cleanup',
+            action='store_true',
+            help='Borrar las respuestas y autoevaluaciones creadas por la prueba',
+        )
+
+    def _random_responses(self, questions):
+        responses = {}
+        for question in questions:
+            if question.get('type') == 'likert':
+                responses[str(question['id'])] = str(random.randint(1, 5))
+            elif question.get('type') == 'multiple_choice' and question.get('options'):
+                responses[str(question['id'])] = random.choice(question['options'])
+            else:
+                responses[str(question['id'])] = 'Respuesta de prueba de carga'
+        return responses
+
+    def handle(self, *args, **options):
+        evaluation = CustomEvaluation.objects.filter(pk=options['evaluation_id']).first()
+        if not evaluation:
+            raise CommandError('Autoevaluación no encontrada')
+        if not evaluation.is_active:
+            raise CommandError('La autoevaluación no está activa')
+
+        student_ids = list(
+            Student.objects.filter(grupo_principal=evaluation.group)
+            .order_by('id').values_list('id', flat=True)[:options['students']]
+        )
+        if not student_ids:
+            raise CommandError('El grupo no tiene alumnos')
+        already_answered = set(
+            EvaluationResponse.objects.filter(evaluation=evaluation, student_id__in=student_ids)
+            .values_list('student_id', flat=True)
+        )
+        self_eval_before = set(SelfEvaluation.objects.filter(student_id__in=student_ids).values_list('id', flat=True))
+
+        submissions = []
+        for student_id in student_ids:
+            payload = {'student_id': student_id, 'responses': self._random_responses(evaluation.questions)}
+            submissions.extend([payload] * (1 + max(options['retries'], 0)))
+        random.shuffle(submissions)
+
+        path = f"/api/custom-evaluations/{evaluation.id}/submit/"
+        if options['url']:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_maxsize=options['concurrency'])
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            endpoint = options['url'].rstrip('/') + path
+
+            def send(payload):
+                inicio = time.perf_counter()
+                try:
+                    status_code = session.post(endpoint, json=payload, timeout=30).status_code
+                except requests.RequestException:
+                    status_code = 'error'
+                return time.perf_counter() - inicio, status_code
+        else:
+            def send(payload):
+                close_old_connections()
+                client = Client(HTTP_HOST='localhost')
+                inicio = time.perf_counter()
+                status_code = client.post(path, payload, content_type='application/json').status_code
+                elapsed = time.perf_counter() - inicio
+                close_old_connections()
+                return elapsed, status_code
+
+        self.stdout.write(
+            f'Ráfaga: {len(student_ids)} alumnos, {len(submissions)} envíos, concurrencia {options["concurrency"]}'
+            f' ({len(already_answered)} alumnos ya habían respondido)'
+        )
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            resultados = list(executor.map(send, submissions))
+        total = time.perf_counter() - inicio
+
+        latencias = sorted(r[0] * 1000 for r in resultados)
+        p95 = latencias[min(len(latencias) - 1, int(round(0.95 * (len(latencias) - 1))))]
+        codigos = Counter(r[1] for r in resultados)
+        respuestas = EvaluationResponse.objects.filter(evaluation=evaluation, student_id__in=student_ids).count()
+
+        self.stdout.write('=' * 60)
+        self.stdout.write(f'  Códigos HTTP:    {dict(codigos)}')
+        self.stdout.write(f'  Latencia media:  {statistics.mean(latencias):.1f} ms')
+        self.stdout.write(f'  Latencia p50:    {statistics.median(latencias):.1f} ms')
+        self.stdout.write(f'  Latencia p95:    {p95:.1f} ms')
+        self.stdout.write(f'  Latencia máx.:   {latencias[-1]:.1f} ms')
+        self.stdout.write(f'  Throughput:      {len(submissions) / total:.1f} envíos/s')
+        self.stdout.write(f'  Respuestas en BD: {respuestas} (esperadas {len(student_ids)})')
+
+        errores = sum(n for code, n in codigos.items() if code == 'error' or code >= 500)
+        if respuestas != len(student_ids) or errores:
+            self.stdout.write(self.style.ERROR('Hay envíos perdidos o errores del servidor'))
+
+        if options['cleanup'] and not options['url']:
+            nuevos = [sid for sid in student_ids if sid not in already_answered]
+            EvaluationResponse.objects.filter(evaluation=evaluation, student_id__in=nuevos).delete()
+            SelfEvaluation.objects.filter(student_id__in=student_ids).exclude(id__in=self_eval_before).delete()
+            self.stdout.write('Datos de la prueba eliminados')
+
+        self.stdout.write(self.style.SUCCESS('Prueba de carga completada'))
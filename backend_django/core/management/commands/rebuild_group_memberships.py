@@ -0,0 +1,28 @@
+"""
+Comando Django para recalcular la tabla de pertenencias alumno-grupo (GroupMembership).
+Necesario tras cargas masivas de alumnos (bulk_create, update de grupo_principal) que no disparan señales.
+Uso: python manage.py rebuild_group_memberships
+     python manage.py rebuild_group_memberships --batch-size 1000
+"""
+from django.core.management.base import BaseCommand
+from core.models import GroupMembership, Student
+
+
+class Command(BaseCommand):
+    help = 'Recalcula las pertenencias de los alumnos a sus grupos principales y subgrupos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Alumnos procesados por lote')
+
+    def handle(self, *args, **options):
+        antes = GroupMembership.objects.count()
+        lote = []
+        for student_id in Student.objects.values_list('id', flat=True).iterator(chunk_size=options['batch_size']):
+            lote.append(student_id)
+            if len(lote) >= options['batch_size']:
+                GroupMembership.sync_students(lote)
+                lote = []
+        GroupMembership.sync_students(lote)
+        self.stdout.write(self.style.SUCCESS(
+            f'Pertenencias recalculadas: {GroupMembership.objects.count()} (antes {antes})'
+        ))
@@ -0,0 +1,55 @@
+"""
+Comando Django para reconstruir y compactar el índice local de papers.
+Uso: python manage.py rebuild_paper_index
+     python manage.py rebuild_paper_index --backfill-chat   # importa los papers guardados en ChatMessage.papers
+"""
+from django.core.management.base import BaseCommand
+from django.db import connection
+from core.models import ChatMessage, ResearchPaper
+from core.services.paper_index import paper_index_service
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye y compacta el índice a texto completo del corpus local de papers'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--backfill-chat',
+            action='store_true',
+            help='Importar al corpus los papers citados en mensajes de chat anteriores',
+        )
+        parser.add_argument(
+            '--no-compact',
+            action='store_true',
+            help='No ejecutar VACUUM / optimize tras reconstruir',
+        )
+        parser.add_argument('--batch-size', type=int, default=200, help='Mensajes procesados por lote')
+
+    def handle(self, *args, **options):
+        if not paper_index_service.is_supported():
+            self.stdout.write(self.style.ERROR(f'Motor de base de datos no soportado: {connection.vendor}'))
+            return
+
+        if options['backfill_chat']:
+            self.stdout.write('Importando papers de mensajes de chat...')
+            nuevos = 0
+            lote = []
+            mensajes = ChatMessage.objects.filter(sender='assistant').values_list('papers', flat=True)
+            for papers in mensajes.iterator(chunk_size=options['batch_size']):
+                if isinstance(papers, list):
+                    lote.extend(p for p in papers if isinstance(p, dict))
+                if len(lote) >= options['batch_size']:
+                    nuevos += paper_index_service.add_papers(lote)
+                    lote = []
+            if lote:
+                nuevos += paper_index_service.add_papers(lote)
+            self.stdout.write(self.style.SUCCESS(f'{nuevos} papers nuevos importados'))
+
+        self.stdout.write('Reconstruyendo índice...')
+        paper_index_service.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Índice reconstruido ({ResearchPaper.objects.count()} papers)'))
+
+        if not options['no_compact']:
+            self.stdout.write('Compactando...')
+            paper_index_service.compact()
+            self.stdout.write(self.style.SUCCESS('Índice compactado'))
@@ -0,0 +1,33 @@
+"""
+Comando Django para recalcular desde cero los agregados de evaluaciones (diario por profesor, mensual por alumno
+y última evaluación de cada alumno por profesor).
+Necesario tras cargas masivas (bulk_create, update) que no disparan las señales de mantenimiento.
+Uso: python manage.py rebuild_rollups
+"""
+from django.core.management.base import BaseCommand
+from django.db.models import Sum
+from core.models import DailyTeacherRollup, StudentMonthlyRollup
+from core.services.rollups import rollup_service
+
+
+class Command(BaseCommand):
+    help = 'Recalcula las tablas de agregados de evaluaciones y autoevaluaciones'
+
+    def _totales(self):
+        diario = DailyTeacherRollup.objects.aggregate(n=Sum('eval_count'))['n'] or 0
+        mensual = StudentMonthlyRollup.objects.aggregate(n=Sum('eval_count'), auto=Sum('self_eval_count'))
+        return diario, mensual['n'] or 0, mensual['auto'] or 0
+
+    def handle(self, *args, **options):
+        antes = self._totales()
+        self.stdout.write('Reconstruyendo agregados...')
+        filas = rollup_service.rebuild()
+        despues = self._totales()
+
+        for etiqueta, a, d in zip(('Evaluaciones (diario)', 'Evaluaciones (mensual)', 'Autoevaluaciones'), antes, despues):
+            if a != d:
+                self.stdout.write(self.style.WARNING(f'{etiqueta}: {a} -> {d} (desviación corregida)'))
+        self.stdout.write(self.style.SUCCESS(
+            f'Agregados reconstruidos: {filas["daily"]} filas diarias, {filas["monthly"]} filas mensuales, '
+            f'{filas["activity"]} últimas evaluaciones por profesor'
+        ))
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.7 on 2026-10-19 19:12
+
+from django.db import migrations, models
+
+from core.fulltext_index import create_statements, drop_statements
+
+
+def create_fulltext_index(apps, schema_editor):
+    """Índice a texto completo según el motor: tsvector + GIN en PostgreSQL, FTS5 + triggers en SQLite"""
+    for sql in create_statements(schema_editor.connection.vendor):
+        schema_editor.execute(sql)
+
+
+def drop_fulltext_index(apps, schema_editor):
+    for sql in drop_statements(schema_editor.connection.vendor):
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_userprofile_display_name_userprofile_settings'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResearchPaper',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(help_text='Título del paper', max_length=1000)),
+                ('title_key', models.CharField(help_text='SHA-1 del título normalizado (deduplicación)', max_length=40, unique=True)),
+                ('abstract', models.TextField(blank=True, default='', help_text='Resumen')),
+                ('authors', models.JSONField(blank=True, default=list, help_text='Lista de autores')),
+                ('year', models.IntegerField(blank=True, help_text='Año de publicación', null=True)),
+                ('url', models.CharField(blank=True, default='', help_text='URL o DOI', max_length=1000)),
+                ('citations', models.IntegerField(default=0, help_text='Número de citaciones')),
+                ('source', models.CharField(blank=True, default='', help_text='Fuente (Semantic Scholar, OpenAlex)', max_length=50)),
+                ('times_retrieved', models.PositiveIntegerField(default=1, help_text='Veces que ha aparecido en búsquedas externas')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Paper de Investigación',
+                'verbose_name_plural': 'Papers de Investigación',
+                'ordering': ['-citations'],
+            },
+        ),
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+    ]
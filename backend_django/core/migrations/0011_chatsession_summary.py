@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-19 19:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_researchpaper'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatsession',
+            name='summary',
+            field=models.TextField(blank=True, default='', help_text='Resumen acumulado de la conversación'),
+        ),
+        migrations.AddField(
+            model_name='chatsession',
+            name='summary_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='chatsession',
+            name='summary_upto_id',
+            field=models.BigIntegerField(blank=True, help_text='ID del último mensaje incluido en el resumen', null=True),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 4.2.7 on 2026-10-19 19:16
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+
+
+def backfill_message_stats(apps, schema_editor):
+    """Rellena contador y último mensaje de las sesiones existentes"""
+    ChatSession = apps.get_model('core', 'ChatSession')
+    ChatMessage = apps.get_model('core', 'ChatMessage')
+    last = ChatMessage.objects.filter(chat=OuterRef('pk')).order_by('-id')
+    sessions = ChatSession.objects.annotate(
+        n_messages=Count('messages'),
+        last_sender=Subquery(last.values('sender')[:1]),
+        last_content=Subquery(last.values('content')[:1]),
+        last_at=Subquery(last.values('timestamp')[:1]),
+    ).iterator(chunk_size=500)
+    batch = []
+    for session in sessions:
+        session.message_count = session.n_messages
+        session.last_message_sender = session.last_sender or ''
+        session.last_message_preview = (session.last_content or '')[:100]
+        session.last_message_at = session.last_at
+        batch.append(session)
+        if len(batch) >= 500:
+            ChatSession.objects.bulk_update(batch, ['message_count', 'last_message_sender', 'last_message_preview', 'last_message_at'])
+            batch = []
+    if batch:
+        ChatSession.objects.bulk_update(batch, ['message_count', 'last_message_sender', 'last_message_preview', 'last_message_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_chatsession_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatsession',
+            name='last_message_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='chatsession',
+            name='last_message_preview',
+            field=models.CharField(blank=True, default='', help_text='Primeros caracteres del último mensaje', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='chatsession',
+            name='last_message_sender',
+            field=models.CharField(blank=True, default='', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='chatsession',
+            name='message_count',
+            field=models.PositiveIntegerField(default=0, help_text='Total de mensajes en la conversación'),
+        ),
+        migrations.AddIndex(
+            model_name='chatsession',
+            index=models.Index(fields=['user', '-updated_at', '-id'], name='core_chatsession_user_upd_idx'),
+        ),
+        migrations.RunPython(backfill_message_stats, migrations.RunPython.noop),
+    ]
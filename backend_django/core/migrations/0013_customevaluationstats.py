@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-19 19:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_chatsession_message_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomEvaluationStats',
+            fields=[
+                ('evaluation', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='core.customevaluation')),
+                ('response_count', models.PositiveIntegerField(default=0)),
+                ('questions_hash', models.CharField(blank=True, default='', help_text='Hash de las preguntas con las que se calcularon', max_length=40)),
+                ('stats', models.JSONField(blank=True, default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Estadísticas de Autoevaluación',
+                'verbose_name_plural': 'Estadísticas de Autoevaluaciones',
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.7 on 2026-10-19 19:24
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_customevaluationstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportDataVersion',
+            fields=[
+                ('group', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='report_version', serialize=False, to='core.group')),
+                ('version', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Versión de datos de informes',
+                'verbose_name_plural': 'Versiones de datos de informes',
+            },
+        ),
+    ]
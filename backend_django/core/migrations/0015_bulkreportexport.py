@@ -0,0 +1,40 @@
+# Generated by Django 4.2.7 on 2026-10-19 19:28
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('core', '0014_reportdataversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BulkReportExport',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('trimestre', models.CharField(default='T1', max_length=10)),
+                ('fecha_inicio', models.DateField()),
+                ('fecha_fin', models.DateField()),
+                ('status', models.CharField(choices=[('pending', 'Pendiente'), ('running', 'En curso'), ('done', 'Completada'), ('error', 'Error')], default='pending', max_length=10)),
+                ('total', models.PositiveIntegerField(default=0, help_text='PDFs a generar')),
+                ('completed', models.PositiveIntegerField(default=0, help_text='PDFs ya añadidos al ZIP')),
+                ('file', models.FileField(blank=True, null=True, upload_to='informes/zip/')),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bulk_report_exports', to='core.group')),
+                ('teacher', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bulk_report_exports', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Exportación masiva de informes',
+                'verbose_name_plural': 'Exportaciones masivas de informes',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-19 19:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_bulkreportexport'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RenderedArtifact',
+            fields=[
+                ('key', models.CharField(help_text='sha256(tipo + versión de plantilla + datos)', max_length=64, primary_key=True, serialize=False)),
+                ('kind', models.CharField(help_text='Tipo de documento (student_report, evaluation_summary...)', max_length=50)),
+                ('content', models.BinaryField()),
+                ('etag', models.CharField(help_text='sha256 del contenido (ETag fuerte)', max_length=64)),
+                ('size', models.PositiveIntegerField()),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_accessed_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Documento generado',
+                'verbose_name_plural': 'Documentos generados',
+                'indexes': [models.Index(fields=['last_accessed_at'], name='core_artifact_lru_idx')],
+            },
+        ),
+    ]
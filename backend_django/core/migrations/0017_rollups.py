@@ -0,0 +1,123 @@
+# Generated by Django 4.2.7 on 2026-10-19 19:37
+
+import core.models
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate, TruncMonth
+
+
+# Copia de core.services.rollups.HISTOGRAM_BINS en el momento de la migración
+HISTOGRAM_BINS = 11
+
+
+def backfill_rollups(apps, schema_editor):
+    """Rellena los agregados con el historial existente (misma agrupación que RollupService.rebuild)"""
+    Evaluation = apps.get_model('core', 'Evaluation')
+    SelfEvaluation = apps.get_model('core', 'SelfEvaluation')
+    DailyTeacherRollup = apps.get_model('core', 'DailyTeacherRollup')
+    StudentMonthlyRollup = apps.get_model('core', 'StudentMonthlyRollup')
+
+    histogram = {}
+    for i in range(HISTOGRAM_BINS):
+        condition = Q(score__gte=i) if i == HISTOGRAM_BINS - 1 else Q(score__gte=i, score__lt=i + 1)
+        histogram[f'h{i}'] = Count('id', filter=condition)
+    base = {'eval_count': Count('id'), 'score_count': Count('score'), 'score_sum': Sum('score'), **histogram}
+
+    filas = (
+        Evaluation.objects.filter(evaluator__isnull=False)
+        .annotate(day=TruncDate('created_at'))
+        .values('evaluator_id', 'subject_id', 'day').annotate(**base).order_by()
+    )
+    DailyTeacherRollup.objects.bulk_create((
+        DailyTeacherRollup(
+            teacher_id=fila['evaluator_id'], subject_id=fila['subject_id'], day=fila['day'],
+            eval_count=fila['eval_count'], score_count=fila['score_count'], score_sum=fila['score_sum'] or 0,
+            score_histogram=[fila[f'h{i}'] for i in range(HISTOGRAM_BINS)],
+        )
+        for fila in filas.iterator()
+    ), batch_size=1000)
+
+    monthly = {}
+    filas = (
+        Evaluation.objects.annotate(month=TruncMonth('date'))
+        .values('student_id', 'month').annotate(**base).order_by()
+    )
+    for fila in filas.iterator():
+        monthly[(fila['student_id'], fila['month'])] = StudentMonthlyRollup(
+            student_id=fila['student_id'], month=fila['month'],
+            eval_count=fila['eval_count'], score_count=fila['score_count'], score_sum=fila['score_sum'] or 0,
+            score_histogram=[fila[f'h{i}'] for i in range(HISTOGRAM_BINS)],
+        )
+    filas = (
+        SelfEvaluation.objects.annotate(month=TruncMonth('created_at'))
+        .values('student_id', 'month').annotate(count=Count('id'), total=Sum('score')).order_by()
+    )
+    for fila in filas.iterator():
+        month = fila['month'].date() if hasattr(fila['month'], 'date') else fila['month']
+        row = monthly.setdefault(
+            (fila['student_id'], month), StudentMonthlyRollup(student_id=fila['student_id'], month=month)
+        )
+        row.self_eval_count = fila['count']
+        row.self_eval_score_sum = fila['total'] or 0
+    StudentMonthlyRollup.objects.bulk_create(monthly.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('core', '0016_renderedartifact'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentMonthlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('eval_count', models.IntegerField(default=0)),
+                ('score_count', models.IntegerField(default=0)),
+                ('score_sum', models.FloatField(default=0)),
+                ('score_histogram', models.JSONField(default=core.models.empty_score_histogram)),
+                ('self_eval_count', models.IntegerField(default=0)),
+                ('self_eval_score_sum', models.FloatField(default=0)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_rollups', to='core.student')),
+            ],
+            options={
+                'verbose_name': 'Agregado mensual de alumno',
+                'verbose_name_plural': 'Agregados mensuales de alumnos',
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyTeacherRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('eval_count', models.IntegerField(default=0, help_text='Evaluaciones registradas')),
+                ('score_count', models.IntegerField(default=0, help_text='Evaluaciones con nota')),
+                ('score_sum', models.FloatField(default=0)),
+                ('score_histogram', models.JSONField(default=core.models.empty_score_histogram)),
+                ('subject', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='core.subject')),
+                ('teacher', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Agregado diario de evaluaciones',
+                'verbose_name_plural': 'Agregados diarios de evaluaciones',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='studentmonthlyrollup',
+            constraint=models.UniqueConstraint(fields=('student', 'month'), name='core_monthly_rollup_unique'),
+        ),
+        migrations.AddIndex(
+            model_name='dailyteacherrollup',
+            index=models.Index(fields=['teacher', 'day'], name='core_daily_rollup_td_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailyteacherrollup',
+            constraint=models.UniqueConstraint(fields=('teacher', 'subject', 'day'), name='core_daily_rollup_unique'),
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
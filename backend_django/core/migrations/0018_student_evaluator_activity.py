@@ -0,0 +1,53 @@
+# Generated by Django 4.2.7 on 2026-10-19 19:40
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_activity(apps, schema_editor):
+    """Última evaluación de cada alumno por cada profesor (misma consulta que RollupService.rebuild)"""
+    Evaluation = apps.get_model('core', 'Evaluation')
+    StudentEvaluatorActivity = apps.get_model('core', 'StudentEvaluatorActivity')
+    filas = Evaluation.objects.filter(evaluator__isnull=False).order_by(
+        'student_id', 'evaluator_id', '-created_at', '-id'
+    ).values_list('student_id', 'evaluator_id', 'created_at', 'id')
+    activity = {}
+    for student_id, evaluator_id, created_at, evaluation_id in filas.iterator(chunk_size=2000):
+        if (student_id, evaluator_id) not in activity:
+            activity[(student_id, evaluator_id)] = StudentEvaluatorActivity(
+                student_id=student_id, evaluator_id=evaluator_id,
+                last_evaluated_at=created_at, last_evaluation_id=evaluation_id,
+            )
+    StudentEvaluatorActivity.objects.bulk_create(activity.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('core', '0017_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentEvaluatorActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_evaluated_at', models.DateTimeField()),
+                ('evaluator', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='student_activity', to=settings.AUTH_USER_MODEL)),
+                ('last_evaluation', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.evaluation')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='evaluator_activity', to='core.student')),
+            ],
+            options={
+                'verbose_name': 'Última evaluación por profesor',
+                'verbose_name_plural': 'Últimas evaluaciones por profesor',
+                'indexes': [models.Index(fields=['student', '-last_evaluated_at'], name='core_student_activity_last_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='studentevaluatoractivity',
+            constraint=models.UniqueConstraint(fields=('student', 'evaluator'), name='core_student_activity_unique'),
+        ),
+        migrations.RunPython(backfill_activity, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 4.2.7 on 2026-10-19 19:43
+
+from django.db import migrations, models
+
+
+# Copia de core.models.WEEKDAY_ALIASES en el momento de la migración
+WEEKDAY_ALIASES = {
+    'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3, 'friday': 4, 'saturday': 5, 'sunday': 6,
+    'lunes': 0, 'martes': 1, 'miércoles': 2, 'miercoles': 2, 'jueves': 3, 'viernes': 4,
+    'sábado': 5, 'sabado': 5, 'domingo': 6,
+    'dilluns': 0, 'dimarts': 1, 'dimecres': 2, 'dijous': 3, 'divendres': 4, 'dissabte': 5, 'diumenge': 6,
+    'l': 0, 'm': 1, 'x': 2, 'j': 3, 'v': 4, 's': 5, 'd': 6,
+    'mon': 0, 'tue': 1, 'wed': 2, 'thu': 3, 'fri': 4, 'sat': 5, 'sun': 6,
+}
+
+
+def backfill_weekday_mask(apps, schema_editor):
+    """Calcula la máscara de días de las asignaturas existentes a partir de days"""
+    Subject = apps.get_model('core', 'Subject')
+    batch = []
+    for subject in Subject.objects.only('id', 'days').iterator(chunk_size=500):
+        mask = 0
+        for day in subject.days or []:
+            index = WEEKDAY_ALIASES.get(str(day).strip().lower())
+            if index is not None:
+                mask |= 1 << index
+        subject.weekday_mask = mask
+        batch.append(subject)
+        if len(batch) >= 500:
+            Subject.objects.bulk_update(batch, ['weekday_mask'])
+            batch = []
+    if batch:
+        Subject.objects.bulk_update(batch, ['weekday_mask'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_student_evaluator_activity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='subject',
+            name='weekday_mask',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, help_text='Días de clase como máscara de bits (bit 0 = lunes), derivada de days al guardar'),
+        ),
+        migrations.AddIndex(
+            model_name='subject',
+            index=models.Index(fields=['teacher', 'weekday_mask'], name='core_subject_teacher_days_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='subject',
+            index=models.Index(fields=['weekday_mask'], name='core_subject_days_idx'),
+        ),
+        migrations.RunPython(backfill_weekday_mask, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 4.2.7 on 2026-10-19 19:45
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_memberships(apps, schema_editor):
+    """Crea las pertenencias de los alumnos existentes (grupo principal y subgrupos)"""
+    Student = apps.get_model('core', 'Student')
+    GroupMembership = apps.get_model('core', 'GroupMembership')
+    deseadas = {}
+    for student_id, group_id in Student.subgrupos.through.objects.values_list('student_id', 'group_id').iterator():
+        deseadas[(student_id, group_id)] = 'subgrupo'
+    for student_id, group_id in Student.objects.filter(grupo_principal__isnull=False).values_list(
+        'id', 'grupo_principal_id'
+    ).iterator():
+        deseadas[(student_id, group_id)] = 'principal'
+    GroupMembership.objects.bulk_create(
+        [GroupMembership(student_id=s, group_id=g, role=role) for (s, g), role in deseadas.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_subject_weekday_mask'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GroupMembership',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('role', models.CharField(choices=[('principal', 'Grupo principal'), ('subgrupo', 'Subgrupo')], max_length=10)),
+                ('group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to='core.group')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to='core.student')),
+            ],
+            options={
+                'verbose_name': 'Pertenencia a grupo',
+                'verbose_name_plural': 'Pertenencias a grupos',
+                'indexes': [models.Index(fields=['student', 'role'], name='core_membership_student_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='groupmembership',
+            constraint=models.UniqueConstraint(fields=('group', 'student'), name='core_membership_unique'),
+        ),
+        migrations.RunPython(backfill_memberships, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 4.2.7 on 2026-10-19 19:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_group_membership'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='notification',
+            name='core_notifi_recipie_aeffaf_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='notification',
+            name='core_notifi_schedul_340655_idx',
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['student', '-created_at'], name='core_comment_student_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['author', '-created_at'], name='core_comment_author_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='evaluation',
+            index=models.Index(fields=['evaluator', '-created_at'], name='core_eval_evaluator_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['recipient', '-created_at'], name='core_notif_unread_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('sent_at__isnull', True)), fields=['scheduled_at'], name='core_notif_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rubricscore',
+            index=models.Index(fields=['student', 'subject', '-evaluated_at'], name='core_rscore_student_subj_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rubricscore',
+            index=models.Index(fields=['evaluator', '-evaluated_at'], name='core_rscore_evaluator_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='selfevaluation',
+            index=models.Index(fields=['student', '-created_at'], name='core_selfeval_student_idx'),
+        ),
+    ]
@@ -1,7 +1,7 @@
 ﻿from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete, pre_delete, pre_save, m2m_changed
 from django.dispatch import receiver
 
 
@@ -33,11 +33,37 @@ class Group(models.Model):
         return self.subgrupos.count()
 
 
+# Nombres de día aceptados en Subject.days (inglés, castellano, catalán y abreviaturas) -> date.weekday()
+WEEKDAY_ALIASES = {
+    'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3, 'friday': 4, 'saturday': 5, 'sunday': 6,
+    'lunes': 0, 'martes': 1, 'miércoles': 2, 'miercoles': 2, 'jueves': 3, 'viernes': 4,
+    'sábado': 5, 'sabado': 5, 'domingo': 6,
+    'dilluns': 0, 'dimarts': 1, 'dimecres': 2, 'dijous': 3, 'divendres': 4, 'dissabte': 5, 'diumenge': 6,
+    'l': 0, 'm': 1, 'x': 2, 'j': 3, 'v': 4, 's': 5, 'd': 6,
+    'mon': 0, 'tue': 1, 'wed': 2, 'thu': 3, 'fri': 4, 'sat': 5, 'sun': 6,
+}
+
+
+def days_to_weekday_mask(days) -> int:
+    """Máscara de bits de los días de clase (bit 0 = lunes ... bit 6 = domingo)"""
+    mask = 0
+    for day in days or []:
+        index = WEEKDAY_ALIASES.get(str(day).strip().lower())
+        if index is not None:
+            mask |= 1 << index
+    return mask
+
+
 class Subject(models.Model):
     """Modelo para asignaturas"""
     name = models.CharField(max_length=200)
     teacher = models.ForeignKey(User, on_delete=models.CASCADE, related_name="subjects")
     days = models.JSONField(default=list)
+    weekday_mask = models.PositiveSmallIntegerField(
+        default=0,
+        editable=False,
+        help_text="Días de clase como máscara de bits (bit 0 = lunes), derivada de days al guardar"
+    )
     start_time = models.TimeField()
     end_time = models.TimeField()
     color = models.CharField(max_length=7, default="#3B82F6")
@@ -48,10 +74,33 @@ class Subject(models.Model):
         ordering = ["name"]
         verbose_name = "Asignatura"
         verbose_name_plural = "Asignaturas"
+        indexes = [
+            models.Index(fields=['teacher', 'weekday_mask'], name='core_subject_teacher_days_idx'),
+            models.Index(fields=['weekday_mask'], name='core_subject_days_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
+    @property
+    def weekdays(self):
+        """Días de clase como enteros de date.weekday() (válidos también para rrule byweekday)"""
+        return [i for i in range(7) if self.weekday_mask & (1 << i)]
+
+    @classmethod
+    def meeting_on(cls, weekday, teacher=None):
+        """
+        Asignaturas con clase un día de la semana (entero de weekday() o fecha).
+        El filtro es un IN sobre las 64 máscaras que contienen el día, resoluble con el índice.
+        """
+        if hasattr(weekday, 'weekday'):
+            weekday = weekday.weekday()
+        bit = 1 << weekday
+        queryset = cls.objects.filter(weekday_mask__in=[mask for mask in range(1, 128) if mask & bit])
+        if teacher is not None:
+            queryset = queryset.filter(teacher=teacher)
+        return queryset
+
 
 class Student(models.Model):
     """Modelo para estudiantes con relación jerárquica a grupos"""
@@ -126,14 +175,13 @@ class Student(models.Model):
 
     @property
     def all_groups(self):
-        """Todos los grupos donde participa el estudiante"""
-        groups = [self.grupo_principal]
-        groups.extend(self.subgrupos.all())
-        return groups
+        """Todos los grupos donde participa el estudiante (el principal primero)"""
+        memberships = self.memberships.select_related('group').order_by('role', 'group__name')
+        return [membership.group for membership in memberships]
 
     def is_in_group(self, group):
         """Verifica si el estudiante pertenece a un grupo específico"""
-        return self.grupo_principal == group or group in self.subgrupos.all()
+        return self.memberships.filter(group=group).exists()
 
     def is_principal_in_group(self, group):
         """Verifica si el estudiante tiene este grupo como principal"""
@@ -141,7 +189,7 @@ class Student(models.Model):
 
     def is_subgrupo_in_group(self, group):
         """Verifica si el estudiante participa como subgrupo en este grupo"""
-        return group in self.subgrupos.all()
+        return self.memberships.filter(group=group, role=GroupMembership.ROLE_SUBGRUPO).exists()
 
 
 class CalendarEvent(models.Model):
@@ -237,6 +285,11 @@ class RubricScore(models.Model):
 
     class Meta:
         ordering = ["-evaluated_at"]
+        indexes = [
+            # Historial del alumno (por asignatura) y listado del profesor, ya en el orden de la vista
+            models.Index(fields=['student', 'subject', '-evaluated_at'], name='core_rscore_student_subj_idx'),
+            models.Index(fields=['evaluator', '-evaluated_at'], name='core_rscore_evaluator_idx'),
+        ]
 
     def __str__(self):
         return f"{self.rubric.title} - {self.student.name if self.student else ''}"
@@ -262,6 +315,11 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # Comentarios del alumno / del autor más recientes primero (sin ordenar en memoria)
+            models.Index(fields=['student', '-created_at'], name='core_comment_student_idx'),
+            models.Index(fields=['author', '-created_at'], name='core_comment_author_idx'),
+        ]
 
     def __str__(self):
         return f"Comentario de {self.author.username} sobre {self.student.name}"
@@ -375,6 +433,8 @@ class Evaluation(models.Model):
         indexes = [
             models.Index(fields=['date', 'subject']),
             models.Index(fields=['student', 'date']),
+            # Evaluaciones del profesor (listado, últimas evaluaciones por alumno)
+            models.Index(fields=['evaluator', '-created_at'], name='core_eval_evaluator_idx'),
         ]
 
     def __str__(self):
@@ -495,6 +555,7 @@ class Evidence(models.Model):
         ordering = ["-created_at"]
         indexes = [
             models.Index(fields=['student', 'subject']),
+            models.Index(fields=['student', '-created_at'], name='core_evidence_student_idx'),
         ]
 
     def __str__(self):
@@ -544,6 +605,7 @@ class SelfEvaluation(models.Model):
         ordering = ["-created_at"]
         indexes = [
             models.Index(fields=['student', 'subject']),
+            models.Index(fields=['student', '-created_at'], name='core_selfeval_student_idx'),
         ]
 
     def __str__(self):
@@ -603,8 +665,16 @@ class Notification(models.Model):
     class Meta:
         ordering = ["-created_at"]
         indexes = [
-            models.Index(fields=['recipient', 'is_read']),
-            models.Index(fields=['scheduled_at']),
+            # Listado paginado por cursor (created_at, id) del destinatario
+            models.Index(fields=['recipient', '-created_at', '-id'], name='core_notif_recipient_idx'),
+            # Parciales: solo las filas que se consultan (no leídas / programadas sin enviar),
+            # que son una fracción pequeña de la tabla
+            models.Index(
+                fields=['recipient', '-created_at'], name='core_notif_unread_idx', condition=models.Q(is_read=False)
+            ),
+            models.Index(
+                fields=['scheduled_at'], name='core_notif_pending_idx', condition=models.Q(sent_at__isnull=True)
+            ),
             models.Index(fields=['notification_type']),
         ]
 
@@ -974,6 +1044,11 @@ class CustomEvaluation(models.Model):
     def total_responses(self):
         """Total de respuestas recibidas"""
         return self.responses.count()
+    
+    @staticmethod
+    def definition_cache_key(evaluation_id):
+        """Clave de caché de la definición pública (preguntas + lista de alumnos)"""
+        return f"custom_eval:definition:{evaluation_id}"
 
 
 class EvaluationResponse(models.Model):
@@ -1001,6 +1076,103 @@ class EvaluationResponse(models.Model):
         return f"{self.student.full_name} - {self.evaluation.title}"
 
 
+class CustomEvaluationStats(models.Model):
+    """
+    Estadísticas por pregunta de una autoevaluación, actualizadas de forma incremental
+    en cada envío (evita recalcularlas desde todas las respuestas).
+    """
+    evaluation = models.OneToOneField(CustomEvaluation, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    response_count = models.PositiveIntegerField(default=0)
+    questions_hash = models.CharField(max_length=40, blank=True, default='', help_text="Hash de las preguntas con las que se calcularon")
+    stats = models.JSONField(default=dict, blank=True)
+    # Estructura de stats (por id de pregunta):
+    # {
+    #   "1": {"type": "likert", "count": 12, "sum": 45, "histogram": {"1": 0, ..., "5": 4}},
+    #   "2": {"type": "multiple_choice", "count": 12, "options": {"Opción A": 7, "Opción B": 5}},
+    #   "3": {"type": "text", "count": 10}
+    # }
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = "Estadísticas de Autoevaluación"
+        verbose_name_plural = "Estadísticas de Autoevaluaciones"
+    
+    def __str__(self):
+        return f"Estadísticas - {self.evaluation_id} ({self.response_count} respuestas)"
+    
+    @staticmethod
+    def hash_questions(questions):
+        import json
+        import hashlib
+        return hashlib.sha1(json.dumps(questions, sort_keys=True).encode('utf-8')).hexdigest()
+    
+    def apply_response(self, questions, responses, sign=1):
+        """Suma (sign=1) o resta (sign=-1) una respuesta a las estadísticas, sin guardar"""
+        self.response_count = max(0, self.response_count + sign)
+        for question in questions:
+            question_id = str(question['id'])
+            answer = (responses or {}).get(question_id)
+            if answer in (None, ''):
+                continue
+            entry = self.stats.setdefault(question_id, {'type': question.get('type'), 'count': 0})
+            if question.get('type') == 'likert':
+                try:
+                    value = int(answer)
+                except (ValueError, TypeError):
+                    continue
+                entry['sum'] = entry.get('sum', 0) + sign * value
+                histogram = entry.setdefault('histogram', {})
+                histogram[str(value)] = max(0, histogram.get(str(value), 0) + sign)
+            elif question.get('type') == 'multiple_choice':
+                options = entry.setdefault('options', {})
+                options[str(answer)] = max(0, options.get(str(answer), 0) + sign)
+            entry['count'] = max(0, entry['count'] + sign)
+
+
+@receiver(post_save, sender=CustomEvaluation)
+@receiver(post_delete, sender=CustomEvaluation)
+def invalidate_custom_evaluation_definition(sender, instance, **kwargs):
+    """Invalidar la definición cacheada al editar o borrar la autoevaluación"""
+    from django.core.cache import cache
+    cache.delete(CustomEvaluation.definition_cache_key(instance.pk))
+
+
+@receiver(post_delete, sender=EvaluationResponse)
+def invalidate_custom_evaluation_stats(sender, instance, **kwargs):
+    """Al borrar respuestas, marcar las estadísticas para recalcularlas en la siguiente lectura"""
+    CustomEvaluationStats.objects.filter(pk=instance.evaluation_id).update(questions_hash='')
+
+
+@receiver(pre_save, sender=Student)
+def remember_previous_grupo_principal(sender, instance, update_fields=None, **kwargs):
+    """Guardar el grupo principal anterior: las cachés del grupo que abandona el alumno también se invalidan"""
+    if instance.pk is None or (update_fields is not None and 'grupo_principal' not in update_fields):
+        instance._previous_grupo_principal_id = instance.grupo_principal_id
+        return
+    instance._previous_grupo_principal_id = Student.objects.filter(pk=instance.pk).values_list(
+        'grupo_principal_id', flat=True
+    ).first()
+
+
+def student_group_ids(instance):
+    """Grupo principal actual del alumno y, si ha cambiado al guardarlo, el anterior"""
+    previous = getattr(instance, '_previous_grupo_principal_id', None)
+    return {group_id for group_id in (instance.grupo_principal_id, previous) if group_id}
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=Student)
+def invalidate_custom_evaluation_rosters(sender, instance, **kwargs):
+    """Invalidar las listas de alumnos cacheadas de las autoevaluaciones del grupo (y del anterior)"""
+    from django.core.cache import cache
+    group_ids = student_group_ids(instance)
+    if group_ids:
+        evaluation_ids = CustomEvaluation.objects.filter(
+            group_id__in=group_ids
+        ).values_list('id', flat=True)
+        cache.delete_many([CustomEvaluation.definition_cache_key(pk) for pk in evaluation_ids])
+
+
 class UserProfile(models.Model):
     """Perfil extendido para usuarios (profesores)"""
     GENDER_CHOICES = [
@@ -1061,6 +1233,15 @@ class ChatSession(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='chat_sessions', help_text="Usuario que inicia el chat")
     title = models.CharField(max_length=500, blank=True, default='Nueva conversación', help_text="Título de la conversación")
+    # Memoria de la conversación: resumen acumulado de los mensajes antiguos
+    summary = models.TextField(blank=True, default='', help_text="Resumen acumulado de la conversación")
+    summary_upto_id = models.BigIntegerField(null=True, blank=True, help_text="ID del último mensaje incluido en el resumen")
+    summary_updated_at = models.DateTimeField(null=True, blank=True)
+    # Campos desnormalizados (mantenidos por las señales de ChatMessage) para listar sesiones sin N+1
+    message_count = models.PositiveIntegerField(default=0, help_text="Total de mensajes en la conversación")
+    last_message_sender = models.CharField(max_length=10, blank=True, default='')
+    last_message_preview = models.CharField(max_length=100, blank=True, default='', help_text="Primeros caracteres del último mensaje")
+    last_message_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -1068,14 +1249,27 @@ class ChatSession(models.Model):
         ordering = ['-updated_at']
         verbose_name = "Sesión de Chat"
         verbose_name_plural = "Sesiones de Chat"
+        indexes = [
+            models.Index(fields=['user', '-updated_at', '-id'], name='core_chatsession_user_upd_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.title[:50]}"
     
-    @property
-    def message_count(self):
-        """Total de mensajes en la conversación"""
-        return self.messages.count()
+    def refresh_message_stats(self, save=True):
+        """Recalcula los campos desnormalizados desde los mensajes (tras borrados o en backfill)"""
+        last = self.messages.order_by('-id').only('sender', 'content', 'timestamp').first()
+        self.message_count = self.messages.count()
+        self.last_message_sender = last.sender if last else ''
+        self.last_message_preview = last.content[:100] if last else ''
+        self.last_message_at = last.timestamp if last else None
+        if save:
+            ChatSession.objects.filter(pk=self.pk).update(
+                message_count=self.message_count,
+                last_message_sender=self.last_message_sender,
+                last_message_preview=self.last_message_preview,
+                last_message_at=self.last_message_at,
+            )
     
     @property
     def last_message(self):
@@ -1114,3 +1308,520 @@ class ChatMessage(models.Model):
     
     def __str__(self):
         return f"{self.sender} - {self.content[:50]}"
+
+
+@receiver(post_save, sender=ChatMessage)
+def update_chat_stats_on_message(sender, instance, created, **kwargs):
+    """Mantener contador y vista previa del último mensaje en la sesión (una sola UPDATE)"""
+    from django.utils import timezone
+    fields = {
+        'last_message_sender': instance.sender,
+        'last_message_preview': instance.content[:100],
+        'last_message_at': instance.timestamp,
+    }
+    if created:
+        fields['message_count'] = models.F('message_count') + 1
+        fields['updated_at'] = timezone.now()
+        ChatSession.objects.filter(pk=instance.chat_id).update(**fields)
+    else:
+        # Edición: solo afecta a la vista previa si es el último mensaje
+        ChatSession.objects.filter(pk=instance.chat_id).exclude(
+            messages__id__gt=instance.id
+        ).update(**fields)
+
+
+def _chat_delete_state(origin):
+    """Estado compartido por las señales de un mismo borrado (origin: instancia o queryset borrado)"""
+    return origin.__dict__.setdefault('_chat_stats_delete', {'sessions': set(), 'refreshed': set()})
+
+
+@receiver(pre_delete, sender=ChatSession)
+def mark_chat_session_deleted(sender, instance, origin=None, **kwargs):
+    """Anotar las sesiones que se borran para no recalcular sus estadísticas al borrar sus mensajes"""
+    if origin is not None:
+        _chat_delete_state(origin)['sessions'].add(instance.pk)
+
+
+@receiver(post_delete, sender=ChatMessage)
+def update_chat_stats_on_message_delete(sender, instance, origin=None, **kwargs):
+    """
+    Recalcular campos desnormalizados al borrar mensajes.
+    Django envía post_delete cuando ya ha borrado todas las filas del lote, así que basta un
+    recálculo por sesión y borrado; si la sesión también se borra, ninguno.
+    """
+    if origin is not None:
+        state = _chat_delete_state(origin)
+        if instance.chat_id in state['sessions'] or instance.chat_id in state['refreshed']:
+            return
+        state['refreshed'].add(instance.chat_id)
+    chat = ChatSession.objects.filter(pk=instance.chat_id).first()
+    if chat:
+        chat.refresh_message_stats()
+
+
+class ResearchPaper(models.Model):
+    """
+    Corpus local de papers devueltos por ResearchSearchService.
+    Indexado a texto completo (tsvector en PostgreSQL, FTS5 en SQLite) para responder
+    primero desde local y solo consultar las APIs externas cuando no hay suficientes resultados.
+    """
+    title = models.CharField(max_length=1000, help_text="Título del paper")
+    title_key = models.CharField(max_length=40, unique=True, help_text="SHA-1 del título normalizado (deduplicación)")
+    abstract = models.TextField(blank=True, default='', help_text="Resumen")
+    authors = models.JSONField(default=list, blank=True, help_text="Lista de autores")
+    year = models.IntegerField(null=True, blank=True, help_text="Año de publicación")
+    url = models.CharField(max_length=1000, blank=True, default='', help_text="URL o DOI")
+    citations = models.IntegerField(default=0, help_text="Número de citaciones")
+    source = models.CharField(max_length=50, blank=True, default='', help_text="Fuente (Semantic Scholar, OpenAlex)")
+    times_retrieved = models.PositiveIntegerField(default=1, help_text="Veces que ha aparecido en búsquedas externas")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-citations']
+        verbose_name = "Paper de Investigación"
+        verbose_name_plural = "Papers de Investigación"
+
+    def __str__(self):
+        return f"{self.title[:80]} ({self.year or 's.f.'})"
+
+    def as_dict(self):
+        """Mismo formato que los papers normalizados de ResearchSearchService"""
+        return {
+            'title': self.title,
+            'abstract': self.abstract or 'Sin resumen disponible',
+            'year': self.year,
+            'authors': self.authors,
+            'url': self.url,
+            'citations': self.citations,
+            'source': self.source,
+        }
+
+
+class ReportDataVersion(models.Model):
+    """
+    Versión de los datos de informe de un grupo. Se incrementa al cambiar evaluaciones,
+    asistencia, autoevaluaciones o evidencias de sus alumnos; las instantáneas de informes
+    cacheadas incluyen la versión en la clave, así que un cambio las invalida todas.
+    """
+    group = models.OneToOneField(Group, on_delete=models.CASCADE, primary_key=True, related_name='report_version')
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = "Versión de datos de informes"
+        verbose_name_plural = "Versiones de datos de informes"
+    
+    def __str__(self):
+        return f"{self.group_id} v{self.version}"
+    
+    @classmethod
+    def bump_for_student(cls, student_id):
+        """Incrementa la versión del grupo principal del alumno (una sola UPDATE)"""
+        from django.db.models import F, Subquery
+        from django.utils import timezone
+        cls.objects.filter(
+            group_id=Subquery(Student.objects.filter(pk=student_id).values('grupo_principal_id')[:1])
+        ).update(version=F('version') + 1, updated_at=timezone.now())
+    
+    @classmethod
+    def bump_for_group(cls, group_id):
+        cls.bump_for_groups([group_id])
+    
+    @classmethod
+    def bump_for_groups(cls, group_ids):
+        from django.db.models import F
+        from django.utils import timezone
+        cls.objects.filter(group_id__in=group_ids).update(version=F('version') + 1, updated_at=timezone.now())
+    
+    @classmethod
+    def bump_for_subject(cls, subject_id):
+        """
+        Incrementa la versión de los grupos cuyos informes muestran la asignatura: los de los
+        alumnos con evaluaciones, asistencia o autoevaluaciones en ella (nombre y horario
+        aparecen en medias por asignatura y en las horas de ausencia)
+        """
+        group_ids = set()
+        for model in (Evaluation, Attendance, SelfEvaluation):
+            group_ids.update(
+                model.objects.filter(subject_id=subject_id, student__grupo_principal__isnull=False)
+                .values_list('student__grupo_principal_id', flat=True).distinct()
+            )
+        if group_ids:
+            cls.bump_for_groups(group_ids)
+
+
+@receiver(post_save, sender=Evaluation)
+@receiver(post_delete, sender=Evaluation)
+@receiver(post_save, sender=Attendance)
+@receiver(post_delete, sender=Attendance)
+@receiver(post_save, sender=SelfEvaluation)
+@receiver(post_delete, sender=SelfEvaluation)
+@receiver(post_save, sender=CorrectionEvidence)
+@receiver(post_delete, sender=CorrectionEvidence)
+def bump_report_version(sender, instance, **kwargs):
+    """Invalidar las instantáneas de informes del grupo del alumno afectado"""
+    ReportDataVersion.bump_for_student(instance.student_id)
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=Student)
+def bump_report_version_student(sender, instance, **kwargs):
+    """Cambios del alumno (nombre, grupo) cambian los informes del grupo actual y del que abandona"""
+    group_ids = student_group_ids(instance)
+    if group_ids:
+        ReportDataVersion.bump_for_groups(group_ids)
+
+
+@receiver(post_save, sender=Group)
+def bump_report_version_group(sender, instance, created, **kwargs):
+    """El nombre del grupo aparece en los informes"""
+    if not created:
+        ReportDataVersion.bump_for_group(instance.pk)
+
+
+@receiver(post_save, sender=Subject)
+@receiver(pre_delete, sender=Subject)
+def bump_report_version_subject(sender, instance, created=False, **kwargs):
+    """
+    Nombre y horario de la asignatura aparecen en los informes. Al borrarla se incrementa
+    antes (pre_delete), mientras aún existen los registros que la relacionan con los grupos.
+    La lista de asignaturas de los informes sale de los registros de los alumnos, no de
+    Group.subjects, así que cambiar esa relación no altera los informes.
+    """
+    if not created:
+        ReportDataVersion.bump_for_subject(instance.pk)
+
+
+class BulkReportExport(models.Model):
+    """
+    Exportación masiva de los informes individuales (PDF) de un grupo en un ZIP.
+    Se genera en segundo plano; guarda el progreso y el ZIP para volver a descargarlo.
+    """
+    import uuid
+    STATUS_CHOICES = [
+        ('pending', 'Pendiente'),
+        ('running', 'En curso'),
+        ('done', 'Completada'),
+        ('error', 'Error'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    group = models.ForeignKey(Group, on_delete=models.CASCADE, related_name='bulk_report_exports')
+    teacher = models.ForeignKey(User, on_delete=models.CASCADE, related_name='bulk_report_exports')
+    trimestre = models.CharField(max_length=10, default='T1')
+    fecha_inicio = models.DateField()
+    fecha_fin = models.DateField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    total = models.PositiveIntegerField(default=0, help_text="PDFs a generar")
+    completed = models.PositiveIntegerField(default=0, help_text="PDFs ya añadidos al ZIP")
+    file = models.FileField(upload_to='informes/zip/', null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = "Exportación masiva de informes"
+        verbose_name_plural = "Exportaciones masivas de informes"
+    
+    def __str__(self):
+        return f"{self.group.name} {self.trimestre} ({self.status})"
+    
+    @property
+    def progress(self):
+        """Porcentaje completado (0-100)"""
+        return round(self.completed * 100 / self.total) if self.total else 0
+
+
+class RenderedArtifact(models.Model):
+    """
+    PDF generado, direccionado por contenido: la clave es el hash de los datos de entrada y
+    de la versión de la plantilla. Mismos datos = mismo PDF, sin volver a renderizar.
+    """
+    key = models.CharField(max_length=64, primary_key=True, help_text="sha256(tipo + versión de plantilla + datos)")
+    kind = models.CharField(max_length=50, help_text="Tipo de documento (student_report, evaluation_summary...)")
+    content = models.BinaryField()
+    etag = models.CharField(max_length=64, help_text="sha256 del contenido (ETag fuerte)")
+    size = models.PositiveIntegerField()
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_accessed_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = "Documento generado"
+        verbose_name_plural = "Documentos generados"
+        indexes = [
+            models.Index(fields=['last_accessed_at'], name='core_artifact_lru_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.kind} {self.key[:12]} ({self.size} B)"
+
+
+def empty_score_histogram():
+    """Histograma de notas 0-10: posición i = notas en [i, i+1) (el 10 incluye el 10)"""
+    return [0] * 11
+
+
+class DailyTeacherRollup(models.Model):
+    """
+    Agregado diario de evaluaciones por (profesor evaluador, asignatura, día de creación).
+    Se mantiene de forma incremental con señales; las gráficas de tendencia leen de aquí
+    en lugar de agrupar todas las evaluaciones con TruncDate.
+    """
+    teacher = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_rollups')
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, null=True, blank=True, related_name='daily_rollups')
+    day = models.DateField()
+    eval_count = models.IntegerField(default=0, help_text="Evaluaciones registradas")
+    score_count = models.IntegerField(default=0, help_text="Evaluaciones con nota")
+    score_sum = models.FloatField(default=0)
+    score_histogram = models.JSONField(default=empty_score_histogram)
+    
+    class Meta:
+        verbose_name = "Agregado diario de evaluaciones"
+        verbose_name_plural = "Agregados diarios de evaluaciones"
+        constraints = [
+            models.UniqueConstraint(fields=['teacher', 'subject', 'day'], name='core_daily_rollup_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['teacher', 'day'], name='core_daily_rollup_td_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.teacher_id} {self.subject_id} {self.day}: {self.eval_count}"
+
+
+class StudentMonthlyRollup(models.Model):
+    """
+    Agregado mensual por alumno: evaluaciones (por fecha de la evaluación) y
+    autoevaluaciones (por fecha de creación). month es el primer día del mes.
+    """
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='monthly_rollups')
+    month = models.DateField()
+    eval_count = models.IntegerField(default=0)
+    score_count = models.IntegerField(default=0)
+    score_sum = models.FloatField(default=0)
+    score_histogram = models.JSONField(default=empty_score_histogram)
+    self_eval_count = models.IntegerField(default=0)
+    self_eval_score_sum = models.FloatField(default=0)
+    
+    class Meta:
+        verbose_name = "Agregado mensual de alumno"
+        verbose_name_plural = "Agregados mensuales de alumnos"
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'month'], name='core_monthly_rollup_unique'),
+        ]
+    
+    def __str__(self):
+        return f"{self.student_id} {self.month:%Y-%m}: {self.eval_count}"
+
+
+
+class StudentEvaluatorActivity(models.Model):
+    """
+    Última evaluación de cada alumno por cada profesor evaluador.
+    Precalculada para el widget de evaluaciones pendientes: una consulta indexada
+    en lugar de buscar en todas las evaluaciones del alumno.
+    """
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='evaluator_activity')
+    evaluator = models.ForeignKey(User, on_delete=models.CASCADE, related_name='student_activity')
+    last_evaluated_at = models.DateTimeField()
+    last_evaluation = models.ForeignKey(
+        Evaluation, on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    
+    class Meta:
+        verbose_name = "Última evaluación por profesor"
+        verbose_name_plural = "Últimas evaluaciones por profesor"
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'evaluator'], name='core_student_activity_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['student', '-last_evaluated_at'], name='core_student_activity_last_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.student_id} / {self.evaluator_id}: {self.last_evaluated_at:%Y-%m-%d}"
+
+@receiver(pre_save, sender=Evaluation)
+@receiver(pre_save, sender=SelfEvaluation)
+def remember_rollup_previous(sender, instance, **kwargs):
+    """Guardar los valores anteriores para restarlos de los agregados en post_save"""
+    from core.services.rollups import rollup_service
+    instance._rollup_previous = rollup_service.previous_values(sender, instance)
+
+
+@receiver(post_save, sender=Evaluation)
+@receiver(post_save, sender=SelfEvaluation)
+def update_rollups_on_save(sender, instance, **kwargs):
+    from core.services.rollups import rollup_service
+    rollup_service.apply_change(sender, getattr(instance, '_rollup_previous', None), instance)
+
+
+@receiver(post_delete, sender=Evaluation)
+@receiver(post_delete, sender=SelfEvaluation)
+def update_rollups_on_delete(sender, instance, **kwargs):
+    from core.services.rollups import rollup_service
+    rollup_service.apply_change(sender, rollup_service.values_of(sender, instance), None)
+
+
+@receiver(post_save, sender=Rubric)
+@receiver(post_delete, sender=Rubric)
+@receiver(post_save, sender=RubricScore)
+@receiver(post_delete, sender=RubricScore)
+def invalidate_rubric_usage(sender, instance, **kwargs):
+    """Invalidar la caché de uso de rúbricas del propietario de la rúbrica"""
+    from core.services.dashboard_service import dashboard_service
+    if sender is Rubric:
+        teacher_id = instance.teacher_id
+    else:
+        teacher_id = Rubric.objects.filter(pk=instance.rubric_id).values_list('teacher_id', flat=True).first()
+    if teacher_id:
+        dashboard_service.invalidate_rubric_usage(teacher_id)
+
+
+@receiver(pre_save, sender=Subject)
+def sync_subject_weekday_mask(sender, instance, **kwargs):
+    """Mantener la máscara de días sincronizada con Subject.days"""
+    instance.weekday_mask = days_to_weekday_mask(instance.days)
+
+
+class GroupMembership(models.Model):
+    """
+    Pertenencia desnormalizada alumno-grupo: una fila por grupo principal y por subgrupo.
+    Sustituye las consultas Q(grupo_principal=...) | Q(subgrupos=...) con distinct() por
+    búsquedas indexadas. Se mantiene con señales desde Student.grupo_principal y
+    Student.subgrupos; si un grupo es a la vez principal y subgrupo, cuenta como principal.
+    """
+    ROLE_PRINCIPAL = 'principal'
+    ROLE_SUBGRUPO = 'subgrupo'
+    ROLE_CHOICES = [(ROLE_PRINCIPAL, 'Grupo principal'), (ROLE_SUBGRUPO, 'Subgrupo')]
+
+    group = models.ForeignKey(Group, on_delete=models.CASCADE, related_name='memberships')
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='memberships')
+    role = models.CharField(max_length=10, choices=ROLE_CHOICES)
+    
+    class Meta:
+        verbose_name = "Pertenencia a grupo"
+        verbose_name_plural = "Pertenencias a grupos"
+        constraints = [
+            models.UniqueConstraint(fields=['group', 'student'], name='core_membership_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['student', 'role'], name='core_membership_student_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.student_id} en {self.group_id} ({self.role})"
+
+    @classmethod
+    def sync_students(cls, student_ids):
+        """Recalcula las pertenencias de los alumnos a partir de grupo_principal y subgrupos"""
+        student_ids = list(student_ids)
+        if not student_ids:
+            return
+        deseadas = {}
+        for student_id, group_id in Student.subgrupos.through.objects.filter(
+            student_id__in=student_ids
+        ).values_list('student_id', 'group_id'):
+            deseadas[(student_id, group_id)] = cls.ROLE_SUBGRUPO
+        for student_id, group_id in Student.objects.filter(
+            id__in=student_ids, grupo_principal__isnull=False
+        ).values_list('id', 'grupo_principal_id'):
+            deseadas[(student_id, group_id)] = cls.ROLE_PRINCIPAL
+
+        actuales = {
+            (student_id, group_id): (pk, role)
+            for pk, student_id, group_id, role in cls.objects.filter(
+                student_id__in=student_ids
+            ).values_list('pk', 'student_id', 'group_id', 'role')
+        }
+        sobrantes = [pk for key, (pk, _) in actuales.items() if key not in deseadas]
+        if sobrantes:
+            cls.objects.filter(pk__in=sobrantes).delete()
+        cambiadas = [key for key, role in deseadas.items() if key in actuales and actuales[key][1] != role]
+        for key in cambiadas:
+            cls.objects.filter(pk=actuales[key][0]).update(role=deseadas[key])
+        nuevas = [key for key in deseadas if key not in actuales]
+        cls.objects.bulk_create(
+            [cls(student_id=s, group_id=g, role=deseadas[(s, g)]) for s, g in nuevas],
+            ignore_conflicts=True,
+        )
+
+        # Los profesores de los grupos afectados ven otro conjunto de alumnos
+        afectados = {g for _, g in nuevas + cambiadas} | {g for s, g in actuales if (s, g) not in deseadas}
+        if afectados:
+            from core.services.access_scope import access_scope_service
+            access_scope_service.invalidate(
+                Group.objects.filter(id__in=afectados).values_list('teacher_id', flat=True)
+            )
+
+    @classmethod
+    def student_ids_for_group(cls, group_id, role=None):
+        """Subconsulta con los ids de los alumnos de un grupo (opcionalmente de un rol)"""
+        queryset = cls.objects.filter(group_id=group_id)
+        if role:
+            queryset = queryset.filter(role=role)
+        return queryset.values('student_id')
+
+    @classmethod
+    def student_ids_for_teacher(cls, teacher):
+        """Subconsulta con los ids de los alumnos de cualquier grupo (principal o subgrupo) del profesor"""
+        return cls.objects.filter(group__teacher=teacher).values('student_id')
+
+    @classmethod
+    def group_ids_for_student(cls, student_id):
+        return cls.objects.filter(student_id=student_id).values('group_id')
+
+    @classmethod
+    def teacher_has_student(cls, teacher, student_id) -> bool:
+        return cls.objects.filter(student_id=student_id, group__teacher=teacher).exists()
+
+
+@receiver(post_save, sender=Student)
+def sync_memberships_on_student_save(sender, instance, created, update_fields=None, **kwargs):
+    """Mantener la pertenencia como grupo principal"""
+    if update_fields is not None and 'grupo_principal' not in update_fields:
+        return
+    GroupMembership.sync_students([instance.pk])
+
+
+@receiver(m2m_changed, sender=Student.subgrupos.through)
+def sync_memberships_on_subgrupos_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """Mantener la pertenencia como subgrupo (desde student.subgrupos o group.subgrupos)"""
+    if action == 'pre_clear' and reverse:
+        # group.subgrupos.clear(): guardar los alumnos antes de perder la relación
+        instance._membership_clear_ids = list(instance.subgrupos.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        student_ids = [instance.pk]
+    elif action == 'post_clear':
+        student_ids = getattr(instance, '_membership_clear_ids', [])
+    else:
+        student_ids = pk_set or []
+    GroupMembership.sync_students(student_ids)
+
+
+@receiver(pre_save, sender=Group)
+@receiver(pre_save, sender=Subject)
+def remember_previous_teacher(sender, instance, update_fields=None, **kwargs):
+    """Guardar el profesor anterior: si se reasigna el grupo o la asignatura pierde el acceso"""
+    if instance.pk is None or (update_fields is not None and 'teacher' not in update_fields):
+        instance._previous_teacher_id = instance.teacher_id
+        return
+    instance._previous_teacher_id = sender.objects.filter(pk=instance.pk).values_list(
+        'teacher_id', flat=True
+    ).first()
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+@receiver(post_save, sender=Subject)
+@receiver(post_delete, sender=Subject)
+def invalidate_access_scope(sender, instance, **kwargs):
+    """Invalidar el ámbito de acceso del profesor (y del anterior) al cambiar sus grupos o asignaturas"""
+    from core.services.access_scope import access_scope_service
+    access_scope_service.invalidate([instance.teacher_id, getattr(instance, '_previous_teacher_id', None)])
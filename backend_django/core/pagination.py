@@ -0,0 +1,43 @@
+"""
+Paginación por cursor (keyset) para listados que crecen sin límite.
+A diferencia de PageNumberPagination no ejecuta COUNT(*) y el coste de cada
+página no depende de lo lejos que esté en el listado.
+"""
+from rest_framework.pagination import CursorPagination
+
+
+class ChatSessionCursorPagination(CursorPagination):
+    """Sesiones de chat, la más reciente primero"""
+    page_size = 30
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-updated_at', '-id')
+
+
+class ChatMessageCursorPagination(CursorPagination):
+    """Mensajes de una sesión, del más reciente al más antiguo (cargar historial hacia atrás)"""
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    ordering = ('-id',)
+
+
+class EvaluationResponseCursorPagination(CursorPagination):
+    """Respuestas de una autoevaluación, la más reciente primero"""
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    ordering = ('-submitted_at', '-id')
+
+
+class TimestampCursorPagination(CursorPagination):
+    """Historiales por fecha de creación (comentarios, notificaciones, evidencias), el más reciente primero"""
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = ('-created_at', '-id')
+
+
+class DateCursorPagination(TimestampCursorPagination):
+    """Registros diarios (asistencia, evaluaciones), el día más reciente primero"""
+    ordering = ('-date', '-id')
@@ -0,0 +1,40 @@
+"""
+Permisos a nivel de objeto basados en el ámbito de acceso del profesor (AccessScope).
+Las comprobaciones usan los conjuntos de ids calculados una vez por petición, sin consultas.
+"""
+from rest_framework.permissions import SAFE_METHODS, BasePermission
+
+from .models import Group, Student
+from .services.access_scope import access_scope_service
+
+
+class CanAccessStudent(BasePermission):
+    """
+    Rutas anidadas bajo un alumno (student_pk) y objetos con student_id: profesores de
+    cualquiera de los grupos del alumno. Modificar el propio alumno exige ser el profesor
+    de su grupo principal.
+    """
+    message = 'No tienes permisos para acceder a este estudiante'
+
+    def has_permission(self, request, view):
+        student_id = view.kwargs.get('student_pk')
+        if student_id is None:
+            return True
+        return access_scope_service.for_request(request).can_view_student(student_id)
+
+    def has_object_permission(self, request, view, obj):
+        scope = access_scope_service.for_request(request)
+        if isinstance(obj, Student):
+            if request.method in SAFE_METHODS:
+                return scope.can_view_student(obj.pk)
+            return scope.can_manage_student(obj.pk)
+        return scope.can_view_student(getattr(obj, 'student_id', None))
+
+
+class CanAccessGroup(BasePermission):
+    """Grupos u objetos con group_id del profesor"""
+    message = 'No tienes permisos para acceder a este grupo'
+
+    def has_object_permission(self, request, view, obj):
+        group_id = obj.pk if isinstance(obj, Group) else getattr(obj, 'group_id', None)
+        return access_scope_service.for_request(request).can_access_group(group_id)
@@ -6,6 +6,23 @@ from .models import (
     Objective, Evidence, SelfEvaluation, Attendance, Notification, CorrectionEvidence,
     UserSettings, CustomEvent, CustomEvaluation, EvaluationResponse, ChatSession, ChatMessage
 )
+from .sparse_fieldsets import SparseFieldsetMixin
+
+
+class UserSummarySerializer(serializers.ModelSerializer):
+    """Usuario resumido para ?expand="""
+
+    class Meta:
+        model = User
+        fields = ['id', 'username', 'first_name', 'last_name']
+
+
+class GroupSummarySerializer(serializers.ModelSerializer):
+    """Grupo resumido para ?expand="""
+
+    class Meta:
+        model = Group
+        fields = ['id', 'name', 'course']
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -51,7 +68,7 @@ class UserSerializer(serializers.ModelSerializer):
         return obj.get_full_name() or obj.username
 
 
-class StudentSerializer(serializers.ModelSerializer):
+class StudentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     full_name = serializers.CharField(read_only=True)
     grupo_principal_name = serializers.SerializerMethodField()
     grupo_principal_course = serializers.SerializerMethodField()
@@ -72,6 +89,17 @@ class StudentSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'full_name', 'grupo_principal_name', 'grupo_principal_course', 
                            'subgrupos_count', 'all_groups_info', 'created_at', 'updated_at']
+        field_requirements = {
+            'full_name': ('name', 'apellidos'),
+            'grupo_principal_name': ('grupo_principal__name',),
+            'grupo_principal_course': ('grupo_principal__course',),
+            'subgrupos_count': ('subgrupos',),
+            'all_groups_info': ('grupo_principal__name', 'grupo_principal__course', 'subgrupos'),
+        }
+        expandable_fields = {
+            'grupo_principal': (GroupSummarySerializer, False),
+            'subgrupos': (GroupSummarySerializer, True),
+        }
     
     def update(self, instance, validated_data):
         """Override update to ensure all extended fields are saved properly"""
@@ -125,7 +153,7 @@ class StudentSerializer(serializers.ModelSerializer):
         return groups_info
 
 
-class SubjectSerializer(serializers.ModelSerializer):
+class SubjectSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     teacher_name = serializers.CharField(source='teacher.username', read_only=True)
     groups = serializers.SerializerMethodField()
 
@@ -133,6 +161,8 @@ class SubjectSerializer(serializers.ModelSerializer):
         model = Subject
         fields = ['id', 'name', 'teacher', 'teacher_name', 'days', 'start_time', 'end_time', 'color', 'groups', 'created_at', 'updated_at']
         read_only_fields = ['id', 'teacher', 'teacher_name', 'created_at', 'updated_at']
+        field_requirements = {'groups': ('groups',)}
+        expandable_fields = {'teacher': (UserSummarySerializer, False)}
 
     def get_groups(self, obj):
         """Retornar grupos asociados con información básica"""
@@ -140,7 +170,7 @@ class SubjectSerializer(serializers.ModelSerializer):
 
 
 
-class GroupSerializer(serializers.ModelSerializer):
+class GroupSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     teacher_name = serializers.SerializerMethodField()
     total_students = serializers.SerializerMethodField()
     total_subgrupos = serializers.SerializerMethodField()
@@ -158,6 +188,15 @@ class GroupSerializer(serializers.ModelSerializer):
             'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'teacher', 'teacher_name', 'created_at', 'updated_at']
+        field_requirements = {
+            'teacher_name': ('teacher__username',),
+            'subjects': ('subjects',),
+            'students': ('alumnos',),
+            'total_students': ('alumnos',),
+            'total_subgrupos': ('subgrupos',),
+            'subject_count': ('subjects',),
+        }
+        expandable_fields = {'teacher': (UserSummarySerializer, False)}
     
     def get_subjects(self, obj):
         """Devuelve lista completa de asignaturas con sus datos"""
@@ -313,7 +352,7 @@ class RubricCriterionSerializer(serializers.ModelSerializer):
         return float(value)
 
 
-class RubricSerializer(serializers.ModelSerializer):
+class RubricSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     teacher_name = serializers.CharField(source='teacher.username', read_only=True)
     subject_name = serializers.CharField(source='subject.name', read_only=True, allow_null=True)
     criteria_count = serializers.SerializerMethodField()
@@ -323,6 +362,7 @@ class RubricSerializer(serializers.ModelSerializer):
         fields = ['id', 'title', 'description', 'subject', 'subject_name', 'teacher', 
                   'teacher_name', 'status', 'criteria_count', 'created_at', 'updated_at']
         read_only_fields = ['id', 'teacher', 'created_at', 'updated_at']
+        field_requirements = {'criteria_count': ('criteria',)}
     
     def get_criteria_count(self, obj):
         return obj.criteria.count()
@@ -393,7 +433,7 @@ class RubricEvaluationSerializer(serializers.Serializer):
         return {'session_id': session_id, 'scores': score_objects}
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     author_name = serializers.CharField(source='author.username', read_only=True)
     student_name = serializers.CharField(source='student.name', read_only=True)
     subject_name = serializers.CharField(source='subject.name', read_only=True, allow_null=True)
@@ -404,7 +444,7 @@ class CommentSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'author', 'created_at']
 
 
-class EvaluationSerializer(serializers.ModelSerializer):
+class EvaluationSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     student_name = serializers.CharField(source='student.name', read_only=True)
     subject_name = serializers.CharField(source='subject.name', read_only=True)
     evaluator_name = serializers.CharField(source='evaluator.username', read_only=True)
@@ -492,7 +532,7 @@ class SubjectCreateSerializer(serializers.ModelSerializer):
         return instance
 
 
-class ObjectiveSerializer(serializers.ModelSerializer):
+class ObjectiveSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     student_name = serializers.CharField(source='student.name', read_only=True)
     subject_name = serializers.CharField(source='subject.name', read_only=True)
     created_by_name = serializers.CharField(source='created_by.username', read_only=True)
@@ -505,7 +545,7 @@ class ObjectiveSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
-class EvidenceSerializer(serializers.ModelSerializer):
+class EvidenceSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     student_name = serializers.CharField(source='student.name', read_only=True)
     subject_name = serializers.CharField(source='subject.name', read_only=True)
     uploaded_by_name = serializers.CharField(source='uploaded_by.username', read_only=True)
@@ -518,6 +558,7 @@ class EvidenceSerializer(serializers.ModelSerializer):
                  'description', 'file', 'file_url', 'file_type', 'uploaded_by', 
                  'uploaded_by_name', 'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at']
+        field_requirements = {'file_url': ('file',), 'file_type': ('file',)}
 
     def get_file_url(self, obj):
         request = self.context.get('request')
@@ -595,7 +636,7 @@ class EvidenceSerializer(serializers.ModelSerializer):
         return value
 
 
-class SelfEvaluationSerializer(serializers.ModelSerializer):
+class SelfEvaluationSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     student_name = serializers.CharField(source='student.name', read_only=True)
     subject_name = serializers.CharField(source='subject.name', read_only=True)
 
@@ -606,7 +647,7 @@ class SelfEvaluationSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
-class AttendanceSerializer(serializers.ModelSerializer):
+class AttendanceSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     student_name = serializers.CharField(source='student.name', read_only=True)
     subject_name = serializers.CharField(source='subject.name', read_only=True)
     recorded_by_name = serializers.CharField(source='recorded_by.username', read_only=True)
@@ -618,7 +659,7 @@ class AttendanceSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
-class NotificationSerializer(serializers.ModelSerializer):
+class NotificationSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     recipient_name = serializers.CharField(source='recipient.username', read_only=True)
     student_name = serializers.CharField(source='related_student.name', read_only=True)
     objective_title = serializers.CharField(source='related_objective.title', read_only=True)
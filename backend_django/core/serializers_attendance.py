@@ -90,7 +90,7 @@ class BulkAttendanceSerializer(serializers.Serializer):
             print(f"[ATTENDANCE] Using specified subject: {subject.id} - {subject.name}")
         elif group_id:
             try:
-                group = Group.objects.prefetch_related('subjects').get(id=group_id)
+                group = Group.objects.get(id=group_id)
                 print(f"[ATTENDANCE] Found group: {group.id} - {group.name}")
             except Group.DoesNotExist:
                 error_msg = f"Grupo con ID {group_id} no encontrado"
@@ -103,16 +103,9 @@ class BulkAttendanceSerializer(serializers.Serializer):
             day_name = day_names[day_of_week]
             print(f"[ATTENDANCE] Day of week: {day_of_week} ({day_name})")
             
-            # Filtrar asignaturas que tienen clase este día
-            all_subjects = group.subjects.all()
-            print(f"[ATTENDANCE] Group has {all_subjects.count()} total subjects")
-            for subject_obj in all_subjects:
-                print(f"[ATTENDANCE] Checking subject {subject_obj.id} - {subject_obj.name}, days: {subject_obj.days}")
-                if subject_obj.days and day_name in subject_obj.days:
-                    subjects_to_register.append(subject_obj)
-                    print(f"[ATTENDANCE] ✓ Subject {subject_obj.name} scheduled for {day_name}")
-                else:
-                    print(f"[ATTENDANCE] ✗ Subject {subject_obj.name} NOT scheduled for {day_name}")
+            # Asignaturas del grupo que tienen clase este día (filtro indexado por máscara de días)
+            subjects_to_register = list(Subject.meeting_on(day_of_week).filter(groups=group))
+            print(f"[ATTENDANCE] {len(subjects_to_register)} subjects scheduled for {day_name}")
             
             if not subjects_to_register:
                 error_msg = f"No se encontraron asignaturas programadas para el grupo '{group.name}' el día {day_name}. Por favor, selecciona una asignatura específica o verifica que el grupo tenga asignaturas configuradas para este día."
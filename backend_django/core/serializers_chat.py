@@ -30,8 +30,8 @@ class ChatSessionSerializer(serializers.ModelSerializer):
 
 
 class ChatSessionListSerializer(serializers.ModelSerializer):
-    """Serializer simplificado para listar sesiones (sin mensajes completos)"""
-    message_count = serializers.SerializerMethodField()
+    """Serializer simplificado para listar sesiones (sin mensajes completos).
+    Usa los campos desnormalizados de ChatSession: ninguna consulta extra por sesión."""
     last_message = serializers.SerializerMethodField()
     user_name = serializers.CharField(source='user.username', read_only=True)
     
@@ -43,18 +43,12 @@ class ChatSessionListSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'message_count', 'last_message', 'user_name', 'created_at', 'updated_at']
     
-    def get_message_count(self, obj):
-        """Calcular el número de mensajes"""
-        return obj.messages.count()
-    
     def get_last_message(self, obj):
-        """Obtener el último mensaje"""
-        last_msg = obj.messages.last()
-        if last_msg:
-            return {
-                'id': last_msg.id,
-                'sender': last_msg.sender,
-                'content': last_msg.content[:100],  # Primeros 100 caracteres
-                'timestamp': last_msg.timestamp
-            }
-        return None
+        """Vista previa del último mensaje"""
+        if not obj.last_message_at:
+            return None
+        return {
+            'sender': obj.last_message_sender,
+            'content': obj.last_message_preview,
+            'timestamp': obj.last_message_at
+        }
@@ -0,0 +1,135 @@
+"""
+Ámbito de acceso del profesor (grupos, asignaturas y alumnos) calculado una vez por petición
+
+Cada endpoint recalculaba sus permisos por su cuenta: grupo_principal.teacher,
+subgrupos.filter(teacher=...).exists(), Student.objects.filter(grupo_principal__teacher=...)...
+AccessScope reúne los conjuntos de ids del profesor en cuatro consultas y se reutiliza:
+
+- dentro de la petición, guardado en el propio request (for_request)
+- entre peticiones, en la caché por usuario con un TTL corto (ACCESS_SCOPE_TTL) y un token
+  que se renueva al cambiar sus grupos, asignaturas o pertenencias de alumnos
+
+Los querysets filtran por group_ids (pocos valores) y las comprobaciones de objeto usan los
+conjuntos en memoria, sin consultas.
+"""
+import logging
+from time import time_ns
+from typing import Dict, FrozenSet, Iterable
+from django.conf import settings
+from django.core.cache import cache
+
+from core.models import Group, GroupMembership, Student, Subject
+
+logger = logging.getLogger(__name__)
+
+
+class AccessScope:
+    """Conjuntos de ids accesibles por un usuario"""
+
+    def __init__(self, user, group_ids: Iterable[int] = (), subject_ids: Iterable[int] = (),
+                 student_ids: Iterable[int] = (), principal_student_ids: Iterable[int] = ()):
+        self.user = user
+        self.is_superuser = bool(user.is_superuser)
+        self.is_staff = bool(user.is_staff or user.is_superuser)
+        self.group_ids: FrozenSet[int] = frozenset(group_ids)
+        self.subject_ids: FrozenSet[int] = frozenset(subject_ids)
+        # Alumnos de sus grupos como principal o subgrupo / solo como grupo principal
+        self.student_ids: FrozenSet[int] = frozenset(student_ids)
+        self.principal_student_ids: FrozenSet[int] = frozenset(principal_student_ids)
+
+    def to_dict(self) -> Dict:
+        return {
+            'group_ids': sorted(self.group_ids),
+            'subject_ids': sorted(self.subject_ids),
+            'student_ids': sorted(self.student_ids),
+            'principal_student_ids': sorted(self.principal_student_ids),
+        }
+
+    # ==================== Comprobaciones ====================
+
+    def can_view_student(self, student_id) -> bool:
+        """Lectura: personal del centro o profesor de cualquiera de los grupos del alumno"""
+        return self.is_staff or _as_int(student_id) in self.student_ids
+
+    def can_manage_student(self, student_id) -> bool:
+        """Modificación/borrado: superusuario o profesor del grupo principal del alumno"""
+        return self.is_superuser or _as_int(student_id) in self.principal_student_ids
+
+    def can_access_group(self, group_id) -> bool:
+        return self.is_superuser or _as_int(group_id) in self.group_ids
+
+    def can_access_subject(self, subject_id) -> bool:
+        return self.is_superuser or _as_int(subject_id) in self.subject_ids
+
+    # ==================== Querysets ====================
+
+    def students(self, include_subgrupos: bool = False):
+        """Alumnos del profesor (por defecto, los de sus grupos principales)"""
+        if include_subgrupos:
+            return Student.objects.filter(id__in=GroupMembership.objects.filter(
+                group_id__in=self.group_ids
+            ).values('student_id'))
+        return Student.objects.filter(grupo_principal_id__in=self.group_ids)
+
+    def groups(self):
+        return Group.objects.filter(id__in=self.group_ids)
+
+
+def _as_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class AccessScopeService:
+    """Construcción y caché de ámbitos de acceso"""
+
+    def __init__(self):
+        self.ttl = getattr(settings, 'ACCESS_SCOPE_TTL', 60)
+
+    def _version_key(self, user_id) -> str:
+        return f"access_scope:version:{user_id}"
+
+    def invalidate(self, user_ids: Iterable[int]):
+        """Renueva el token de los usuarios: su ámbito se recalcula en la siguiente petición"""
+        cache.delete_many([self._version_key(user_id) for user_id in set(user_ids) if user_id])
+
+    def compute(self, user) -> AccessScope:
+        group_ids = list(Group.objects.filter(teacher=user).values_list('id', flat=True))
+        subject_ids = list(Subject.objects.filter(teacher=user).values_list('id', flat=True))
+        # Grupo principal desde Student (también cubre altas masivas sin pertenencias todavía);
+        # los subgrupos, desde la tabla de pertenencias
+        principal_ids = set(Student.objects.filter(grupo_principal_id__in=group_ids).values_list('id', flat=True))
+        student_ids = principal_ids | set(GroupMembership.objects.filter(
+            group_id__in=group_ids, role=GroupMembership.ROLE_SUBGRUPO
+        ).values_list('student_id', flat=True))
+        return AccessScope(user, group_ids, subject_ids, student_ids, principal_ids)
+
+    def for_user(self, user) -> AccessScope:
+        if not user.is_authenticated:
+            return AccessScope(user)
+        version_key = self._version_key(user.id)
+        version = cache.get(version_key)
+        if version is None:
+            cache.add(version_key, time_ns(), None)
+            version = cache.get(version_key)
+        key = f"access_scope:{user.id}:{version}"
+        data = cache.get(key)
+        if data is not None:
+            return AccessScope(user, **data)
+        scope = self.compute(user)
+        cache.set(key, scope.to_dict(), self.ttl)
+        return scope
+
+    def for_request(self, request) -> AccessScope:
+        """Ámbito del usuario de la petición, calculado una sola vez por petición"""
+        scope = getattr(request, '_access_scope', None)
+        if scope is None or scope.user != request.user:
+            scope = self.for_user(request.user)
+            request._access_scope = scope
+        return scope
+
+
+# Instancia global del servicio
+access_scope_service = AccessScopeService()
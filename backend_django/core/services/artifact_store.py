@@ -0,0 +1,85 @@
+"""
+Almacén de documentos generados (PDF) direccionado por contenido
+
+La clave de cada documento es sha256(tipo + versión de plantilla + datos de entrada), de
+modo que volver a descargar un informe cuyos datos no han cambiado sirve el PDF guardado
+sin renderizarlo de nuevo. Un cambio en los datos o en la plantilla produce otra clave;
+los documentos antiguos dejan de usarse y acaban desalojados.
+
+- ETag fuerte: sha256 de los bytes guardados (idénticos mientras el documento exista)
+- Desalojo LRU acotado por tamaño: si el total supera PDF_CACHE_MAX_BYTES se borran los
+  documentos usados hace más tiempo hasta bajar al 90 % del límite
+- Guardado en la BD para que todos los procesos compartan el almacén
+"""
+import hashlib
+import json
+import logging
+from typing import Callable, Dict, Optional
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from core.models import RenderedArtifact
+
+logger = logging.getLogger(__name__)
+
+
+class ArtifactStore:
+    """Documentos renderizados reutilizables mientras no cambien sus datos de entrada"""
+
+    def __init__(self):
+        self.max_bytes = getattr(settings, 'PDF_CACHE_MAX_BYTES', 200 * 1024 * 1024)
+
+    def key_for(self, kind: str, data: Dict, template_version) -> str:
+        payload = json.dumps(data, sort_keys=True, ensure_ascii=False, default=str, separators=(',', ':'))
+        return hashlib.sha256(f"{kind}:{template_version}:{payload}".encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[RenderedArtifact]:
+        """Documento sin cargar el contenido (se lee al acceder a .content)"""
+        artifact = RenderedArtifact.objects.defer('content').filter(pk=key).first()
+        if artifact is not None:
+            RenderedArtifact.objects.filter(pk=key).update(last_accessed_at=timezone.now(), hits=F('hits') + 1)
+        return artifact
+
+    def put(self, key: str, kind: str, content: bytes) -> RenderedArtifact:
+        try:
+            with transaction.atomic():
+                artifact = RenderedArtifact.objects.create(
+                    key=key, kind=kind, content=content, size=len(content),
+                    etag=hashlib.sha256(content).hexdigest(),
+                )
+        except IntegrityError:
+            # Otra petición renderizó el mismo documento a la vez: servir el suyo
+            return RenderedArtifact.objects.get(pk=key)
+        self.evict()
+        return artifact
+
+    def get_or_render(self, kind: str, data: Dict, template_version, render: Callable[[Dict], bytes]) -> RenderedArtifact:
+        key = self.key_for(kind, data, template_version)
+        artifact = self.get(key)
+        if artifact is None:
+            artifact = self.put(key, kind, render(data))
+            logger.info(f"Documento {kind} renderizado y guardado ({artifact.size} B)")
+        return artifact
+
+    def evict(self):
+        """Borra los documentos menos usados recientemente si se supera el tamaño máximo"""
+        total = RenderedArtifact.objects.aggregate(total=Sum('size'))['total'] or 0
+        if total <= self.max_bytes:
+            return 0
+        objetivo = total - int(self.max_bytes * 0.9)
+        liberado = 0
+        keys = []
+        for key, size in RenderedArtifact.objects.order_by('last_accessed_at', 'created_at').values_list('key', 'size').iterator():
+            keys.append(key)
+            liberado += size
+            if liberado >= objetivo:
+                break
+        RenderedArtifact.objects.filter(pk__in=keys).delete()
+        logger.info(f"Almacén de documentos: {len(keys)} desalojados ({liberado} B)")
+        return len(keys)
+
+
+# Instancia global del servicio
+artifact_store = ArtifactStore()
@@ -0,0 +1,176 @@
+"""
+Exportación masiva de informes individuales en PDF (un ZIP por grupo)
+
+A final de trimestre el tutor necesita un PDF por alumno. ReportLab es CPU y no suelta el
+GIL, así que los PDFs se renderizan en un ProcessPoolExecutor y se añaden al ZIP en el
+orden en que terminan. El pool es único por proceso del servidor y se crea la primera vez
+que hace falta: varias exportaciones simultáneas comparten sus BULK_PDF_WORKERS procesos en
+lugar de lanzar cada una los suyos. Los datos de cada alumno salen de las instantáneas de informes
+(report_snapshots) en el proceso principal; los procesos hijos solo renderizan, sin BD.
+
+El ZIP se escribe sobre un destino no buscable, de modo que los bytes se pueden:
+- enviar al cliente a medida que se generan (StreamingHttpResponse), o
+- volcar a un fichero temporal y guardarlo en el storage (BulkReportExport.file) para
+  descargarlo de nuevo, con el progreso actualizado tras cada PDF
+"""
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from django.conf import settings
+from django.core.files import File
+from django.db import connection
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+
+from core.models import BulkReportExport, Group, Student
+from core.services.export_informes_service import render_pdf_individual
+from core.services.report_snapshots import report_snapshots
+
+logger = logging.getLogger(__name__)
+
+# Pool compartido por todas las exportaciones del proceso (ver _get_executor)
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+class _ZipStream:
+    """Destino no buscable para zipfile: acumula lo escrito hasta que se recoge con drain()"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class BulkPDFExportService:
+    """Renderizado en paralelo de los informes individuales de un grupo y empaquetado en ZIP"""
+
+    def __init__(self):
+        # 0 = un proceso por CPU (máximo 4, el servidor también atiende peticiones)
+        self.workers = getattr(settings, 'BULK_PDF_WORKERS', 0)
+
+    def default_workers(self) -> int:
+        return self.workers or min(4, os.cpu_count() or 1)
+
+    def build_tasks(self, grupo: Group, fecha_inicio, fecha_fin, trimestre: str,
+                    comentarios: Optional[Dict] = None) -> List[Tuple]:
+        """Argumentos de render_pdf_individual para cada alumno del grupo"""
+        comentarios = comentarios or {}
+        alumnos = Student.objects.filter(grupo_principal=grupo).select_related('grupo_principal').order_by('apellidos', 'name')
+        tareas = []
+        for alumno in alumnos:
+            data = report_snapshots.informe_estudiante(alumno, fecha_inicio, fecha_fin, grupo.teacher)
+            nombre = f"{alumno.apellidos} {alumno.name}".strip()
+            nombre_fichero = get_valid_filename(f"{nombre}_{alumno.id}_{trimestre}.pdf")
+            tareas.append((
+                nombre_fichero, data, comentarios.get(str(alumno.id), {}), trimestre, alumno.name, grupo.name,
+            ))
+        return tareas
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Pool de procesos compartido; se recrea si un proceso hijo ha muerto"""
+        global _executor
+        with _executor_lock:
+            if _executor is None or getattr(_executor, '_broken', False):
+                # spawn: los hijos no heredan conexiones a la BD ni hilos del servidor
+                _executor = ProcessPoolExecutor(
+                    max_workers=self.default_workers(), mp_context=multiprocessing.get_context('spawn')
+                )
+            return _executor
+
+    def _render(self, tareas: List[Tuple], workers: int) -> Iterator[Tuple[str, bytes]]:
+        """PDFs en el orden en que terminan"""
+        if workers <= 1 or len(tareas) <= 1:
+            for tarea in tareas:
+                yield render_pdf_individual(tarea)
+            return
+
+        executor = self._get_executor()
+        futures = [executor.submit(render_pdf_individual, tarea) for tarea in tareas]
+        try:
+            for future in as_completed(futures):
+                yield future.result()
+        except BrokenProcessPool:
+            logger.error("El pool de PDFs se ha roto; se recreará en la siguiente exportación")
+            raise
+        finally:
+            # Si el cliente corta la descarga no se siguen renderizando los PDFs de esta
+            # exportación; el pool sigue vivo para las demás
+            for future in futures:
+                future.cancel()
+
+    def iter_zip(self, tareas: List[Tuple], workers: Optional[int] = None,
+                 on_progress: Optional[Callable[[int], None]] = None) -> Iterator[bytes]:
+        """Bytes del ZIP, un trozo por PDF terminado"""
+        stream = _ZipStream()
+        with zipfile.ZipFile(stream, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+            for completados, (nombre_fichero, pdf) in enumerate(self._render(tareas, workers or self.default_workers()), 1):
+                zf.writestr(nombre_fichero, pdf)
+                if on_progress:
+                    on_progress(completados)
+                yield stream.drain()
+        yield stream.drain()
+
+    def start(self, job: BulkReportExport, comentarios: Optional[Dict] = None):
+        """Lanza la exportación en un hilo en segundo plano"""
+        thread = threading.Thread(target=self._run_in_thread, args=(job.id, comentarios), daemon=True)
+        thread.start()
+
+    def _run_in_thread(self, job_id, comentarios):
+        try:
+            self.run(job_id, comentarios)
+        finally:
+            connection.close()
+
+    def run(self, job_id, comentarios: Optional[Dict] = None):
+        """Genera el ZIP de la exportación y lo guarda en el storage"""
+        job = BulkReportExport.objects.select_related('group__teacher').get(pk=job_id)
+        try:
+            tareas = self.build_tasks(job.group, job.fecha_inicio, job.fecha_fin, job.trimestre, comentarios)
+            BulkReportExport.objects.filter(pk=job.pk).update(status='running', total=len(tareas), completed=0)
+
+            def on_progress(completados):
+                BulkReportExport.objects.filter(pk=job.pk).update(completed=completados)
+
+            with tempfile.TemporaryFile() as tmp:
+                for chunk in self.iter_zip(tareas, on_progress=on_progress):
+                    tmp.write(chunk)
+                tmp.seek(0)
+                nombre_zip = get_valid_filename(f"informes_{job.group.name}_{job.trimestre}_{str(job.id)[:8]}.zip")
+                job.file.save(nombre_zip, File(tmp), save=False)
+
+            job.status = 'done'
+            job.total = job.completed = len(tareas)
+            job.finished_at = timezone.now()
+            job.save(update_fields=['status', 'total', 'completed', 'file', 'finished_at'])
+            logger.info(f"Exportación masiva {job.id}: {len(tareas)} PDFs")
+        except Exception as e:
+            logger.exception(f"Error en la exportación masiva {job.id}")
+            BulkReportExport.objects.filter(pk=job.pk).update(
+                status='error', error=str(e), finished_at=timezone.now()
+            )
+
+
+# Instancia global del servicio
+bulk_pdf_export_service = BulkPDFExportService()
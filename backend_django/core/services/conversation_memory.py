@@ -0,0 +1,181 @@
+"""
+Memoria de conversación para el chatbot de investigación educativa
+
+- Resumen acumulado por ChatSession: cada N turnos los mensajes antiguos se
+  condensan (con el LLM) en ChatSession.summary y se marcan con summary_upto_id.
+  Cada pasada incorpora como máximo `summary_every * 2` mensajes (los más antiguos sin
+  resumir), así que el prompt del resumen también está acotado aunque haya un atraso
+  (sesiones anteriores a la memoria o fallos del LLM); el atraso se recupera por tramos.
+  La actualización se lanza tras responder, en un hilo en segundo plano
+- Ventana reciente: los últimos mensajes posteriores al resumen, del más nuevo
+  al más antiguo, hasta agotar un presupuesto de tokens
+
+Así el prompt tiene un tamaño acotado por larga que sea la sesión.
+"""
+import logging
+import threading
+from typing import Dict, List, Optional
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.models import ChatSession, ChatMessage
+from .openrouter_service import openrouter_client
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PROMPT = """Resume la siguiente conversación entre un docente y un asistente educativo.
+Conserva datos concretos (nivel, asignatura, grupo, alumnos, acuerdos, estrategias propuestas
+y autores citados) y omite saludos. Máximo {max_words} palabras, en el idioma de la conversación.
+
+RESUMEN ANTERIOR:
+{previous}
+
+NUEVOS MENSAJES:
+{transcript}
+
+RESUMEN ACTUALIZADO:"""
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimación rápida (≈4 caracteres por token), suficiente para presupuestar el prompt"""
+    return len(text or '') // 4 + 1
+
+
+class ConversationMemory:
+    """Construye el contexto acotado (resumen + ventana reciente) de una sesión de chat"""
+
+    def __init__(self):
+        # Tokens máximos para la ventana de mensajes recientes
+        self.token_budget = getattr(settings, 'CHAT_MEMORY_TOKEN_BUDGET', 1500)
+        # Mensajes recientes que se leen como máximo de la base de datos
+        self.max_window = getattr(settings, 'CHAT_MEMORY_MAX_WINDOW', 12)
+        # Turnos (pregunta + respuesta) sin resumir que disparan la actualización del resumen
+        self.summary_every = getattr(settings, 'CHAT_MEMORY_SUMMARY_EVERY', 4)
+        # Mensajes que se mantienen literales (fuera del resumen) tras resumir
+        self.keep_recent = getattr(settings, 'CHAT_MEMORY_KEEP_RECENT', 4)
+        self.summary_max_tokens = getattr(settings, 'CHAT_MEMORY_SUMMARY_MAX_TOKENS', 400)
+        # Resumir en segundo plano tras la respuesta (False: dentro de la petición)
+        self.summary_async = getattr(settings, 'CHAT_MEMORY_SUMMARY_ASYNC', True)
+        self.model = getattr(settings, 'AI_MODEL', 'anthropic/claude-3-5-haiku')
+
+    def fit_to_budget(self, messages: List[Dict], budget: Optional[int] = None) -> List[Dict]:
+        """
+        Recorta una lista cronológica de mensajes {'sender', 'content'} al presupuesto de tokens,
+        priorizando los más recientes. Un mensaje demasiado largo se trunca en lugar de descartarse
+        si es el único que cabe.
+        """
+        budget = budget or self.token_budget
+        fitted = []
+        used = 0
+        for msg in reversed(messages):
+            content = msg.get('content') or ''
+            tokens = estimate_tokens(content)
+            if used + tokens > budget:
+                if not fitted:
+                    fitted.append({**msg, 'content': content[:budget * 4] + '…'})
+                break
+            fitted.append(msg)
+            used += tokens
+        fitted.reverse()
+        return fitted
+
+    def _unsummarized(self, chat: ChatSession):
+        messages = chat.messages.all()
+        if chat.summary_upto_id:
+            messages = messages.filter(id__gt=chat.summary_upto_id)
+        return messages
+
+    def build_context(self, chat: ChatSession, before_id: Optional[int] = None) -> Dict:
+        """
+        Contexto para el agente: {'summary': str, 'history': [{'sender', 'content'}, ...]}
+
+        Args:
+            before_id: Excluir este mensaje y posteriores (p. ej. la pregunta que se está respondiendo)
+        """
+        messages = self._unsummarized(chat)
+        if before_id is not None:
+            messages = messages.filter(id__lt=before_id)
+        recent = list(messages.order_by('-id').values('sender', 'content')[:self.max_window])
+        recent.reverse()
+        return {
+            'summary': chat.summary,
+            'history': self.fit_to_budget([
+                {'sender': 'assistant' if m['sender'] == 'assistant' else 'user', 'content': m['content']}
+                for m in recent
+            ]),
+        }
+
+    def _summarize(self, previous: str, messages: List[ChatMessage]) -> Optional[str]:
+        transcript = '\n'.join(
+            f"{'Asistente' if m.sender == 'assistant' else 'Docente'}: {m.content[:2000]}"
+            for m in messages
+        )
+        prompt = SUMMARY_PROMPT.format(
+            max_words=int(self.summary_max_tokens * 0.6),
+            previous=previous or '(ninguno)',
+            transcript=transcript,
+        )
+        try:
+            response = openrouter_client.chat_completion(
+                messages=[{'role': 'user', 'content': prompt}],
+                model=self.model,
+                max_tokens=self.summary_max_tokens,
+                temperature=0.2,
+            )
+            return (response['choices'][0]['message'].get('content') or '').strip() or None
+        except Exception as e:
+            logger.warning(f"No se pudo actualizar el resumen de la conversación: {e}")
+            return None
+
+    def update_summary(self, chat: ChatSession) -> bool:
+        """
+        Incorpora al resumen los mensajes antiguos cuando se acumulan `summary_every` turnos
+        sin resumir (más allá de los `keep_recent` que se mantienen literales). Solo se
+        incorporan los `summary_every * 2` más antiguos: si el LLM falla, el siguiente intento
+        no es mayor. Devuelve True si el resumen se actualizó.
+        """
+        fold_size = self.summary_every * 2
+        pending = list(
+            self._unsummarized(chat).order_by('id').only('id', 'sender', 'content')[:fold_size + self.keep_recent]
+        )
+        if len(pending) < fold_size + self.keep_recent:
+            return False
+
+        to_fold = pending[:fold_size]
+        summary = self._summarize(chat.summary, to_fold)
+        if summary is None:
+            return False
+
+        # Actualización condicional: si otra petición ya resumió estos mensajes, no se pisa
+        updated = ChatSession.objects.filter(
+            id=chat.id, summary_upto_id=chat.summary_upto_id
+        ).update(summary=summary, summary_upto_id=to_fold[-1].id, summary_updated_at=timezone.now())
+        if updated:
+            chat.summary = summary
+            chat.summary_upto_id = to_fold[-1].id
+            logger.info(f"Resumen de la conversación {chat.id} actualizado ({len(to_fold)} mensajes)")
+        return bool(updated)
+
+    def schedule_summary(self, chat: ChatSession):
+        """Actualiza el resumen tras confirmar la transacción, sin retrasar la respuesta"""
+        if not self.summary_async:
+            self.update_summary(chat)
+            return
+        transaction.on_commit(lambda: threading.Thread(
+            target=self._update_in_thread, args=(chat.id,), daemon=True
+        ).start())
+
+    def _update_in_thread(self, chat_id):
+        try:
+            chat = ChatSession.objects.filter(pk=chat_id).first()
+            if chat is not None:
+                self.update_summary(chat)
+        except Exception:
+            logger.exception(f"Error actualizando el resumen de la conversación {chat_id}")
+        finally:
+            connection.close()
+
+
+# Instancia global del servicio
+conversation_memory = ConversationMemory()
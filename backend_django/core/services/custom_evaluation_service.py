@@ -0,0 +1,262 @@
+"""
+Envío de autoevaluaciones por QR (CustomEvaluation)
+
+Cuando el profesor proyecta el QR, 25-30 alumnos envían a la vez. Para aguantar la ráfaga:
+- La definición (preguntas, lista de alumnos, asignatura) se cachea: el envío no consulta
+  la evaluación, el alumno ni las asignaturas del grupo
+- Respuesta y SelfEvaluation se guardan en una única transacción, con un upsert sobre la
+  clave única (evaluation, student)
+- Los reintentos son idempotentes: reenviar las mismas respuestas devuelve el envío ya
+  guardado en lugar de un error o un duplicado
+- Las estadísticas por pregunta (CustomEvaluationStats) se actualizan en la misma
+  transacción, así la vista de resultados no recorre todas las respuestas
+"""
+import time
+import random
+import logging
+from typing import Dict, Optional
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import OperationalError, transaction
+
+from core.models import CustomEvaluation, CustomEvaluationStats, EvaluationResponse, SelfEvaluation, Student
+
+logger = logging.getLogger(__name__)
+
+
+class SubmissionError(Exception):
+    """Error de envío con el código HTTP que debe devolver la vista"""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class CustomEvaluationService:
+    """Definición cacheada y envío transaccional de autoevaluaciones personalizadas"""
+
+    def __init__(self):
+        self.cache_ttl = getattr(settings, 'CUSTOM_EVAL_CACHE_TTL', 300)
+        # Intentos ante errores transitorios de la BD (bloqueos, deadlocks)
+        self.max_attempts = getattr(settings, 'CUSTOM_EVAL_SUBMIT_ATTEMPTS', 5)
+
+    def get_definition(self, evaluation_id) -> Optional[Dict]:
+        """
+        Definición pública de la evaluación (None si no existe). Se invalida al guardar la
+        evaluación o un alumno del grupo (señales en models.py).
+        """
+        key = CustomEvaluation.definition_cache_key(evaluation_id)
+        definition = cache.get(key)
+        if definition is not None:
+            return definition
+
+        try:
+            evaluation = CustomEvaluation.objects.select_related('group').filter(pk=evaluation_id).first()
+        except (ValueError, ValidationError):
+            return None  # UUID mal formado
+        if evaluation is None:
+            return None
+        students = list(
+            Student.objects.filter(grupo_principal_id=evaluation.group_id)
+            .values('id', 'name', 'apellidos').order_by('apellidos', 'name')
+        )
+        subject_id = evaluation.group.subjects.values_list('id', flat=True).first()
+        definition = {
+            'id': str(evaluation.id),
+            'title': evaluation.title,
+            'description': evaluation.description,
+            'questions': evaluation.questions,
+            'questions_hash': CustomEvaluationStats.hash_questions(evaluation.questions),
+            'group_id': evaluation.group_id,
+            'subject_id': subject_id,
+            'is_active': evaluation.is_active,
+            'allow_multiple_attempts': evaluation.allow_multiple_attempts,
+            'students': students,
+            'student_ids': [s['id'] for s in students],
+        }
+        cache.set(key, definition, self.cache_ttl)
+        return definition
+
+    def _in_roster(self, definition: Dict, student_id: int) -> bool:
+        if student_id in definition['student_ids']:
+            return True
+        # Alumno añadido al grupo después de cachear la definición
+        return Student.objects.filter(id=student_id, grupo_principal_id=definition['group_id']).exists()
+
+    def _self_evaluation_fields(self, definition: Dict, responses: Dict) -> Dict:
+        """Puntuación media likert (1-5) y comentario para el widget de autoevaluaciones"""
+        likert_scores = []
+        comment_parts = []
+        for question in definition['questions']:
+            answer = responses.get(str(question['id']), '')
+            if question['type'] == 'likert':
+                try:
+                    likert_scores.append(int(answer))
+                except (ValueError, TypeError):
+                    pass
+            elif question['type'] in ['multiple_choice', 'text']:
+                if answer:
+                    comment_parts.append(f"{question['text']}: {answer}")
+
+        average_score = int(sum(likert_scores) / len(likert_scores)) if likert_scores else 3
+        comment = f"Autoevaluación: {definition['title']}\n"
+        if comment_parts:
+            comment += "\n".join(comment_parts[:3])  # Máximo 3 respuestas en el comentario
+        return {'score': max(1, min(5, average_score)), 'comment': comment}
+
+    def submit(self, evaluation_id, student_id, responses: Dict) -> Dict:
+        """
+        Guarda el envío de un alumno.
+
+        Returns:
+            {'response': EvaluationResponse, 'created': bool, 'duplicate': bool}
+            duplicate=True indica un reintento con las mismas respuestas (no se guarda nada)
+
+        Raises:
+            SubmissionError con el código HTTP adecuado
+        """
+        definition = self.get_definition(evaluation_id)
+        if definition is None:
+            raise SubmissionError('Autoevaluación no encontrada', 404)
+        if not definition['is_active']:
+            raise SubmissionError('Esta autoevaluación ya no está disponible')
+        if not student_id or not responses or not isinstance(responses, dict):
+            raise SubmissionError('Faltan datos: student_id y responses son requeridos')
+        try:
+            student_id = int(student_id)
+        except (TypeError, ValueError):
+            raise SubmissionError('student_id no válido')
+        if not self._in_roster(definition, student_id):
+            raise SubmissionError('Estudiante no encontrado en este grupo', 404)
+
+        # El envío es idempotente: ante un bloqueo transitorio de la BD se reintenta entero
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                return self._save(definition, student_id, responses)
+            except OperationalError as e:
+                if attempt == self.max_attempts:
+                    raise
+                logger.warning(f"Envío de autoevaluación reintentado ({attempt}): {e}")
+                time.sleep(0.05 * 2 ** (attempt - 1) + random.random() * 0.05)
+
+    def _save(self, definition: Dict, student_id: int, responses: Dict) -> Dict:
+        with transaction.atomic():
+            # Upsert sobre (evaluation, student): bloquea la fila si existe; si dos envíos
+            # simultáneos intentan crearla, get_or_create recupera la del ganador
+            response_obj, created = EvaluationResponse.objects.select_for_update().get_or_create(
+                evaluation_id=definition['id'],
+                student_id=student_id,
+                defaults={'responses': responses},
+            )
+            previous_responses = None
+            if not created:
+                if response_obj.responses == responses:
+                    return {'response': response_obj, 'created': False, 'duplicate': True}
+                if not definition['allow_multiple_attempts']:
+                    raise SubmissionError('Ya has respondido esta autoevaluación')
+                previous_responses = response_obj.responses
+                response_obj.responses = responses
+                response_obj.save(update_fields=['responses'])
+
+            self._update_stats(definition, previous_responses, responses)
+
+            # Conectar con el widget: SelfEvaluation en la misma transacción.
+            # Un fallo aquí no debe perder la respuesta del alumno (savepoint)
+            try:
+                with transaction.atomic():
+                    SelfEvaluation.objects.create(
+                        student_id=student_id,
+                        subject_id=definition['subject_id'],
+                        evaluation_type='autoevaluacion',
+                        **self._self_evaluation_fields(definition, responses)
+                    )
+            except Exception as e:
+                logger.warning(f"Error creando SelfEvaluation para alumno {student_id}: {e}")
+
+        return {'response': response_obj, 'created': created, 'duplicate': False}
+
+
+    def _update_stats(self, definition: Dict, previous_responses: Optional[Dict], responses: Dict):
+        """Aplica el envío a las estadísticas (dentro de la transacción del envío)"""
+        stats, created = CustomEvaluationStats.objects.select_for_update().get_or_create(
+            evaluation_id=definition['id']
+        )
+        if created or stats.questions_hash != definition['questions_hash']:
+            # Primera vez, preguntas editadas o respuestas borradas: recalcular desde cero
+            # (la respuesta actual ya está guardada y entra en el recálculo)
+            self._rebuild_stats(stats, definition['questions'])
+            return
+        if previous_responses is not None:
+            stats.apply_response(definition['questions'], previous_responses, sign=-1)
+        stats.apply_response(definition['questions'], responses)
+        stats.save(update_fields=['response_count', 'stats', 'updated_at'])
+
+    def _rebuild_stats(self, stats: CustomEvaluationStats, questions):
+        stats.response_count = 0
+        stats.stats = {}
+        rows = EvaluationResponse.objects.filter(evaluation_id=stats.evaluation_id).values_list('responses', flat=True)
+        for responses in rows.iterator(chunk_size=500):
+            stats.apply_response(questions, responses if isinstance(responses, dict) else {})
+        stats.questions_hash = CustomEvaluationStats.hash_questions(questions)
+        stats.save()
+
+    def get_results(self, evaluation: CustomEvaluation) -> Dict:
+        """Resultados compactos por pregunta: recuento, media, histograma likert y opciones"""
+        questions_hash = CustomEvaluationStats.hash_questions(evaluation.questions)
+        stats = CustomEvaluationStats.objects.filter(evaluation=evaluation).first()
+        if stats is None or stats.questions_hash != questions_hash:
+            with transaction.atomic():
+                stats, _ = CustomEvaluationStats.objects.select_for_update().get_or_create(evaluation=evaluation)
+                self._rebuild_stats(stats, evaluation.questions)
+
+        questions = []
+        for question in evaluation.questions:
+            entry = stats.stats.get(str(question['id']), {})
+            item = {
+                'id': question['id'],
+                'text': question.get('text', ''),
+                'type': question.get('type'),
+                'count': entry.get('count', 0),
+            }
+            if question.get('type') == 'likert':
+                item['mean'] = round(entry['sum'] / entry['count'], 2) if entry.get('count') else None
+                item['histogram'] = {str(v): entry.get('histogram', {}).get(str(v), 0) for v in range(1, 6)}
+            elif question.get('type') == 'multiple_choice':
+                options = entry.get('options', {})
+                item['options'] = {
+                    option: options.get(str(option), 0) for option in question.get('options', [])
+                }
+                # Respuestas con opciones que ya no existen en la pregunta
+                for option, count in options.items():
+                    if option not in item['options'] and count:
+                        item['options'][option] = count
+            questions.append(item)
+
+        return {
+            'evaluation_id': str(evaluation.id),
+            'title': evaluation.title,
+            'response_count': stats.response_count,
+            'updated_at': stats.updated_at,
+            'questions': questions,
+        }
+
+    def iter_export_rows(self, evaluation: CustomEvaluation):
+        """Respuestas en bruto, una a una y por lotes (para exportaciones en streaming)"""
+        rows = (
+            EvaluationResponse.objects.filter(evaluation=evaluation)
+            .order_by('submitted_at', 'id')
+            .values('id', 'student_id', 'student__name', 'student__apellidos', 'responses', 'submitted_at')
+        )
+        for row in rows.iterator(chunk_size=500):
+            yield {
+                'id': str(row['id']),
+                'student_id': row['student_id'],
+                'student_name': f"{row['student__name']} {row['student__apellidos']}".strip(),
+                'submitted_at': row['submitted_at'].isoformat(),
+                'responses': row['responses'] or {},
+            }
+
+
+# Instancia global del servicio
+custom_evaluation_service = CustomEvaluationService()
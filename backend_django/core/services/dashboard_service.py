@@ -0,0 +1,474 @@
+"""
+Dashboard del docente: secciones calculadas en una sola petición
+
+La página del dashboard pedía ocho endpoints por separado, cada uno con su autenticación
+JWT y su propia subconsulta de "alumnos de este profesor". El endpoint compuesto
+(/api/dashboard/?sections=...) calcula el ámbito del profesor una vez (DashboardScope) y
+evalúa las secciones en paralelo con un ThreadPoolExecutor (cada hilo con su conexión).
+
+Las secciones que dependen de evaluaciones, asistencia y autoevaluaciones se cachean por
+profesor y día con un token de versión construido a partir de ReportDataVersion de sus
+grupos: cualquier cambio en los datos de un grupo invalida el dashboard de su profesor.
+
+El uso de rúbricas (sesiones de evaluación por rúbrica del profesor) se cachea aparte con
+un token por profesor que se renueva al guardar o borrar rúbricas y puntuaciones.
+
+Los endpoints antiguos (dashboard_resumen, proximas_clases, ...) siguen existiendo y
+delegan en la sección correspondiente.
+"""
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time, timedelta
+from time import time_ns
+from typing import Dict, Iterable, List, Optional
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count, Exists, OuterRef, Q, Subquery
+from django.utils import timezone
+
+from core.models import (
+    Attendance, CalendarEvent, Comment, Evaluation, Group, ReportDataVersion, Rubric, Student,
+    StudentEvaluatorActivity, Subject
+)
+from core.services.access_scope import access_scope_service
+from core.services.rollups import rollup_service
+
+logger = logging.getLogger(__name__)
+
+
+def parse_days(value) -> Optional[int]:
+    """Ventana en días de un parámetro de la petición (None si falta o no es válida)"""
+    try:
+        days = int(value)
+    except (TypeError, ValueError):
+        return None
+    return days if days > 0 else None
+
+
+def parse_limit(value, default: int = 5, maximum: int = 50) -> int:
+    """Número de elementos pedido, entre 1 y `maximum` (el valor por defecto si no es válido)"""
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(limit, maximum))
+
+
+class DashboardScope:
+    """Ámbito del profesor calculado una vez por petición y compartido por las secciones"""
+
+    def __init__(self, user, params=None, access=None):
+        self.user = user
+        self.params = params or {}
+        # Ámbito de acceso compartido con el resto de la petición (grupos y alumnos del profesor)
+        self.access = access or access_scope_service.for_user(user)
+        self.today = timezone.now().date()
+        # Una consulta: grupos del profesor con su versión de datos (LEFT JOIN)
+        grupos = list(Group.objects.filter(teacher=user).values_list('id', 'report_version__version'))
+        self.group_ids = [gid for gid, _ in grupos]
+        sin_version = [gid for gid, version in grupos if version is None]
+        if sin_version:
+            # Las versiones se incrementan con UPDATE: la fila debe existir antes de cachear
+            ReportDataVersion.objects.bulk_create(
+                [ReportDataVersion(group_id=gid) for gid in sin_version], ignore_conflicts=True
+            )
+        versiones = ','.join(f"{gid}:{version or 0}" for gid, version in sorted(grupos))
+        self.data_version = hashlib.sha1(versiones.encode()).hexdigest()[:16]
+        self.student_ids = sorted(self.access.principal_student_ids)
+
+
+class DashboardService:
+    """Secciones del dashboard y su evaluación concurrente"""
+
+    def __init__(self):
+        self.cache_ttl = getattr(settings, 'DASHBOARD_CACHE_TTL', 300)
+        self.max_workers = getattr(settings, 'DASHBOARD_MAX_WORKERS', 4)
+        self.pending_precomputed = getattr(settings, 'DASHBOARD_PENDING_PRECOMPUTED', True)
+        # nombre -> (método, cacheable por versión de datos)
+        self.sections = {
+            'resumen': (self.resumen, True),
+            'proximas_clases': (self.proximas_clases, False),
+            'evolucion': (self.evolucion, True),
+            'comentarios_recientes': (self.comentarios_recientes, False),
+            'rubricas_estadisticas': (self.rubricas_estadisticas, False),
+            'evaluaciones_pendientes': (self.evaluaciones_pendientes, True),
+            'insights': (self.insights, True),
+            'noticias': (self.noticias, False),
+        }
+
+    # ==================== Secciones ====================
+
+    def resumen(self, scope: DashboardScope) -> Dict:
+        """Resumen general del dashboard del docente"""
+        week_ago = scope.today - timedelta(days=7)
+        asistencia = Attendance.objects.filter(student_id__in=scope.student_ids, date=scope.today).aggregate(
+            total=Count('id'), presentes=Count('id', filter=Q(status='presente'))
+        )
+        total_asistencias_hoy = asistencia['total']
+        asistencias_hoy = asistencia['presentes']
+        return {
+            'total_alumnos': len(scope.student_ids),
+            'total_asignaturas': Subject.objects.filter(teacher=scope.user).count(),
+            'evaluaciones_semana': rollup_service.teacher_totals(scope.user, week_ago)['eval_count'],
+            'asistencias_hoy': asistencias_hoy,
+            'total_asistencias_hoy': total_asistencias_hoy,
+            'porcentaje_asistencia': round((asistencias_hoy / total_asistencias_hoy * 100), 1) if total_asistencias_hoy > 0 else 0,
+        }
+
+    def proximas_clases(self, scope: DashboardScope) -> Dict:
+        """Próximas clases del día - incluye clases recurrentes de asignaturas"""
+        today_weekday = scope.today.strftime('%A').lower()  # 'monday', 'tuesday', etc.
+        clases_data = []
+
+        # 1. Clases recurrentes de las asignaturas del usuario (filtro indexado por máscara de días)
+        for subject in Subject.meeting_on(scope.today, teacher=scope.user).prefetch_related('groups'):
+            groups = list(subject.groups.all())
+            group_names = ', '.join(g.name for g in groups) if groups else 'Sin grupo'
+            clases_data.append({
+                'id': f'subject-{subject.id}',
+                'title': subject.name,
+                'subject_name': subject.name,
+                'group_name': group_names,
+                'start_time': subject.start_time.strftime('%H:%M') if subject.start_time else '--:--',
+                'end_time': subject.end_time.strftime('%H:%M') if subject.end_time else '--:--',
+                'event_type': 'class',
+                'description': f'Clase recurrente - {group_names}',
+                'color': subject.color
+            })
+
+        # 2. Eventos personalizados del calendario para hoy
+        eventos_hoy = CalendarEvent.objects.filter(
+            date=scope.today, created_by=scope.user
+        ).select_related('subject').order_by('start_time')
+        for evento in eventos_hoy:
+            clases_data.append({
+                'id': f'event-{evento.id}',
+                'title': evento.title,
+                'subject_name': evento.subject.name if evento.subject else evento.title,
+                'group_name': evento.event_type,
+                'start_time': evento.start_time.strftime('%H:%M') if evento.start_time else '--:--',
+                'end_time': evento.end_time.strftime('%H:%M') if evento.end_time else '--:--',
+                'event_type': evento.event_type,
+                'description': evento.description or '',
+                'color': evento.color
+            })
+
+        clases_data.sort(key=lambda x: x['start_time'])
+        return {
+            'clases': clases_data,
+            'total_clases': len(clases_data),
+            'today': scope.today.strftime('%Y-%m-%d'),
+            'weekday': today_weekday
+        }
+
+    def evolucion(self, scope: DashboardScope) -> Dict:
+        """Evolución del rendimiento de los últimos 30 días"""
+        thirty_days_ago = scope.today - timedelta(days=30)
+        # Agregado diario (profesor, asignatura, día): una fila por día en lugar de todas las evaluaciones
+        evolucion_data = [
+            item for item in rollup_service.teacher_daily(scope.user, thirty_days_ago, scope.params.get('subject_id'))
+            if item['score_count']
+        ]
+
+        chart_data = [
+            {
+                'date': item['day'].strftime('%Y-%m-%d'),
+                'avg_score': round(item['score_sum'] / item['score_count'], 1),
+                'total_evaluations': item['score_count']
+            }
+            for item in evolucion_data
+        ]
+        # Totales a partir de los días (sin volver a consultar)
+        total_evaluations = sum(item['score_count'] for item in evolucion_data)
+        suma = sum(item['score_sum'] for item in evolucion_data)
+        avg_score_general = suma / total_evaluations if total_evaluations else None
+
+        return {
+            'chart_data': chart_data,
+            'summary': {
+                'total_evaluations': total_evaluations,
+                'avg_score_general': round(float(avg_score_general), 1) if avg_score_general else 0,
+                'period_days': 30
+            }
+        }
+
+    def comentarios_recientes(self, scope: DashboardScope) -> Dict:
+        """Comentarios recientes sobre los alumnos del profesor"""
+        limit = parse_limit(scope.params.get('limit'))
+        comentarios = Comment.objects.filter(student_id__in=scope.student_ids).select_related(
+            'student', 'subject', 'author'
+        ).order_by('-created_at')[:limit]
+        comentarios_data = [
+            {
+                'id': comentario.id,
+                'student_name': comentario.student.name,
+                'student_id': comentario.student.id,
+                'subject_name': comentario.subject.name if comentario.subject else 'Sin asignatura',
+                'text': comentario.text[:100] + '...' if len(comentario.text) > 100 else comentario.text,
+                'author_name': comentario.author.username if comentario.author else 'Sistema',
+                'created_at': comentario.created_at.strftime('%d/%m/%Y %H:%M')
+            }
+            for comentario in comentarios
+        ]
+        return {'comentarios': comentarios_data, 'total': len(comentarios_data)}
+
+    def rubricas_estadisticas(self, scope: DashboardScope) -> Dict:
+        """Estadísticas de rúbricas más usadas (opcional: ?days=N)"""
+        days = parse_days(scope.params.get('days'))
+        rubricas_data = [
+            {
+                'id': rubrica['id'],
+                'name': rubrica['title'],
+                'description': rubrica['description'][:100] + '...' if len(rubrica['description']) > 100 else rubrica['description'],
+                'usage_count': rubrica['usage_count'],
+                'created_at': rubrica['created_at'].strftime('%d/%m/%Y')
+            }
+            for rubrica in self.rubric_usage(scope.user, days)[:10]
+        ]
+        return {'rubricas': rubricas_data, 'total_rubricas': len(rubricas_data), 'period_days': days}
+
+    # ==================== Uso de rúbricas ====================
+
+    def _rubric_version_key(self, teacher_id) -> str:
+        return f"rubricas:version:{teacher_id}"
+
+    def invalidate_rubric_usage(self, teacher_id):
+        """Renueva el token del profesor: las entradas anteriores quedan huérfanas hasta expirar"""
+        cache.delete(self._rubric_version_key(teacher_id))
+
+    def rubric_usage(self, teacher, days: Optional[int] = None) -> List[Dict]:
+        """
+        Rúbricas del profesor con el número de sesiones de evaluación (no filas por criterio),
+        de más a menos usada. Una consulta agrupada; cacheada por profesor y ventana.
+        """
+        version_key = self._rubric_version_key(teacher.id)
+        version = cache.get(version_key)
+        if version is None:
+            cache.add(version_key, time_ns(), None)
+            version = cache.get(version_key)
+        key = f"rubricas:{teacher.id}:{days or 'all'}:{version}"
+        data = cache.get(key)
+        if data is not None:
+            return data
+
+        sesiones = Q()
+        if days:
+            sesiones = Q(scores__evaluated_at__gte=timezone.now() - timedelta(days=days))
+        data = list(
+            Rubric.objects.filter(teacher=teacher)
+            .annotate(usage_count=Count('scores__evaluation_session_id', filter=sesiones, distinct=True))
+            .order_by('-usage_count', 'title')
+            .values('id', 'title', 'description', 'usage_count', 'created_at')
+        )
+        cache.set(key, data, self.cache_ttl)
+        return data
+
+    def _pendientes_queryset(self, scope: DashboardScope, since):
+        """
+        Alumnos del profesor sin evaluación suya desde `since`, anotados con la fecha y la nota
+        de su última evaluación (de cualquier profesor, o sin evaluador). Una sola consulta con
+        subconsultas correlacionadas. El filtro de pendientes usa la tabla precalculada
+        StudentEvaluatorActivity o, si está desactivada, directamente Evaluation; la última
+        evaluación sale siempre de Evaluation, porque la tabla no guarda las que no tienen
+        evaluador.
+        """
+        evaluaciones = Evaluation.objects.filter(student=OuterRef('pk'))
+        ultima = evaluaciones.order_by('-created_at', '-id')
+        alumnos = Student.objects.filter(grupo_principal_id__in=scope.group_ids).annotate(
+            last_date=Subquery(ultima.values('created_at')[:1]),
+            last_score=Subquery(ultima.values('score')[:1]),
+        )
+        if self.pending_precomputed:
+            ultima_mia = StudentEvaluatorActivity.objects.filter(student=OuterRef('pk'), evaluator=scope.user)
+            alumnos = alumnos.annotate(
+                ultima_mia=Subquery(ultima_mia.values('last_evaluated_at')[:1]),
+            ).filter(Q(ultima_mia__isnull=True) | Q(ultima_mia__lt=since))
+        else:
+            alumnos = alumnos.exclude(Exists(evaluaciones.filter(evaluator=scope.user, created_at__gte=since)))
+        return alumnos.select_related('grupo_principal').order_by('name')
+
+    def evaluaciones_pendientes(self, scope: DashboardScope) -> Dict:
+        """Alumnos sin evaluación en la última semana"""
+        week_ago = timezone.make_aware(datetime.combine(scope.today - timedelta(days=7), time.min))
+        pendientes_data = [
+            {
+                'id': student.id,
+                'name': student.name,
+                'group_name': student.grupo_principal.name if student.grupo_principal else 'Sin grupo',
+                'last_evaluation_date': timezone.localtime(student.last_date).strftime('%d/%m/%Y') if student.last_date else 'Nunca',
+                'last_evaluation_score': student.last_score
+            }
+            for student in self._pendientes_queryset(scope, week_ago)
+        ]
+        return {'pendientes': pendientes_data, 'total_pendientes': len(pendientes_data)}
+
+    def insights(self, scope: DashboardScope) -> Dict:
+        """Insights del aula a partir de los datos de los últimos 30 días"""
+        thirty_days_ago = timezone.now() - timedelta(days=30)
+        total_students = len(scope.student_ids)
+        evaluaciones = rollup_service.teacher_totals(scope.user, timezone.localtime(thirty_days_ago).date())
+        total_evaluations = evaluaciones['eval_count']
+        avg_score_float = evaluaciones['score_sum'] / evaluaciones['score_count'] if evaluaciones['score_count'] else 0.0
+
+        asistencia = Attendance.objects.filter(
+            student_id__in=scope.student_ids, date__gte=thirty_days_ago.date()
+        ).aggregate(total=Count('id'), presentes=Count('id', filter=Q(status='presente')))
+        attendance_rate = (asistencia['presentes'] / max(asistencia['total'], 1)) * 100
+
+        insights = []
+        if total_students > 0:
+            insights.append(f"📊 Tienes {total_students} estudiantes en tu aula")
+        if total_evaluations > 0:
+            insights.append(f"📝 Se han registrado {total_evaluations} evaluaciones en los últimos 30 días")
+        if avg_score_float > 0:
+            if avg_score_float >= 7:
+                insights.append("🎉 ¡Excelente! El promedio de calificaciones es muy bueno")
+            elif avg_score_float >= 5:
+                insights.append("📈 El rendimiento académico está en un nivel aceptable")
+            else:
+                insights.append("⚠️ Considera reforzar el apoyo académico")
+        if attendance_rate > 0:
+            if attendance_rate >= 90:
+                insights.append("✅ La asistencia es excelente")
+            elif attendance_rate >= 75:
+                insights.append("📅 La asistencia es buena")
+            else:
+                insights.append("🔍 Revisa la asistencia de los estudiantes")
+        if not insights:
+            insights.append("📚 Comienza a registrar evaluaciones y asistencias para obtener insights personalizados")
+
+        return {
+            'insights': insights,
+            'data': {
+                'total_students': total_students,
+                'total_evaluations': total_evaluations,
+                'avg_score': round(avg_score_float, 1),
+                'attendance_rate': round(attendance_rate, 1)
+            }
+        }
+
+    def noticias(self, scope: DashboardScope) -> Dict:
+        """Noticias educativas (iguales para todos los profesores, caché global de 48 h)"""
+        cache_key = 'noticias_educacion_cache'
+        cached_data = cache.get(cache_key)
+        if cached_data:
+            return cached_data
+
+        # Aquí se conectaría a un RSS/API real; por ahora datos simulados con fecha dinámica
+        today = timezone.now()
+        noticias_data = [
+            {
+                'id': 1,
+                'title': 'Nuevas tendencias en evaluación educativa competencial',
+                'summary': 'Análisis de metodologías innovadoras en evaluación por competencias y su impacto en el aprendizaje del alumnado...',
+                'source': 'Revista Educación 3.0',
+                'date': (today - timedelta(days=1)).strftime('%Y-%m-%d'),
+                'url': 'https://www.educaciontrespuntocero.com'
+            },
+            {
+                'id': 2,
+                'title': 'Evaluación formativa: claves para la mejora educativa',
+                'summary': 'Estrategias y herramientas para implementar una evaluación formativa efectiva en el aula...',
+                'source': 'Diari de l\'Educació',
+                'date': (today - timedelta(days=2)).strftime('%Y-%m-%d'),
+                'url': 'https://diarieducacio.cat'
+            },
+            {
+                'id': 3,
+                'title': 'Innovación pedagógica en centros educativos',
+                'summary': 'Experiencias de éxito en la implementación de metodologías activas y evaluación auténtica...',
+                'source': 'EducaLab',
+                'date': (today - timedelta(days=3)).strftime('%Y-%m-%d'),
+                'url': 'https://intef.es/recursos-educativos/recursos-para-el-aprendizaje-en-linea'
+            },
+            {
+                'id': 4,
+                'title': 'Rúbricas de evaluación: diseño y aplicación práctica',
+                'summary': 'Guía completa sobre el diseño e implementación de rúbricas en diferentes etapas educativas...',
+                'source': 'Blog XTEC',
+                'date': (today - timedelta(days=4)).strftime('%Y-%m-%d'),
+                'url': 'https://bloc.xtec.cat'
+            },
+            {
+                'id': 5,
+                'title': 'Autoevaluación y coevaluación en el aula',
+                'summary': 'Herramientas y estrategias para fomentar la autoevaluación y la evaluación entre pares...',
+                'source': 'EducaBcn',
+                'date': (today - timedelta(days=5)).strftime('%Y-%m-%d'),
+                'url': 'https://ajuntament.barcelona.cat/educacio'
+            }
+        ]
+        response_data = {
+            'noticias': noticias_data,
+            'total': len(noticias_data),
+            'last_updated': today.isoformat(),
+            'next_update': (today + timedelta(days=2)).isoformat()
+        }
+        cache.set(cache_key, response_data, 60 * 60 * 48)
+        return response_data
+
+    # ==================== Evaluación ====================
+
+    def _cache_key(self, name: str, scope: DashboardScope) -> str:
+        params = ''
+        if name == 'evolucion':
+            params = f":{scope.params.get('subject_id') or ''}"
+        return f"dashboard:{scope.user.id}:{name}:{scope.today}:{scope.data_version}{params}"
+
+    def section(self, name: str, scope: DashboardScope) -> Dict:
+        """Una sección, desde la caché si es cacheable"""
+        method, cacheable = self.sections[name]
+        if not cacheable:
+            return method(scope)
+        key = self._cache_key(name, scope)
+        data = cache.get(key)
+        if data is None:
+            data = method(scope)
+            cache.set(key, data, self.cache_ttl)
+        return data
+
+    def _section_in_thread(self, name: str, scope: DashboardScope) -> Dict:
+        try:
+            return self.section(name, scope)
+        finally:
+            # Cada hilo abre su propia conexión: se cierra al terminar la sección
+            connection.close()
+
+    def build(self, user, names: Optional[Iterable[str]] = None, params=None, access=None) -> Dict:
+        """
+        Secciones pedidas (todas por defecto) evaluadas en paralelo.
+        Un fallo en una sección no tumba el resto: se informa en 'errors'.
+        """
+        names = [n for n in (names or self.sections) if n in self.sections]
+        scope = DashboardScope(user, params, access)
+        resultados: Dict[str, Dict] = {}
+        errores: Dict[str, str] = {}
+
+        if self.max_workers <= 1 or len(names) <= 1:
+            for name in names:
+                try:
+                    resultados[name] = self.section(name, scope)
+                except Exception as e:
+                    logger.exception(f"[DASHBOARD] Error en la sección {name}")
+                    errores[name] = str(e)
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(names))) as executor:
+                futures = {name: executor.submit(self._section_in_thread, name, scope) for name in names}
+                for name, future in futures.items():
+                    try:
+                        resultados[name] = future.result()
+                    except Exception as e:
+                        logger.exception(f"[DASHBOARD] Error en la sección {name}")
+                        errores[name] = str(e)
+
+        return {
+            'sections': resultados,
+            'errors': errores,
+            'generated_at': timezone.now().isoformat(),
+        }
+
+
+# Instancia global del servicio
+dashboard_service = DashboardService()
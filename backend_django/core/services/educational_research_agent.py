@@ -7,7 +7,9 @@ import logging
 from typing import Dict, List, Optional
 from django.conf import settings
 from .research_search import research_search_service
+from .paper_index import paper_index_service
 from .openrouter_service import openrouter_client
+from .conversation_memory import conversation_memory
 
 logger = logging.getLogger(__name__)
 
@@ -228,7 +230,8 @@ RECUERDA: Tu propósito es ser ÚTIL, PRÁCTICO y FUNDAMENTADO. Nunca digas que
         self,
         user_question: str,
         papers: List[Dict],
-        chat_history: Optional[List[Dict]] = None
+        chat_history: Optional[List[Dict]] = None,
+        conversation_summary: str = ''
     ) -> Dict:
         """
         Genera respuesta basada en papers científicos
@@ -236,7 +239,8 @@ RECUERDA: Tu propósito es ser ÚTIL, PRÁCTICO y FUNDAMENTADO. Nunca digas que
         Args:
             user_question: Pregunta del usuario
             papers: Lista de papers encontrados
-            chat_history: Historial previo de conversación
+            chat_history: Mensajes recientes de la conversación (orden cronológico)
+            conversation_summary: Resumen acumulado de los mensajes anteriores a chat_history
             
         Returns:
             Dict con 'response' (texto) y 'papers_used' (lista)
@@ -254,14 +258,24 @@ RECUERDA: Tu propósito es ser ÚTIL, PRÁCTICO y FUNDAMENTADO. Nunca digas que
                 "content": self.system_prompt
             })
             
-            # Agregar historial si existe (últimos 5 mensajes)
+            # Resumen de la parte antigua de la conversación
+            if conversation_summary:
+                messages.append({
+                    "role": "system",
+                    "content": f"RESUMEN DE LA CONVERSACIÓN ANTERIOR:\n{conversation_summary}"
+                })
+            
+            # Agregar historial reciente si existe, recortado al presupuesto de tokens
             if chat_history and isinstance(chat_history, list) and len(chat_history) > 0:
-                for msg in chat_history[-5:]:
-                    if isinstance(msg, dict) and 'sender' in msg and 'content' in msg:
-                        messages.append({
-                            "role": msg.get("sender", "user"),
-                            "content": msg.get("content", "")
-                        })
+                valid_history = [
+                    msg for msg in chat_history
+                    if isinstance(msg, dict) and 'sender' in msg and 'content' in msg
+                ]
+                for msg in conversation_memory.fit_to_budget(valid_history):
+                    messages.append({
+                        "role": msg.get("sender", "user"),
+                        "content": msg.get("content", "")
+                    })
             
             # Mensaje del usuario con contexto científico (si hay)
             if papers and len(papers) > 0:
@@ -347,14 +361,16 @@ Responde usando tu conocimiento pedagógico basado en autores reconocidos y cons
     def process_question(
         self,
         question: str,
-        chat_history: Optional[List[Dict]] = None
+        chat_history: Optional[List[Dict]] = None,
+        conversation_summary: str = ''
     ) -> Dict:
         """
         Proceso completo: buscar papers + generar respuesta
         
         Args:
             question: Pregunta del usuario
-            chat_history: Historial de chat
+            chat_history: Mensajes recientes de la conversación
+            conversation_summary: Resumen acumulado de la conversación
             
         Returns:
             Dict con response, papers, y metadatos
@@ -376,18 +392,20 @@ Responde usando tu conocimiento pedagógico basado en autores reconocidos y cons
                 }
             
             # 1. Buscar papers relevantes (pero no es obligatorio encontrarlos)
+            #    Primero en el corpus local; las APIs externas solo si hay pocos resultados
             logger.info(f"Searching papers for: {question}")
-            papers = research_search_service.search_combined(question, limit=5)
-            
-            # Validar que papers sea una lista
-            if papers is None:
-                papers = []
+            papers = paper_index_service.search(question, limit=5)
             
-            logger.info(f"Found {len(papers)} papers")
+            if paper_index_service.has_good_recall(papers):
+                logger.info(f"Found {len(papers)} papers in local index")
+            else:
+                external_papers = research_search_service.search_combined(question, limit=5) or []
+                papers = research_search_service.merge_and_rank([papers, external_papers], 5)
+                logger.info(f"Found {len(papers)} papers ({len(external_papers)} from external APIs)")
             
             # 2. Generar respuesta con IA (incluso si no hay papers)
             # El prompt ya maneja el caso de pocos o ningún paper
-            result = self.generate_response(question, papers, chat_history)
+            result = self.generate_response(question, papers, chat_history, conversation_summary)
             
             return result
             
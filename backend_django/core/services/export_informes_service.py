@@ -594,3 +594,16 @@ class ExcelExportService:
 # Instancias globales
 pdf_export_service = PDFExportService()
 excel_export_service = ExcelExportService()
+
+
+def render_pdf_individual(args):
+    """
+    Renderiza un informe individual y devuelve (nombre_fichero, bytes del PDF).
+    Función de módulo sin dependencias de Django para poder ejecutarse en un ProcessPoolExecutor.
+    
+    Args:
+        args: (nombre_fichero, data, comentarios, trimestre, estudiante_nombre, grupo_nombre)
+    """
+    nombre_fichero, data, comentarios, trimestre, estudiante_nombre, grupo_nombre = args
+    buffer = pdf_export_service.generar_pdf_individual(data, comentarios, trimestre, estudiante_nombre, grupo_nombre)
+    return nombre_fichero, buffer.getvalue()
@@ -5,9 +5,11 @@ Integrado con corrección automática usando LanguageTool
 import os
 import logging
 import tempfile
-from typing import Dict, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 from django.conf import settings
 from google.cloud import vision_v1p3beta1 as vision
+from google.cloud import vision_v1 as vision_files
 from google.api_core import exceptions as gcp_exceptions
 
 logger = logging.getLogger(__name__)
@@ -19,11 +21,17 @@ class GoogleVisionOCRError(Exception):
 class GoogleVisionOCRClient:
     """Cliente para OCR de escritura manuscrita usando Google Cloud Vision"""
     
+    # Límite de la API síncrona batch_annotate_files
+    PDF_PAGES_PER_REQUEST = 5
+    
     def __init__(self):
         self.client = None
+        self.files_client = None
         self.project_id = getattr(settings, 'GOOGLE_CLOUD_PROJECT_ID', None)
         self.credentials_path = getattr(settings, 'GOOGLE_CLOUD_CREDENTIALS_PATH', None)
         self.max_file_size = getattr(settings, 'GOOGLE_VISION_MAX_FILE_SIZE', 20 * 1024 * 1024)  # 20MB
+        self.batch_size = min(getattr(settings, 'GOOGLE_VISION_BATCH_SIZE', 16), 16)  # Máximo de la API: 16 imágenes
+        self.batch_concurrency = getattr(settings, 'GOOGLE_VISION_BATCH_CONCURRENCY', 4)
         
         # Configurar cliente
         self._setup_client()
@@ -96,39 +104,214 @@ class GoogleVisionOCRClient:
             if response.error.message:
                 raise GoogleVisionOCRError(f"Error de Google Cloud Vision: {response.error.message}")
             
-            # Extraer texto y metadatos
-            full_text = response.full_text_annotation.text if response.full_text_annotation else ""
-            
-            # Extraer información detallada de palabras
-            words_info = self._extract_words_info(response)
-            
-            # Calcular confianza promedio
-            confidence_scores = [word.get('confidence', 0) for word in words_info]
-            avg_confidence = sum(confidence_scores) / len(confidence_scores) if confidence_scores else 0
+            result = self._build_handwritten_result(response, language_hint, file_size)
             
-            result = {
-                'text': full_text.strip(),
-                'words': words_info,
-                'confidence': avg_confidence,
-                'word_count': len(words_info),
-                'language_hint': language_hint,
-                'processing_info': {
-                    'file_size': file_size,
-                    'success': True,
-                    'error': None
-                }
-            }
-            
-            logger.info(f"OCR completado exitosamente. Palabras detectadas: {len(words_info)}")
+            logger.info(f"OCR completado exitosamente. Palabras detectadas: {result['word_count']}")
             return result
             
         except gcp_exceptions.GoogleAPIError as e:
             logger.error(f"Error de API de Google Cloud: {str(e)}")
-            raise GoogleVisionOCRError(f"Error de API de Google Cloud: {str(e)}")
+            raise GoogleVisionOCRError(f"Error de API de Google Cloud: {str(e)}") from e
         except Exception as e:
             logger.error(f"Error inesperado en OCR: {str(e)}")
-            raise GoogleVisionOCRError(f"Error inesperado: {str(e)}")
-    
+            raise GoogleVisionOCRError(f"Error inesperado: {str(e)}") from e
+
+    def _build_handwritten_result(self, response, language_hint: str, file_size: int) -> Dict[str, any]:
+        """Construye el dict de resultado a partir de una respuesta de document_text_detection"""
+        # Extraer texto y metadatos
+        full_text = response.full_text_annotation.text if response.full_text_annotation else ""
+
+        # Extraer información detallada de palabras
+        words_info = self._extract_words_info(response)
+
+        # Calcular confianza promedio
+        confidence_scores = [word.get('confidence', 0) for word in words_info]
+        avg_confidence = sum(confidence_scores) / len(confidence_scores) if confidence_scores else 0
+
+        return {
+            'text': full_text.strip(),
+            'words': words_info,
+            'confidence': avg_confidence,
+            'word_count': len(words_info),
+            'language_hint': language_hint,
+            'processing_info': {
+                'file_size': file_size,
+                'success': True,
+                'error': None
+            }
+        }
+
+    def _page_error(self, error: str, language_hint: str, file_size: int = 0) -> Dict[str, any]:
+        """Resultado de una página fallida dentro de un lote (no aborta el resto del lote)"""
+        return {
+            'text': '',
+            'words': [],
+            'confidence': 0,
+            'word_count': 0,
+            'language_hint': language_hint,
+            'processing_info': {
+                'file_size': file_size,
+                'success': False,
+                'error': error
+            }
+        }
+
+    def _get_files_client(self):
+        """
+        Cliente v1 para batch_annotate_files (PDF/TIFF síncrono).
+        vision_v1p3beta1 no expone batch_annotate_files, así que se crea bajo demanda.
+        """
+        if self.files_client is None:
+            self.files_client = vision_files.ImageAnnotatorClient()
+        return self.files_client
+
+    def _annotate_image_chunk(
+        self,
+        chunk: List[Tuple[int, bytes]],
+        language_hint: str,
+        raise_errors: bool = False
+    ) -> List[Tuple[int, Dict]]:
+        """
+        Envía hasta `batch_size` imágenes en una sola llamada batch_annotate_images.
+        Si la llamada falla, devuelve un error por imagen; con raise_errors=True lanza
+        GoogleVisionOCRError (con la excepción de la API como causa) para que el router decida.
+        """
+        requests_batch = [
+            vision.AnnotateImageRequest(
+                image=vision.Image(content=content),
+                features=[vision.Feature(type_=vision.Feature.Type.DOCUMENT_TEXT_DETECTION)],
+                image_context=vision.ImageContext(language_hints=[language_hint]),
+            )
+            for _, content in chunk
+        ]
+        try:
+            batch_response = self.client.batch_annotate_images(requests=requests_batch)
+        except gcp_exceptions.GoogleAPIError as e:
+            logger.error(f"Error de API de Google Cloud en lote: {str(e)}")
+            if raise_errors:
+                raise GoogleVisionOCRError(f"Error de API de Google Cloud: {str(e)}") from e
+            return [(index, self._page_error(str(e), language_hint, len(content))) for index, content in chunk]
+
+        results = []
+        for (index, content), response in zip(chunk, batch_response.responses):
+            if response.error.message:
+                results.append((index, self._page_error(response.error.message, language_hint, len(content))))
+            else:
+                results.append((index, self._build_handwritten_result(response, language_hint, len(content))))
+        return results
+
+    def _annotate_pdf_pages(self, content: bytes, pages: List[int], language_hint: str) -> Tuple[int, List[Tuple[int, Dict]]]:
+        """
+        Anota un bloque de páginas de un PDF. Devuelve (total_páginas, [(página, resultado)]).
+        Con `pages` vacío la API procesa las primeras 5 páginas que existan.
+        """
+        request = vision_files.AnnotateFileRequest(
+            input_config=vision_files.InputConfig(content=content, mime_type='application/pdf'),
+            features=[vision_files.Feature(type_=vision_files.Feature.Type.DOCUMENT_TEXT_DETECTION)],
+            image_context=vision_files.ImageContext(language_hints=[language_hint]),
+            pages=pages,
+        )
+        try:
+            batch_response = self._get_files_client().batch_annotate_files(requests=[request])
+        except gcp_exceptions.GoogleAPIError as e:
+            logger.error(f"Error de API de Google Cloud en PDF (páginas {pages or 'iniciales'}): {str(e)}")
+            return 0, [(page, self._page_error(str(e), language_hint)) for page in pages or [1]]
+
+        file_response = batch_response.responses[0]
+        if file_response.error.message:
+            return file_response.total_pages, [
+                (page, self._page_error(file_response.error.message, language_hint)) for page in pages or [1]
+            ]
+
+        results = []
+        for response in file_response.responses:
+            page = response.context.page_number
+            if response.error.message:
+                results.append((page, self._page_error(response.error.message, language_hint)))
+            else:
+                results.append((page, self._build_handwritten_result(response, language_hint, 0)))
+        return file_response.total_pages, results
+
+    def iter_batch_handwritten_text(
+        self,
+        images: List[bytes],
+        language_hint: str = "es-t-i0-handwrit",
+        annotate_chunk: Optional[Callable[[List[Tuple[int, bytes]], str], List[Tuple[int, Dict]]]] = None
+    ) -> Iterator[Tuple[int, Dict]]:
+        """
+        OCR manuscrito por lotes. Agrupa las imágenes en llamadas batch_annotate_images
+        (máx. `batch_size` por llamada) y lanza como mucho `batch_concurrency` llamadas a la vez.
+
+        Args:
+            images: Contenido binario de cada imagen, en orden
+            language_hint: Hint de idioma para manuscrito
+            annotate_chunk: Sustituye a _annotate_image_chunk para cada lote (el router la usa
+                para pasar a Tesseract los lotes que fallan)
+
+        Yields:
+            (índice de la imagen, resultado) a medida que termina cada lote
+        """
+        if not self.client:
+            raise GoogleVisionOCRError("Cliente Google Cloud Vision no configurado")
+
+        indexed = []
+        for index, content in enumerate(images):
+            if len(content) > self.max_file_size:
+                yield index, self._page_error(
+                    f"Archivo demasiado grande: {len(content)} bytes (máximo: {self.max_file_size})",
+                    language_hint, len(content)
+                )
+            else:
+                indexed.append((index, content))
+
+        chunks = [indexed[i:i + self.batch_size] for i in range(0, len(indexed), self.batch_size)]
+        if not chunks:
+            return
+
+        logger.info(f"OCR por lotes: {len(indexed)} imágenes en {len(chunks)} llamadas")
+        with ThreadPoolExecutor(max_workers=min(self.batch_concurrency, len(chunks))) as executor:
+            futures = [executor.submit(annotate_chunk or self._annotate_image_chunk, chunk, language_hint) for chunk in chunks]
+            for future in as_completed(futures):
+                for index, result in future.result():
+                    yield index, result
+
+    def iter_pdf_handwritten_text(
+        self,
+        content: bytes,
+        language_hint: str = "es-t-i0-handwrit"
+    ) -> Iterator[Tuple[int, Dict]]:
+        """
+        OCR manuscrito de un PDF multipágina con batch_annotate_files.
+        La API síncrona admite 5 páginas por petición: la primera petición, sin páginas
+        explícitas (la API devuelve las primeras que existan, sin pedir páginas fuera de rango
+        en PDFs cortos), descubre el total de páginas y el resto de bloques se lanzan en paralelo.
+
+        Yields:
+            (número de página, empezando en 1, resultado) a medida que se completa cada bloque
+        """
+        if not self.client:
+            raise GoogleVisionOCRError("Cliente Google Cloud Vision no configurado")
+        if len(content) > self.max_file_size:
+            raise GoogleVisionOCRError(f"Archivo demasiado grande: {len(content)} bytes (máximo: {self.max_file_size})")
+
+        total_pages, results = self._annotate_pdf_pages(content, [], language_hint)
+        for page, result in results:
+            yield page, result
+
+        remaining = [
+            list(range(start, min(start + self.PDF_PAGES_PER_REQUEST, total_pages + 1)))
+            for start in range(self.PDF_PAGES_PER_REQUEST + 1, total_pages + 1, self.PDF_PAGES_PER_REQUEST)
+        ]
+        if not remaining:
+            return
+
+        logger.info(f"OCR de PDF: {total_pages} páginas en {len(remaining) + 1} llamadas")
+        with ThreadPoolExecutor(max_workers=min(self.batch_concurrency, len(remaining))) as executor:
+            futures = [executor.submit(self._annotate_pdf_pages, content, pages, language_hint) for pages in remaining]
+            for future in as_completed(futures):
+                for page, result in future.result()[1]:
+                    yield page, result
+
     def _extract_words_info(self, response) -> List[Dict]:
         """Extrae información detallada de cada palabra detectada"""
         words_info = []
@@ -217,7 +400,7 @@ class GoogleVisionOCRClient:
             
         except Exception as e:
             logger.error(f"Error en OCR de texto impreso: {str(e)}")
-            raise GoogleVisionOCRError(f"Error en OCR de texto impreso: {str(e)}")
+            raise GoogleVisionOCRError(f"Error en OCR de texto impreso: {str(e)}") from e
     
     def get_supported_languages(self) -> Dict[str, str]:
         """
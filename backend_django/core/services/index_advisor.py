@@ -0,0 +1,260 @@
+"""
+Asesor de índices a partir de un registro de consultas reales
+
+1. Grabación (opcional): con QUERY_LOG_PATH definido, cada consulta ejecutada se añade al
+   fichero como una línea JSON {"sql", "params", "ms"} (QueryLogRecorder, instalado en
+   core.apps al crear cada conexión).
+2. Análisis (comando index_advisor): se agrupan las consultas por forma (literales y listas
+   IN normalizados), se ejecuta EXPLAIN de un ejemplo de cada forma y se señalan:
+   - lecturas secuenciales de una tabla con predicados en el WHERE
+   - ordenaciones en memoria (ORDER BY sin índice que lo resuelva)
+   junto con el índice candidato (columnas de igualdad, luego rango u ORDER BY) si no
+   existe ya uno con esas columnas iniciales.
+
+Acepta también el registro del logger django.db.backends ("(0.002) SELECT ...; args=...").
+Funciona con SQLite (EXPLAIN QUERY PLAN) y PostgreSQL (EXPLAIN (FORMAT JSON)); EXPLAIN sin
+ANALYZE no ejecuta la consulta.
+"""
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.apps import apps
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_DJANGO_LOG_LINE = re.compile(r'^\((?P<ms>[\d.]+)\) (?P<sql>.*?); args=.*?(?:; alias=\w+)?$')
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'(?<![\w"])-?\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN \((?:\s*(?:%s|\?)\s*,?)+\)', re.IGNORECASE)
+_COLUMN_PREDICATE = re.compile(
+    r'"?(?P<table>\w+)"?\."(?P<column>\w+)"\s*(?P<op>=|IN\b|IS NULL|<=|>=|<|>|BETWEEN\b|LIKE\b)', re.IGNORECASE
+)
+_ORDER_BY = re.compile(r'\bORDER BY (?P<cols>.+?)(?:\bLIMIT\b|\bOFFSET\b|\)|$)', re.IGNORECASE)
+_ORDER_COLUMN = re.compile(r'"?(?P<table>\w+)"\."(?P<column>\w+)"\s*(?P<dir>ASC|DESC)?', re.IGNORECASE)
+_TABLE_ALIAS = re.compile(r'(?:FROM|JOIN)\s+"(?P<table>\w+)"(?:\s+(?:AS\s+)?(?P<alias>[A-Z]\d+))?', re.IGNORECASE)
+
+EQUALITY_OPS = {'=', 'IN', 'IS NULL'}
+
+
+# ==================== Grabación ====================
+
+class QueryLogRecorder:
+    """execute_wrapper que añade cada consulta al registro (una línea JSON por consulta)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            if not many:
+                self.record(sql, params, (time.perf_counter() - start) * 1000)
+
+    def record(self, sql: str, params, ms: float):
+        linea = json.dumps({'sql': sql, 'params': list(params or ()), 'ms': round(ms, 3)}, default=str)
+        try:
+            with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+                f.write(linea + '\n')
+        except OSError as e:
+            logger.warning(f"No se pudo escribir el registro de consultas {self.path}: {e}")
+
+
+# ==================== Lectura y agrupación ====================
+
+def read_query_log(lines: Iterable[str]) -> Iterator[Tuple[str, Optional[list], float]]:
+    """(sql, params, ms) de cada línea; params es None si el SQL ya lleva los valores"""
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith('{'):
+            try:
+                data = json.loads(line)
+            except ValueError:
+                continue
+            if data.get('sql'):
+                yield data['sql'], data.get('params') or [], float(data.get('ms') or 0)
+            continue
+        match = _DJANGO_LOG_LINE.match(line)
+        if match:
+            yield match.group('sql'), None, float(match.group('ms')) * 1000
+
+
+def query_shape(sql: str) -> str:
+    """Forma de la consulta: sin literales y con las listas IN de cualquier longitud unificadas"""
+    shape = _STRING_LITERAL.sub('?', sql)
+    shape = _NUMBER_LITERAL.sub('?', shape)
+    shape = _IN_LIST.sub('IN (...)', shape)
+    return re.sub(r'\s+', ' ', shape).strip()
+
+
+def group_queries(entries: Iterable[Tuple[str, Optional[list], float]]) -> Dict[str, Dict]:
+    """Formas de SELECT con un ejemplo, número de ejecuciones y tiempo total (más costosas primero)"""
+    shapes = OrderedDict()
+    for sql, params, ms in entries:
+        if not sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+            continue
+        shape = query_shape(sql)
+        item = shapes.setdefault(shape, {'sql': sql, 'params': params, 'count': 0, 'total_ms': 0.0})
+        item['count'] += 1
+        item['total_ms'] += ms
+    return OrderedDict(sorted(shapes.items(), key=lambda kv: (-kv[1]['total_ms'], -kv[1]['count'])))
+
+
+# ==================== Planes ====================
+
+def _aliases(sql: str) -> Dict[str, str]:
+    aliases = {}
+    for match in _TABLE_ALIAS.finditer(sql):
+        aliases[match.group('table')] = match.group('table')
+        if match.group('alias'):
+            aliases[match.group('alias')] = match.group('table')
+    return aliases
+
+
+def explain(sql: str, params: Optional[list], using: str = 'default') -> Tuple[List[str], List[Tuple[str, str]]]:
+    """
+    Plan de la consulta: (líneas legibles, problemas)
+    Cada problema es ('scan', tabla) o ('sort', tabla o '').
+    """
+    connection = connections[using]
+    aliases = _aliases(sql)
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            lines, issues = [], []
+            _walk_postgres(plan[0]['Plan'], 0, lines, issues)
+            return lines, issues
+
+        if connection.vendor != 'sqlite':
+            raise NotImplementedError(f"EXPLAIN no soportado para {connection.vendor}")
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        lines, issues = [], []
+        for row in cursor.fetchall():
+            detail = row[-1]
+            lines.append(detail)
+            match = re.match(r'SCAN (?:TABLE )?(\w+)(?: AS \w+)?$', detail)
+            if match:
+                issues.append(('scan', aliases.get(match.group(1), match.group(1))))
+            elif 'USE TEMP B-TREE FOR ORDER BY' in detail:
+                issues.append(('sort', ''))
+        return lines, issues
+
+
+def _walk_postgres(node: Dict, depth: int, lines: List[str], issues: List[Tuple[str, str]]) -> Optional[str]:
+    """Recorre el plan JSON; devuelve la primera tabla bajo el nodo (para atribuir las ordenaciones)"""
+    relation = node.get('Relation Name')
+    lines.append('  ' * depth + f"{node['Node Type']}" + (f" on {relation}" if relation else '') +
+                 f" (rows={node.get('Plan Rows')})")
+    if node['Node Type'] == 'Seq Scan' and relation:
+        issues.append(('scan', relation))
+    first = relation
+    for child in node.get('Plans', []):
+        child_relation = _walk_postgres(child, depth + 1, lines, issues)
+        first = first or child_relation
+    if node['Node Type'] in ('Sort', 'Incremental Sort'):
+        issues.append(('sort', first or ''))
+    return first
+
+
+# ==================== Candidatos ====================
+
+def predicates(sql: str) -> Dict[str, Dict[str, List[str]]]:
+    """Columnas filtradas por tabla, separadas en igualdad / rango, y columnas del ORDER BY"""
+    aliases = _aliases(sql)
+    result: Dict[str, Dict[str, List[str]]] = {}
+
+    def entry(table):
+        return result.setdefault(aliases.get(table, table), {'equality': [], 'range': [], 'order': []})
+
+    where = re.split(r'\bWHERE\b', sql, maxsplit=1, flags=re.IGNORECASE)
+    if len(where) == 2:
+        for match in _COLUMN_PREDICATE.finditer(where[1]):
+            kind = 'equality' if match.group('op').upper() in EQUALITY_OPS else 'range'
+            columns = entry(match.group('table'))[kind]
+            if match.group('column') not in columns:
+                columns.append(match.group('column'))
+    order = _ORDER_BY.search(sql)
+    if order:
+        for match in _ORDER_COLUMN.finditer(order.group('cols')):
+            direction = '-' if (match.group('dir') or '').upper() == 'DESC' else ''
+            entry(match.group('table'))['order'].append(direction + match.group('column'))
+    return result
+
+
+def candidate_columns(table_predicates: Dict[str, List[str]], for_sort: bool = False) -> List[str]:
+    """
+    Igualdad primero y después el primer rango; para evitar una ordenación, las columnas del
+    ORDER BY en lugar del rango (máx. 3 columnas)
+    """
+    columns = list(table_predicates['equality'])
+    if table_predicates['range'] and not for_sort:
+        columns.append(table_predicates['range'][0])
+    else:
+        columns += [c for c in table_predicates['order'] if c.lstrip('-') not in columns]
+    return columns[:3]
+
+
+def existing_indexes(table: str, using: str = 'default') -> List[List[str]]:
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, table)
+    return [
+        info['columns'] for info in constraints.values()
+        if (info.get('index') or info.get('unique') or info.get('primary_key')) and info.get('columns')
+    ]
+
+
+def is_covered(columns: List[str], indexes: List[List[str]]) -> bool:
+    wanted = [c.lstrip('-') for c in columns]
+    return any(index[:len(wanted)] == wanted for index in indexes)
+
+
+def model_index_hint(table: str, columns: List[str]) -> str:
+    """Declaración models.Index equivalente (con nombres de campo si la tabla es de un modelo)"""
+    model = next((m for m in apps.get_models() if m._meta.db_table == table), None)
+    fields = []
+    for column in columns:
+        desc, name = column.startswith('-'), column.lstrip('-')
+        if model is not None:
+            name = next((f.name for f in model._meta.concrete_fields if f.column == name), name)
+        fields.append(('-' if desc else '') + name)
+    prefix = f"{model.__name__}: " if model is not None else f"{table}: "
+    return prefix + f"models.Index(fields={fields!r})"
+
+
+def analyze(sql: str, params: Optional[list], using: str = 'default') -> Dict:
+    """Plan, problemas y candidatos de una consulta"""
+    lines, issues = explain(sql, params, using)
+    found = predicates(sql)
+    candidates = []
+    for kind, table in issues:
+        if kind == 'sort' and not table:
+            # SQLite no dice qué tabla se ordena: la de las columnas del ORDER BY
+            table = next((t for t, p in found.items() if p['order']), '')
+        table_predicates = found.get(table)
+        if not table_predicates:
+            continue
+        if kind == 'scan' and not (table_predicates['equality'] or table_predicates['range']):
+            continue  # lectura completa buscada (sin filtros sobre la tabla)
+        if kind == 'sort' and not table_predicates['order']:
+            continue
+        columns = candidate_columns(table_predicates, for_sort=(kind == 'sort'))
+        if not columns or is_covered(columns, existing_indexes(table, using)):
+            continue
+        candidate = {'table': table, 'columns': columns, 'reason': kind, 'hint': model_index_hint(table, columns)}
+        if candidate not in candidates:
+            candidates.append(candidate)
+    return {'plan': lines, 'issues': issues, 'candidates': candidates}
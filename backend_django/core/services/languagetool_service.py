@@ -1,21 +1,164 @@
 """
 Servicio de LanguageTool para corrección gramatical y ortográfica
 """
+import re
+import time
+import hashlib
+import threading
 import requests
 import logging
-from typing import Dict, List, Optional
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
 from django.conf import settings
+from django.core.cache import cache
 
 logger = logging.getLogger(__name__)
 
+
+class LanguageToolBackend:
+    """
+    Servidor LanguageTool concreto (público o autoalojado).
+    Reutiliza conexiones HTTP con una Session y recuerda durante un tiempo si está caído.
+    """
+    
+    def __init__(self, name: str, base_url: str, timeout: int, pool_size: int = 10, retry_after: int = 30):
+        self.name = name
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._down_until = 0.0
+        self._lock = threading.Lock()
+    
+    def is_available(self) -> bool:
+        """False mientras dura la penalización tras un fallo de conexión"""
+        return time.monotonic() >= self._down_until
+    
+    def mark_down(self):
+        with self._lock:
+            self._down_until = time.monotonic() + self.retry_after
+        logger.warning(f"LanguageTool '{self.name}' marcado como no disponible durante {self.retry_after}s")
+    
+    def mark_up(self):
+        with self._lock:
+            self._down_until = 0.0
+    
+    def check(self, data: Dict) -> requests.Response:
+        return self.session.post(f"{self.base_url}/check", data=data, timeout=self.timeout)
+    
+    def health_check(self) -> Dict:
+        """
+        Comprueba el servidor con GET /languages. Un éxito lo devuelve a la rotación; un fallo
+        no lo saca (eso solo lo deciden las peticiones reales), para que consultar el estado
+        no deje fuera al servidor local.
+        """
+        inicio = time.perf_counter()
+        try:
+            response = self.session.get(f"{self.base_url}/languages", timeout=min(self.timeout, 5))
+            healthy = response.status_code == 200
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"Health check de LanguageTool '{self.name}' falló: {e}")
+            healthy = False
+        latencia_ms = round((time.perf_counter() - inicio) * 1000, 1)
+        if healthy:
+            self.mark_up()
+        return {'backend': self.name, 'url': self.base_url, 'healthy': healthy, 'latency_ms': latencia_ms}
+
+
 class LanguageToolService:
     """Servicio para integración con LanguageTool API"""
     
     BASE_URL = "https://api.languagetool.org/v2"
     
+    # Mapear códigos de idioma a formato LanguageTool
+    LANGUAGE_MAP = {
+        'ca': 'ca-ES',  # Catalán
+        'es': 'es',     # Español
+        'en': 'en-US'   # Inglés
+    }
+    
+    # Separador de párrafos: una o más líneas en blanco
+    PARAGRAPH_SEPARATOR = re.compile(r'\n\s*\n')
+    # Puntos de corte preferidos al trocear un párrafo demasiado largo
+    SENTENCE_END = re.compile(r'[.!?;:]\s|\n')
+    # Unión de los segmentos que viajan en una misma petición (LanguageTool los ve como párrafos distintos)
+    PACK_SEPARATOR = '\n\n'
+    
     def __init__(self):
         self.timeout = getattr(settings, 'LANGUAGETOOL_TIMEOUT', 10)
         self.max_text_length = getattr(settings, 'LANGUAGETOOL_MAX_TEXT_LENGTH', 20000)
+        self.chunk_length = getattr(settings, 'LANGUAGETOOL_CHUNK_LENGTH', 5000)
+        self.concurrency = getattr(settings, 'LANGUAGETOOL_CONCURRENCY', 4)
+        self.cache_ttl = getattr(settings, 'LANGUAGETOOL_CACHE_TTL', 60 * 60 * 24)
+        # Segundos durante los que se reutiliza el último health check de cada backend
+        self.health_ttl = getattr(settings, 'LANGUAGETOOL_HEALTH_TTL', 60)
+        self.backends = self._configurar_backends()
+    
+    def _configurar_backends(self) -> List[LanguageToolBackend]:
+        """
+        Backends en orden de preferencia: el servidor local (LANGUAGETOOL_URL) primero y
+        la API pública como respaldo, salvo que LANGUAGETOOL_PUBLIC_FALLBACK sea False.
+        """
+        retry_after = getattr(settings, 'LANGUAGETOOL_RETRY_AFTER', 30)
+        pool_size = max(self.concurrency, 10)
+        backends = []
+        local_url = getattr(settings, 'LANGUAGETOOL_URL', '')
+        if local_url and local_url.rstrip('/') != self.BASE_URL:
+            backends.append(LanguageToolBackend('local', local_url, self.timeout, pool_size, retry_after))
+        if not backends or getattr(settings, 'LANGUAGETOOL_PUBLIC_FALLBACK', True):
+            backends.append(LanguageToolBackend('public', self.BASE_URL, self.timeout, pool_size, retry_after))
+        return backends
+    
+    def get_backend(self, name: str) -> Optional[LanguageToolBackend]:
+        return next((backend for backend in self.backends if backend.name == name), None)
+    
+    def _enviar_check(self, data: Dict, backends: Optional[List[LanguageToolBackend]] = None) -> requests.Response:
+        """
+        POST /check al primer backend disponible. Ante errores de conexión, timeouts o
+        respuestas 5xx/429 se pasa al siguiente; si todos fallan se relanza el último error.
+        """
+        candidatos = backends or self.backends
+        disponibles = [backend for backend in candidatos if backend.is_available()] or candidatos
+        ultimo_error = None
+        response = None
+        for i, backend in enumerate(disponibles):
+            es_ultimo = i == len(disponibles) - 1
+            try:
+                response = backend.check(data)
+            except requests.exceptions.RequestException as e:
+                backend.mark_down()
+                ultimo_error = e
+                continue
+            if not es_ultimo and (response.status_code >= 500 or response.status_code == 429):
+                logger.warning(f"LanguageTool '{backend.name}' respondió {response.status_code}, usando respaldo")
+                if response.status_code >= 500:
+                    backend.mark_down()
+                continue
+            return response
+        if response is not None:
+            return response
+        raise ultimo_error
+    
+    def health_status(self) -> List[Dict]:
+        """
+        Estado de todos los backends configurados. Cada backend se comprueba como mucho una
+        vez cada LANGUAGETOOL_HEALTH_TTL segundos (la API pública tiene límite de peticiones);
+        entre comprobaciones se devuelve el último resultado. 'available' indica si el backend
+        está en la rotación ahora mismo.
+        """
+        estado = []
+        for backend in self.backends:
+            cache_key = f"languagetool:health:{backend.name}"
+            resultado = cache.get(cache_key)
+            if resultado is None:
+                resultado = backend.health_check()
+                cache.set(cache_key, resultado, self.health_ttl)
+            estado.append({**resultado, 'available': backend.is_available()})
+        return estado
     
     def corregir_texto(self, texto: str, idioma: str = "es") -> Dict:
         """
@@ -29,20 +172,11 @@ class LanguageToolService:
             Dict con los errores encontrados y sugerencias
         """
         try:
-            # Validar longitud del texto
+            # Los textos largos se trocean en lugar de rechazarse
             if len(texto) > self.max_text_length:
-                return {
-                    'error': f'El texto es demasiado largo. Máximo {self.max_text_length} caracteres.',
-                    'matches': []
-                }
+                return self.corregir_texto_incremental(texto, idioma)
             
-            # Mapear códigos de idioma a formato LanguageTool
-            language_map = {
-                'ca': 'ca-ES',  # Catalán
-                'es': 'es',     # Español
-                'en': 'en-US'   # Inglés
-            }
-            language_code = language_map.get(idioma, idioma)
+            language_code = self.LANGUAGE_MAP.get(idioma, idioma)
             
             # Preparar datos para la API (SOLO los necesarios)
             data = {
@@ -51,12 +185,8 @@ class LanguageToolService:
                 "enabledOnly": "false"
             }
             
-            # Realizar petición a LanguageTool
-            response = requests.post(
-                f"{self.BASE_URL}/check",
-                data=data,
-                timeout=self.timeout
-            )
+            # Realizar petición a LanguageTool (servidor local o API pública)
+            response = self._enviar_check(data)
             
             if response.status_code == 200:
                 result = response.json()
@@ -89,6 +219,158 @@ class LanguageToolService:
                 'matches': []
             }
     
+    def corregir_texto_incremental(self, texto: str, idioma: str = "es") -> Dict:
+        """
+        Corrige el texto párrafo a párrafo reutilizando resultados anteriores.
+        
+        Cada párrafo (y cada trozo de los párrafos más largos que chunk_length) se identifica
+        por el hash de su contenido: los que ya se corrigieron salen de caché y solo los
+        modificados se envían a LanguageTool, empaquetados en peticiones de hasta chunk_length
+        caracteres (la API pública limita las peticiones por IP). Los errores de cada petición
+        se reparten entre sus segmentos y se recolocan sobre el documento completo.
+        
+        Args:
+            texto: Texto completo a corregir
+            idioma: Código de idioma (por defecto 'es' para español)
+            
+        Returns:
+            Dict con el mismo formato que corregir_texto más estadísticas de reutilización
+        """
+        language_code = self.LANGUAGE_MAP.get(idioma, idioma)
+        segmentos = self._segmentar_texto(texto)
+        
+        # Resolver desde caché y agrupar los segmentos pendientes por hash (párrafos repetidos se corrigen una vez)
+        claves = {self._clave_segmento(fragmento, language_code): fragmento for _, fragmento in segmentos}
+        resultados = cache.get_many(list(claves.keys()))
+        pendientes = [clave for clave in claves if clave not in resultados]
+        
+        errores = []
+        fallidos = 0
+        paquetes = self._empaquetar([(clave, claves[clave]) for clave in pendientes])
+        if paquetes:
+            with ThreadPoolExecutor(max_workers=min(self.concurrency, len(paquetes))) as executor:
+                respuestas = executor.map(lambda paquete: self._corregir_paquete(paquete, language_code), paquetes)
+                nuevos = {}
+                for paquete, (por_segmento, error) in zip(paquetes, respuestas):
+                    if error:
+                        errores.append(error)
+                        fallidos += len(paquete)
+                        continue
+                    nuevos.update(por_segmento)
+                resultados.update(nuevos)
+                if nuevos:
+                    cache.set_many(nuevos, self.cache_ttl)
+        
+        # Recolocar offsets sobre el documento completo
+        matches = []
+        language = 'Español'
+        detected_language = 'Español'
+        for offset, fragmento in segmentos:
+            resultado = resultados.get(self._clave_segmento(fragmento, language_code))
+            if not resultado:
+                continue
+            language = resultado.get('language', language)
+            detected_language = resultado.get('detected_language', detected_language)
+            for match in resultado['matches']:
+                matches.append({**match, 'offset': match['offset'] + offset})
+        
+        respuesta = {
+            'matches': matches,
+            'total_errors': len(matches),
+            'language': language,
+            'detected_language': detected_language,
+            'incremental': {
+                'segmentos': len(segmentos),
+                'corregidos': len(pendientes) - fallidos,
+                'reutilizados': len(claves) - len(pendientes),
+                'fallidos': fallidos,
+                'peticiones': len(paquetes)
+            }
+        }
+        if errores:
+            respuesta['error'] = errores[0]
+        return respuesta
+    
+    def _clave_segmento(self, fragmento: str, language_code: str) -> str:
+        digest = hashlib.sha256(f"{language_code}\x00{fragmento}".encode('utf-8')).hexdigest()
+        return f"languagetool:segmento:{digest}"
+    
+    def _segmentar_texto(self, texto: str) -> List[Tuple[int, str]]:
+        """Divide el texto en (offset, fragmento): párrafos, y los muy largos en trozos por frases"""
+        segmentos = []
+        inicio = 0
+        for separador in self.PARAGRAPH_SEPARATOR.finditer(texto):
+            self._anadir_segmentos(segmentos, texto, inicio, separador.start())
+            inicio = separador.end()
+        self._anadir_segmentos(segmentos, texto, inicio, len(texto))
+        return segmentos
+    
+    def _anadir_segmentos(self, segmentos: List[Tuple[int, str]], texto: str, inicio: int, fin: int):
+        while fin - inicio > self.chunk_length:
+            ventana = texto[inicio:inicio + self.chunk_length]
+            cortes = [m.end() for m in self.SENTENCE_END.finditer(ventana)]
+            corte = cortes[-1] if cortes else ventana.rfind(' ') + 1
+            if corte <= 0:
+                corte = self.chunk_length
+            segmentos.append((inicio, texto[inicio:inicio + corte]))
+            inicio += corte
+        if texto[inicio:fin].strip():
+            segmentos.append((inicio, texto[inicio:fin]))
+    
+    def _empaquetar(self, segmentos: List[Tuple[str, str]]) -> List[List[Tuple[str, int, str]]]:
+        """
+        Agrupa los segmentos (clave, fragmento) en paquetes de hasta chunk_length caracteres
+        Cada paquete es una lista de (clave, offset dentro del texto del paquete, fragmento).
+        """
+        paquetes, actual, longitud = [], [], 0
+        for clave, fragmento in segmentos:
+            separador = len(self.PACK_SEPARATOR) if actual else 0
+            if actual and longitud + separador + len(fragmento) > self.chunk_length:
+                paquetes.append(actual)
+                actual, longitud, separador = [], 0, 0
+            actual.append((clave, longitud + separador, fragmento))
+            longitud += separador + len(fragmento)
+        if actual:
+            paquetes.append(actual)
+        return paquetes
+    
+    def _corregir_paquete(self, paquete: List[Tuple[str, int, str]], language_code: str) -> Tuple[Dict[str, Dict], Optional[str]]:
+        """
+        Corrige un paquete en una sola petición y reparte los errores entre sus segmentos,
+        con offsets relativos a cada segmento. Devuelve ({clave: resultado}, mensaje de error).
+        Los errores que cruzan el separador entre segmentos se descartan: no existen en el documento.
+        """
+        texto = self.PACK_SEPARATOR.join(fragmento for _, _, fragmento in paquete)
+        resultado, error = self._corregir_segmento(texto, language_code)
+        if error:
+            return {}, error
+        por_segmento = {clave: {**resultado, 'matches': []} for clave, _, _ in paquete}
+        for match in resultado['matches']:
+            for clave, inicio, fragmento in paquete:
+                if inicio <= match['offset'] and match['offset'] + match['length'] <= inicio + len(fragmento):
+                    por_segmento[clave]['matches'].append({**match, 'offset': match['offset'] - inicio})
+                    break
+        for segmento in por_segmento.values():
+            segmento['total_errors'] = len(segmento['matches'])
+        return por_segmento, None
+    
+    def _corregir_segmento(self, fragmento: str, language_code: str) -> Tuple[Optional[Dict], Optional[str]]:
+        """Envía un único segmento a LanguageTool. Devuelve (resultado, mensaje de error)"""
+        try:
+            response = self._enviar_check(
+                {"text": fragmento, "language": language_code, "enabledOnly": "false"}
+            )
+            if response.status_code != 200:
+                logger.error(f"Error en LanguageTool API: {response.status_code}")
+                return None, 'Error al conectar con el servicio de corrección'
+            return self._procesar_resultado(response.json()), None
+        except requests.exceptions.Timeout:
+            logger.error("Timeout en LanguageTool API")
+            return None, 'Timeout al conectar con el servicio de corrección'
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Error de conexión con LanguageTool: {e}")
+            return None, 'Error de conexión con el servicio de corrección'
+    
     def _procesar_resultado(self, resultado: Dict) -> Dict:
         """
         Procesa el resultado de LanguageTool para formato educativo
@@ -0,0 +1,178 @@
+"""
+Servicio OCR local (Tesseract) - solo CPU, sin credenciales ni cuota
+Misma interfaz que GoogleVisionOCRClient para poder usarse como alternativa
+"""
+import os
+import logging
+from typing import Dict, List
+from django.conf import settings
+
+try:
+    import pytesseract
+    from PIL import Image
+    TESSERACT_AVAILABLE = True
+except ImportError:
+    TESSERACT_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+class LocalOCRError(Exception):
+    """Excepción personalizada para errores del OCR local"""
+    pass
+
+
+class TesseractOCRClient:
+    """Cliente OCR local basado en Tesseract. Adecuado para texto impreso."""
+
+    # Códigos de idioma de la app -> paquetes de idioma de Tesseract
+    LANGUAGE_MAP = {
+        'es': 'spa',
+        'ca': 'cat',
+        'en': 'eng',
+        'fr': 'fra',
+        'de': 'deu',
+        'it': 'ita',
+        'pt': 'por',
+    }
+
+    def __init__(self):
+        self.client = None
+        self.max_file_size = getattr(settings, 'GOOGLE_VISION_MAX_FILE_SIZE', 20 * 1024 * 1024)
+        self.tesseract_cmd = getattr(settings, 'TESSERACT_CMD', None)
+
+        self._setup_client()
+
+    def _setup_client(self):
+        """Comprueba que pytesseract y el binario de Tesseract están disponibles"""
+        if not TESSERACT_AVAILABLE:
+            logger.info("pytesseract no está instalado: OCR local deshabilitado")
+            return
+
+        try:
+            if self.tesseract_cmd:
+                pytesseract.pytesseract.tesseract_cmd = self.tesseract_cmd
+            version = pytesseract.get_tesseract_version()
+            self.client = pytesseract
+            logger.info(f"OCR local Tesseract {version} configurado correctamente")
+        except Exception as e:
+            logger.warning(f"Tesseract no disponible: {str(e)}")
+            self.client = None
+
+    def _tesseract_language(self, language_hint: str) -> str:
+        """Convierte 'es' o 'es-t-i0-handwrit' en 'spa'"""
+        base = (language_hint or 'es').split('-')[0].lower()
+        return self.LANGUAGE_MAP.get(base, 'spa')
+
+    def _run(self, image_path: str, language_hint: str, result_type: str) -> Dict[str, any]:
+        if not self.client:
+            raise LocalOCRError("OCR local (Tesseract) no disponible")
+
+        if not os.path.exists(image_path):
+            raise LocalOCRError(f"Archivo de imagen no encontrado: {image_path}")
+
+        file_size = os.path.getsize(image_path)
+        if file_size > self.max_file_size:
+            raise LocalOCRError(f"Archivo demasiado grande: {file_size} bytes (máximo: {self.max_file_size})")
+
+        try:
+            with Image.open(image_path) as image:
+                data = pytesseract.image_to_data(
+                    image,
+                    lang=self._tesseract_language(language_hint),
+                    output_type=pytesseract.Output.DICT,
+                )
+        except Exception as e:
+            logger.error(f"Error en OCR local: {str(e)}")
+            raise LocalOCRError(f"Error en OCR local: {str(e)}") from e
+
+        words_info = self._extract_words_info(data)
+        full_text = self._rebuild_text(data)
+
+        confidence_scores = [word['confidence'] for word in words_info]
+        avg_confidence = sum(confidence_scores) / len(confidence_scores) if confidence_scores else 0
+
+        return {
+            'text': full_text.strip(),
+            'words': words_info,
+            'confidence': avg_confidence,
+            'word_count': len(words_info),
+            'language_hint': language_hint,
+            'processing_info': {
+                'file_size': file_size,
+                'success': True,
+                'error': None,
+                'type': result_type
+            }
+        }
+
+    def _extract_words_info(self, data: Dict) -> List[Dict]:
+        """Palabras con confianza normalizada a 0-1 y bounding box, igual que Vision"""
+        words_info = []
+        for i, text in enumerate(data.get('text', [])):
+            text = (text or '').strip()
+            confidence = float(data['conf'][i])
+            if not text or confidence < 0:
+                continue
+            confidence = confidence / 100.0
+            words_info.append({
+                'text': text,
+                'confidence': confidence,
+                'bounding_box': {
+                    'x1': data['left'][i],
+                    'y1': data['top'][i],
+                    'x2': data['left'][i] + data['width'][i],
+                    'y2': data['top'][i] + data['height'][i],
+                },
+                'is_low_confidence': confidence < 0.7
+            })
+        return words_info
+
+    def _rebuild_text(self, data: Dict) -> str:
+        """Reconstruye el texto respetando líneas y párrafos detectados"""
+        lines = []
+        current_key = None
+        current_words = []
+        for i, text in enumerate(data.get('text', [])):
+            text = (text or '').strip()
+            if not text:
+                continue
+            key = (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+            if key != current_key and current_words:
+                lines.append(' '.join(current_words))
+                current_words = []
+            current_key = key
+            current_words.append(text)
+        if current_words:
+            lines.append(' '.join(current_words))
+        return '\n'.join(lines)
+
+    def detect_handwritten_text(self, image_path: str, language_hint: str = "es-t-i0-handwrit") -> Dict[str, any]:
+        """
+        Tesseract no está entrenado para manuscrito: se usa solo como último recurso
+        cuando Google Vision no está disponible.
+        """
+        return self._run(image_path, language_hint, 'handwritten_fallback')
+
+    def detect_printed_text(self, image_path: str, language_hint: str = "es") -> Dict[str, any]:
+        """Detecta texto impreso"""
+        return self._run(image_path, language_hint, 'printed')
+
+    def get_supported_languages(self) -> Dict[str, str]:
+        """Idiomas instalados en Tesseract que la app sabe mapear"""
+        if not self.client:
+            return {}
+        try:
+            installed = set(pytesseract.get_languages(config=''))
+        except Exception:
+            installed = set(self.LANGUAGE_MAP.values())
+        names = {'es': 'Español', 'ca': 'Catalán', 'en': 'Inglés', 'fr': 'Francés',
+                 'de': 'Alemán', 'it': 'Italiano', 'pt': 'Portugués'}
+        return {
+            code: f"{names[code]} impreso"
+            for code, tess in self.LANGUAGE_MAP.items() if tess in installed
+        }
+
+
+# Instancia global del servicio
+local_ocr_client = TesseractOCRClient()
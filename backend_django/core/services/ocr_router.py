@@ -0,0 +1,248 @@
+"""
+Router OCR: elige entre Google Cloud Vision y el OCR local (Tesseract)
+
+- Texto impreso -> Tesseract (gratis, sin red); Vision solo si Tesseract no está instalado
+- Manuscrito    -> Vision; Tesseract como respaldo ante cuota agotada, errores de red o falta de credenciales
+                   (en los lotes, por cada llamada batch que falle)
+- Auto          -> Tesseract primero; si la confianza es baja se asume manuscrito y se envía a Vision
+
+Cada resultado indica en processing_info qué motor lo sirvió y, si hubo respaldo, por qué.
+"""
+import os
+import logging
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Optional, Tuple
+from django.conf import settings
+from django.core.cache import cache
+from google.api_core import exceptions as gcp_exceptions
+
+from .google_vision_ocr_service import google_vision_ocr_client, GoogleVisionOCRError
+from .local_ocr_service import local_ocr_client, LocalOCRError
+
+logger = logging.getLogger(__name__)
+
+ENGINE_VISION = 'google_vision'
+ENGINE_LOCAL = 'tesseract'
+
+TEXT_TYPES = ('manuscrito', 'impreso', 'auto')
+
+# Errores tras los que tiene sentido reintentar con otro motor
+QUOTA_ERRORS = (gcp_exceptions.ResourceExhausted, gcp_exceptions.TooManyRequests)
+NETWORK_ERRORS = (
+    gcp_exceptions.ServiceUnavailable,
+    gcp_exceptions.DeadlineExceeded,
+    gcp_exceptions.RetryError,
+    ConnectionError,
+    TimeoutError,
+)
+
+VISION_COOLDOWN_KEY = 'ocr_router:vision_cooldown'
+STATS_KEY_PREFIX = 'ocr_router:served'
+
+
+class OCRRouter:
+    """Enruta cada petición OCR al motor adecuado y aplica respaldo automático"""
+
+    def __init__(self, vision_client=google_vision_ocr_client, local_client=local_ocr_client):
+        self.vision = vision_client
+        self.local = local_client
+        # Tras agotar la cuota (o un error de red) se deja de llamar a Vision durante este tiempo
+        self.vision_cooldown = getattr(settings, 'OCR_VISION_COOLDOWN_SECONDS', 300)
+        self.network_cooldown = getattr(settings, 'OCR_VISION_NETWORK_COOLDOWN_SECONDS', 60)
+        # Confianza mínima de Tesseract para dar por bueno un texto impreso en modo auto
+        self.printed_confidence = getattr(settings, 'OCR_AUTO_PRINTED_CONFIDENCE', 0.85)
+        self.batch_concurrency = getattr(settings, 'GOOGLE_VISION_BATCH_CONCURRENCY', 4)
+
+    def is_available(self) -> bool:
+        return bool(self.vision.client or self.local.client)
+
+    def _vision_usable(self) -> bool:
+        return bool(self.vision.client) and not cache.get(VISION_COOLDOWN_KEY)
+
+    def _unusable_reason(self) -> str:
+        """Motivo del respaldo cuando Vision no está utilizable: sin cliente o en pausa tras un fallo"""
+        if not self.vision.client:
+            return 'vision_unavailable'
+        return f"{cache.get(VISION_COOLDOWN_KEY) or 'quota'}_cooldown"
+
+    def _classify_failure(self, error: Exception) -> Optional[str]:
+        """Devuelve 'quota', 'network' o None (error no recuperable cambiando de motor)"""
+        current = error
+        while current is not None:
+            if isinstance(current, QUOTA_ERRORS):
+                return 'quota'
+            if isinstance(current, NETWORK_ERRORS):
+                return 'network'
+            current = current.__cause__
+        message = str(error).lower()
+        if 'resource_exhausted' in message or 'quota' in message:
+            return 'quota'
+        return None
+
+    def _record(self, result: Dict, engine: str, fallback_reason: Optional[str] = None) -> Dict:
+        result.setdefault('processing_info', {})
+        result['processing_info']['engine'] = engine
+        result['processing_info']['fallback_reason'] = fallback_reason
+        key = f"{STATS_KEY_PREFIX}:{engine}"
+        cache.add(key, 0, None)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+        if fallback_reason:
+            logger.warning(f"OCR servido por {engine} (respaldo: {fallback_reason})")
+        else:
+            logger.info(f"OCR servido por {engine}")
+        return result
+
+    def _vision_failed(self, error: GoogleVisionOCRError) -> str:
+        """Registra el fallo de Vision; relanza si no es recuperable"""
+        reason = self._classify_failure(error)
+        if reason is None:
+            raise error
+        cooldown = self.vision_cooldown if reason == 'quota' else self.network_cooldown
+        cache.set(VISION_COOLDOWN_KEY, reason, cooldown)
+        logger.warning(f"Google Vision falló ({reason}): {str(error)}")
+        return reason
+
+    def get_stats(self) -> Dict[str, int]:
+        """Número de peticiones servidas por cada motor"""
+        return {
+            engine: cache.get(f"{STATS_KEY_PREFIX}:{engine}", 0)
+            for engine in (ENGINE_VISION, ENGINE_LOCAL)
+        }
+
+    def get_status(self) -> Dict:
+        """Motores configurados, pausa de Vision (si la hay) y peticiones servidas por cada motor"""
+        return {
+            'disponible': self.is_available(),
+            'motores': {ENGINE_VISION: bool(self.vision.client), ENGINE_LOCAL: bool(self.local.client)},
+            'vision_en_pausa': cache.get(VISION_COOLDOWN_KEY),
+            'servidas': self.get_stats(),
+        }
+
+    def detect_text(self, image_path: str, language_hint: str = "es", text_type: str = 'manuscrito') -> Dict[str, any]:
+        """
+        Extrae texto de una imagen con el motor adecuado según text_type.
+
+        Raises:
+            GoogleVisionOCRError / LocalOCRError si ningún motor puede servir la petición
+        """
+        if text_type not in TEXT_TYPES:
+            text_type = 'manuscrito'
+
+        if text_type == 'impreso':
+            return self._detect_printed(image_path, language_hint)
+        if text_type == 'auto':
+            return self._detect_auto(image_path, language_hint)
+        return self._detect_handwritten(image_path, language_hint)
+
+    def _detect_printed(self, image_path: str, language_hint: str) -> Dict[str, any]:
+        if self.local.client:
+            return self._record(self.local.detect_printed_text(image_path, language_hint), ENGINE_LOCAL)
+        return self._record(self.vision.detect_printed_text(image_path, language_hint), ENGINE_VISION, 'local_unavailable')
+
+    def _detect_handwritten(self, image_path: str, language_hint: str, local_result: Optional[Dict] = None) -> Dict[str, any]:
+        reason = self._unusable_reason()
+        if self._vision_usable():
+            try:
+                return self._record(self.vision.detect_handwritten_text(image_path, language_hint), ENGINE_VISION)
+            except GoogleVisionOCRError as e:
+                if not self.local.client and local_result is None:
+                    raise
+                reason = self._vision_failed(e)
+
+        if local_result is not None:
+            return self._record(local_result, ENGINE_LOCAL, reason)
+        if not self.local.client:
+            raise GoogleVisionOCRError("Cliente Google Cloud Vision no configurado y OCR local no disponible")
+        return self._record(self.local.detect_handwritten_text(image_path, language_hint), ENGINE_LOCAL, reason)
+
+    def _detect_auto(self, image_path: str, language_hint: str) -> Dict[str, any]:
+        local_result = None
+        if self.local.client:
+            try:
+                local_result = self.local.detect_printed_text(image_path, language_hint)
+            except LocalOCRError as e:
+                logger.warning(f"OCR local falló en modo auto: {str(e)}")
+            else:
+                if local_result['word_count'] and local_result['confidence'] >= self.printed_confidence:
+                    return self._record(local_result, ENGINE_LOCAL)
+        return self._detect_handwritten(image_path, language_hint, local_result=local_result)
+
+    def _local_batch_item(self, index: int, content: bytes, language_hint: str) -> Tuple[int, Dict]:
+        temp_file_path = None
+        try:
+            with tempfile.NamedTemporaryFile(delete=False, suffix='.png') as temp_file:
+                temp_file.write(content)
+                temp_file_path = temp_file.name
+            result = self.local.detect_handwritten_text(temp_file_path, language_hint)
+        except LocalOCRError as e:
+            result = self.vision._page_error(str(e), language_hint, len(content))
+        finally:
+            if temp_file_path and os.path.exists(temp_file_path):
+                os.unlink(temp_file_path)
+        return index, result
+
+    def _vision_batch_chunk(self, chunk: List[Tuple[int, bytes]], language_hint: str) -> List[Tuple[int, Dict]]:
+        """
+        Un lote del OCR por lotes: Vision y, si la llamada falla por cuota o red, pausa Vision
+        y pasa las imágenes del lote a Tesseract. Los lotes que empiezan durante la pausa van
+        directamente a Tesseract.
+        """
+        if self._vision_usable():
+            try:
+                return [
+                    (index, self._record(result, ENGINE_VISION))
+                    for index, result in self.vision._annotate_image_chunk(chunk, language_hint, raise_errors=True)
+                ]
+            except GoogleVisionOCRError as e:
+                if not self.local.client or self._classify_failure(e) is None:
+                    return [
+                        (index, self._record(self.vision._page_error(str(e), language_hint, len(content)), ENGINE_VISION))
+                        for index, content in chunk
+                    ]
+                reason = self._vision_failed(e)
+        else:
+            if not self.local.client:
+                error = "Google Vision en pausa y OCR local no disponible"
+                return [
+                    (index, self._record(self.vision._page_error(error, language_hint, len(content)), ENGINE_VISION))
+                    for index, content in chunk
+                ]
+            reason = self._unusable_reason()
+
+        return [
+            (index, self._record(result, ENGINE_LOCAL, reason))
+            for index, result in (self._local_batch_item(i, content, language_hint) for i, content in chunk)
+        ]
+
+    def iter_batch_handwritten_text(self, images: List[bytes], language_hint: str = "es-t-i0-handwrit") -> Iterator[Tuple[int, Dict]]:
+        """
+        Lote de imágenes: Vision si está utilizable, con respaldo a Tesseract por lote ante
+        cuota o red; si no, Tesseract con la misma concurrencia
+        """
+        if self._vision_usable():
+            for index, result in self.vision.iter_batch_handwritten_text(
+                images, language_hint, annotate_chunk=self._vision_batch_chunk
+            ):
+                if 'engine' not in result['processing_info']:
+                    # Imágenes rechazadas por tamaño antes de llamar a la API
+                    self._record(result, ENGINE_VISION)
+                yield index, result
+            return
+
+        if not self.local.client:
+            raise GoogleVisionOCRError("Cliente Google Cloud Vision no configurado y OCR local no disponible")
+
+        reason = self._unusable_reason()
+        with ThreadPoolExecutor(max_workers=self.batch_concurrency) as executor:
+            futures = [executor.submit(self._local_batch_item, i, content, language_hint) for i, content in enumerate(images)]
+            for future in as_completed(futures):
+                index, result = future.result()
+                yield index, self._record(result, ENGINE_LOCAL, reason)
+
+
+# Instancia global del router
+ocr_router = OCRRouter()
@@ -0,0 +1,205 @@
+"""
+Índice local de papers científicos (búsqueda a texto completo)
+
+- PostgreSQL: columna generada tsvector + índice GIN, ranking con ts_rank_cd
+  (PostgreSQL no trae BM25; ts_rank_cd normalizado por longitud es lo más parecido)
+- SQLite: tabla virtual FTS5 sincronizada por triggers, ranking BM25 nativo (bm25())
+
+El agente de investigación consulta primero este índice y solo va a Semantic Scholar /
+OpenAlex cuando no hay suficientes resultados locales que cubran la pregunta.
+"""
+import re
+import hashlib
+import logging
+import unicodedata
+from typing import Dict, List
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+
+from core.fulltext_index import FTS_TABLE, PG_INDEX, TABLE, create_statements
+from core.models import ResearchPaper
+from .research_search import research_search_service
+
+logger = logging.getLogger(__name__)
+
+# Palabras vacías (es/ca/en) que no aportan a la búsqueda
+STOPWORDS = {
+    'de', 'la', 'el', 'los', 'las', 'del', 'al', 'un', 'una', 'unos', 'unas', 'que', 'en', 'con', 'por',
+    'para', 'como', 'mas', 'pero', 'sus', 'son', 'sobre', 'entre', 'hay', 'qué', 'cómo', 'cuál',
+    'cual', 'donde', 'cuando', 'puedo', 'puede', 'hacer', 'dice', 'esta', 'este', 'estos', 'estas', 'muy',
+    'les', 'els', 'amb', 'per', 'com', 'què', 'dels', 'the', 'and', 'for', 'with', 'what', 'how',
+    'does', 'are', 'from', 'that', 'this', 'into', 'about', 'evidencia', 'evidence',
+}
+
+def _strip_accents(text: str) -> str:
+    text = unicodedata.normalize('NFKD', text)
+    return ''.join(c for c in text if not unicodedata.combining(c))
+
+
+class PaperIndexService:
+    """Corpus local de papers con índice a texto completo"""
+
+    def __init__(self):
+        # Resultados locales necesarios para no consultar las APIs externas
+        self.min_hits = getattr(settings, 'RESEARCH_LOCAL_MIN_HITS', 3)
+        # Fracción de términos de la pregunta que debe contener un paper para contar como acierto
+        self.min_coverage = getattr(settings, 'RESEARCH_LOCAL_MIN_COVERAGE', 0.5)
+
+    def is_supported(self) -> bool:
+        return connection.vendor in ('postgresql', 'sqlite')
+
+    def _title_key(self, title: str) -> str:
+        normalized = research_search_service._title_key(_strip_accents(title or ''))
+        return hashlib.sha1(normalized.encode('utf-8')).hexdigest() if normalized else ''
+
+    def _query_terms(self, query: str) -> List[str]:
+        """Términos significativos de la pregunta, en minúsculas y sin duplicados (máx. 12)"""
+        terms = []
+        for word in re.findall(r'\w+', query.lower()):
+            if len(word) < 3 or word in STOPWORDS or _strip_accents(word) in STOPWORDS:
+                continue
+            if word not in terms:
+                terms.append(word)
+        return terms[:12]
+
+    def add_papers(self, papers: List[Dict]) -> int:
+        """
+        Añade (o actualiza) papers normalizados al corpus. Devuelve cuántos son nuevos.
+        Se conserva el mayor número de citaciones y el resumen más completo.
+        """
+        by_key = {}
+        for paper in papers or []:
+            key = self._title_key(paper.get('title'))
+            if key:
+                by_key[key] = paper
+        if not by_key:
+            return 0
+
+        # Filas bloqueadas e insertadas siempre en orden de title_key: dos búsquedas concurrentes
+        # con papers en común esperan una a la otra en lugar de bloquearse mutuamente
+        keys = sorted(by_key)
+        with transaction.atomic():
+            existing = {
+                stored.title_key: stored
+                for stored in ResearchPaper.objects.select_for_update().filter(title_key__in=keys).order_by('title_key')
+            }
+            to_update = []
+            for key, stored in existing.items():
+                paper = by_key[key]
+                stored.citations = max(stored.citations, paper.get('citations') or 0)
+                abstract = paper.get('abstract') or ''
+                if abstract != 'Sin resumen disponible' and len(abstract) > len(stored.abstract):
+                    stored.abstract = abstract
+                stored.year = stored.year or paper.get('year')
+                stored.url = stored.url or (paper.get('url') or '')[:1000]
+                to_update.append(stored)
+            if to_update:
+                ResearchPaper.objects.bulk_update(to_update, ['citations', 'abstract', 'year', 'url'])
+                ResearchPaper.objects.filter(title_key__in=existing.keys()).update(times_retrieved=F('times_retrieved') + 1)
+
+            new_papers = [
+                ResearchPaper(
+                    title=(paper.get('title') or '')[:1000],
+                    title_key=key,
+                    abstract='' if paper.get('abstract') == 'Sin resumen disponible' else (paper.get('abstract') or ''),
+                    authors=paper.get('authors') or [],
+                    year=paper.get('year'),
+                    url=(paper.get('url') or '')[:1000],
+                    citations=paper.get('citations') or 0,
+                    source=(paper.get('source') or '')[:50],
+                )
+                for key, paper in sorted(by_key.items()) if key not in existing
+            ]
+            ResearchPaper.objects.bulk_create(new_papers, ignore_conflicts=True)
+        return len(new_papers)
+
+    def _candidates(self, terms: List[str], limit: int) -> List[int]:
+        """IDs de papers que coinciden con algún término, ordenados por relevancia"""
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                # 'simple' no quita acentos: se buscan ambas variantes
+                variants = sorted({t for term in terms for t in (term, _strip_accents(term))})
+                tsquery = ' | '.join(variants)
+                cursor.execute(
+                    f"""SELECT id FROM {TABLE}
+                        WHERE search_vector @@ to_tsquery('simple', %s)
+                        ORDER BY ts_rank_cd(search_vector, to_tsquery('simple', %s), 1 | 32) DESC
+                        LIMIT %s""",
+                    [tsquery, tsquery, limit]
+                )
+            else:
+                match = ' OR '.join(f'"{term}"' for term in terms)
+                # bm25(): menor es mejor; pesos título 2.0, resumen 1.0
+                cursor.execute(
+                    f"""SELECT rowid FROM {FTS_TABLE}
+                        WHERE {FTS_TABLE} MATCH %s
+                        ORDER BY bm25({FTS_TABLE}, 2.0, 1.0)
+                        LIMIT %s""",
+                    [match, limit]
+                )
+            return [row[0] for row in cursor.fetchall()]
+
+    def search(self, query: str, limit: int = 5) -> List[Dict]:
+        """
+        Busca en el corpus local. Solo devuelve papers que cubren al menos
+        `min_coverage` de los términos de la pregunta.
+        """
+        if not self.is_supported():
+            return []
+        terms = self._query_terms(query)
+        if not terms:
+            return []
+
+        try:
+            ids = self._candidates(terms, limit * 4)
+        except Exception as e:
+            logger.error(f"Error consultando el índice local de papers: {e}")
+            return []
+
+        papers = ResearchPaper.objects.in_bulk(ids)
+        normalized_terms = {_strip_accents(term) for term in terms}
+        results = []
+        for paper_id in ids:
+            paper = papers.get(paper_id)
+            if not paper:
+                continue
+            words = set(re.findall(r'\w+', _strip_accents(f"{paper.title} {paper.abstract}".lower())))
+            coverage = len(normalized_terms & words) / len(normalized_terms)
+            if coverage >= self.min_coverage:
+                results.append(paper.as_dict())
+            if len(results) >= limit:
+                break
+        return results
+
+    def has_good_recall(self, papers: List[Dict]) -> bool:
+        return len(papers) >= self.min_hits
+
+    def ensure_index(self):
+        """Crea el índice a texto completo si no existe (idempotente, mismo DDL que la migración 0010)"""
+        with connection.cursor() as cursor:
+            for sql in create_statements(connection.vendor):
+                cursor.execute(sql)
+
+    def rebuild(self):
+        """Reconstruye el índice desde la tabla de papers"""
+        self.ensure_index()
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                # La columna tsvector es generada: basta con reindexar
+                cursor.execute(f"REINDEX INDEX {PG_INDEX}")
+            elif connection.vendor == 'sqlite':
+                cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+    def compact(self):
+        """Compacta el índice y la tabla (fuera de transacción)"""
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute(f"VACUUM ANALYZE {TABLE}")
+            elif connection.vendor == 'sqlite':
+                cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+                cursor.execute("VACUUM")
+
+
+# Instancia global del servicio
+paper_index_service = PaperIndexService()
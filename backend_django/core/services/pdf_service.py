@@ -12,7 +12,7 @@ from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, Tabl
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from django.conf import settings
-from django.db import models
+from django.utils import timezone
 from core.models import Student, Evaluation, Objective, SelfEvaluation
 
 logger = logging.getLogger(__name__)
@@ -64,258 +64,364 @@ class PDFReportService:
             spaceAfter=12
         )
 
-    def generate_student_report(self, student_id, include_objectives=True, include_self_evaluations=True):
-        """
-        Generar informe PDF completo de un estudiante.
-
-        Args:
-            student_id: ID del estudiante
-            include_objectives: Incluir objetivos en el reporte
-            include_self_evaluations: Incluir autoevaluaciones en el reporte
+    # Versión de las plantillas: cambiarla al modificar el diseño de los PDFs
+    # (forma parte de la clave del almacén de PDFs generados)
+    TEMPLATE_VERSION = 2
 
-        Returns:
-            bytes: Contenido del PDF en bytes
+    def collect_student_report_data(self, student_id, include_objectives=True, include_self_evaluations=True):
+        """
+        Datos del informe completo de un estudiante, solo con tipos primitivos: se usan para
+        renderizar el PDF y para calcular su clave en el almacén de PDFs generados.
+        La fecha del informe (día, sin hora) forma parte de los datos: un PDF cacheado nunca
+        muestra una fecha distinta de la del día en que se sirve.
         """
         try:
-            # Obtener datos del estudiante
-            student = Student.objects.select_related().get(id=student_id)
-
-            # Crear buffer para el PDF
-            buffer = io.BytesIO()
-            doc = SimpleDocTemplate(buffer, pagesize=A4)
-            story = []
-
-            # Título del reporte
-            story.append(Paragraph(f"Informe de Evaluación - {student.name}", self.title_style))
-            story.append(Spacer(1, 12))
-
-            # Información del estudiante
-            story.append(Paragraph("Información del Estudiante", self.subtitle_style))
-            student_info = [
-                ["Nombre:", student.name],
-                ["Email:", student.email or "No especificado"],
-                ["Curso:", student.course or "No especificado"],
-                ["Asistencia:", ".1f"],
-                ["Fecha del Reporte:", datetime.now().strftime("%d/%m/%Y %H:%M")],
+            student = Student.objects.select_related('grupo_principal').get(id=student_id)
+        except Student.DoesNotExist:
+            raise PDFServiceError("Estudiante no encontrado")
+
+        data = {
+            'report_date': timezone.localdate().isoformat(),
+            'student': {
+                'name': student.name,
+                'email': student.email or "No especificado",
+                'course': student.course or "No especificado",
+                'attendance': student.attendance_percentage,
+            },
+            'evaluations': [
+                {
+                    'date': e['date'].isoformat(),
+                    'subject': e['subject__name'] or "General",
+                    'evaluator': e['evaluator__username'] or "N/A",
+                    'comment': e['comment'],
+                    'score': e['score'],
+                }
+                for e in Evaluation.objects.filter(student=student).order_by('-date')
+                .values('date', 'subject__name', 'evaluator__username', 'comment', 'score')[:10]
+            ],
+            'objectives': None,
+            'self_evaluations': None,
+        }
+
+        if include_objectives:
+            data['objectives'] = [
+                {
+                    'title': o.title,
+                    'description': o.description,
+                    'status': o.get_status_display(),
+                    'deadline': o.deadline.isoformat() if o.deadline else None,
+                }
+                for o in Objective.objects.filter(student=student).order_by('-created_at')
             ]
 
-            student_table = Table(student_info, colWidths=[2*inch, 4*inch])
-            student_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
-                ('TEXTCOLOR', (0, 0), (0, -1), colors.black),
+        if include_self_evaluations:
+            data['self_evaluations'] = [
+                {
+                    'date': se.created_at.date().isoformat(),
+                    'subject': se.subject.name if se.subject else "General",
+                    'type': se.get_evaluation_type_display(),
+                    'score': se.score,
+                    'comment': se.comment,
+                }
+                for se in SelfEvaluation.objects.filter(student=student).select_related('subject').order_by('-created_at')[:5]
+            ]
+
+        return data
+
+    def render_student_report(self, data):
+        """Renderiza el informe completo a partir de collect_student_report_data()"""
+        buffer = io.BytesIO()
+        doc = SimpleDocTemplate(buffer, pagesize=A4)
+        story = []
+
+        # Título del reporte
+        student = data['student']
+        story.append(Paragraph(f"Informe de Evaluación - {student['name']}", self.title_style))
+        story.append(Spacer(1, 12))
+
+        # Información del estudiante
+        story.append(Paragraph("Información del Estudiante", self.subtitle_style))
+        student_info = [
+            ["Nombre:", student['name']],
+            ["Email:", student['email']],
+            ["Curso:", student['course']],
+            ["Asistencia:", f"{student['attendance']:.1f}%"],
+            ["Fecha del Reporte:", datetime.strptime(data['report_date'], '%Y-%m-%d').strftime("%d/%m/%Y")],
+        ]
+
+        student_table = Table(student_info, colWidths=[2*inch, 4*inch])
+        student_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
+            ('TEXTCOLOR', (0, 0), (0, -1), colors.black),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ('BACKGROUND', (0, 0), (-1, 0), colors.lightblue),
+        ]))
+        story.append(student_table)
+        story.append(Spacer(1, 20))
+
+        # Evaluaciones recientes
+        story.append(Paragraph("Evaluaciones Recientes", self.section_style))
+
+        if data['evaluations']:
+            eval_data = [["Fecha", "Asignatura", "Evaluador", "Comentario", "Puntuación"]]
+            for eval in data['evaluations']:
+                eval_data.append([
+                    datetime.strptime(eval['date'], '%Y-%m-%d').strftime("%d/%m/%Y"),
+                    eval['subject'],
+                    eval['evaluator'],
+                    eval['comment'][:50] + "..." if len(eval['comment']) > 50 else eval['comment'],
+                    str(eval['score']) if eval['score'] is not None else "N/A"
+                ])
+
+            eval_table = Table(eval_data, colWidths=[1*inch, 1.5*inch, 1.5*inch, 2.5*inch, 0.8*inch])
+            eval_table.setStyle(TableStyle([
+                ('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
+                ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
                 ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 0), (-1, -1), 10),
+                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                ('FONTSIZE', (0, 0), (-1, 0), 10),
                 ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                ('BACKGROUND', (0, 0), (-1, 0), colors.lightblue),
+                ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+                ('VALIGN', (0, 0), (-1, -1), 'TOP'),
             ]))
-            story.append(student_table)
+            story.append(eval_table)
+        else:
+            story.append(Paragraph("No hay evaluaciones registradas.", self.normal_style))
+
+        story.append(Spacer(1, 20))
+
+        # Objetivos (si se solicita)
+        if data['objectives'] is not None:
+            story.append(Paragraph("Objetivos", self.section_style))
+
+            if data['objectives']:
+                for objective in data['objectives']:
+                    story.append(Paragraph(f"• {objective['title']}", self.normal_style))
+                    story.append(Paragraph(f"  Descripción: {objective['description']}", self.normal_style))
+                    story.append(Paragraph(f"  Estado: {objective['status']}", self.normal_style))
+                    if objective['deadline']:
+                        deadline = datetime.strptime(objective['deadline'], '%Y-%m-%d')
+                        story.append(Paragraph(f"  Fecha límite: {deadline.strftime('%d/%m/%Y')}", self.normal_style))
+                    story.append(Spacer(1, 6))
+            else:
+                story.append(Paragraph("No hay objetivos registrados.", self.normal_style))
+
             story.append(Spacer(1, 20))
 
-            # Evaluaciones recientes
-            story.append(Paragraph("Evaluaciones Recientes", self.section_style))
-
-            evaluations = Evaluation.objects.filter(
-                student=student
-            ).select_related('subject', 'evaluator').order_by('-date')[:10]
-
-            if evaluations:
-                eval_data = [["Fecha", "Asignatura", "Evaluador", "Comentario", "Puntuación"]]
-                for eval in evaluations:
-                    eval_data.append([
-                        eval.date.strftime("%d/%m/%Y"),
-                        eval.subject.name if eval.subject else "General",
-                        eval.evaluator.username,
-                        eval.comment[:50] + "..." if len(eval.comment) > 50 else eval.comment,
-                        str(eval.score) if eval.score else "N/A"
+        # Autoevaluaciones (si se solicita)
+        if data['self_evaluations'] is not None:
+            story.append(Paragraph("Autoevaluaciones", self.section_style))
+
+            if data['self_evaluations']:
+                self_eval_data = [["Fecha", "Asignatura", "Tipo", "Puntuación", "Comentario"]]
+                for self_eval in data['self_evaluations']:
+                    self_eval_data.append([
+                        datetime.strptime(self_eval['date'], '%Y-%m-%d').strftime("%d/%m/%Y"),
+                        self_eval['subject'],
+                        self_eval['type'],
+                        f"{self_eval['score']}/5",
+                        self_eval['comment'][:30] + "..." if len(self_eval['comment']) > 30 else self_eval['comment']
                     ])
 
-                eval_table = Table(eval_data, colWidths=[1*inch, 1.5*inch, 1.5*inch, 2.5*inch, 0.8*inch])
-                eval_table.setStyle(TableStyle([
-                    ('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
+                self_eval_table = Table(self_eval_data, colWidths=[1*inch, 1.5*inch, 1.2*inch, 1*inch, 2.5*inch])
+                self_eval_table.setStyle(TableStyle([
+                    ('BACKGROUND', (0, 0), (-1, 0), colors.darkgreen),
                     ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
                     ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
                     ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                    ('FONTSIZE', (0, 0), (-1, 0), 10),
+                    ('FONTSIZE', (0, 0), (-1, 0), 9),
                     ('GRID', (0, 0), (-1, -1), 1, colors.black),
                     ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-                    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
                 ]))
-                story.append(eval_table)
+                story.append(self_eval_table)
             else:
-                story.append(Paragraph("No hay evaluaciones registradas.", self.normal_style))
-
-            story.append(Spacer(1, 20))
+                story.append(Paragraph("No hay autoevaluaciones registradas.", self.normal_style))
 
-            # Objetivos (si se solicita)
-            if include_objectives:
-                story.append(Paragraph("Objetivos", self.section_style))
-
-                objectives = Objective.objects.filter(
-                    student=student
-                ).select_related('subject', 'created_by').order_by('-created_at')
-
-                if objectives:
-                    for objective in objectives:
-                        story.append(Paragraph(f"• {objective.title}", self.normal_style))
-                        story.append(Paragraph(f"  Descripción: {objective.description}", self.normal_style))
-                        story.append(Paragraph(f"  Estado: {objective.get_status_display()}", self.normal_style))
-                        if objective.deadline:
-                            story.append(Paragraph(f"  Fecha límite: {objective.deadline.strftime('%d/%m/%Y')}", self.normal_style))
-                        story.append(Spacer(1, 6))
-                else:
-                    story.append(Paragraph("No hay objetivos registrados.", self.normal_style))
-
-                story.append(Spacer(1, 20))
-
-            # Autoevaluaciones (si se solicita)
-            if include_self_evaluations:
-                story.append(Paragraph("Autoevaluaciones", self.section_style))
-
-                self_evaluations = SelfEvaluation.objects.filter(
-                    student=student
-                ).select_related('subject').order_by('-created_at')[:5]
-
-                if self_evaluations:
-                    self_eval_data = [["Fecha", "Asignatura", "Tipo", "Puntuación", "Comentario"]]
-                    for self_eval in self_evaluations:
-                        self_eval_data.append([
-                            self_eval.created_at.strftime("%d/%m/%Y"),
-                            self_eval.subject.name if self_eval.subject else "General",
-                            self_eval.get_evaluation_type_display(),
-                            f"{self_eval.score}/5",
-                            self_eval.comment[:30] + "..." if len(self_eval.comment) > 30 else self_eval.comment
-                        ])
-
-                    self_eval_table = Table(self_eval_data, colWidths=[1*inch, 1.5*inch, 1.2*inch, 1*inch, 2.5*inch])
-                    self_eval_table.setStyle(TableStyle([
-                        ('BACKGROUND', (0, 0), (-1, 0), colors.darkgreen),
-                        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-                        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                        ('FONTSIZE', (0, 0), (-1, 0), 9),
-                        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                        ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-                    ]))
-                    story.append(self_eval_table)
-                else:
-                    story.append(Paragraph("No hay autoevaluaciones registradas.", self.normal_style))
-
-            # Pie de página
-            story.append(Spacer(1, 30))
-            story.append(Paragraph(
-                f"Reporte generado el {datetime.now().strftime('%d/%m/%Y %H:%M')} por EduApp",
-                ParagraphStyle('Footer', parent=self.styles['Normal'], fontSize=8, alignment=1)
-            ))
-
-            # Generar PDF
-            doc.build(story)
-            buffer.seek(0)
-            pdf_content = buffer.getvalue()
-            buffer.close()
-
-            logger.info(f'Informe PDF generado para estudiante {student.name}')
-            return pdf_content
+        # Pie de página
+        story.append(Spacer(1, 30))
+        story.append(Paragraph(
+            f"Reporte generado el {datetime.strptime(data['report_date'], '%Y-%m-%d').strftime('%d/%m/%Y')} por EduApp",
+            ParagraphStyle('Footer', parent=self.styles['Normal'], fontSize=8, alignment=1)
+        ))
 
-        except Student.DoesNotExist:
-            raise PDFServiceError("Estudiante no encontrado")
-        except Exception as e:
-            logger.error(f'Error generando PDF para estudiante {student_id}: {str(e)}')
-            raise PDFServiceError(f"Error generando PDF: {str(e)}")
+        # Generar PDF
+        doc.build(story)
+        pdf_content = buffer.getvalue()
+        buffer.close()
+        return pdf_content
 
-    def generate_evaluation_summary_pdf(self, student_id, subject_id=None, start_date=None, end_date=None):
+    def generate_student_report(self, student_id, include_objectives=True, include_self_evaluations=True):
         """
-        Generar PDF con resumen de evaluaciones en un período.
+        Generar informe PDF completo de un estudiante.
 
         Args:
             student_id: ID del estudiante
-            subject_id: ID de la asignatura (opcional)
-            start_date: Fecha de inicio (opcional)
-            end_date: Fecha de fin (opcional)
+            include_objectives: Incluir objetivos en el reporte
+            include_self_evaluations: Incluir autoevaluaciones en el reporte
 
         Returns:
             bytes: Contenido del PDF en bytes
         """
         try:
-            student = Student.objects.get(id=student_id)
+            data = self.collect_student_report_data(student_id, include_objectives, include_self_evaluations)
+            pdf_content = self.render_student_report(data)
+            logger.info(f"Informe PDF generado para estudiante {data['student']['name']}")
+            return pdf_content
+
+        except PDFServiceError:
+            raise
+        except Exception as e:
+            logger.error(f'Error generando PDF para estudiante {student_id}: {str(e)}')
+            raise PDFServiceError(f"Error generando PDF: {str(e)}")
 
-            # Filtrar evaluaciones
-            evaluations = Evaluation.objects.filter(student=student)
+    def collect_evaluation_summary_data(self, student_id, subject_id=None, start_date=None, end_date=None):
+        """Datos del resumen de evaluaciones de un período (tipos primitivos)"""
+        try:
+            student = Student.objects.get(id=student_id)
+        except Student.DoesNotExist:
+            raise PDFServiceError("Estudiante no encontrado")
 
-            if subject_id:
-                evaluations = evaluations.filter(subject_id=subject_id)
+        # Filtrar evaluaciones
+        evaluations = Evaluation.objects.filter(student=student)
 
-            if start_date:
-                evaluations = evaluations.filter(date__gte=start_date)
+        if subject_id:
+            evaluations = evaluations.filter(subject_id=subject_id)
 
-            if end_date:
-                evaluations = evaluations.filter(date__lte=end_date)
+        if start_date:
+            evaluations = evaluations.filter(date__gte=start_date)
 
-            evaluations = evaluations.select_related('subject', 'evaluator').order_by('-date')
+        if end_date:
+            evaluations = evaluations.filter(date__lte=end_date)
 
-            # Crear PDF
-            buffer = io.BytesIO()
-            doc = SimpleDocTemplate(buffer, pagesize=A4)
-            story = []
+        # Título
+        title = f"Resumen de Evaluaciones - {student.name}"
+        if subject_id:
+            from core.models import Subject
+            subject = Subject.objects.get(id=subject_id)
+            title += f" - {subject.name}"
 
-            # Título
-            title = f"Resumen de Evaluaciones - {student.name}"
-            if subject_id:
-                from core.models import Subject
-                subject = Subject.objects.get(id=subject_id)
-                title += f" - {subject.name}"
+        rows = list(
+            evaluations.order_by('-date', '-id')
+            .values('date', 'subject__name', 'evaluator__username', 'score', 'comment')
+        )
+        scores = [e['score'] for e in rows if e['score'] is not None]
+
+        return {
+            'title': title,
+            'total': len(rows),
+            'average': sum(scores) / len(scores) if scores else None,
+            'period': f"{start_date or 'Inicio'} - {end_date or 'Actualidad'}",
+            'evaluations': [
+                {
+                    'date': e['date'].isoformat(),
+                    'subject': e['subject__name'] or "General",
+                    'evaluator': e['evaluator__username'] or "N/A",
+                    'score': e['score'],
+                    'comment': e['comment'],
+                }
+                for e in rows
+            ],
+        }
+
+    def render_evaluation_summary(self, data):
+        """Renderiza el resumen a partir de collect_evaluation_summary_data()"""
+        buffer = io.BytesIO()
+        doc = SimpleDocTemplate(buffer, pagesize=A4)
+        story = []
+
+        story.append(Paragraph(data['title'], self.title_style))
+        story.append(Spacer(1, 12))
+
+        # Estadísticas
+        stats_data = [
+            ["Total de Evaluaciones:", str(data['total'])],
+            ["Puntuación Promedio:", f"{data['average']:.1f}" if data['average'] is not None else "N/A"],
+            ["Período:", data['period']],
+        ]
+
+        stats_table = Table(stats_data, colWidths=[2.5*inch, 3.5*inch])
+        stats_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ]))
+        story.append(stats_table)
+        story.append(Spacer(1, 20))
+
+        # Lista de evaluaciones
+        if data['evaluations']:
+            story.append(Paragraph("Detalle de Evaluaciones", self.section_style))
+
+            eval_data = [["Fecha", "Asignatura", "Evaluador", "Puntuación", "Comentario"]]
+            for eval in data['evaluations']:
+                eval_data.append([
+                    datetime.strptime(eval['date'], '%Y-%m-%d').strftime("%d/%m/%Y"),
+                    eval['subject'],
+                    eval['evaluator'],
+                    str(eval['score']) if eval['score'] is not None else "N/A",
+                    eval['comment'][:40] + "..." if len(eval['comment']) > 40 else eval['comment']
+                ])
+
+            eval_table = Table(eval_data, colWidths=[1*inch, 1.5*inch, 1.5*inch, 0.8*inch, 2.5*inch])
+            eval_table.setStyle(TableStyle([
+                ('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
+                ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+                ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ]))
+            story.append(eval_table)
 
-            story.append(Paragraph(title, self.title_style))
-            story.append(Spacer(1, 12))
+        # Generar PDF
+        doc.build(story)
+        pdf_content = buffer.getvalue()
+        buffer.close()
+        return pdf_content
 
-            # Estadísticas
-            total_evaluations = evaluations.count()
-            avg_score = evaluations.filter(score__isnull=False).aggregate(avg=models.Avg('score'))['avg__avg']
+    def generate_evaluation_summary_pdf(self, student_id, subject_id=None, start_date=None, end_date=None):
+        """
+        Generar PDF con resumen de evaluaciones en un período.
 
-            stats_data = [
-                ["Total de Evaluaciones:", str(total_evaluations)],
-                ["Puntuación Promedio:", ".1f" if avg_score else "N/A"],
-                ["Período:", f"{start_date or 'Inicio'} - {end_date or 'Actualidad'}"],
-            ]
+        Args:
+            student_id: ID del estudiante
+            subject_id: ID de la asignatura (opcional)
+            start_date: Fecha de inicio (opcional)
+            end_date: Fecha de fin (opcional)
 
-            stats_table = Table(stats_data, colWidths=[2.5*inch, 3.5*inch])
-            stats_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ]))
-            story.append(stats_table)
-            story.append(Spacer(1, 20))
+        Returns:
+            bytes: Contenido del PDF en bytes
+        """
+        try:
+            return self.render_evaluation_summary(
+                self.collect_evaluation_summary_data(student_id, subject_id, start_date, end_date)
+            )
 
-            # Lista de evaluaciones
-            if evaluations:
-                story.append(Paragraph("Detalle de Evaluaciones", self.section_style))
-
-                eval_data = [["Fecha", "Asignatura", "Evaluador", "Puntuación", "Comentario"]]
-                for eval in evaluations:
-                    eval_data.append([
-                        eval.date.strftime("%d/%m/%Y"),
-                        eval.subject.name if eval.subject else "General",
-                        eval.evaluator.username,
-                        str(eval.score) if eval.score else "N/A",
-                        eval.comment[:40] + "..." if len(eval.comment) > 40 else eval.comment
-                    ])
+        except Exception as e:
+            logger.error(f'Error generando resumen PDF: {str(e)}')
+            raise PDFServiceError(f"Error generando resumen PDF: {str(e)}")
 
-                eval_table = Table(eval_data, colWidths=[1*inch, 1.5*inch, 1.5*inch, 0.8*inch, 2.5*inch])
-                eval_table.setStyle(TableStyle([
-                    ('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
-                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-                    ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                ]))
-                story.append(eval_table)
+    def get_student_report(self, student_id, include_objectives=True, include_self_evaluations=True):
+        """Informe completo desde el almacén de PDFs generados (solo se renderiza si cambian los datos)"""
+        from core.services.artifact_store import artifact_store
 
-            # Generar PDF
-            doc.build(story)
-            buffer.seek(0)
-            pdf_content = buffer.getvalue()
-            buffer.close()
+        data = self.collect_student_report_data(student_id, include_objectives, include_self_evaluations)
+        try:
+            return artifact_store.get_or_render('student_report', data, self.TEMPLATE_VERSION, self.render_student_report)
+        except Exception as e:
+            logger.error(f'Error generando PDF para estudiante {student_id}: {str(e)}')
+            raise PDFServiceError(f"Error generando PDF: {str(e)}")
 
-            return pdf_content
+    def get_evaluation_summary(self, student_id, subject_id=None, start_date=None, end_date=None):
+        """Resumen de evaluaciones desde el almacén de PDFs generados"""
+        from core.services.artifact_store import artifact_store
 
+        try:
+            data = self.collect_evaluation_summary_data(student_id, subject_id, start_date, end_date)
+            return artifact_store.get_or_render(
+                'evaluation_summary', data, self.TEMPLATE_VERSION, self.render_evaluation_summary
+            )
+        except PDFServiceError:
+            raise
         except Exception as e:
             logger.error(f'Error generando resumen PDF: {str(e)}')
-            raise PDFServiceError(f"Error generando resumen PDF: {str(e)}")
\ No newline at end of file
+            raise PDFServiceError(f"Error generando resumen PDF: {str(e)}")
@@ -0,0 +1,288 @@
+"""
+Motor de informes trimestrales (grupo e individual)
+
+Calcula los informes con un número fijo de consultas agregadas (GROUP BY + agregados
+condicionales), independiente del número de alumnos y asignaturas:
+
+- Informe de grupo: 7 consultas
+- Informe individual: 4 consultas
+
+La comparación con el trimestre anterior (mismas fechas, 3 meses antes) se obtiene en la
+misma consulta que el trimestre actual mediante Avg(..., filter=Q(...)).
+
+La asistencia se calcula a partir de los registros de Attendance: cada registro 'ausente'
+cuenta como una sesión perdida, con la duración de la sesión de su asignatura.
+"""
+import logging
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+from dateutil.relativedelta import relativedelta
+from django.db.models import Avg, Count, Q
+
+from core.models import Attendance, CorrectionEvidence, Evaluation, Group, SelfEvaluation, Student
+
+logger = logging.getLogger(__name__)
+
+# Categorías de la distribución de notas (nota mínima, nombre), de mayor a menor
+CATEGORIAS_NOTA = [(9, 'Excelente'), (7, 'Notable'), (5, 'Aprobado'), (0, 'Insuficiente')]
+MESES_TRIMESTRE = 3
+# Duración por defecto de una sesión si la asignatura no tiene horario válido
+HORAS_SESION_DEFECTO = 1.0
+
+
+def categorizar_nota(nota: float) -> str:
+    for minimo, categoria in CATEGORIAS_NOTA:
+        if nota >= minimo:
+            return categoria
+    return 'Insuficiente'
+
+
+def _round(value, digits=2) -> Optional[float]:
+    return round(float(value), digits) if value is not None else None
+
+
+def _horas_sesion(start_time, end_time) -> float:
+    """Duración en horas de la sesión de una asignatura"""
+    if not start_time or not end_time:
+        return HORAS_SESION_DEFECTO
+    inicio = datetime.combine(date.min, start_time)
+    fin = datetime.combine(date.min, end_time)
+    horas = (fin - inicio).total_seconds() / 3600
+    return horas if horas > 0 else HORAS_SESION_DEFECTO
+
+
+class ReportEngine:
+    """Informes trimestrales de grupo y de estudiante basados en consultas agregadas"""
+
+    def periodos(self, fecha_inicio: date, fecha_fin: date) -> Tuple[Q, Q, Q]:
+        """Filtros Q del trimestre actual, del anterior y de ambos (sobre el campo date)"""
+        inicio_anterior = fecha_inicio - relativedelta(months=MESES_TRIMESTRE)
+        fin_anterior = fecha_fin - relativedelta(months=MESES_TRIMESTRE)
+        actual = Q(date__gte=fecha_inicio, date__lte=fecha_fin)
+        anterior = Q(date__gte=inicio_anterior, date__lte=fin_anterior)
+        return actual, anterior, actual | anterior
+
+    def _medias_por_asignatura(self, evaluaciones, actual: Q, anterior: Q, teacher) -> List[Dict]:
+        """Una consulta: media actual y anterior por asignatura del profesor"""
+        filas = (
+            evaluaciones.filter(subject__isnull=False, subject__teacher=teacher)
+            .values('subject_id', 'subject__name')
+            .annotate(media=Avg('score', filter=actual), media_anterior=Avg('score', filter=anterior))
+            .filter(media__isnull=False)
+        )
+        resultado = []
+        for fila in filas:
+            media = fila['media']
+            anterior_media = fila['media_anterior']
+            resultado.append({
+                'id': fila['subject_id'],
+                'nombre': fila['subject__name'],
+                'media': float(media),
+                'tendencia': float(media - anterior_media) if anterior_media is not None else 0,
+            })
+        resultado.sort(key=lambda x: (-x['media'], x['nombre']))
+        return resultado
+
+    def _ausencias(self, attendances) -> Dict[int, Dict]:
+        """
+        Una consulta: registros por alumno, asignatura y estado.
+        Devuelve {student_id: {'registros', 'ausencias', 'retrasos', 'horas_falta'}}
+        """
+        filas = (
+            attendances.values('student_id', 'status', 'subject__start_time', 'subject__end_time')
+            .annotate(total=Count('id'))
+        )
+        por_alumno = defaultdict(lambda: {'registros': 0, 'ausencias': 0, 'retrasos': 0, 'horas_falta': 0.0})
+        for fila in filas:
+            datos = por_alumno[fila['student_id']]
+            datos['registros'] += fila['total']
+            if fila['status'] == 'ausente':
+                datos['ausencias'] += fila['total']
+                datos['horas_falta'] += fila['total'] * _horas_sesion(
+                    fila['subject__start_time'], fila['subject__end_time']
+                )
+            elif fila['status'] == 'tarde':
+                datos['retrasos'] += fila['total']
+        return por_alumno
+
+    def informe_grupo(self, grupo: Group, fecha_inicio: date, fecha_fin: date, teacher) -> Dict:
+        actual, anterior, ambos = self.periodos(fecha_inicio, fecha_fin)
+
+        # 1. Alumnos del grupo
+        estudiantes = {
+            s['id']: s for s in Student.objects.filter(grupo_principal=grupo).values('id', 'name', 'apellidos')
+        }
+        total_estudiantes = len(estudiantes)
+
+        evaluaciones = Evaluation.objects.filter(ambos, student__grupo_principal=grupo, score__isnull=False)
+
+        # 2. Media global actual y anterior
+        globales = evaluaciones.aggregate(
+            media=Avg('score', filter=actual), media_anterior=Avg('score', filter=anterior)
+        )
+        media_global = globales['media'] or 0
+        media_anterior = globales['media_anterior']
+        tendencia_global = (
+            float(media_global - media_anterior)
+            if globales['media'] is not None and media_anterior is not None else 0
+        )
+
+        # 3. Media de cada alumno en el trimestre -> distribución de notas
+        distribucion = {categoria: 0 for _, categoria in CATEGORIAS_NOTA}
+        medias_alumnos = (
+            evaluaciones.filter(actual).values('student_id').annotate(media=Avg('score'))
+        )
+        for fila in medias_alumnos:
+            if fila['media'] is not None:
+                distribucion[categorizar_nota(fila['media'])] += 1
+
+        distribucion_notas = [
+            {
+                'categoria': cat,
+                'cantidad': count,
+                'porcentaje': round((count / total_estudiantes * 100) if total_estudiantes > 0 else 0, 1)
+            }
+            for cat, count in distribucion.items()
+        ]
+        total_aprobados = distribucion['Excelente'] + distribucion['Notable'] + distribucion['Aprobado']
+        tasa_aprobados = (total_aprobados / total_estudiantes * 100) if total_estudiantes > 0 else 0
+
+        # 4. Medias por asignatura con tendencia
+        medias_por_asignatura = self._medias_por_asignatura(evaluaciones, actual, anterior, teacher)
+
+        areas_destacadas = [
+            f"{a['nombre']}: Media de {a['media']:.2f}" for a in medias_por_asignatura[:3] if a['media'] >= 7
+        ]
+        areas_mejora = [
+            f"{a['nombre']}: Media de {a['media']:.2f} - Requiere refuerzo"
+            for a in reversed(medias_por_asignatura[-3:]) if a['media'] < 7
+        ]
+        if not areas_destacadas:
+            areas_destacadas = ["El grupo muestra un rendimiento equilibrado en todas las áreas"]
+        if not areas_mejora:
+            areas_mejora = ["No se identifican áreas críticas de mejora"]
+
+        # 5. Asistencia y ranking de absentismo
+        ausencias = self._ausencias(Attendance.objects.filter(actual, student__grupo_principal=grupo))
+        total_registros = sum(a['registros'] for a in ausencias.values())
+        total_ausencias = sum(a['ausencias'] for a in ausencias.values())
+        total_horas_falta = sum(a['horas_falta'] for a in ausencias.values())
+        asistencia_media = ((total_registros - total_ausencias) / total_registros * 100) if total_registros else 100
+
+        ranking_absentismo = []
+        for student_id, datos in ausencias.items():
+            if datos['ausencias'] and student_id in estudiantes:
+                estudiante = estudiantes[student_id]
+                ranking_absentismo.append({
+                    'id': student_id,
+                    'nombre': f"{estudiante['name']} {estudiante['apellidos']}".strip(),
+                    'horas_falta': round(datos['horas_falta'], 1),
+                    'faltas': datos['ausencias'],
+                })
+        ranking_absentismo.sort(key=lambda x: (-x['horas_falta'], x['nombre']))
+
+        # 6-7. Autoevaluaciones del grupo en el trimestre
+        autoevaluacion_grupo = self._autoevaluacion_grupo(grupo, fecha_inicio, fecha_fin)
+
+        return {
+            'total_estudiantes': total_estudiantes,
+            'media_global': float(media_global) if media_global else 0,
+            'tendencia_global': tendencia_global,
+            'tasa_aprobados': round(tasa_aprobados, 1),
+            'total_aprobados': total_aprobados,
+            'distribucion_notas': distribucion_notas,
+            'medias_por_asignatura': medias_por_asignatura,
+            'areas_destacadas': areas_destacadas,
+            'areas_mejora': areas_mejora,
+            'asistencia_media': round(asistencia_media, 1),
+            'total_horas_falta': round(total_horas_falta, 1),
+            'ranking_absentismo': ranking_absentismo,
+            'autoevaluacion_grupo': autoevaluacion_grupo,
+        }
+
+    def _autoevaluacion_grupo(self, grupo: Group, fecha_inicio: date, fecha_fin: date) -> Optional[Dict]:
+        autoevaluaciones = SelfEvaluation.objects.filter(
+            student__grupo_principal=grupo,
+            created_at__date__gte=fecha_inicio,
+            created_at__date__lte=fecha_fin,
+        )
+        # Media por asignatura (las mejor valoradas por los propios alumnos)
+        por_asignatura = list(
+            autoevaluaciones.values('subject_id', 'subject__name')
+            .annotate(media=Avg('score'), total=Count('id'))
+            .order_by('-media', 'subject__name')
+        )
+        if not por_asignatura:
+            return None
+
+        total = sum(fila['total'] for fila in por_asignatura)
+        media = sum(fila['media'] * fila['total'] for fila in por_asignatura) / total
+        hay_comentarios = autoevaluaciones.exclude(comment='').exists()
+        return {
+            'total': total,
+            'media': _round(media),
+            'competencias_principales': [
+                {'nombre': fila['subject__name'] or 'General', 'media': _round(fila['media'])}
+                for fila in por_asignatura[:3]
+            ],
+            'percepciones': "El grupo muestra interés en el aprendizaje cooperativo y valora la importancia del esfuerzo personal." if hay_comentarios else "",
+        }
+
+    def informe_estudiante(self, estudiante: Student, fecha_inicio: date, fecha_fin: date, teacher) -> Dict:
+        actual, anterior, ambos = self.periodos(fecha_inicio, fecha_fin)
+
+        # 1. Nota trimestral y tendencia por asignatura
+        evaluaciones = Evaluation.objects.filter(ambos, student=estudiante, score__isnull=False)
+        evaluaciones_por_asignatura = [
+            {
+                'id': fila['id'],
+                'nombre': fila['nombre'],
+                'nota_trimestral': fila['media'],
+                'tendencia': fila['tendencia'],
+            }
+            for fila in self._medias_por_asignatura(evaluaciones, actual, anterior, teacher)
+        ]
+
+        # 2. Asistencia
+        ausencias = self._ausencias(Attendance.objects.filter(actual, student=estudiante)).get(estudiante.id, {})
+
+        # 3. Autoevaluación más reciente del trimestre
+        autoevaluacion = SelfEvaluation.objects.filter(
+            student=estudiante,
+            created_at__date__gte=fecha_inicio,
+            created_at__date__lte=fecha_fin,
+        ).order_by('-created_at').only('comment', 'score').first()
+        autoevaluacion_data = None
+        if autoevaluacion:
+            autoevaluacion_data = {
+                'texto': autoevaluacion.comment or "Sin reflexión personal registrada",
+                'puntuacion': autoevaluacion.score,
+                'competencias': [],
+            }
+
+        # 4. Registros de aula (feedback de evidencias de corrección)
+        registros_aula = list(
+            CorrectionEvidence.objects.filter(
+                student=estudiante,
+                created_at__date__gte=fecha_inicio,
+                created_at__date__lte=fecha_fin,
+            ).exclude(teacher_feedback='')
+            .order_by('-created_at').values_list('teacher_feedback', flat=True)[:5]
+        )
+
+        return {
+            'nombre': estudiante.name,
+            'grupo': estudiante.grupo_principal.name if estudiante.grupo_principal else 'Sin grupo',
+            'evaluaciones_por_asignatura': evaluaciones_por_asignatura,
+            'total_horas_ausencia': round(ausencias.get('horas_falta', 0.0), 1),
+            'faltas': ausencias.get('ausencias', 0),
+            'retrasos': ausencias.get('retrasos', 0),
+            'autoevaluacion': autoevaluacion_data,
+            'registros_aula': registros_aula,
+            'comentarios_guardados': None,
+        }
+
+
+# Instancia global del motor
+report_engine = ReportEngine()
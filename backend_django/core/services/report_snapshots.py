@@ -0,0 +1,66 @@
+"""
+Instantáneas versionadas de los informes trimestrales
+
+Ver un informe y después descargarlo en PDF y en Excel calculaba el informe tres veces.
+Ahora la vista JSON y los exportadores leen la misma instantánea, guardada en caché con la
+clave (grupo o estudiante, profesor, rango de fechas, versión de datos).
+
+La versión de datos de cada grupo (ReportDataVersion) se incrementa con las señales de
+models.py al cambiar evaluaciones, asistencia, autoevaluaciones o evidencias de sus
+alumnos: las instantáneas antiguas dejan de consultarse y caducan solas por TTL.
+"""
+import logging
+from datetime import date
+from typing import Dict, Optional
+from django.conf import settings
+from django.core.cache import cache
+
+from core.models import Group, ReportDataVersion, Student
+from core.services.report_engine import report_engine
+
+logger = logging.getLogger(__name__)
+
+
+class ReportSnapshotService:
+    """Caché de informes de grupo e individuales invalidada por versión de datos"""
+
+    def __init__(self):
+        self.ttl = getattr(settings, 'REPORT_SNAPSHOT_TTL', 3600)
+
+    def get_version(self, group_id: Optional[int]) -> int:
+        """Versión actual de los datos del grupo (crea la fila la primera vez)"""
+        if not group_id:
+            return 0
+        version = ReportDataVersion.objects.filter(group_id=group_id).values_list('version', flat=True).first()
+        if version is None:
+            # La fila debe existir antes de cachear nada: los incrementos son UPDATE
+            version = ReportDataVersion.objects.get_or_create(group_id=group_id)[0].version
+        return version
+
+    def _cached(self, key: str, build):
+        data = cache.get(key)
+        if data is None:
+            data = build()
+            cache.set(key, data, self.ttl)
+        else:
+            logger.debug(f"Instantánea de informe reutilizada: {key}")
+        return data
+
+    def informe_grupo(self, grupo: Group, fecha_inicio: date, fecha_fin: date, teacher) -> Dict:
+        version = self.get_version(grupo.id)
+        key = f"informes:grupo:{grupo.id}:{teacher.id}:{fecha_inicio}:{fecha_fin}:v{version}"
+        return self._cached(key, lambda: report_engine.informe_grupo(grupo, fecha_inicio, fecha_fin, teacher))
+
+    def informe_estudiante(self, estudiante: Student, fecha_inicio: date, fecha_fin: date, teacher) -> Dict:
+        version = self.get_version(estudiante.grupo_principal_id)
+        key = (
+            f"informes:estudiante:{estudiante.id}:{estudiante.grupo_principal_id}:{teacher.id}"
+            f":{fecha_inicio}:{fecha_fin}:v{version}"
+        )
+        return self._cached(
+            key, lambda: report_engine.informe_estudiante(estudiante, fecha_inicio, fecha_fin, teacher)
+        )
+
+
+# Instancia global del servicio
+report_snapshots = ReportSnapshotService()
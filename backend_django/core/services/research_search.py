@@ -2,13 +2,27 @@
 Servicio de búsqueda de literatura científica educativa
 Integra Semantic Scholar y OpenAlex APIs (gratuitas)
 """
+import re
+import heapq
+import hashlib
 import requests
 import logging
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor, wait
 from typing import List, Dict, Optional
 from django.conf import settings
+from django.core.cache import cache
 
 logger = logging.getLogger(__name__)
 
+# Pool compartido: cada búsqueda combinada lanza una petición por fuente
+_search_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='research-search')
+
+
+class ResearchSearchError(Exception):
+    """Una fuente no ha podido responder (error HTTP, timeout o respuesta inválida)"""
+    pass
+
 
 class ResearchSearchService:
     """Servicio para buscar artículos científicos en bases de datos académicas"""
@@ -17,8 +31,11 @@ class ResearchSearchService:
     OPENALEX_URL = "https://api.openalex.org/works"
     
     def __init__(self):
-        self.timeout = 10
+        # Plazo total compartido por ambas fuentes (se consultan en paralelo)
+        self.deadline = getattr(settings, 'RESEARCH_SEARCH_DEADLINE', 8)
+        self.timeout = self.deadline
         self.max_results = 5
+        self.cache_ttl = getattr(settings, 'RESEARCH_SEARCH_CACHE_TTL', 60 * 60 * 6)
     
     def search_semantic_scholar(self, query: str, limit: int = 5) -> List[Dict]:
         """
@@ -30,6 +47,9 @@ class ResearchSearchService:
             
         Returns:
             Lista de papers con estructura normalizada
+            
+        Raises:
+            ResearchSearchError: si la API falla (para distinguirlo de una búsqueda sin resultados)
         """
         try:
             params = {
@@ -50,14 +70,16 @@ class ResearchSearchService:
                 return self._normalize_semantic_scholar(papers)
             else:
                 logger.error(f"Semantic Scholar error: {response.status_code}")
-                return []
+                raise ResearchSearchError(f"Semantic Scholar respondió {response.status_code}")
                 
+        except ResearchSearchError:
+            raise
         except requests.exceptions.RequestException as e:
             logger.error(f"Error searching Semantic Scholar: {e}")
-            return []
+            raise ResearchSearchError(f"Semantic Scholar: {e}") from e
         except Exception as e:
             logger.error(f"Unexpected error in Semantic Scholar search: {e}")
-            return []
+            raise ResearchSearchError(f"Semantic Scholar: {e}") from e
     
     def search_openalex(self, query: str, per_page: int = 5) -> List[Dict]:
         """
@@ -69,6 +91,9 @@ class ResearchSearchService:
             
         Returns:
             Lista de papers con estructura normalizada
+            
+        Raises:
+            ResearchSearchError: si la API falla (para distinguirlo de una búsqueda sin resultados)
         """
         try:
             params = {
@@ -89,18 +114,25 @@ class ResearchSearchService:
                 return self._normalize_openalex(papers)
             else:
                 logger.error(f"OpenAlex error: {response.status_code}")
-                return []
+                raise ResearchSearchError(f"OpenAlex respondió {response.status_code}")
                 
+        except ResearchSearchError:
+            raise
         except requests.exceptions.RequestException as e:
             logger.error(f"Error searching OpenAlex: {e}")
-            return []
+            raise ResearchSearchError(f"OpenAlex: {e}") from e
         except Exception as e:
             logger.error(f"Unexpected error in OpenAlex search: {e}")
-            return []
+            raise ResearchSearchError(f"OpenAlex: {e}") from e
     
     def search_combined(self, query: str, limit: int = 5) -> List[Dict]:
         """
-        Busca en ambas APIs y combina resultados
+        Busca en ambas APIs en paralelo y combina resultados
+        
+        Las dos fuentes comparten un único plazo (RESEARCH_SEARCH_DEADLINE): si una no
+        responde a tiempo o falla se devuelven los resultados de la otra. Solo cuando ambas
+        responden correctamente se cachea el resultado, por consulta normalizada, durante
+        RESEARCH_SEARCH_CACHE_TTL.
         
         Args:
             query: Términos de búsqueda
@@ -109,22 +141,84 @@ class ResearchSearchService:
         Returns:
             Lista combinada de papers únicos
         """
-        # Buscar en ambas fuentes
-        semantic_papers = self.search_semantic_scholar(query, limit=limit)
-        openalex_papers = self.search_openalex(query, per_page=limit)
+        cache_key = self._cache_key(query, limit)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"Research search cache hit: {query[:60]}")
+            return cached
         
-        # Combinar y deduplicar por título
-        all_papers = semantic_papers + openalex_papers
-        unique_papers = self._deduplicate_papers(all_papers)
+        futures = {
+            _search_executor.submit(self.search_semantic_scholar, query, limit): 'Semantic Scholar',
+            _search_executor.submit(self.search_openalex, query, limit): 'OpenAlex',
+        }
+        done, not_done = wait(futures, timeout=self.deadline)
         
-        # Ordenar por relevancia (citaciones + año)
-        sorted_papers = sorted(
-            unique_papers,
-            key=lambda p: (p.get('citations', 0) * 0.7 + (p.get('year', 2000) - 2000) * 0.3),
-            reverse=True
-        )
+        paper_lists = []
+        failed = 0
+        for future in done:
+            try:
+                paper_lists.append(future.result())
+            except Exception as e:
+                failed += 1
+                logger.error(f"Error in {futures[future]} search: {e}")
+        for future in not_done:
+            future.cancel()
+            logger.warning(f"{futures[future]} no respondió en {self.deadline}s, se devuelven resultados parciales")
         
-        return sorted_papers[:limit]
+        papers = self.merge_and_rank(paper_lists, limit)
+        
+        # Acumular todo lo recibido en el corpus local (índice a texto completo)
+        self._store_in_local_index([paper for papers_found in paper_lists for paper in papers_found])
+        
+        # Solo se cachean resultados completos para no fijar una respuesta parcial
+        if not not_done and not failed:
+            cache.set(cache_key, papers, self.cache_ttl)
+        
+        return papers
+    
+    def _store_in_local_index(self, papers: List[Dict]):
+        """Guarda los papers en el corpus local; un fallo aquí no debe romper la búsqueda"""
+        if not papers:
+            return
+        from .paper_index import paper_index_service
+        try:
+            nuevos = paper_index_service.add_papers(papers)
+            logger.info(f"Corpus local: {nuevos} papers nuevos de {len(papers)} recibidos")
+        except Exception as e:
+            logger.error(f"Error guardando papers en el corpus local: {e}")
+    
+    def _normalize_query(self, query: str) -> str:
+        """Minúsculas, sin acentos ni puntuación y con espacios colapsados"""
+        text = unicodedata.normalize('NFKD', query.lower())
+        text = ''.join(c for c in text if not unicodedata.combining(c))
+        return ' '.join(re.sub(r'[^\w\s]', ' ', text).split())
+    
+    def _cache_key(self, query: str, limit: int) -> str:
+        digest = hashlib.sha1(f"{self._normalize_query(query)}|{limit}".encode('utf-8')).hexdigest()
+        return f"research_search:{digest}"
+    
+    def _title_key(self, title: str) -> str:
+        return ' '.join(re.sub(r'[^\w\s]', ' ', (title or '').lower()).split())
+    
+    def _relevance(self, paper: Dict) -> float:
+        """Relevancia por citaciones + año"""
+        return (paper.get('citations') or 0) * 0.7 + ((paper.get('year') or 2000) - 2000) * 0.3
+    
+    def merge_and_rank(self, paper_lists: List[List[Dict]], limit: int) -> List[Dict]:
+        """
+        Deduplica por título (quedándose con el de más citaciones) y selecciona los
+        `limit` más relevantes en una sola pasada sobre el conjunto combinado.
+        """
+        unique = {}
+        for papers in paper_lists:
+            for paper in papers:
+                title_key = self._title_key(paper.get('title'))
+                if not title_key:
+                    continue
+                current = unique.get(title_key)
+                if current is None or (paper.get('citations') or 0) > (current.get('citations') or 0):
+                    unique[title_key] = paper
+        return heapq.nlargest(limit, unique.values(), key=self._relevance)
     
     def _normalize_semantic_scholar(self, papers: List[Dict]) -> List[Dict]:
         """Normaliza la respuesta de Semantic Scholar"""
@@ -191,23 +285,6 @@ class ResearchSearchService:
                 continue
         
         return normalized
-    
-    def _deduplicate_papers(self, papers: List[Dict]) -> List[Dict]:
-        """Elimina papers duplicados por título similar"""
-        unique = {}
-        
-        for paper in papers:
-            # Usar título normalizado como clave
-            title_key = paper.get('title', '').lower().strip()
-            
-            if title_key and title_key not in unique:
-                unique[title_key] = paper
-            elif title_key in unique:
-                # Si ya existe, quedarse con el que tiene más citaciones
-                if paper.get('citations', 0) > unique[title_key].get('citations', 0):
-                    unique[title_key] = paper
-        
-        return list(unique.values())
 
 
 # Instancia global del servicio
@@ -0,0 +1,260 @@
+"""
+Agregados incrementales para las gráficas de tendencia
+
+Las gráficas (evolución del dashboard, insights, analítica del alumno) agrupaban todas las
+evaluaciones con TruncDate/TruncMonth en cada carga: el coste crecía con los años de
+historial. Ahora leen de dos tablas de agregados:
+
+- DailyTeacherRollup: (profesor evaluador, asignatura, día de creación)
+- StudentMonthlyRollup: (alumno, mes) con evaluaciones y autoevaluaciones
+- StudentEvaluatorActivity: última evaluación de cada alumno por cada profesor (widget de
+  evaluaciones pendientes)
+
+Cada alta, cambio o baja de Evaluation/SelfEvaluation aplica un delta (se resta la versión
+anterior y se suma la nueva) con señales de models.py, bajo select_for_update. Las
+escrituras masivas (bulk_create, update) no disparan señales: el comando rebuild_rollups
+recalcula las tablas desde cero para corregir cualquier desviación.
+"""
+import logging
+from datetime import date
+from typing import Dict, Optional
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate, TruncMonth
+from django.utils import timezone
+
+from core.models import (
+    DailyTeacherRollup, Evaluation, SelfEvaluation, StudentEvaluatorActivity, StudentMonthlyRollup,
+    empty_score_histogram
+)
+
+logger = logging.getLogger(__name__)
+
+HISTOGRAM_BINS = 11
+
+
+def score_bin(score: float) -> int:
+    return max(0, min(int(score), HISTOGRAM_BINS - 1))
+
+
+def month_start(value: date) -> date:
+    return value.replace(day=1)
+
+
+class RollupService:
+    """Mantenimiento incremental, reconstrucción y lectura de los agregados"""
+
+    # ==================== Deltas ====================
+
+    def values_of(self, model, instance) -> Optional[Dict]:
+        """Campos de la fila que afectan a los agregados"""
+        if model is Evaluation:
+            return {
+                'evaluator_id': instance.evaluator_id,
+                'subject_id': instance.subject_id,
+                'student_id': instance.student_id,
+                'created_at': instance.created_at,
+                'date': instance.date,
+                'score': instance.score,
+            }
+        return {
+            'student_id': instance.student_id,
+            'created_at': instance.created_at,
+            'score': instance.score,
+        }
+
+    def previous_values(self, model, instance) -> Optional[Dict]:
+        """Valores guardados en la BD antes de un save (None si es un alta)"""
+        if instance.pk is None or instance._state.adding:
+            return None
+        fields = ['evaluator_id', 'subject_id', 'student_id', 'created_at', 'date', 'score'] \
+            if model is Evaluation else ['student_id', 'created_at', 'score']
+        return model.objects.filter(pk=instance.pk).values(*fields).first()
+
+    def apply_change(self, model, previous: Optional[Dict], instance):
+        current = self.values_of(model, instance) if instance is not None else None
+        if previous == current:
+            return
+        with transaction.atomic():
+            if model is Evaluation:
+                if previous:
+                    self._apply_evaluation(previous, -1)
+                if current:
+                    self._apply_evaluation(current, 1)
+                self._update_activity(previous, current, instance)
+            else:
+                if previous:
+                    self._apply_self_evaluation(previous, -1)
+                if current:
+                    self._apply_self_evaluation(current, 1)
+
+    def _row(self, model, sign: int, **lookup):
+        """Fila bloqueada; para restar solo se usan filas existentes (p. ej. en borrados en cascada)"""
+        if sign > 0:
+            return model.objects.select_for_update().get_or_create(**lookup)[0]
+        return model.objects.select_for_update().filter(**lookup).first()
+
+    def _add_score(self, row, score, sign: int):
+        row.eval_count += sign
+        if score is not None:
+            row.score_count += sign
+            row.score_sum += sign * score
+            histogram = list(row.score_histogram or empty_score_histogram())
+            histogram[score_bin(score)] += sign
+            row.score_histogram = histogram
+
+    def _apply_evaluation(self, values: Dict, sign: int):
+        if values['evaluator_id'] and values['created_at']:
+            row = self._row(
+                DailyTeacherRollup, sign, teacher_id=values['evaluator_id'], subject_id=values['subject_id'],
+                day=timezone.localtime(values['created_at']).date(),
+            )
+            if row is not None:
+                self._add_score(row, values['score'], sign)
+                row.save()
+
+        row = self._row(StudentMonthlyRollup, sign, student_id=values['student_id'], month=month_start(values['date']))
+        if row is not None:
+            self._add_score(row, values['score'], sign)
+            row.save()
+
+    def _apply_self_evaluation(self, values: Dict, sign: int):
+        if not values['created_at']:
+            return
+        row = self._row(
+            StudentMonthlyRollup, sign, student_id=values['student_id'],
+            month=month_start(timezone.localtime(values['created_at']).date()),
+        )
+        if row is not None:
+            row.self_eval_count += sign
+            row.self_eval_score_sum += sign * (values['score'] or 0)
+            row.save()
+
+    def _update_activity(self, previous: Optional[Dict], current: Optional[Dict], instance):
+        if previous is None and current and current['evaluator_id']:
+            # Alta: es la evaluación más reciente del par (created_at es auto_now_add)
+            StudentEvaluatorActivity.objects.update_or_create(
+                student_id=current['student_id'], evaluator_id=current['evaluator_id'],
+                defaults={'last_evaluated_at': current['created_at'], 'last_evaluation': instance},
+            )
+            return
+        # Cambio de alumno/profesor o baja: recalcular los pares afectados
+        pares = {(v['student_id'], v['evaluator_id']) for v in (previous, current) if v and v['evaluator_id']}
+        for student_id, evaluator_id in pares:
+            self.refresh_activity(student_id, evaluator_id)
+
+    def refresh_activity(self, student_id, evaluator_id):
+        ultima = Evaluation.objects.filter(student_id=student_id, evaluator_id=evaluator_id).order_by(
+            '-created_at', '-id'
+        ).values_list('id', 'created_at').first()
+        if ultima is None:
+            StudentEvaluatorActivity.objects.filter(student_id=student_id, evaluator_id=evaluator_id).delete()
+        else:
+            StudentEvaluatorActivity.objects.update_or_create(
+                student_id=student_id, evaluator_id=evaluator_id,
+                defaults={'last_evaluated_at': ultima[1], 'last_evaluation_id': ultima[0]},
+            )
+
+    # ==================== Reconstrucción ====================
+
+    def _histogram_aggregates(self):
+        """Count condicional por intervalo de nota (una columna por posición del histograma)"""
+        aggregates = {}
+        for i in range(HISTOGRAM_BINS):
+            condition = Q(score__gte=i) if i == HISTOGRAM_BINS - 1 else Q(score__gte=i, score__lt=i + 1)
+            aggregates[f'h{i}'] = Count('id', filter=condition)
+        return aggregates
+
+    def rebuild(self) -> Dict[str, int]:
+        """Recalcula ambas tablas desde Evaluation y SelfEvaluation (en una transacción)"""
+        base = {
+            'eval_count': Count('id'),
+            'score_count': Count('score'),
+            'score_sum': Sum('score'),
+            **self._histogram_aggregates(),
+        }
+
+        daily = []
+        filas = (
+            Evaluation.objects.filter(evaluator__isnull=False)
+            .annotate(day=TruncDate('created_at'))
+            .values('evaluator_id', 'subject_id', 'day').annotate(**base).order_by()
+        )
+        for fila in filas.iterator():
+            daily.append(DailyTeacherRollup(
+                teacher_id=fila['evaluator_id'], subject_id=fila['subject_id'], day=fila['day'],
+                eval_count=fila['eval_count'], score_count=fila['score_count'], score_sum=fila['score_sum'] or 0,
+                score_histogram=[fila[f'h{i}'] for i in range(HISTOGRAM_BINS)],
+            ))
+
+        monthly = {}
+        filas = (
+            Evaluation.objects.annotate(month=TruncMonth('date'))
+            .values('student_id', 'month').annotate(**base).order_by()
+        )
+        for fila in filas.iterator():
+            monthly[(fila['student_id'], fila['month'])] = StudentMonthlyRollup(
+                student_id=fila['student_id'], month=fila['month'],
+                eval_count=fila['eval_count'], score_count=fila['score_count'], score_sum=fila['score_sum'] or 0,
+                score_histogram=[fila[f'h{i}'] for i in range(HISTOGRAM_BINS)],
+            )
+        filas = (
+            SelfEvaluation.objects.annotate(month=TruncMonth('created_at'))
+            .values('student_id', 'month').annotate(count=Count('id'), total=Sum('score')).order_by()
+        )
+        for fila in filas.iterator():
+            month = fila['month'].date() if hasattr(fila['month'], 'date') else fila['month']
+            row = monthly.setdefault(
+                (fila['student_id'], month), StudentMonthlyRollup(student_id=fila['student_id'], month=month)
+            )
+            row.self_eval_count = fila['count']
+            row.self_eval_score_sum = fila['total'] or 0
+
+        # Última evaluación por (alumno, profesor): la primera de cada par en orden descendente
+        activity = {}
+        filas = Evaluation.objects.filter(evaluator__isnull=False).order_by(
+            'student_id', 'evaluator_id', '-created_at', '-id'
+        ).values_list('student_id', 'evaluator_id', 'created_at', 'id')
+        for student_id, evaluator_id, created_at, evaluation_id in filas.iterator(chunk_size=2000):
+            if (student_id, evaluator_id) not in activity:
+                activity[(student_id, evaluator_id)] = StudentEvaluatorActivity(
+                    student_id=student_id, evaluator_id=evaluator_id,
+                    last_evaluated_at=created_at, last_evaluation_id=evaluation_id,
+                )
+
+        with transaction.atomic():
+            DailyTeacherRollup.objects.all().delete()
+            StudentMonthlyRollup.objects.all().delete()
+            StudentEvaluatorActivity.objects.all().delete()
+            DailyTeacherRollup.objects.bulk_create(daily, batch_size=1000)
+            StudentMonthlyRollup.objects.bulk_create(monthly.values(), batch_size=1000)
+            StudentEvaluatorActivity.objects.bulk_create(activity.values(), batch_size=1000)
+
+        logger.info(
+            f"Agregados reconstruidos: {len(daily)} diarios, {len(monthly)} mensuales, {len(activity)} últimas evaluaciones"
+        )
+        return {'daily': len(daily), 'monthly': len(monthly), 'activity': len(activity)}
+
+    # ==================== Lectura ====================
+
+    def teacher_daily(self, teacher, since: date, subject_id=None):
+        """Filas por día (eval_count, score_count, score_sum) desde una fecha"""
+        qs = DailyTeacherRollup.objects.filter(teacher=teacher, day__gte=since)
+        if subject_id:
+            qs = qs.filter(subject_id=subject_id)
+        return qs.values('day').annotate(
+            eval_count=Sum('eval_count'), score_count=Sum('score_count'), score_sum=Sum('score_sum')
+        ).order_by('day')
+
+    def teacher_totals(self, teacher, since: date) -> Dict:
+        totals = DailyTeacherRollup.objects.filter(teacher=teacher, day__gte=since).aggregate(
+            eval_count=Sum('eval_count'), score_count=Sum('score_count'), score_sum=Sum('score_sum')
+        )
+        return {key: value or 0 for key, value in totals.items()}
+
+    def student_monthly(self, student, since: date):
+        return StudentMonthlyRollup.objects.filter(student=student, month__gte=month_start(since)).order_by('month')
+
+
+# Instancia global del servicio
+rollup_service = RollupService()
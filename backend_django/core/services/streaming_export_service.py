@@ -0,0 +1,157 @@
+"""
+Exportaciones en streaming de datos en bruto (evaluaciones y asistencia)
+
+Los volcados de todo el centro que piden los coordinadores pueden tener cientos de miles de
+filas. En lugar de construir un Workbook en memoria, las filas se leen con
+QuerySet.iterator() por lotes y se escriben según el formato:
+
+- csv / ndjson: cada fila se envía al cliente en cuanto se genera (StreamingHttpResponse)
+- xlsx: hoja write-only de openpyxl volcada a un fichero temporal en disco. Un xlsx es un
+  zip que solo se puede cerrar al final, así que se sirve después con FileResponse por
+  bloques; en ningún momento está el libro entero en memoria
+
+En los tres casos la memoria se mantiene plana con independencia del número de filas.
+"""
+import csv
+import json
+import tempfile
+from datetime import date
+from typing import Iterable, Iterator, List, Optional, Sequence
+from django.conf import settings
+from django.http import FileResponse, StreamingHttpResponse
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill
+
+from core.models import Attendance, Evaluation
+
+FORMATOS = ('xlsx', 'csv', 'ndjson')
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+class _Echo:
+    """Buffer mínimo para que csv.writer devuelva cada línea en vez de escribirla"""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(headers: Sequence[str], rows: Iterable[Sequence]) -> Iterator[str]:
+    """Líneas CSV (con BOM para que Excel detecte UTF-8)"""
+    writer = csv.writer(_Echo())
+    yield '\ufeff'
+    yield writer.writerow(headers)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def iter_ndjson(headers: Sequence[str], rows: Iterable[Sequence]) -> Iterator[str]:
+    """Una línea JSON por fila"""
+    for row in rows:
+        yield json.dumps(dict(zip(headers, row)), ensure_ascii=False, default=str) + '\n'
+
+
+def csv_response(headers: Sequence[str], rows: Iterable[Sequence], filename: str) -> StreamingHttpResponse:
+    response = StreamingHttpResponse(iter_csv(headers, rows), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+    return response
+
+
+def ndjson_response(headers: Sequence[str], rows: Iterable[Sequence], filename: str) -> StreamingHttpResponse:
+    response = StreamingHttpResponse(iter_ndjson(headers, rows), content_type='application/x-ndjson')
+    response['Content-Disposition'] = f'attachment; filename="{filename}.ndjson"'
+    return response
+
+
+def xlsx_response(sheet_title: str, headers: Sequence[str], rows: Iterable[Sequence], filename: str) -> FileResponse:
+    """Hoja write-only en un fichero temporal servida por bloques (se borra al cerrarse)"""
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title=sheet_title[:31])
+    ws.freeze_panes = 'A2'
+
+    header_fill = PatternFill(start_color="3B82F6", end_color="3B82F6", fill_type="solid")
+    header_font = Font(bold=True, color="FFFFFF")
+    header_row = []
+    for header in headers:
+        cell = WriteOnlyCell(ws, value=header)
+        cell.fill = header_fill
+        cell.font = header_font
+        header_row.append(cell)
+    ws.append(header_row)
+    for row in rows:
+        ws.append(row)
+
+    tmp = tempfile.TemporaryFile(dir=getattr(settings, 'EXPORT_TMP_DIR', None))
+    wb.save(tmp)
+    tmp.seek(0)
+    return FileResponse(tmp, as_attachment=True, filename=f"{filename}.xlsx", content_type=XLSX_CONTENT_TYPE)
+
+
+class StreamingExportService:
+    """Volcados de evaluaciones y asistencia acotados por profesor, grupo y fechas"""
+
+    def __init__(self):
+        self.chunk_size = getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+        self.datasets = {
+            'evaluaciones': {
+                'titulo': 'Evaluaciones',
+                'headers': ['id', 'fecha', 'alumno_id', 'alumno', 'grupo', 'asignatura', 'nota', 'comentario', 'evaluador'],
+                'queryset': self._evaluaciones,
+            },
+            'asistencia': {
+                'titulo': 'Asistencia',
+                'headers': ['id', 'fecha', 'alumno_id', 'alumno', 'grupo', 'asignatura', 'estado', 'comentario', 'registrado_por'],
+                'queryset': self._asistencia,
+            },
+        }
+
+    def _evaluaciones(self):
+        return Evaluation.objects.order_by('date', 'id').values_list(
+            'id', 'date', 'student_id', 'student__name', 'student__apellidos', 'student__grupo_principal__name',
+            'subject__name', 'score', 'comment', 'evaluator__username',
+        )
+
+    def _asistencia(self):
+        return Attendance.objects.order_by('date', 'id').values_list(
+            'id', 'date', 'student_id', 'student__name', 'student__apellidos', 'student__grupo_principal__name',
+            'subject__name', 'status', 'comment', 'recorded_by__username',
+        )
+
+    def puede_exportar_centro(self, user) -> bool:
+        """Coordinación (staff) puede volcar los datos de todo el centro"""
+        return user.is_staff or user.is_superuser
+
+    def queryset(self, dataset: str, user, grupo_id: Optional[int] = None,
+                 fecha_inicio: Optional[date] = None, fecha_fin: Optional[date] = None):
+        qs = self.datasets[dataset]['queryset']()
+        if not self.puede_exportar_centro(user):
+            qs = qs.filter(student__grupo_principal__teacher=user)
+        if grupo_id:
+            qs = qs.filter(student__grupo_principal_id=grupo_id)
+        if fecha_inicio:
+            qs = qs.filter(date__gte=fecha_inicio)
+        if fecha_fin:
+            qs = qs.filter(date__lte=fecha_fin)
+        return qs
+
+    def iter_rows(self, qs) -> Iterator[List]:
+        """Filas planas leídas por lotes (sin caché de resultados del QuerySet)"""
+        for (pk, fecha, alumno_id, nombre, apellidos, grupo, asignatura,
+             valor, comentario, usuario) in qs.iterator(chunk_size=self.chunk_size):
+            yield [
+                pk, fecha.isoformat(), alumno_id, f"{nombre} {apellidos}".strip(), grupo or '',
+                asignatura or 'General', valor, comentario or '', usuario or '',
+            ]
+
+    def response(self, dataset: str, formato: str, user, filename: str, **filtros):
+        definicion = self.datasets[dataset]
+        rows = self.iter_rows(self.queryset(dataset, user, **filtros))
+        if formato == 'csv':
+            return csv_response(definicion['headers'], rows, filename)
+        if formato == 'ndjson':
+            return ndjson_response(definicion['headers'], rows, filename)
+        return xlsx_response(definicion['titulo'], definicion['headers'], rows, filename)
+
+
+# Instancia global del servicio
+streaming_export_service = StreamingExportService()
@@ -0,0 +1,150 @@
+"""
+Respuestas parciales para los serializers de core: ?fields= y ?expand=
+
+- ?fields=id,name          solo esos campos; los SerializerMethodField no pedidos no se calculan
+- ?expand=grupo_principal  sustituye el id de una relación por el objeto resumido
+                           (Meta.expandable_fields) y lo incluye aunque no esté en fields
+
+SparseFieldsetViewMixin traduce los campos resultantes a columnas y relaciones del modelo:
+only() con las columnas leídas, select_related para las FK atravesadas y prefetch_related
+para las relaciones múltiples. Los campos calculados declaran qué leen en
+Meta.field_requirements; si un campo no se puede resolver no se aplica only() (las
+relaciones conocidas se cargan igualmente).
+
+Solo en lecturas (GET/HEAD/OPTIONS): en escrituras el serializer valida todos sus campos.
+"""
+from typing import Iterable, Optional, Set, Tuple
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+
+
+def requested_names(request, param: str) -> Optional[Set[str]]:
+    """Nombres de ?fields= / ?expand= (None si no se ha pedido o no es una lectura)"""
+    if request is None or request.method not in SAFE_METHODS:
+        return None
+    value = request.query_params.get(param)
+    if value is None:
+        return None
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+def resolve_path(model, path: str) -> Optional[Tuple[Set[str], Set[str], Set[str]]]:
+    """
+    (columnas para only(), select_related, prefetch_related) que necesita leer 'a__b__c'
+    None si el camino no es un campo del modelo (propiedad, método...)
+    """
+    columns, select, prefetch = set(), set(), set()
+    parts = path.split('__')
+    current = model
+    for i, part in enumerate(parts):
+        try:
+            field = current._meta.get_field(part)
+        except FieldDoesNotExist:
+            return None
+        prefix = '__'.join(parts[:i + 1])
+        if field.many_to_many or field.one_to_many:
+            # Lo que haya detrás se lee de la relación precargada
+            prefetch.add(prefix)
+            return columns, select, prefetch
+        columns.add(prefix)
+        if i == len(parts) - 1:
+            break
+        if not field.is_relation:
+            return None
+        select.add(prefix)
+        current = field.related_model
+    return columns, select, prefetch
+
+
+class SparseFieldsetMixin:
+    """
+    Mixin para ModelSerializer: aplica ?fields= / ?expand= al serializer raíz de la respuesta
+
+    Meta.field_requirements = {'campo_calculado': ('columna', 'fk__columna', 'relacion_multiple')}
+    Meta.expandable_fields = {'fk': (SerializerResumen, many)}
+    """
+
+    def _is_root(self) -> bool:
+        parent = getattr(self, 'parent', None)
+        if isinstance(parent, serializers.ListSerializer):
+            parent = getattr(parent, 'parent', None)
+        return parent is None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if not self._is_root():
+            return fields
+        request = self.context.get('request')
+
+        expandable = getattr(self.Meta, 'expandable_fields', {})
+        expand = (requested_names(request, EXPAND_PARAM) or set()) & set(expandable)
+        for name in expand:
+            serializer_class, many = expandable[name]
+            fields[name] = serializer_class(many=many, read_only=True)
+
+        requested = requested_names(request, FIELDS_PARAM)
+        if requested is not None:
+            keep = requested | expand
+            for name in [name for name in fields if name not in keep]:
+                fields.pop(name)
+        return fields
+
+    def queryset_requirements(self) -> Tuple[Optional[Set[str]], Set[str], Set[str]]:
+        """(columnas o None si no se pueden determinar, select_related, prefetch_related) de los campos actuales"""
+        model = self.Meta.model
+        declared = getattr(self.Meta, 'field_requirements', {})
+        columns, select, prefetch = {model._meta.pk.name}, set(), set()
+        resolvable = True
+        for name, field in self.fields.items():
+            if field.write_only:
+                continue
+            if name in declared:
+                paths: Iterable[str] = declared[name]
+            elif isinstance(field, serializers.SerializerMethodField) or field.source == '*':
+                resolvable = False
+                continue
+            else:
+                paths = ['__'.join(field.source_attrs)]
+            for path in paths:
+                resolved = resolve_path(model, path)
+                if resolved is None:
+                    resolvable = False
+                    continue
+                columns |= resolved[0]
+                select |= resolved[1]
+                prefetch |= resolved[2]
+                if isinstance(field, serializers.BaseSerializer) and not resolved[2]:
+                    select.add(path)  # relación expandida: el objeto completo en el mismo JOIN
+        return (columns if resolvable else None), select, prefetch
+
+
+class SparseFieldsetViewMixin:
+    """
+    Mixin para GenericAPIView: ajusta el queryset a los campos del serializer en las lecturas
+    Con ?fields= sustituye las relaciones de get_queryset por las necesarias y aplica only().
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.request.method not in SAFE_METHODS:
+            return queryset
+        serializer = self.get_serializer()
+        if not hasattr(serializer, 'queryset_requirements') or serializer.Meta.model is not queryset.model:
+            return queryset
+
+        columns, select, prefetch = serializer.queryset_requirements()
+        narrow = columns is not None and requested_names(self.request, FIELDS_PARAM) is not None
+        if narrow:
+            queryset = queryset.select_related(None).prefetch_related(None)
+        if select:
+            queryset = queryset.select_related(*sorted(select))
+        if prefetch:
+            queryset = queryset.prefetch_related(*sorted(prefetch))
+        if narrow:
+            queryset = queryset.only(*sorted(columns))
+        return queryset
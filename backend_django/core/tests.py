@@ -1,3 +1,1891 @@
-from django.test import TestCase
+import json
+from datetime import date, datetime, time, timezone as dt_timezone
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase
+from rest_framework.test import APIClient
+
+from core.models import Attendance, Comment, Evaluation, Group, SelfEvaluation, Student, Subject
+from core.services.report_engine import report_engine
+
+FECHA_INICIO = date(2025, 1, 7)
+FECHA_FIN = date(2025, 3, 31)
+FECHA_ACTUAL = date(2025, 2, 10)
+FECHA_ANTERIOR = date(2024, 11, 12)
+
+
+class ReportEngineTests(TestCase):
+    """Informes trimestrales sobre un grupo de 30 alumnos y 10 asignaturas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user(username='profe', password='x')
+        cls.grupo = Group.objects.create(name='4tA', course='4t ESO', teacher=cls.teacher)
+        cls.asignaturas = Subject.objects.bulk_create([
+            Subject(
+                name=f'Asignatura {i:02d}', teacher=cls.teacher, days=['L'],
+                start_time=time(9, 0), end_time=time(10, 30) if i == 0 else time(10, 0),
+            )
+            for i in range(10)
+        ])
+        cls.alumnos = Student.objects.bulk_create([
+            Student(name=f'Alumno{i:02d}', apellidos='Test', grupo_principal=cls.grupo)
+            for i in range(30)
+        ])
+
+        # Nota del alumno i en la asignatura j: i % 11 en el trimestre actual
+        # y un punto menos en el anterior (tendencia +1 en todas las asignaturas)
+        evaluaciones = []
+        for i, alumno in enumerate(cls.alumnos):
+            for asignatura in cls.asignaturas:
+                nota = float(i % 11)
+                evaluaciones.append(Evaluation(student=alumno, subject=asignatura, date=FECHA_ACTUAL, score=nota))
+                evaluaciones.append(Evaluation(
+                    student=alumno, subject=asignatura, date=FECHA_ANTERIOR, score=max(nota - 1, 0)
+                ))
+        # Evaluación sin nota (no cuenta) y fuera de los dos trimestres (no cuenta)
+        evaluaciones.append(Evaluation(student=cls.alumnos[0], subject=cls.asignaturas[0], date=date(2025, 2, 11), score=None))
+        evaluaciones.append(Evaluation(student=cls.alumnos[0], subject=cls.asignaturas[0], date=date(2023, 1, 1), score=10))
+        Evaluation.objects.bulk_create(evaluaciones)
+
+        # Alumno 0: 2 ausencias en la asignatura de 1,5 h y 1 retraso; alumno 1: 1 ausencia de 1 h
+        asistencias = [
+            Attendance(student=alumno, subject=cls.asignaturas[1], date=FECHA_ACTUAL, status='presente')
+            for alumno in cls.alumnos
+        ]
+        asistencias += [
+            Attendance(student=cls.alumnos[0], subject=cls.asignaturas[0], date=date(2025, 2, d), status='ausente')
+            for d in (3, 4)
+        ]
+        asistencias.append(Attendance(student=cls.alumnos[0], subject=cls.asignaturas[2], date=FECHA_ACTUAL, status='tarde'))
+        asistencias.append(Attendance(student=cls.alumnos[1], subject=cls.asignaturas[2], date=FECHA_ACTUAL, status='ausente'))
+        Attendance.objects.bulk_create(asistencias)
+
+        SelfEvaluation.objects.create(student=cls.alumnos[0], subject=cls.asignaturas[0], score=4, comment='Me esfuerzo')
+        SelfEvaluation.objects.create(student=cls.alumnos[1], subject=cls.asignaturas[0], score=2, comment='')
+        SelfEvaluation.objects.update(created_at=datetime(2025, 2, 12, 10, 0, tzinfo=dt_timezone.utc))
+
+    def setUp(self):
+        # Las instantáneas de informes sobreviven al rollback de la BD entre tests
+        cache.clear()
+
+    def test_informe_grupo_valores(self):
+        data = report_engine.informe_grupo(self.grupo, FECHA_INICIO, FECHA_FIN, self.teacher)
+        notas = [i % 11 for i in range(30)]
+
+        self.assertEqual(data['total_estudiantes'], 30)
+        self.assertAlmostEqual(data['media_global'], sum(notas) / 30)
+        self.assertAlmostEqual(data['tendencia_global'], 1 - sum(1 for n in notas if n == 0) / 30, places=5)
+
+        distribucion = {d['categoria']: d['cantidad'] for d in data['distribucion_notas']}
+        self.assertEqual(distribucion['Excelente'], sum(1 for n in notas if n >= 9))
+        self.assertEqual(distribucion['Insuficiente'], sum(1 for n in notas if n < 5))
+        self.assertEqual(sum(distribucion.values()), 30)
+        self.assertEqual(data['total_aprobados'], sum(1 for n in notas if n >= 5))
+
+        self.assertEqual(len(data['medias_por_asignatura']), 10)
+        for asignatura in data['medias_por_asignatura']:
+            self.assertAlmostEqual(asignatura['media'], sum(notas) / 30)
+
+        self.assertAlmostEqual(data['total_horas_falta'], 4.0)  # 2 x 1,5 h + 1 x 1 h
+        self.assertEqual([a['id'] for a in data['ranking_absentismo']], [self.alumnos[0].id, self.alumnos[1].id])
+        self.assertEqual(data['ranking_absentismo'][0]['faltas'], 2)
+        self.assertAlmostEqual(data['asistencia_media'], round(31 / 34 * 100, 1))
+
+        self.assertEqual(data['autoevaluacion_grupo']['total'], 2)
+        self.assertAlmostEqual(data['autoevaluacion_grupo']['media'], 3.0)
+
+    def test_informe_grupo_consultas_fijas(self):
+        # El número de consultas no depende del número de alumnos ni de asignaturas
+        with self.assertNumQueries(7):
+            report_engine.informe_grupo(self.grupo, FECHA_INICIO, FECHA_FIN, self.teacher)
+
+        grupo_vacio = Group.objects.create(name='4tB', teacher=self.teacher)
+        with self.assertNumQueries(6):  # sin autoevaluaciones no se buscan comentarios
+            data = report_engine.informe_grupo(grupo_vacio, FECHA_INICIO, FECHA_FIN, self.teacher)
+        self.assertEqual(data['total_estudiantes'], 0)
+        self.assertIsNone(data['autoevaluacion_grupo'])
+
+    def test_informe_estudiante(self):
+        alumno = Student.objects.select_related('grupo_principal').get(pk=self.alumnos[5].pk)
+        with self.assertNumQueries(4):
+            data = report_engine.informe_estudiante(alumno, FECHA_INICIO, FECHA_FIN, self.teacher)
+
+        self.assertEqual(data['grupo'], '4tA')
+        self.assertEqual(len(data['evaluaciones_por_asignatura']), 10)
+        for asignatura in data['evaluaciones_por_asignatura']:
+            self.assertEqual(asignatura['nota_trimestral'], 5.0)
+            self.assertEqual(asignatura['tendencia'], 1.0)
+        self.assertEqual(data['total_horas_ausencia'], 0)
+        self.assertIsNone(data['autoevaluacion'])
+
+        alumno = Student.objects.select_related('grupo_principal').get(pk=self.alumnos[0].pk)
+        data = report_engine.informe_estudiante(alumno, FECHA_INICIO, FECHA_FIN, self.teacher)
+        self.assertEqual(data['total_horas_ausencia'], 3.0)
+        self.assertEqual(data['retrasos'], 1)
+        self.assertEqual(data['autoevaluacion']['texto'], 'Me esfuerzo')
+
+    def test_endpoints(self):
+        client = APIClient()
+        client.force_authenticate(self.teacher)
+        params = {'fecha_inicio': FECHA_INICIO.isoformat(), 'fecha_fin': FECHA_FIN.isoformat()}
+
+        response = client.get('/api/informes/grupo/', {'grupo_id': self.grupo.id, **params})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_estudiantes'], 30)
+
+        response = client.get('/api/informes/estudiante/', {'estudiante_id': self.alumnos[0].id, **params})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['evaluaciones_por_asignatura']), 10)
+
+        otro = User.objects.create_user(username='otro', password='x')
+        client.force_authenticate(otro)
+        response = client.get('/api/informes/grupo/', {'grupo_id': self.grupo.id, **params})
+        self.assertEqual(response.status_code, 404)
+
+
+class ReportSnapshotTests(TestCase):
+    """La vista JSON y los exportadores comparten la instantánea hasta que cambian los datos"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user(username='profe', password='x')
+        cls.grupo = Group.objects.create(name='3rB', teacher=cls.teacher)
+        cls.asignatura = Subject.objects.create(
+            name='Mates', teacher=cls.teacher, days=['L'], start_time=time(9, 0), end_time=time(10, 0)
+        )
+        cls.alumno = Student.objects.create(name='Ana', apellidos='Test', grupo_principal=cls.grupo)
+        Evaluation.objects.create(student=cls.alumno, subject=cls.asignatura, date=FECHA_ACTUAL, score=6)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_instantanea_reutilizada_e_invalidada(self):
+        from core.services.report_snapshots import report_snapshots
+
+        data = report_snapshots.informe_grupo(self.grupo, FECHA_INICIO, FECHA_FIN, self.teacher)
+        self.assertAlmostEqual(data['media_global'], 6.0)
+        with self.assertNumQueries(1):  # solo la versión de datos
+            report_snapshots.informe_grupo(self.grupo, FECHA_INICIO, FECHA_FIN, self.teacher)
+
+        Evaluation.objects.create(student=self.alumno, subject=self.asignatura, date=date(2025, 2, 17), score=8)
+        data = report_snapshots.informe_grupo(self.grupo, FECHA_INICIO, FECHA_FIN, self.teacher)
+        self.assertAlmostEqual(data['media_global'], 7.0)
+
+        Attendance.objects.create(student=self.alumno, subject=self.asignatura, date=FECHA_ACTUAL, status='ausente')
+        data = report_snapshots.informe_estudiante(self.alumno, FECHA_INICIO, FECHA_FIN, self.teacher)
+        self.assertEqual(data['total_horas_ausencia'], 1.0)
+        Attendance.objects.all().delete()
+        data = report_snapshots.informe_estudiante(self.alumno, FECHA_INICIO, FECHA_FIN, self.teacher)
+        self.assertEqual(data['total_horas_ausencia'], 0)
+
+    def test_exportacion_usa_la_instantanea(self):
+        client = APIClient()
+        client.force_authenticate(self.teacher)
+        params = {'grupo_id': self.grupo.id, 'fecha_inicio': FECHA_INICIO.isoformat(), 'fecha_fin': FECHA_FIN.isoformat()}
+        self.assertEqual(client.get('/api/informes/grupo/', params).status_code, 200)
+
+        with mock.patch.object(report_engine, 'informe_grupo') as motor:
+            response = client.get('/api/informes/grupo/excel/', params)
+        motor.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('3rB', response['Content-Disposition'])
+
+    def test_cambio_de_grupo_asignatura_y_nombre_invalida(self):
+        from core.services.report_snapshots import report_snapshots
+
+        otro = Group.objects.create(name='3rC', teacher=self.teacher)
+        versiones = lambda: (report_snapshots.get_version(self.grupo.id), report_snapshots.get_version(otro.id))
+
+        inicial = versiones()
+        self.alumno.grupo_principal = otro
+        self.alumno.save()
+        despues = versiones()
+        self.assertGreater(despues[0], inicial[0])  # el grupo que abandona
+        self.assertGreater(despues[1], inicial[1])
+
+        self.asignatura.name = 'Matemáticas'
+        self.asignatura.save()
+        tras_asignatura = versiones()
+        self.assertEqual(tras_asignatura[0], despues[0])  # sin registros de sus alumnos
+        self.assertGreater(tras_asignatura[1], despues[1])
+
+        otro.name = '3rD'
+        otro.save()
+        self.assertGreater(versiones()[1], tras_asignatura[1])
+
+        self.asignatura.delete()
+        self.assertGreater(versiones()[1], tras_asignatura[1] + 1)
+
+
+class StreamingExportTests(TestCase):
+    """Volcados en bruto: acotados por profesor salvo para coordinación (staff)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user(username='profe', password='x')
+        cls.otro = User.objects.create_user(username='otro', password='x')
+        cls.coordinador = User.objects.create_user(username='coord', password='x', is_staff=True)
+        asignatura = Subject.objects.create(
+            name='Mates', teacher=cls.teacher, days=['L'], start_time=time(9, 0), end_time=time(10, 0)
+        )
+        for profesor, nombre in ((cls.teacher, '1rA'), (cls.otro, '1rB')):
+            grupo = Group.objects.create(name=nombre, teacher=profesor)
+            alumnos = Student.objects.bulk_create([
+                Student(name=f'{nombre}-{i}', apellidos='Test', grupo_principal=grupo) for i in range(5)
+            ])
+            Evaluation.objects.bulk_create([
+                Evaluation(student=alumno, subject=asignatura, date=FECHA_ACTUAL, score=7) for alumno in alumnos
+            ])
+
+    def _get(self, user, **params):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.get('/api/informes/datos/', {'dataset': 'evaluaciones', **params})
+
+    def test_csv_y_ndjson(self):
+        response = self._get(self.teacher, formato='csv')
+        self.assertEqual(response.status_code, 200)
+        lineas = b''.join(response.streaming_content).decode('utf-8-sig').splitlines()
+        self.assertEqual(len(lineas), 6)  # cabecera + 5 alumnos del profesor
+        self.assertTrue(all('1rA' in linea for linea in lineas[1:]))
+
+        response = self._get(self.coordinador, formato='ndjson')
+        filas = [json.loads(linea) for linea in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(len(filas), 10)
+        self.assertEqual(filas[0]['nota'], 7.0)
+
+    def test_xlsx_write_only(self):
+        from io import BytesIO
+        from openpyxl import load_workbook
+
+        response = self._get(self.coordinador)
+        self.assertEqual(response.status_code, 200)
+        ws = load_workbook(BytesIO(b''.join(response.streaming_content)), read_only=True).active
+        self.assertEqual(len(list(ws.rows)), 11)
+
+        grupo_ajeno = Group.objects.get(name='1rB')
+        self.assertEqual(self._get(self.teacher, grupo_id=grupo_ajeno.id).status_code, 404)
+        self.assertEqual(self._get(self.teacher, formato='pdf').status_code, 400)
+
+
+class BulkPDFExportTests(TestCase):
+    """ZIP con un PDF por alumno, renderizado en varios procesos y guardado para re-descarga"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user(username='profe', password='x')
+        cls.grupo = Group.objects.create(name='2nC', teacher=cls.teacher)
+        asignatura = Subject.objects.create(
+            name='Mates', teacher=cls.teacher, days=['L'], start_time=time(9, 0), end_time=time(10, 0)
+        )
+        cls.alumnos = Student.objects.bulk_create([
+            Student(name=f'Alumno{i}', apellidos='Test', grupo_principal=cls.grupo) for i in range(4)
+        ])
+        Evaluation.objects.bulk_create([
+            Evaluation(student=alumno, subject=asignatura, date=FECHA_ACTUAL, score=6) for alumno in cls.alumnos
+        ])
+
+    def setUp(self):
+        # Las instantáneas de informes sobreviven al rollback de la BD entre tests
+        cache.clear()
+
+    def test_exportacion_en_segundo_plano(self):
+        import tempfile
+        import zipfile
+        from io import BytesIO
+        from core.models import BulkReportExport
+        from core.services.bulk_pdf_export import bulk_pdf_export_service
+
+        client = APIClient()
+        client.force_authenticate(self.teacher)
+        params = f'grupo_id={self.grupo.id}&fecha_inicio={FECHA_INICIO}&fecha_fin={FECHA_FIN}&trimestre=T2'
+
+        with tempfile.TemporaryDirectory() as media, self.settings(MEDIA_ROOT=media), \
+                mock.patch.object(bulk_pdf_export_service, 'start') as start, \
+                mock.patch.object(bulk_pdf_export_service, 'workers', 2):
+            response = client.post(f'/api/informes/grupo/pdf-zip/?{params}', {'comentarios': {}}, format='json')
+            self.assertEqual(response.status_code, 202)
+            start.assert_called_once()
+            export_id = response.data['id']
+            # El hilo se sustituye por una ejecución síncrona (comparte la transacción del test)
+            bulk_pdf_export_service.run(export_id)
+
+            job = BulkReportExport.objects.get(pk=export_id)
+            self.assertEqual((job.status, job.total, job.completed, job.progress), ('done', 4, 4, 100))
+            estado = client.get(f'/api/informes/grupo/pdf-zip/{export_id}/')
+            self.assertIsNotNone(estado.data['download_url'])
+
+            response = client.get(estado.data['download_url'])
+            self.assertEqual(response.status_code, 200)
+            with zipfile.ZipFile(BytesIO(b''.join(response.streaming_content))) as zf:
+                nombres = zf.namelist()
+                self.assertEqual(len(nombres), 4)
+                self.assertTrue(all(zf.read(n).startswith(b'%PDF') for n in nombres))
+
+    def test_stream_directo(self):
+        import zipfile
+        from io import BytesIO
+
+        client = APIClient()
+        client.force_authenticate(self.teacher)
+        params = f'grupo_id={self.grupo.id}&fecha_inicio={FECHA_INICIO}&fecha_fin={FECHA_FIN}&stream=1'
+        response = client.post(f'/api/informes/grupo/pdf-zip/?{params}', {}, format='json')
+        self.assertEqual(response.status_code, 200)
+        with zipfile.ZipFile(BytesIO(b''.join(response.streaming_content))) as zf:
+            self.assertEqual(len(zf.namelist()), 4)
+
+    def test_pool_compartido_entre_exportaciones(self):
+        from concurrent.futures import Future
+        from core.services import bulk_pdf_export
+        from core.services.bulk_pdf_export import bulk_pdf_export_service
+
+        def submit(fn, tarea):
+            future = Future()
+            future.set_result((tarea[0], b'%PDF'))
+            return future
+
+        tareas = [(f'{i}.pdf',) for i in range(3)]
+        with mock.patch.object(bulk_pdf_export, '_executor', None), \
+                mock.patch.object(bulk_pdf_export, 'ProcessPoolExecutor') as pool_cls:
+            pool_cls.return_value.submit.side_effect = submit
+            pool_cls.return_value._broken = False
+            for _ in range(2):
+                pdfs = list(bulk_pdf_export_service._render(tareas, workers=2))
+                self.assertEqual(len(pdfs), 3)
+        # Un único pool para ambas exportaciones, que no se cierra al terminar cada una
+        pool_cls.assert_called_once()
+        pool_cls.return_value.shutdown.assert_not_called()
+
+
+class PDFArtifactStoreTests(TestCase):
+    """PDFs reutilizados mientras no cambian sus datos, con ETag fuerte y desalojo por tamaño"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user(username='profe', password='x')
+        cls.grupo = Group.objects.create(name='1rD', teacher=cls.teacher)
+        cls.asignatura = Subject.objects.create(
+            name='Mates', teacher=cls.teacher, days=['L'], start_time=time(9, 0), end_time=time(10, 0)
+        )
+        cls.alumno = Student.objects.create(name='Ana', apellidos='Test', grupo_principal=cls.grupo)
+        Evaluation.objects.create(
+            student=cls.alumno, subject=cls.asignatura, date=FECHA_ACTUAL, score=6, evaluator=cls.teacher
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+        self.url = f'/api/alumnos/{self.alumno.id}/informe-pdf/'
+
+    def test_reutiliza_pdf_y_etag(self):
+        from core.services.pdf_service import PDFReportService
+
+        render = PDFReportService.render_student_report
+        with mock.patch.object(PDFReportService, 'render_student_report', autospec=True, side_effect=render) as renderizado:
+            primera = self.client.get(self.url)
+            self.assertEqual(primera.status_code, 200)
+            self.assertTrue(primera.content.startswith(b'%PDF'))
+            etag = primera['ETag']
+
+            segunda = self.client.get(self.url)
+            self.assertEqual((segunda['ETag'], segunda.content), (etag, primera.content))
+            self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+            self.assertEqual(renderizado.call_count, 1)
+
+            Evaluation.objects.create(student=self.alumno, subject=self.asignatura, date=date(2025, 2, 17), score=8)
+            tercera = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(tercera.status_code, 200)
+            self.assertNotEqual(tercera['ETag'], etag)
+            self.assertEqual(renderizado.call_count, 2)
+
+            # Al cambiar de día la fecha del informe cambia y el PDF se vuelve a generar
+            with mock.patch('django.utils.timezone.localdate', return_value=date(2030, 1, 2)):
+                cuarta = self.client.get(self.url, HTTP_IF_NONE_MATCH=tercera['ETag'])
+            self.assertEqual(cuarta.status_code, 200)
+            self.assertEqual(renderizado.call_count, 3)
+            self.assertEqual(renderizado.call_args.args[1]['report_date'], '2030-01-02')
+
+    def test_desalojo_por_tamano(self):
+        from core.models import RenderedArtifact
+        from core.services.artifact_store import artifact_store
+
+        with mock.patch.object(artifact_store, 'max_bytes', 250):
+            for i in range(5):
+                artifact_store.get_or_render('test', {'i': i}, 1, lambda data: b'x' * 100)
+        self.assertLessEqual(sum(RenderedArtifact.objects.values_list('size', flat=True)), 250)
+        # Se conservan los más recientes
+        self.assertIsNotNone(artifact_store.get(artifact_store.key_for('test', {'i': 4}, 1)))
+        self.assertIsNone(artifact_store.get(artifact_store.key_for('test', {'i': 0}, 1)))
+
+
+class DashboardTests(TestCase):
+    """Dashboard compuesto: subconjunto de secciones, caché por versión de datos y endpoints antiguos"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user(username='profe', password='x')
+        cls.grupo = Group.objects.create(name='3rC', teacher=cls.teacher)
+        cls.asignatura = Subject.objects.create(
+            name='Mates', teacher=cls.teacher, days=['L'], start_time=time(9, 0), end_time=time(10, 0)
+        )
+        cls.alumnos = [
+            Student.objects.create(name=f'Alumno{i}', apellidos='Test', grupo_principal=cls.grupo) for i in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+        # Los hilos no ven los datos de la transacción del test: secciones en secuencia
+        from core.services.dashboard_service import dashboard_service
+        patcher = mock.patch.object(dashboard_service, 'max_workers', 1)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_secciones_y_subconjunto(self):
+        response = self.client.get('/api/dashboard/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['errors'], {})
+        self.assertEqual(len(response.data['sections']), 8)
+        self.assertEqual(response.data['sections']['resumen']['total_alumnos'], 3)
+
+        response = self.client.get('/api/dashboard/', {'sections': 'resumen,evaluaciones_pendientes'})
+        self.assertEqual(set(response.data['sections']), {'resumen', 'evaluaciones_pendientes'})
+        self.assertEqual(response.data['sections']['evaluaciones_pendientes']['total_pendientes'], 3)
+
+        self.assertEqual(self.client.get('/api/dashboard/', {'sections': 'resumen,otra'}).status_code, 400)
+
+    def test_cache_invalidada_por_version_de_datos(self):
+        params = {'sections': 'evaluaciones_pendientes'}
+        self.client.get('/api/dashboard/', params)
+        with self.assertNumQueries(1):  # solo las versiones de los grupos (ámbito de acceso en caché)
+            response = self.client.get('/api/dashboard/', params)
+        self.assertEqual(response.data['sections']['evaluaciones_pendientes']['total_pendientes'], 3)
+
+        Evaluation.objects.create(
+            student=self.alumnos[0], subject=self.asignatura, date=FECHA_ACTUAL, score=7, evaluator=self.teacher
+        )
+        response = self.client.get('/api/dashboard/', params)
+        self.assertEqual(response.data['sections']['evaluaciones_pendientes']['total_pendientes'], 2)
+
+    def test_comentarios_del_profesor_y_limite(self):
+        otro = User.objects.create_user(username='otro', password='x')
+        ajeno = Student.objects.create(
+            name='Ajeno', apellidos='Test', grupo_principal=Group.objects.create(name='3rD', teacher=otro)
+        )
+        Comment.objects.create(student=ajeno, author=otro, text='De otro profesor')
+        for i in range(3):
+            Comment.objects.create(student=self.alumnos[i], author=self.teacher, text=f'Comentario {i}')
+
+        response = self.client.get('/api/dashboard/comentarios_recientes/', {'limit': 'muchos'})
+        self.assertEqual(response.status_code, 200)
+        textos = {c['text'] for c in response.data['comentarios']}
+        self.assertEqual(textos, {'Comentario 0', 'Comentario 1', 'Comentario 2'})
+        response = self.client.get('/api/dashboard/comentarios_recientes/', {'limit': 2})
+        self.assertEqual(len(response.data['comentarios']), 2)
+
+    def test_endpoints_antiguos(self):
+        response = self.client.get('/api/dashboard/resumen/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_alumnos'], 3)
+        self.assertIn('clases', self.client.get('/api/dashboard/proximas_clases/').data)
+        self.assertIn('noticias', self.client.get('/api/noticias/educacion/').data)
+
+
+class DashboardConcurrencyTests(TransactionTestCase):
+    """Secciones del dashboard en varios hilos: ven los datos confirmados y cierran su conexión"""
+
+    def setUp(self):
+        cache.clear()
+        self.teacher = User.objects.create_user(username='profe', password='x')
+        otro = User.objects.create_user(username='otro', password='x')
+        grupo = Group.objects.create(name='3rC', teacher=self.teacher)
+        grupo_otro = Group.objects.create(name='3rD', teacher=otro)
+        alumnos = [Student.objects.create(name=f'Alumno{i}', apellidos='Test', grupo_principal=grupo) for i in range(3)]
+        ajeno = Student.objects.create(name='Ajeno', apellidos='Test', grupo_principal=grupo_otro)
+        Evaluation.objects.create(student=alumnos[0], date=date.today(), score=7, evaluator=self.teacher)
+        Comment.objects.create(student=alumnos[1], author=self.teacher, text='Propio')
+        Comment.objects.create(student=ajeno, author=otro, text='Ajeno')
+
+    def test_secciones_en_paralelo(self):
+        import threading
+        from django.db import connection
+        from core.services import dashboard_service as modulo
+
+        hilos, cerradas = {}, []
+        original = modulo.dashboard_service._section_in_thread
+
+        def espia(name, scope):
+            hilos[name] = threading.get_ident()
+            return original(name, scope)
+
+        def cerrar():
+            cerradas.append(threading.get_ident())
+            connection.close()
+
+        with mock.patch.object(modulo.dashboard_service, 'max_workers', 3), \
+                mock.patch.object(modulo.dashboard_service, '_section_in_thread', espia), \
+                mock.patch.object(modulo, 'connection') as conexion:
+            conexion.close.side_effect = cerrar
+            data = modulo.dashboard_service.build(
+                self.teacher, ['resumen', 'evaluaciones_pendientes', 'comentarios_recientes']
+            )
+
+        self.assertEqual(data['errors'], {})
+        self.assertEqual(data['sections']['resumen']['total_alumnos'], 3)
+        self.assertEqual(data['sections']['evaluaciones_pendientes']['total_pendientes'], 2)
+        self.assertEqual([c['text'] for c in data['sections']['comentarios_recientes']['comentarios']], ['Propio'])
+        # Las secciones se calcularon fuera del hilo principal y cada una cerró su conexión
+        self.assertNotIn(threading.get_ident(), hilos.values())
+        self.assertEqual(sorted(cerradas), sorted(hilos.values()))
+
+
+class RollupTests(TestCase):
+    """Agregados diarios y mensuales: mantenimiento incremental y reconstrucción"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user(username='profe', password='x')
+        cls.grupo = Group.objects.create(name='4tA', teacher=cls.teacher)
+        cls.asignatura = Subject.objects.create(
+            name='Mates', teacher=cls.teacher, days=['L'], start_time=time(9, 0), end_time=time(10, 0)
+        )
+        cls.alumno = Student.objects.create(name='Alumno', apellidos='Test', grupo_principal=cls.grupo)
+
+    def _filas(self):
+        from core.models import DailyTeacherRollup, StudentMonthlyRollup
+        diario = list(DailyTeacherRollup.objects.order_by('day', 'subject_id').values(
+            'teacher_id', 'subject_id', 'day', 'eval_count', 'score_count', 'score_sum', 'score_histogram'
+        ))
+        mensual = list(StudentMonthlyRollup.objects.order_by('month').values(
+            'student_id', 'month', 'eval_count', 'score_count', 'score_sum', 'score_histogram',
+            'self_eval_count', 'self_eval_score_sum'
+        ))
+        return diario, mensual
+
+    def test_altas_cambios_y_bajas(self):
+        evaluacion = Evaluation.objects.create(
+            student=self.alumno, subject=self.asignatura, date=FECHA_ACTUAL, score=7.5, evaluator=self.teacher
+        )
+        Evaluation.objects.create(student=self.alumno, date=FECHA_ACTUAL, score=None, evaluator=self.teacher)
+        SelfEvaluation.objects.create(student=self.alumno, score=4)
+
+        diario, mensual = self._filas()
+        self.assertEqual(sum(f['eval_count'] for f in diario), 2)
+        febrero = next(f for f in mensual if f['month'] == date(2025, 2, 1))
+        self.assertEqual((febrero['eval_count'], febrero['score_count'], febrero['score_sum']), (2, 1, 7.5))
+        self.assertEqual(febrero['score_histogram'][7], 1)
+        self.assertEqual(sum(f['self_eval_count'] for f in mensual), 1)
+
+        # Cambio de nota y de mes: se resta de febrero y se suma a marzo
+        evaluacion.score = 10
+        evaluacion.date = date(2025, 3, 3)
+        evaluacion.save()
+        _, mensual = self._filas()
+        febrero = next(f for f in mensual if f['month'] == date(2025, 2, 1))
+        marzo = next(f for f in mensual if f['month'] == date(2025, 3, 1))
+        self.assertEqual((febrero['eval_count'], febrero['score_count'], febrero['score_histogram'][7]), (1, 0, 0))
+        self.assertEqual((marzo['score_sum'], marzo['score_histogram'][10]), (10, 1))
+
+        evaluacion.delete()
+        diario, mensual = self._filas()
+        self.assertEqual(sum(f['eval_count'] for f in diario), 1)
+        self.assertEqual(sum(f['score_count'] for f in mensual), 0)
+
+    def test_reconstruccion_coincide_con_incremental(self):
+        from django.core.management import call_command
+        from core.models import StudentMonthlyRollup
+        for dia, nota in [(3, 5.0), (4, 8.25), (5, None)]:
+            Evaluation.objects.create(
+                student=self.alumno, subject=self.asignatura, date=date(2025, 2, dia), score=nota, evaluator=self.teacher
+            )
+        SelfEvaluation.objects.create(student=self.alumno, score=3)
+        incremental = self._filas()
+
+        # Una carga masiva no dispara señales: el comando corrige la desviación
+        Evaluation.objects.bulk_create([Evaluation(student=self.alumno, date=date(2025, 2, 20), score=6)])
+        call_command('rebuild_rollups', stdout=mock.MagicMock())
+        diario, mensual = self._filas()
+        self.assertEqual(diario, incremental[0])
+        self.assertEqual(StudentMonthlyRollup.objects.get(month=date(2025, 2, 1)).eval_count, 4)
+
+        Evaluation.objects.filter(date=date(2025, 2, 20)).delete()
+        self.assertEqual(self._filas(), incremental)
+
+    def test_analitica_del_alumno_desde_agregados(self):
+        hoy = date.today()
+        Evaluation.objects.create(student=self.alumno, subject=self.asignatura, date=hoy, score=6, evaluator=self.teacher)
+        Evaluation.objects.create(student=self.alumno, date=hoy, score=8, evaluator=self.teacher)
+        client = APIClient()
+        client.force_authenticate(self.teacher)
+        response = client.get(f'/api/alumnos/{self.alumno.id}/analytics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['evaluation_trend'][-1], {'month': hoy.strftime('%Y-%m'), 'count': 2, 'avg_score': 7.0})
+        self.assertEqual(response.data['summary']['total_evaluations'], 2)
+
+
+class PendingEvaluationsTests(TestCase):
+    """Evaluaciones pendientes: una consulta con subconsultas, con y sin la tabla precalculada"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user(username='profe', password='x')
+        cls.otro = User.objects.create_user(username='otro', password='x')
+        cls.grupo = Group.objects.create(name='2nB', teacher=cls.teacher)
+        cls.alumnos = [
+            Student.objects.create(name=f'Alumno{i}', apellidos='Test', grupo_principal=cls.grupo) for i in range(4)
+        ]
+        hoy = date.today()
+        # Alumno0: evaluado por el profesor esta semana (no pendiente)
+        Evaluation.objects.create(student=cls.alumnos[0], date=hoy, score=6, evaluator=cls.teacher)
+        # Alumno1: solo evaluado por otro profesor (pendiente, con su última nota)
+        Evaluation.objects.create(student=cls.alumnos[1], date=hoy, score=9, evaluator=cls.otro)
+        # Alumno2: evaluación antigua del profesor (pendiente)
+        antigua = Evaluation.objects.create(student=cls.alumnos[2], date=FECHA_ANTERIOR, score=4, evaluator=cls.teacher)
+        Evaluation.objects.filter(pk=antigua.pk).update(created_at=datetime(2024, 11, 12, 10, tzinfo=dt_timezone.utc))
+        from core.services.rollups import rollup_service
+        rollup_service.refresh_activity(cls.alumnos[2].id, cls.teacher.id)
+        # Alumno3 solo tiene una evaluación sin evaluador (pendiente, con su nota)
+        Evaluation.objects.create(student=cls.alumnos[3], date=hoy, score=5)
+
+    def _pendientes(self):
+        from core.services.dashboard_service import DashboardScope, dashboard_service
+        scope = DashboardScope(self.teacher)
+        with self.assertNumQueries(1):
+            return dashboard_service.evaluaciones_pendientes(scope)
+
+    def test_precalculado_y_subconsultas_coinciden(self):
+        from core.services.dashboard_service import dashboard_service
+        precalculado = self._pendientes()
+        with mock.patch.object(dashboard_service, 'pending_precomputed', False):
+            directo = self._pendientes()
+        self.assertEqual(precalculado, directo)
+        por_nombre = {p['name']: p for p in precalculado['pendientes']}
+        self.assertEqual(set(por_nombre), {'Alumno1', 'Alumno2', 'Alumno3'})
+        self.assertEqual(por_nombre['Alumno1']['last_evaluation_score'], 9)
+        self.assertEqual(por_nombre['Alumno2']['last_evaluation_date'], '12/11/2024')
+        self.assertEqual(por_nombre['Alumno3']['last_evaluation_score'], 5)
+
+    def test_tabla_precalculada_sigue_altas_y_bajas(self):
+        from core.models import StudentEvaluatorActivity
+        nueva = Evaluation.objects.create(student=self.alumnos[3], date=date.today(), score=7, evaluator=self.teacher)
+        self.assertNotIn('Alumno3', [p['name'] for p in self._pendientes()['pendientes']])
+        self.assertEqual(StudentEvaluatorActivity.objects.get(student=self.alumnos[3]).last_evaluation, nueva)
+
+        nueva.delete()
+        self.assertFalse(StudentEvaluatorActivity.objects.filter(student=self.alumnos[3]).exists())
+        self.assertIn('Alumno3', [p['name'] for p in self._pendientes()['pendientes']])
+
+
+class RubricUsageTests(TestCase):
+    """Uso de rúbricas por profesor: sesiones (no criterios), ventana temporal y caché invalidada"""
+
+    @classmethod
+    def setUpTestData(cls):
+        from core.models import Rubric, RubricCriterion, RubricLevel
+        cls.teacher = User.objects.create_user(username='profe', password='x')
+        cls.otro = User.objects.create_user(username='otro', password='x')
+        cls.grupo = Group.objects.create(name='1rA', teacher=cls.teacher)
+        cls.alumno = Student.objects.create(name='Alumno', apellidos='Test', grupo_principal=cls.grupo)
+        cls.rubrica = Rubric.objects.create(title='Expresión oral', teacher=cls.teacher)
+        cls.vacia = Rubric.objects.create(title='Sin usar', teacher=cls.teacher)
+        cls.ajena = Rubric.objects.create(title='Ajena', teacher=cls.otro)
+        cls.criterios = []
+        for orden in range(3):
+            criterio = RubricCriterion.objects.create(rubric=cls.rubrica, name=f'C{orden}', order=orden)
+            RubricLevel.objects.create(criterion=criterio, name='Bien', score=3)
+            cls.criterios.append(criterio)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+
+    def _sesion(self, session_id):
+        from core.models import RubricScore
+        for criterio in self.criterios:
+            RubricScore.objects.create(
+                rubric=self.rubrica, criterion=criterio, level=criterio.levels.first(),
+                student=self.alumno, evaluator=self.teacher, evaluation_session_id=session_id,
+            )
+
+    def test_sesiones_por_profesor_y_ventana(self):
+        from core.models import RubricScore
+        self._sesion('s1')
+        self._sesion('s2')
+        RubricScore.objects.filter(evaluation_session_id='s1').update(
+            evaluated_at=datetime(2024, 1, 10, tzinfo=dt_timezone.utc)
+        )
+        cache.clear()
+
+        response = self.client.get('/api/dashboard/stats/rubrics-distribution')
+        self.assertEqual(response.data, [{'name': 'Expresión oral', 'count': 2}, {'name': 'Sin usar', 'count': 0}])
+        response = self.client.get('/api/dashboard/rubricas_estadisticas/', {'days': 30})
+        self.assertEqual([r['usage_count'] for r in response.data['rubricas']], [1, 0])
+        self.assertEqual(response.data['period_days'], 30)
+
+    def test_cache_por_profesor_invalidada_al_evaluar(self):
+        self._sesion('s1')
+        self.client.get('/api/dashboard/stats/rubrics-distribution')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/dashboard/stats/rubrics-distribution')
+        self.assertEqual(response.data[0]['count'], 1)
+
+        self._sesion('s2')
+        response = self.client.get('/api/dashboard/stats/rubrics-distribution')
+        self.assertEqual(response.data[0]['count'], 2)
+
+
+class SubjectWeekdayMaskTests(TestCase):
+    """Máscara de días de clase: sincronizada al guardar, rellenada por la migración y filtro por día"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user(username='profe', password='x')
+        cls.otro = User.objects.create_user(username='otro', password='x')
+        cls.grupo = Group.objects.create(name='1rB', teacher=cls.teacher)
+        horas = {'start_time': time(9, 0), 'end_time': time(10, 0)}
+        cls.mates = Subject.objects.create(name='Mates', teacher=cls.teacher, days=['monday', 'Miércoles'], **horas)
+        cls.catala = Subject.objects.create(name='Català', teacher=cls.teacher, days=['dimecres', 'V'], **horas)
+        cls.ajena = Subject.objects.create(name='Ajena', teacher=cls.otro, days=['wednesday'], **horas)
+        cls.grupo.subjects.add(cls.mates, cls.catala)
+
+    def test_mascara_y_filtro_por_dia(self):
+        self.assertEqual(self.mates.weekday_mask, 0b0000101)
+        self.assertEqual(self.catala.weekdays, [2, 4])
+        with self.assertNumQueries(1):
+            miercoles = set(Subject.meeting_on(date(2025, 2, 12), teacher=self.teacher).values_list('name', flat=True))
+        self.assertEqual(miercoles, {'Mates', 'Català'})
+        self.assertEqual(list(Subject.meeting_on(4).values_list('name', flat=True)), ['Català'])
+
+        self.mates.days = ['friday']
+        self.mates.save()
+        self.assertEqual(set(Subject.meeting_on(4).values_list('name', flat=True)), {'Mates', 'Català'})
+
+    def test_migracion_rellena_mascara(self):
+        import importlib
+        from django.apps import apps
+        migracion = importlib.import_module('core.migrations.0019_subject_weekday_mask')
+        Subject.objects.update(weekday_mask=0)
+        migracion.backfill_weekday_mask(apps, None)
+        self.assertEqual(Subject.objects.get(pk=self.catala.pk).weekday_mask, 0b0010100)
+
+    def test_horario_de_hoy_del_profesor(self):
+        hoy = date.today().strftime('%A').lower()
+        Subject.objects.create(name='Hoy', teacher=self.teacher, days=[hoy], start_time=time(8, 0), end_time=time(9, 0))
+        Subject.objects.create(name='Hoy ajena', teacher=self.otro, days=[hoy], start_time=time(8, 0), end_time=time(9, 0))
+        client = APIClient()
+        client.force_authenticate(self.teacher)
+        response = client.get('/api/dashboard/schedule/today')
+        self.assertIn('Hoy', [s['name'] for s in response.data])
+        self.assertNotIn('Hoy ajena', [s['name'] for s in response.data])
+
+
+class GroupMembershipTests(TestCase):
+    """Pertenencias alumno-grupo sincronizadas con grupo_principal y subgrupos"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user(username='profe', password='x')
+        cls.otro = User.objects.create_user(username='otro', password='x')
+        cls.tutoria = Group.objects.create(name='3rA', teacher=cls.teacher)
+        cls.optativa = Group.objects.create(name='Robòtica', teacher=cls.otro)
+        cls.alumno = Student.objects.create(name='Alumno', apellidos='Test', grupo_principal=cls.tutoria)
+        cls.otro_alumno = Student.objects.create(name='Otro', apellidos='Test', grupo_principal=cls.optativa)
+
+    def _pertenencias(self, alumno):
+        from core.models import GroupMembership
+        return dict(GroupMembership.objects.filter(student=alumno).values_list('group__name', 'role'))
+
+    def test_sincronizacion_con_principal_y_subgrupos(self):
+        self.assertEqual(self._pertenencias(self.alumno), {'3rA': 'principal'})
+
+        self.alumno.subgrupos.add(self.optativa)
+        self.assertEqual(self._pertenencias(self.alumno), {'3rA': 'principal', 'Robòtica': 'subgrupo'})
+        self.assertEqual([g.name for g in self.alumno.all_groups], ['3rA', 'Robòtica'])
+
+        # El subgrupo pasa a ser principal y el antiguo principal desaparece
+        self.alumno.grupo_principal = self.optativa
+        self.alumno.save()
+        self.assertEqual(self._pertenencias(self.alumno), {'Robòtica': 'principal'})
+
+        # Cambios desde el lado del grupo (relación inversa) y clear()
+        self.tutoria.subgrupos.add(self.alumno, self.otro_alumno)
+        self.assertEqual(self._pertenencias(self.otro_alumno), {'Robòtica': 'principal', '3rA': 'subgrupo'})
+        self.tutoria.subgrupos.clear()
+        self.assertEqual(self._pertenencias(self.alumno), {'Robòtica': 'principal'})
+        self.assertEqual(self._pertenencias(self.otro_alumno), {'Robòtica': 'principal'})
+
+    def test_consultas_y_permisos_por_pertenencia(self):
+        from core.models import GroupMembership
+        self.otro_alumno.subgrupos.add(self.tutoria)
+        self.assertTrue(GroupMembership.teacher_has_student(self.teacher, self.otro_alumno.id))
+
+        client = APIClient()
+        client.force_authenticate(self.teacher)
+        response = client.get(f'/api/alumnos/{self.otro_alumno.id}/analytics/')
+        self.assertEqual(response.status_code, 200)
+        response = client.get('/api/students/', {'exclude_from_group': self.tutoria.id})
+        alumnos = response.data['results'] if 'results' in response.data else response.data
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Alumno', [s['name'] for s in alumnos])
+
+    def test_reconstruccion(self):
+        from django.core.management import call_command
+        from core.models import GroupMembership
+        GroupMembership.objects.all().delete()
+        Student.objects.filter(pk=self.alumno.pk).update(grupo_principal=self.optativa)
+        call_command('rebuild_group_memberships', stdout=mock.MagicMock())
+        self.assertEqual(self._pertenencias(self.alumno), {'Robòtica': 'principal'})
+        self.assertEqual(self._pertenencias(self.otro_alumno), {'Robòtica': 'principal'})
+
+
+class AccessScopeTests(TestCase):
+    """Ámbito de acceso del profesor: una vez por petición, caché por usuario e invalidación"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user(username='profe', password='x')
+        cls.otro = User.objects.create_user(username='otro', password='x')
+        cls.grupo = Group.objects.create(name='2nA', teacher=cls.teacher)
+        cls.grupo_otro = Group.objects.create(name='2nB', teacher=cls.otro)
+        cls.propio = Student.objects.create(name='Propio', apellidos='Test', grupo_principal=cls.grupo)
+        cls.de_subgrupo = Student.objects.create(name='Subgrupo', apellidos='Test', grupo_principal=cls.grupo_otro)
+        cls.de_subgrupo.subgrupos.add(cls.grupo)
+        cls.ajeno = Student.objects.create(name='Ajeno', apellidos='Test', grupo_principal=cls.grupo_otro)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+
+    def test_conjuntos_y_comprobaciones(self):
+        from core.services.access_scope import access_scope_service
+        scope = access_scope_service.for_user(self.teacher)
+        self.assertEqual(scope.group_ids, {self.grupo.id})
+        self.assertTrue(scope.can_view_student(self.de_subgrupo.id))
+        self.assertFalse(scope.can_manage_student(self.de_subgrupo.id))
+        self.assertTrue(scope.can_manage_student(str(self.propio.id)))
+        self.assertFalse(scope.can_view_student(self.ajeno.id))
+
+        with self.assertNumQueries(0):
+            access_scope_service.for_user(self.teacher)
+
+        # Un alumno nuevo en el grupo invalida el ámbito en caché
+        nuevo = Student.objects.create(name='Nuevo', apellidos='Test', grupo_principal=self.grupo)
+        self.assertTrue(access_scope_service.for_user(self.teacher).can_manage_student(nuevo.id))
+
+    def test_reasignar_grupo_invalida_al_profesor_anterior(self):
+        from core.services.access_scope import access_scope_service
+        self.assertTrue(access_scope_service.for_user(self.otro).can_manage_student(self.ajeno.id))
+        self.assertTrue(access_scope_service.for_user(self.teacher).can_manage_student(self.propio.id))
+
+        self.grupo_otro.teacher = self.teacher
+        self.grupo_otro.save()
+        self.assertFalse(access_scope_service.for_user(self.otro).can_manage_student(self.ajeno.id))
+        self.assertTrue(access_scope_service.for_user(self.teacher).can_manage_student(self.ajeno.id))
+
+        asignatura = Subject.objects.create(
+            name='Mates', teacher=self.teacher, days=['L'], start_time=time(9, 0), end_time=time(10, 0)
+        )
+        self.assertIn(asignatura.id, access_scope_service.for_user(self.teacher).subject_ids)
+        asignatura.teacher = self.otro
+        asignatura.save()
+        self.assertNotIn(asignatura.id, access_scope_service.for_user(self.teacher).subject_ids)
+
+    def test_permisos_en_endpoints(self):
+        self.assertEqual(self.client.get(f'/api/alumnos/{self.de_subgrupo.id}/analytics/').status_code, 200)
+        self.assertEqual(self.client.get(f'/api/alumnos/{self.ajeno.id}/analytics/').status_code, 403)
+        self.assertNotEqual(self.client.delete(f'/api/students/{self.ajeno.id}/').status_code, 204)
+        self.assertEqual(Student.objects.filter(pk=self.ajeno.pk).count(), 1)
+
+        # Rutas anidadas bajo un alumno: CanAccessStudent
+        self.assertEqual(self.client.get(f'/api/alumnos/{self.ajeno.id}/evaluaciones/').status_code, 403)
+        self.assertEqual(self.client.get(f'/api/alumnos/{self.propio.id}/evaluaciones/').status_code, 200)
+
+
+class IndexAdvisorTests(TestCase):
+    """Registro de consultas, agrupación por forma y candidatos de EXPLAIN"""
+
+    def _registro(self, lineas):
+        import os
+        import tempfile
+        fd, path = tempfile.mkstemp(suffix='.jsonl')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lineas) + '\n')
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_grabacion_y_formas(self):
+        from django.db import connection
+        from core.models import Comment
+        from core.services.index_advisor import QueryLogRecorder, group_queries, read_query_log
+
+        path = self._registro([])
+        with connection.execute_wrapper(QueryLogRecorder(path)):
+            list(Comment.objects.filter(student_id=1)[:5])
+            list(Comment.objects.filter(student_id=2)[:5])
+            list(Evaluation.objects.filter(student_id__in=[1, 2, 3]))
+            list(Evaluation.objects.filter(student_id__in=[4]))
+        with open(path, encoding='utf-8') as f:
+            formas = group_queries(read_query_log(f))
+        self.assertEqual(sorted(item['count'] for item in formas.values()), [2, 2])
+
+    def test_candidatos(self):
+        from io import StringIO
+        from django.core.management import call_command
+
+        consulta = ('SELECT "core_evaluation"."id" FROM "core_evaluation" '
+                    'WHERE "core_evaluation"."score" >= %s ORDER BY "core_evaluation"."id" ASC')
+        cubierta = ('SELECT "core_comment"."id" FROM "core_comment" '
+                    'WHERE "core_comment"."student_id" = %s ORDER BY "core_comment"."created_at" DESC')
+        path = self._registro([
+            json.dumps({'sql': consulta, 'params': [5], 'ms': 3.0}),
+            json.dumps({'sql': consulta, 'params': [7], 'ms': 2.0}),
+            json.dumps({'sql': cubierta, 'params': [1], 'ms': 1.0}),
+            json.dumps({'sql': 'INSERT INTO "core_comment" ("text") VALUES (%s)', 'params': ['x'], 'ms': 1.0}),
+            '(0.004) SELECT "core_notification"."id" FROM "core_notification" '
+            'WHERE "core_notification"."title" = \'Aviso\'; args=(\'Aviso\',); alias=default',
+        ])
+        out = StringIO()
+        call_command('index_advisor', path, stdout=out)
+        salida = out.getvalue()
+        self.assertIn('3 formas de consulta SELECT', salida)
+        self.assertIn("Evaluation: models.Index(fields=['score'])", salida)
+        self.assertIn("Notification: models.Index(fields=['title'])", salida)
+        # (student, -created_at) ya existe: sin lectura secuencial ni ordenación para los comentarios
+        self.assertNotIn('core_comment', salida.split('Índices candidatos')[1])
+        self.assertNotIn("Comment: models.Index", salida)
+
+
+class HistoryCursorPaginationTests(TestCase):
+    """Historiales paginados por cursor: sin COUNT ni OFFSET creciente"""
+
+    @classmethod
+    def setUpTestData(cls):
+        from core.models import Comment
+        cls.teacher = User.objects.create_user(username='profe', password='x')
+        cls.grupo = Group.objects.create(name='4tA', teacher=cls.teacher)
+        cls.asignatura = Subject.objects.create(
+            name='Mates', teacher=cls.teacher, days=['L'], start_time=time(9, 0), end_time=time(10, 0)
+        )
+        cls.alumno = Student.objects.create(name='Alumno', apellidos='Test', grupo_principal=cls.grupo)
+        cls.comentarios = [
+            Comment.objects.create(student=cls.alumno, author=cls.teacher, text=f'Comentario {i}') for i in range(5)
+        ]
+        Attendance.objects.bulk_create([
+            Attendance(student=cls.alumno, subject=cls.asignatura, date=date(2025, 2, d), status='presente')
+            for d in range(3, 8)
+        ])
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+
+    def _recorrer(self, url, params=None):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        paginas, consultas = [], []
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            paginas.append(response.data['results'])
+            if not response.data['next']:
+                return paginas, consultas
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(response.data['next'])
+            consultas.append([q['sql'] for q in ctx.captured_queries])
+
+    def test_comentarios(self):
+        paginas, consultas = self._recorrer('/api/comments/', {'student': self.alumno.id, 'page_size': 2})
+        self.assertEqual([len(p) for p in paginas], [2, 2, 1])
+        ids = [c['id'] for p in paginas for c in p]
+        self.assertEqual(ids, [c.id for c in reversed(self.comentarios)])
+        # Misma forma de consulta en cada página y sin COUNT(*)
+        self.assertEqual(len(consultas[0]), len(consultas[1]))
+        self.assertFalse(any('COUNT(' in sql for sql in consultas[0] + consultas[1]))
+
+    def test_asistencia_y_datos_completos(self):
+        paginas, _ = self._recorrer(f'/api/students/{self.alumno.id}/attendance/', {'page_size': 2})
+        fechas = [a['date'] for p in paginas for a in p]
+        self.assertEqual(fechas, [f'2025-02-0{d}' for d in range(7, 2, -1)])
+
+        response = self.client.get(f'/api/alumnos/{self.alumno.id}/datos_completos/', {'page_size': 3})
+        self.assertEqual(len(response.data['asistencia']), 3)
+        self.assertEqual(len(response.data['comentarios']), 3)
+        self.assertIsNone(response.data['paginacion']['evaluaciones'])
+        siguiente = response.data['paginacion']['asistencia']
+        self.assertIn('seccion=asistencia', siguiente)
+        response = self.client.get(siguiente)
+        self.assertEqual([a['date'] for a in response.data['results']], ['2025-02-04', '2025-02-03'])
+
+        cursor = siguiente.split('cursor=')[1].split('&')[0]
+        response = self.client.get(f'/api/alumnos/{self.alumno.id}/datos_completos/', {'cursor': cursor})
+        self.assertEqual(response.status_code, 400)
+
+
+class SparseFieldsetTests(TestCase):
+    """?fields= / ?expand=: columnas leídas, campos calculados y consultas por listado"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user(username='profe', password='x')
+        cls.grupo = Group.objects.create(name='4tA', course='4t ESO', teacher=cls.teacher)
+        cls.desdoble = Group.objects.create(name='4tA-Angles', course='4t ESO', teacher=cls.teacher)
+        cls.asignatura = Subject.objects.create(
+            name='Mates', teacher=cls.teacher, days=['L'], start_time=time(9, 0), end_time=time(10, 0)
+        )
+        cls.asignatura.groups.add(cls.grupo)
+        for i in range(4):
+            alumno = Student.objects.create(
+                name=f'Alumno{i}', apellidos='Test', grupo_principal=cls.grupo, medical_conditions='Asma'
+            )
+            alumno.subgrupos.add(cls.desdoble)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+
+    def _get(self, url, params=None):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        data = response.data['results'] if isinstance(response.data, dict) else response.data
+        return data, [q['sql'] for q in ctx.captured_queries]
+
+    def test_alumnos(self):
+        completo, consultas_completo = self._get('/api/students/')
+        self.assertEqual(completo[0]['subgrupos_count'], 1)
+        self.assertEqual(completo[0]['all_groups_info'][1]['name'], '4tA-Angles')
+
+        # Las consultas del listado completo no crecen con el número de alumnos
+        Student.objects.create(name='Otro', apellidos='Test', grupo_principal=self.grupo).subgrupos.add(self.desdoble)
+        cache.clear()
+        _, consultas_mas = self._get('/api/students/')
+        self.assertEqual(len(consultas_mas), len(consultas_completo))
+
+        parcial, consultas = self._get('/api/students/', {'fields': 'id,name'})
+        self.assertEqual(set(parcial[0]), {'id', 'name'})
+        self.assertLess(len(consultas), len(consultas_completo))
+        select_alumnos = next(sql for sql in consultas if 'FROM "core_student"' in sql and 'COUNT' not in sql)
+        self.assertNotIn('medical_conditions', select_alumnos)
+        self.assertNotIn('subgrupos', ' '.join(consultas))
+
+        expandido, _ = self._get('/api/students/', {'fields': 'id', 'expand': 'grupo_principal,subgrupos'})
+        self.assertEqual(expandido[0]['grupo_principal'], {'id': self.grupo.id, 'name': '4tA', 'course': '4t ESO'})
+        self.assertEqual([g['name'] for g in expandido[0]['subgrupos']], ['4tA-Angles'])
+
+    def test_grupos_y_asignaturas(self):
+        grupos, consultas = self._get('/api/groups/', {'fields': 'id,name,total_students'})
+        self.assertEqual({g['name']: g['total_students'] for g in grupos}, {'4tA': 4, '4tA-Angles': 0})
+        self.assertNotIn('core_subject', ' '.join(consultas))
+
+        asignaturas, _ = self._get('/api/subjects/', {'fields': 'id,name', 'expand': 'teacher'})
+        self.assertEqual(asignaturas[0]['teacher']['username'], 'profe')
+        self.assertEqual(set(asignaturas[0]), {'id', 'name', 'teacher'})
+
+    def test_escrituras_sin_recorte(self):
+        alumno = Student.objects.filter(grupo_principal=self.grupo).first()
+        response = self.client.patch(f'/api/students/{alumno.id}/?fields=id', {'name': 'Nuevo'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['name'], 'Nuevo')
+        self.assertIn('medical_conditions', response.data)
+
+
+class BatchOCRTests(TestCase):
+    """OCR por lotes: llamadas batch de Vision agrupadas y salida NDJSON"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user(username='profe', password='x')
+        cls.grupo = Group.objects.create(name='4tA', teacher=cls.teacher)
+        cls.alumnos = [Student.objects.create(name=f'Alumno {i}', apellidos='Test', grupo_principal=cls.grupo) for i in range(5)]
+
+    def setUp(self):
+        from google.cloud import vision_v1p3beta1 as vision
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+
+        def batch_annotate_images(requests):
+            textos = [r.image.content.decode() for r in requests]
+            return vision.BatchAnnotateImagesResponse(responses=[
+                vision.AnnotateImageResponse(full_text_annotation=vision.TextAnnotation(text=texto)) for texto in textos
+            ])
+
+        from core.services.ocr_router import ocr_router
+        self.vision_client = mock.Mock()
+        self.vision_client.batch_annotate_images.side_effect = batch_annotate_images
+        for patcher in (
+            mock.patch.object(ocr_router.vision, 'client', self.vision_client),
+            mock.patch.object(ocr_router.vision, 'batch_size', 2),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _imagenes(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        return [SimpleUploadedFile(f'p{i}.png', f'texto {i}'.encode(), content_type='image/png') for i in range(5)]
+
+    def test_lotes_y_ndjson(self):
+        from core.models import CorrectionEvidence
+        response = self.client.post('/api/ocr/procesar-lote/', {
+            'imagenes': self._imagenes(),
+            'crear_evidencias': 'true',
+            'student_ids': ','.join(str(a.id) for a in self.alumnos),
+        }, format='multipart')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lineas = [json.loads(l) for l in b''.join(response.streaming_content).decode().splitlines()]
+
+        # 5 imágenes en llamadas de 2: 3 llamadas batch_annotate_images
+        self.assertEqual(self.vision_client.batch_annotate_images.call_count, 3)
+        paginas = {l['pagina']: l['resultado'] for l in lineas[:-1]}
+        self.assertEqual(sorted(paginas), [1, 2, 3, 4, 5])
+        self.assertEqual(paginas[4]['text'], 'texto 3')
+        self.assertEqual(paginas[4]['processing_info']['engine'], 'google_vision')
+        self.assertEqual(lineas[-1]['resumen'], {'total': 5, 'procesadas': 5, 'fallidas': 0, 'evidencias_creadas': 5})
+        evidencia = CorrectionEvidence.objects.get(student=self.alumnos[2])
+        self.assertEqual(evidencia.original_text, 'texto 2')
+        self.assertEqual(evidencia.ocr_info['page'], 3)
+
+    def test_student_ids_no_numericos(self):
+        response = self.client.post('/api/ocr/procesar-lote/', {
+            'imagenes': self._imagenes(),
+            'crear_evidencias': 'true',
+            'student_ids': 'uno,dos',
+        }, format='multipart')
+        self.assertEqual(response.status_code, 400)
+        self.vision_client.batch_annotate_images.assert_not_called()
+
+    def test_pdf_de_dos_paginas(self):
+        from google.cloud import vision_v1 as vision_files
+        from core.services.ocr_router import ocr_router
+
+        files_client = mock.Mock()
+        files_client.batch_annotate_files.return_value = vision_files.BatchAnnotateFilesResponse(responses=[
+            vision_files.AnnotateFileResponse(total_pages=2, responses=[
+                vision_files.AnnotateImageResponse(
+                    full_text_annotation=vision_files.TextAnnotation(text=f'página {n}'),
+                    context=vision_files.ImageAnnotationContext(page_number=n),
+                )
+                for n in (1, 2)
+            ])
+        ])
+        with mock.patch.object(ocr_router.vision, 'files_client', files_client):
+            paginas = dict(ocr_router.vision.iter_pdf_handwritten_text(b'%PDF-1.4'))
+
+        # Una sola llamada y sin pedir páginas que el PDF no tiene
+        files_client.batch_annotate_files.assert_called_once()
+        peticion = files_client.batch_annotate_files.call_args.kwargs['requests'][0]
+        self.assertEqual(list(peticion.pages), [])
+        self.assertEqual({n: r['text'] for n, r in paginas.items()}, {1: 'página 1', 2: 'página 2'})
+
+
+class OCRRouterFallbackTests(TestCase):
+    """Respaldo de Vision a Tesseract ante cuota o red, en imágenes sueltas y por lotes"""
+
+    def setUp(self):
+        from core.services.google_vision_ocr_service import google_vision_ocr_client
+        from core.services.ocr_router import OCRRouter
+        cache.clear()
+        self.vision_client = mock.Mock()
+        for patcher in (
+            mock.patch.object(google_vision_ocr_client, 'client', self.vision_client),
+            mock.patch.object(google_vision_ocr_client, 'batch_size', 2),
+            mock.patch.object(google_vision_ocr_client, 'batch_concurrency', 1),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        def local_ocr(path, language_hint):
+            with open(path, 'rb') as f:
+                texto = f.read().decode()
+            return {'text': texto, 'words': [], 'confidence': 0.9, 'word_count': 1, 'language_hint': language_hint,
+                    'processing_info': {'success': True, 'error': None}}
+
+        self.local_client = mock.Mock(client=True)
+        self.local_client.detect_handwritten_text.side_effect = local_ocr
+        self.router = OCRRouter(vision_client=google_vision_ocr_client, local_client=self.local_client)
+
+    def test_imagen_suelta(self):
+        import tempfile
+        from google.api_core import exceptions as gcp_exceptions
+        from core.services.google_vision_ocr_service import GoogleVisionOCRError
+        from core.services.ocr_router import VISION_COOLDOWN_KEY
+
+        with tempfile.NamedTemporaryFile(suffix='.png') as imagen:
+            imagen.write(b'hola')
+            imagen.flush()
+            with mock.patch.object(self.router.vision, 'detect_handwritten_text') as detect:
+                error = GoogleVisionOCRError('sin cuota')
+                error.__cause__ = gcp_exceptions.ResourceExhausted('quota')
+                detect.side_effect = error
+                resultado = self.router.detect_text(imagen.name)
+                self.assertEqual(resultado['text'], 'hola')
+                self.assertEqual(resultado['processing_info']['engine'], 'tesseract')
+                self.assertEqual(resultado['processing_info']['fallback_reason'], 'quota')
+                self.assertEqual(cache.get(VISION_COOLDOWN_KEY), 'quota')
+
+                # Durante la pausa no se vuelve a llamar a Vision
+                resultado = self.router.detect_text(imagen.name)
+                self.assertEqual(detect.call_count, 1)
+                self.assertEqual(resultado['processing_info']['fallback_reason'], 'quota_cooldown')
+
+                # Un error no recuperable no pasa a Tesseract
+                cache.clear()
+                detect.side_effect = GoogleVisionOCRError('imagen corrupta')
+                with self.assertRaises(GoogleVisionOCRError):
+                    self.router.detect_text(imagen.name)
+
+    def test_lote(self):
+        from google.api_core import exceptions as gcp_exceptions
+        from google.cloud import vision_v1p3beta1 as vision
+
+        respuestas = [
+            vision.BatchAnnotateImagesResponse(responses=[
+                vision.AnnotateImageResponse(full_text_annotation=vision.TextAnnotation(text=t)) for t in ('v0', 'v1')
+            ]),
+            gcp_exceptions.ServiceUnavailable('caída'),
+        ]
+        self.vision_client.batch_annotate_images.side_effect = respuestas
+        imagenes = [f'local {i}'.encode() for i in range(5)]
+        resultados = dict(self.router.iter_batch_handwritten_text(imagenes))
+
+        # El segundo lote falla: sus imágenes se repiten con Tesseract y el tercero ya no llama a Vision
+        self.assertEqual(self.vision_client.batch_annotate_images.call_count, 2)
+        self.assertEqual([resultados[i]['text'] for i in range(5)], ['v0', 'v1', 'local 2', 'local 3', 'local 4'])
+        self.assertEqual(
+            [(r['processing_info']['engine'], r['processing_info']['fallback_reason']) for _, r in sorted(resultados.items())],
+            [('google_vision', None), ('google_vision', None), ('tesseract', 'network'), ('tesseract', 'network'),
+             ('tesseract', 'network_cooldown')],
+        )
+        self.assertTrue(all(r['processing_info']['success'] for r in resultados.values()))
+
+
+    def test_estado_y_motor_en_la_evidencia(self):
+        import tempfile
+        from google.api_core import exceptions as gcp_exceptions
+        from core.models import CorrectionEvidence
+        from core.services.google_vision_ocr_service import GoogleVisionOCRError
+
+        teacher = User.objects.create_user(username='profe', password='x')
+        alumno = Student.objects.create(
+            name='Ana', apellidos='Test', grupo_principal=Group.objects.create(name='4tB', teacher=teacher)
+        )
+        client = APIClient()
+        client.force_authenticate(teacher)
+
+        with tempfile.NamedTemporaryFile(suffix='.png') as imagen:
+            imagen.write(b'hola')
+            imagen.flush()
+            with mock.patch.object(self.router.vision, 'detect_handwritten_text') as detect:
+                error = GoogleVisionOCRError('sin red')
+                error.__cause__ = gcp_exceptions.ServiceUnavailable('503')
+                detect.side_effect = error
+                resultado = self.router.detect_text(imagen.name)
+
+        with mock.patch('core.views.ocr_router', self.router):
+            estado = client.get('/api/ocr/estado/').data
+        self.assertTrue(estado['disponible'])
+        self.assertEqual(estado['vision_en_pausa'], 'network')
+        self.assertEqual(estado['servidas'], {'google_vision': 0, 'tesseract': 1})
+
+        # La evidencia de una imagen suelta guarda el motor recibido en ocr_info (JSON en multipart)
+        response = client.post('/api/correccion/guardar-evidencia/', {
+            'student_id': alumno.id,
+            'original_text': resultado['text'],
+            'corrected_text': resultado['text'],
+            'correction_type': 'ocr',
+            'ocr_info': json.dumps({'engine': resultado['processing_info']['engine'], 'confianza': 0.9}),
+        }, format='multipart')
+        self.assertIn(response.status_code, (200, 201))
+        self.assertEqual(CorrectionEvidence.objects.get(student=alumno).ocr_info['engine'], 'tesseract')
+
+
+class LanguageToolIncrementalTests(TestCase):
+    """Corrección por párrafos: empaquetado de peticiones, offsets y reutilización de caché"""
+
+    def setUp(self):
+        import re
+        from core.services.languagetool_service import LanguageToolService
+        cache.clear()
+        self.service = LanguageToolService()
+        self.peticiones = []
+
+        def enviar_check(data, backends=None):
+            # Un error por cada aparición de "malo" en el texto recibido
+            self.peticiones.append(data['text'])
+            response = mock.Mock(status_code=200)
+            response.json.return_value = {'matches': [
+                {'offset': m.start(), 'length': 4, 'message': 'Palabra', 'rule': {'id': 'MORFOLOGIK_RULE_ES'}}
+                for m in re.finditer('malo', data['text'])
+            ]}
+            return response
+
+        patcher = mock.patch.object(self.service, '_enviar_check', side_effect=enviar_check)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _texto(self, parrafos):
+        return '\n\n'.join(parrafos)
+
+    def test_empaquetado_y_offsets(self):
+        parrafos = [f'Párrafo {i} con un error malo y otro malo.' for i in range(6)]
+        texto = self._texto(parrafos)
+        self.service.chunk_length = 100
+
+        resultado = self.service.corregir_texto_incremental(texto)
+        # 6 párrafos de 41 caracteres en peticiones de hasta 100: 3 peticiones de 2 párrafos
+        self.assertEqual(len(self.peticiones), 3)
+        self.assertEqual(self.peticiones[0], self._texto(parrafos[:2]))
+        self.assertEqual(resultado['incremental']['peticiones'], 3)
+        self.assertEqual(resultado['total_errors'], 12)
+        self.assertTrue(all(texto[m['offset']:m['offset'] + m['length']] == 'malo' for m in resultado['matches']))
+        self.assertEqual(sorted(m['offset'] for m in resultado['matches']),
+                         [m['offset'] for m in resultado['matches']])
+
+    def test_reutiliza_cache(self):
+        parrafos = ['Primer párrafo malo.', 'Segundo párrafo correcto.', 'Tercer párrafo.']
+        self.service.corregir_texto_incremental(self._texto(parrafos))
+        self.assertEqual(len(self.peticiones), 1)
+
+        # Solo el párrafo modificado viaja; los demás salen de caché con sus offsets recolocados
+        parrafos[1] = 'Segundo párrafo ahora malo, bastante más largo.'
+        texto = self._texto(parrafos)
+        resultado = self.service.corregir_texto_incremental(texto)
+        self.assertEqual(self.peticiones[1:], [parrafos[1]])
+        self.assertEqual(resultado['incremental'], {
+            'segmentos': 3, 'corregidos': 1, 'reutilizados': 2, 'fallidos': 0, 'peticiones': 1,
+        })
+        self.assertEqual([m['offset'] for m in resultado['matches']],
+                         [texto.index('malo'), texto.index('malo', texto.index('Segundo'))])
+
+
+class LanguageToolBackendTests(TestCase):
+    """Backends de LanguageTool: respaldo ante fallos, penalización temporal y health check"""
+
+    def setUp(self):
+        from core.services.languagetool_service import LanguageToolBackend, LanguageToolService
+        cache.clear()
+        self.service = LanguageToolService()
+        self.local = LanguageToolBackend('local', 'http://lt.local/v2', 5, retry_after=30)
+        self.public = LanguageToolBackend('public', LanguageToolService.BASE_URL, 5, retry_after=30)
+        for backend in (self.local, self.public):
+            backend.session = mock.Mock()
+            backend.session.post.return_value = mock.Mock(status_code=200)
+        self.service.backends = [self.local, self.public]
+
+    def _respuesta(self, status_code):
+        return mock.Mock(status_code=status_code)
+
+    def test_respaldo_ante_conexion_5xx_y_429(self):
+        import requests
+        self.local.session.post.side_effect = requests.exceptions.ConnectionError('caído')
+        self.assertEqual(self.service._enviar_check({'text': 'a'}).status_code, 200)
+        self.public.session.post.assert_called_once()
+        self.assertFalse(self.local.is_available())
+
+        self.local.mark_up()
+        self.local.session.post.side_effect = None
+        self.local.session.post.return_value = self._respuesta(503)
+        self.assertEqual(self.service._enviar_check({'text': 'a'}).status_code, 200)
+        self.assertFalse(self.local.is_available())
+
+        # 429: se usa el respaldo, pero el servidor sigue en la rotación
+        self.local.mark_up()
+        self.local.session.post.return_value = self._respuesta(429)
+        self.assertEqual(self.service._enviar_check({'text': 'a'}).status_code, 200)
+        self.assertTrue(self.local.is_available())
+        self.assertEqual(self.public.session.post.call_count, 3)
+
+    def test_backend_penalizado_hasta_retry_after(self):
+        with mock.patch('core.services.languagetool_service.time.monotonic', return_value=1000.0):
+            self.local.mark_down()
+            self.service._enviar_check({'text': 'a'})
+            self.local.session.post.assert_not_called()
+        with mock.patch('core.services.languagetool_service.time.monotonic', return_value=1031.0):
+            self.service._enviar_check({'text': 'a'})
+            self.local.session.post.assert_called_once()
+        self.public.session.post.assert_called_once()
+
+    def test_ultimo_backend_devuelve_su_respuesta(self):
+        import requests
+        self.local.session.post.return_value = self._respuesta(502)
+        self.public.session.post.return_value = self._respuesta(503)
+        self.assertEqual(self.service._enviar_check({'text': 'a'}).status_code, 503)
+
+        # Si ningún backend responde se relanza el último error de conexión
+        self.local.mark_up()
+        for backend in (self.local, self.public):
+            backend.session.post.side_effect = requests.exceptions.Timeout('lento')
+        with self.assertRaises(requests.exceptions.Timeout):
+            self.service._enviar_check({'text': 'a'})
+
+    def test_health_status_cacheado_sin_penalizar(self):
+        import requests
+        self.local.session.get.return_value = self._respuesta(200)
+        self.public.session.get.side_effect = requests.exceptions.ConnectionError('sin red')
+
+        estado = {b['backend']: b for b in self.service.health_status()}
+        self.assertTrue(estado['local']['healthy'])
+        self.assertFalse(estado['public']['healthy'])
+        # Un health check fallido no saca al backend de la rotación
+        self.assertTrue(estado['public']['available'])
+        self.assertTrue(self.public.is_available())
+
+        # Dentro del TTL no se vuelve a consultar a los servidores
+        self.local.mark_down()
+        estado = {b['backend']: b for b in self.service.health_status()}
+        self.assertEqual(self.local.session.get.call_count, 1)
+        self.assertEqual(self.public.session.get.call_count, 1)
+        self.assertFalse(estado['local']['available'])
+
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username='profe', password='x'))
+        with mock.patch('core.views.languagetool_service', self.service):
+            response = client.get('/api/correccion/estado/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['disponible'])
+        self.assertEqual(self.local.session.get.call_count, 1)
+
+
+class ResearchSearchCacheTests(TestCase):
+    """Búsqueda combinada: solo se cachea cuando responden las dos fuentes"""
+
+    def setUp(self):
+        cache.clear()
+
+    def _respuesta(self, url, params=None, timeout=None):
+        if 'semanticscholar' in url:
+            if self.semantic_falla:
+                return mock.Mock(status_code=429)
+            datos = {'data': [{'title': 'Feedback formativo', 'year': 2020, 'citationCount': 10, 'authors': []}]}
+        else:
+            datos = {'results': [{'title': 'Evaluación entre iguales', 'publication_year': 2021, 'cited_by_count': 3}]}
+        return mock.Mock(status_code=200, json=mock.Mock(return_value=datos))
+
+    def test_fuente_fallida_no_se_cachea(self):
+        from core.services.research_search import research_search_service
+        self.semantic_falla = True
+        with mock.patch('core.services.research_search.requests.get', side_effect=self._respuesta) as get, \
+                mock.patch.object(research_search_service, '_store_in_local_index'):
+            papers = research_search_service.search_combined('evaluación formativa')
+            self.assertEqual([p['source'] for p in papers], ['OpenAlex'])
+            research_search_service.search_combined('evaluación formativa')
+            self.assertEqual(get.call_count, 4)
+
+            # Con las dos fuentes respondiendo, la siguiente búsqueda sale de caché
+            self.semantic_falla = False
+            papers = research_search_service.search_combined('evaluación formativa')
+            self.assertEqual(len(papers), 2)
+            research_search_service.search_combined('Evaluación  formativa')
+            self.assertEqual(get.call_count, 6)
+
+
+class PaperIndexTests(TestCase):
+    """Corpus local de papers: altas/actualizaciones, búsqueda a texto completo y uso desde el agente"""
+
+    PAPERS = [
+        {'title': 'Evaluación formativa en secundaria', 'abstract': 'Efecto del feedback formativo en el aprendizaje',
+         'year': 2019, 'authors': ['A'], 'url': 'u1', 'citations': 40, 'source': 'OpenAlex'},
+        {'title': 'Rúbricas y autoevaluación', 'abstract': 'Sin resumen disponible',
+         'year': 2021, 'authors': ['B'], 'url': 'u2', 'citations': 12, 'source': 'Semantic Scholar'},
+        {'title': 'Gestión del aula', 'abstract': 'Normas y rutinas', 'year': 2015, 'authors': [], 'url': '',
+         'citations': 5, 'source': 'OpenAlex'},
+    ]
+
+    def test_altas_y_actualizaciones(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from core.models import ResearchPaper
+        from core.services.paper_index import paper_index_service
+
+        self.assertEqual(paper_index_service.add_papers(self.PAPERS), 3)
+        actualizado = {**self.PAPERS[1], 'title': 'RÚBRICAS y autoevaluación!', 'citations': 30,
+                       'abstract': 'Uso de rúbricas para la autoevaluación del alumnado'}
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(paper_index_service.add_papers([actualizado, self.PAPERS[0]]), 0)
+        # Bloqueo en orden de title_key para que dos búsquedas concurrentes no se bloqueen mutuamente
+        seleccion = next(q['sql'] for q in ctx.captured_queries if q['sql'].startswith('SELECT'))
+        self.assertIn('ORDER BY "core_researchpaper"."title_key"', seleccion)
+
+        paper = ResearchPaper.objects.get(url='u2')
+        self.assertEqual((paper.citations, paper.times_retrieved), (30, 2))
+        self.assertEqual(paper.abstract, 'Uso de rúbricas para la autoevaluación del alumnado')
+        self.assertEqual(ResearchPaper.objects.count(), 3)
+
+    def test_busqueda_local(self):
+        from core.services.paper_index import paper_index_service
+        paper_index_service.add_papers(self.PAPERS)
+        paper_index_service.ensure_index()  # idempotente sobre el índice creado por la migración
+
+        resultados = paper_index_service.search('¿Qué dice la evidencia sobre la evaluacion formativa?')
+        self.assertEqual([p['title'] for p in resultados], ['Evaluación formativa en secundaria'])
+        self.assertEqual(paper_index_service.search('rutinas de aula')[0]['title'], 'Gestión del aula')
+        self.assertEqual(paper_index_service.search('metacognición'), [])
+
+    def test_agente_completa_con_fuentes_externas(self):
+        from core.services.educational_research_agent import educational_research_agent
+        from core.services.paper_index import paper_index_service
+        from core.services.research_search import research_search_service
+        paper_index_service.add_papers(self.PAPERS)
+        externo = {**self.PAPERS[0], 'citations': 90, 'source': 'Semantic Scholar'}
+
+        with mock.patch.object(research_search_service, 'search_combined', return_value=[externo]) as externa, \
+                mock.patch.object(educational_research_agent, 'generate_response', return_value={'success': True}) as generar:
+            educational_research_agent.process_question('evaluación formativa en secundaria')
+        externa.assert_called_once()
+        papers = generar.call_args[0][1]
+        # Mismo título en local y externo: queda uno, con más citaciones
+        self.assertEqual([(p['title'], p['citations']) for p in papers], [('Evaluación formativa en secundaria', 90)])
+
+
+class ChatSessionStatsTests(TestCase):
+    """Campos desnormalizados de ChatSession y mensajes paginados por cursor"""
+
+    def setUp(self):
+        from core.models import ChatMessage, ChatSession
+        self.user = User.objects.create_user(username='profe', password='x')
+        self.chat = ChatSession.objects.create(user=self.user)
+        self.otro = ChatSession.objects.create(user=self.user)
+        self.mensajes = [
+            ChatMessage.objects.create(chat=self.chat, sender='user' if i % 2 == 0 else 'assistant', content=f'Mensaje {i}')
+            for i in range(5)
+        ]
+        ChatMessage.objects.create(chat=self.otro, sender='user', content='Otro 0')
+        ChatMessage.objects.create(chat=self.otro, sender='assistant', content='Otro 1')
+
+    def _estadisticas(self, chat):
+        chat.refresh_from_db()
+        return chat.message_count, chat.last_message_preview
+
+    def test_altas_ediciones_y_borrados(self):
+        self.assertEqual(self._estadisticas(self.chat), (5, 'Mensaje 4'))
+
+        # Editar un mensaje antiguo no cambia la vista previa
+        self.mensajes[1].content = 'Editado'
+        self.mensajes[1].save()
+        self.assertEqual(self._estadisticas(self.chat), (5, 'Mensaje 4'))
+
+        self.mensajes[4].delete()
+        self.assertEqual(self._estadisticas(self.chat), (4, 'Mensaje 3'))
+
+    def test_borrado_masivo_recalcula_una_vez_por_sesion(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from core.models import ChatMessage
+
+        with CaptureQueriesContext(connection) as ctx:
+            ChatMessage.objects.filter(content__in=['Mensaje 3', 'Mensaje 4', 'Otro 1']).delete()
+        recuentos = [q['sql'] for q in ctx.captured_queries if 'COUNT(' in q['sql']]
+        self.assertEqual(len(recuentos), 2)
+        self.assertEqual(self._estadisticas(self.chat), (3, 'Mensaje 2'))
+        self.assertEqual(self._estadisticas(self.otro), (1, 'Otro 0'))
+
+    def test_borrar_sesion_no_recalcula(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from core.models import ChatSession
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.chat.delete()
+        self.assertFalse(any('COUNT(' in q['sql'] or q['sql'].startswith('UPDATE') for q in ctx.captured_queries))
+        self.assertFalse(ChatSession.objects.filter(pk=self.chat.pk).exists())
+
+        # Borrado de sesiones en cascada desde el usuario
+        with CaptureQueriesContext(connection) as ctx:
+            self.user.delete()
+        self.assertFalse(any('COUNT(' in q['sql'] and 'core_chatmessage' in q['sql'] for q in ctx.captured_queries))
+        self.assertFalse(ChatSession.objects.exists())
+
+    def test_mensajes_por_cursor(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get(f'/api/ai/chat/{self.chat.id}/messages/', {'page_size': 2})
+        self.assertEqual(response.status_code, 200)
+        contenidos = [m['content'] for m in response.data['results']]
+        while response.data['next']:
+            response = client.get(response.data['next'])
+            contenidos += [m['content'] for m in response.data['results']]
+        self.assertEqual(contenidos, [f'Mensaje {i}' for i in range(4, -1, -1)])
+
+        ajeno = User.objects.create_user(username='ajeno', password='x')
+        client.force_authenticate(ajeno)
+        self.assertEqual(client.get(f'/api/ai/chat/{self.chat.id}/messages/').status_code, 404)
+
+
+class CustomEvaluationSubmitTests(TestCase):
+    """Envío de autoevaluaciones por QR: upsert, reintentos idempotentes y lista de alumnos cacheada"""
+
+    PREGUNTAS = [
+        {'id': 1, 'text': 'Participación', 'type': 'likert'},
+        {'id': 2, 'text': 'Dificultad', 'type': 'multiple_choice', 'options': ['Baja', 'Alta']},
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        from core.models import CustomEvaluation
+        cls.teacher = User.objects.create_user(username='profe', password='x')
+        cls.grupo = Group.objects.create(name='4tA', teacher=cls.teacher)
+        cls.otro_grupo = Group.objects.create(name='4tB', teacher=cls.teacher)
+        cls.alumno = Student.objects.create(name='Ana', apellidos='Test', grupo_principal=cls.grupo)
+        cls.evaluacion = CustomEvaluation.objects.create(
+            title='Proyecto', group=cls.grupo, teacher=cls.teacher, questions=cls.PREGUNTAS
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_upsert_e_idempotencia(self):
+        from core.models import CustomEvaluationStats, EvaluationResponse
+        from core.services.custom_evaluation_service import SubmissionError, custom_evaluation_service
+
+        respuestas = {'1': '4', '2': 'Alta'}
+        resultado = custom_evaluation_service.submit(self.evaluacion.id, str(self.alumno.id), respuestas)
+        self.assertEqual((resultado['created'], resultado['duplicate']), (True, False))
+
+        # Reintento con las mismas respuestas: se devuelve el envío guardado sin tocar nada
+        resultado = custom_evaluation_service.submit(self.evaluacion.id, self.alumno.id, dict(respuestas))
+        self.assertEqual((resultado['created'], resultado['duplicate']), (False, True))
+        self.assertEqual(EvaluationResponse.objects.count(), 1)
+        self.assertEqual(SelfEvaluation.objects.filter(student=self.alumno).count(), 1)
+        self.assertEqual(CustomEvaluationStats.objects.get(pk=self.evaluacion.pk).response_count, 1)
+
+        # Respuestas distintas sin intentos múltiples: rechazo
+        with self.assertRaises(SubmissionError) as ctx:
+            custom_evaluation_service.submit(self.evaluacion.id, self.alumno.id, {'1': '2', '2': 'Baja'})
+        self.assertEqual(ctx.exception.status_code, 400)
+
+        # Con intentos múltiples se actualiza la fila y las estadísticas restan la respuesta anterior
+        self.evaluacion.allow_multiple_attempts = True
+        self.evaluacion.save()
+        resultado = custom_evaluation_service.submit(self.evaluacion.id, self.alumno.id, {'1': '2', '2': 'Baja'})
+        self.assertEqual((resultado['created'], resultado['duplicate']), (False, False))
+        self.assertEqual(EvaluationResponse.objects.get().responses, {'1': '2', '2': 'Baja'})
+        stats = CustomEvaluationStats.objects.get(pk=self.evaluacion.pk)
+        self.assertEqual(stats.response_count, 1)
+        self.assertEqual(stats.stats['1']['sum'], 2)
+        self.assertEqual(stats.stats['2']['options'], {'Alta': 0, 'Baja': 1})
+
+    def test_errores_de_envio(self):
+        import uuid
+        from core.services.custom_evaluation_service import SubmissionError, custom_evaluation_service
+        casos = [
+            (uuid.uuid4(), self.alumno.id, {'1': '3'}, 404),
+            (self.evaluacion.id, 'abc', {'1': '3'}, 400),
+            (self.evaluacion.id, self.alumno.id, {}, 400),
+        ]
+        for evaluacion_id, alumno_id, respuestas, codigo in casos:
+            with self.assertRaises(SubmissionError) as ctx:
+                custom_evaluation_service.submit(evaluacion_id, alumno_id, respuestas)
+            self.assertEqual(ctx.exception.status_code, codigo)
+
+    def test_cambio_de_grupo_invalida_ambas_listas(self):
+        from core.models import CustomEvaluation
+        from core.services.custom_evaluation_service import SubmissionError, custom_evaluation_service
+        otra = CustomEvaluation.objects.create(title='Otra', group=self.otro_grupo, teacher=self.teacher, questions=self.PREGUNTAS)
+        self.assertIn(self.alumno.id, custom_evaluation_service.get_definition(self.evaluacion.id)['student_ids'])
+        self.assertNotIn(self.alumno.id, custom_evaluation_service.get_definition(otra.id)['student_ids'])
+
+        self.alumno.grupo_principal = self.otro_grupo
+        self.alumno.save()
+        self.assertNotIn(self.alumno.id, custom_evaluation_service.get_definition(self.evaluacion.id)['student_ids'])
+        self.assertIn(self.alumno.id, custom_evaluation_service.get_definition(otra.id)['student_ids'])
+        with self.assertRaises(SubmissionError) as ctx:
+            custom_evaluation_service.submit(self.evaluacion.id, self.alumno.id, {'1': '3'})
+        self.assertEqual(ctx.exception.status_code, 404)
+
+
+class CustomEvaluationStatsTests(TestCase):
+    """Agregados por pregunta de las autoevaluaciones: incrementales, recálculo y exportación"""
+
+    PREGUNTAS = CustomEvaluationSubmitTests.PREGUNTAS + [{'id': 3, 'text': 'Comentario', 'type': 'text'}]
+
+    @classmethod
+    def setUpTestData(cls):
+        from core.models import CustomEvaluation, EvaluationResponse
+        cls.teacher = User.objects.create_user(username='profe', password='x')
+        cls.grupo = Group.objects.create(name='4tA', teacher=cls.teacher)
+        cls.alumnos = [Student.objects.create(name=f'Alumno {i}', apellidos='Test', grupo_principal=cls.grupo) for i in range(3)]
+        cls.evaluacion = CustomEvaluation.objects.create(
+            title='Proyecto', group=cls.grupo, teacher=cls.teacher, questions=cls.PREGUNTAS
+        )
+        cls.respuestas = [
+            {'1': '5', '2': 'Alta', '3': 'Bien'},
+            {'1': '3', '2': 'Baja', '3': ''},
+            {'1': 'x', '2': 'Alta'},
+        ]
+        for alumno, respuestas in zip(cls.alumnos, cls.respuestas):
+            EvaluationResponse.objects.create(evaluation=cls.evaluacion, student=alumno, responses=respuestas)
+
+    def test_apply_response(self):
+        from core.models import CustomEvaluationStats
+        stats = CustomEvaluationStats(evaluation=self.evaluacion)
+        for respuestas in self.respuestas:
+            stats.apply_response(self.PREGUNTAS, respuestas)
+        self.assertEqual(stats.response_count, 3)
+        # Likert no numérico y texto vacío no cuentan
+        self.assertEqual(stats.stats['1'], {'type': 'likert', 'count': 2, 'sum': 8, 'histogram': {'5': 1, '3': 1}})
+        self.assertEqual(stats.stats['2'], {'type': 'multiple_choice', 'count': 3, 'options': {'Alta': 2, 'Baja': 1}})
+        self.assertEqual(stats.stats['3'], {'type': 'text', 'count': 1})
+
+        stats.apply_response(self.PREGUNTAS, self.respuestas[0], sign=-1)
+        self.assertEqual(stats.response_count, 2)
+        self.assertEqual(stats.stats['1'], {'type': 'likert', 'count': 1, 'sum': 3, 'histogram': {'5': 0, '3': 1}})
+        self.assertEqual(stats.stats['2']['options'], {'Alta': 1, 'Baja': 1})
+
+    def test_recalculo_desde_respuestas(self):
+        from core.models import CustomEvaluationStats, EvaluationResponse
+        from core.services.custom_evaluation_service import custom_evaluation_service
+
+        resultados = custom_evaluation_service.get_results(self.evaluacion)
+        self.assertEqual(resultados['response_count'], 3)
+        likert = resultados['questions'][0]
+        self.assertEqual((likert['count'], likert['mean']), (2, 4.0))
+        self.assertEqual(likert['histogram'], {'1': 0, '2': 0, '3': 1, '4': 0, '5': 1})
+        self.assertEqual(resultados['questions'][1]['options'], {'Baja': 1, 'Alta': 2})
+
+        # Borrar una respuesta marca las estadísticas y la siguiente lectura las recalcula
+        EvaluationResponse.objects.filter(student=self.alumnos[0]).delete()
+        self.assertEqual(CustomEvaluationStats.objects.get(pk=self.evaluacion.pk).questions_hash, '')
+        resultados = custom_evaluation_service.get_results(self.evaluacion)
+        self.assertEqual(resultados['response_count'], 2)
+        self.assertEqual(resultados['questions'][0]['mean'], 3.0)
+
+        # Editar las preguntas también fuerza el recálculo (opciones que ya no existen se conservan)
+        self.evaluacion.questions = [{'id': 2, 'text': 'Dificultad', 'type': 'multiple_choice', 'options': ['Baja', 'Media']}]
+        self.evaluacion.save()
+        resultados = custom_evaluation_service.get_results(self.evaluacion)
+        self.assertEqual(resultados['questions'][0]['options'], {'Baja': 1, 'Media': 0, 'Alta': 1})
+
+    def test_exportacion(self):
+        client = APIClient()
+        client.force_authenticate(self.teacher)
+        url = f'/api/custom-evaluations/{self.evaluacion.id}/export/'
+
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        lineas = b''.join(response.streaming_content).decode('utf-8').lstrip('\ufeff').splitlines()
+        self.assertEqual(lineas[0], 'student_id,alumno,enviado,Participación,Dificultad,Comentario')
+        self.assertEqual(len(lineas), 4)
+        self.assertTrue(lineas[1].startswith(f'{self.alumnos[0].id},Alumno 0 Test,'))
+        self.assertTrue(lineas[1].endswith(',5,Alta,Bien'))
+
+        response = client.get(url, {'formato': 'ndjson'})
+        filas = [json.loads(l) for l in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([f['responses'] for f in filas], self.respuestas)
+
+
+class ConversationMemoryTests(TestCase):
+    """Memoria del chat: ventana de los mensajes más recientes y resumen acotado por tramos"""
+
+    def setUp(self):
+        from core.models import ChatSession
+        self.user = User.objects.create_user(username='profe', password='x')
+        self.chat = ChatSession.objects.create(user=self.user)
+
+    def _mensajes(self, n, desde=0):
+        from core.models import ChatMessage
+        return [
+            ChatMessage.objects.create(chat=self.chat, sender='user' if i % 2 == 0 else 'assistant', content=f'Mensaje {i}')
+            for i in range(desde, desde + n)
+        ]
+
+    def _respuesta(self, texto):
+        return {'choices': [{'message': {'content': texto}}]}
+
+    def test_ventana_con_los_mas_recientes(self):
+        from core.services.conversation_memory import conversation_memory
+        mensajes = self._mensajes(20)
+        with mock.patch.object(conversation_memory, 'max_window', 6):
+            contexto = conversation_memory.build_context(self.chat, before_id=mensajes[-1].id)
+        historial = [m['content'] for m in contexto['history']]
+        # Los 6 anteriores a la pregunta actual, que queda excluida
+        self.assertEqual(historial, [f'Mensaje {i}' for i in range(13, 19)])
+        self.assertEqual(contexto['history'][0]['sender'], 'assistant')
+
+    def test_presupuesto_de_tokens(self):
+        from core.services.conversation_memory import conversation_memory
+        mensajes = [{'sender': 'user', 'content': 'a' * 40} for _ in range(5)]
+        self.assertEqual(len(conversation_memory.fit_to_budget(mensajes, budget=25)), 2)
+        # Un único mensaje demasiado largo se trunca en lugar de descartarse
+        truncado = conversation_memory.fit_to_budget([{'sender': 'user', 'content': 'b' * 400}], budget=10)
+        self.assertEqual(truncado[0]['content'], 'b' * 40 + '…')
+
+    def test_resumen_solo_al_superar_el_umbral(self):
+        from core.services.conversation_memory import conversation_memory
+        with mock.patch.object(conversation_memory, 'summary_every', 2), \
+                mock.patch.object(conversation_memory, 'keep_recent', 2), \
+                mock.patch('core.services.conversation_memory.openrouter_client') as cliente:
+            cliente.chat_completion.return_value = self._respuesta('Resumen 1')
+            mensajes = self._mensajes(5)
+            self.assertFalse(conversation_memory.update_summary(self.chat))
+            cliente.chat_completion.assert_not_called()
+
+            mensajes += self._mensajes(1, desde=5)
+            self.assertTrue(conversation_memory.update_summary(self.chat))
+            self.chat.refresh_from_db()
+            self.assertEqual((self.chat.summary, self.chat.summary_upto_id), ('Resumen 1', mensajes[3].id))
+
+            # El resumen deja fuera los mensajes resumidos
+            contexto = conversation_memory.build_context(self.chat)
+            self.assertEqual([m['content'] for m in contexto['history']], ['Mensaje 4', 'Mensaje 5'])
+            self.assertFalse(conversation_memory.update_summary(self.chat))
+
+    def test_no_pisa_un_resumen_concurrente(self):
+        from core.models import ChatSession
+        from core.services.conversation_memory import conversation_memory
+        mensajes = self._mensajes(12)
+        obsoleto = ChatSession.objects.get(pk=self.chat.pk)
+        # Otra petición ya resumió la conversación
+        ChatSession.objects.filter(pk=self.chat.pk).update(summary='Otro', summary_upto_id=mensajes[7].id)
+        with mock.patch('core.services.conversation_memory.openrouter_client') as cliente:
+            cliente.chat_completion.return_value = self._respuesta('Tardío')
+            self.assertFalse(conversation_memory.update_summary(obsoleto))
+        self.chat.refresh_from_db()
+        self.assertEqual(self.chat.summary, 'Otro')
+
+    def test_prompt_acotado_aunque_falle_el_llm(self):
+        from core.services.conversation_memory import conversation_memory
+        mensajes = self._mensajes(60)
+        with mock.patch('core.services.conversation_memory.openrouter_client') as cliente:
+            cliente.chat_completion.side_effect = RuntimeError('LLM caído')
+            for _ in range(3):
+                self.assertFalse(conversation_memory.update_summary(self.chat))
+            self.assertEqual(cliente.chat_completion.call_count, 3)
+            prompts = [c.kwargs['messages'][0]['content'] for c in cliente.chat_completion.call_args_list]
+            # Siempre el mismo tramo de summary_every * 2 mensajes, aunque el atraso sea de 60
+            self.assertEqual(len(set(prompts)), 1)
+            self.assertIn('Mensaje 7', prompts[0])
+            self.assertNotIn('Mensaje 8', prompts[0])
+
+            cliente.chat_completion.side_effect = None
+            cliente.chat_completion.return_value = self._respuesta('Resumen')
+            self.assertTrue(conversation_memory.update_summary(self.chat))
+        self.chat.refresh_from_db()
+        self.assertEqual(self.chat.summary_upto_id, mensajes[7].id)
+
+    def test_send_message_resume_tras_responder(self):
+        from core.services import conversation_memory as memoria
+        client = APIClient()
+        client.force_authenticate(self.user)
+        self._mensajes(12)
+        with mock.patch('core.views_chat.educational_research_agent') as agente, \
+                mock.patch.object(memoria.conversation_memory, 'update_summary') as update_summary, \
+                mock.patch.object(memoria.threading, 'Thread') as hilo, \
+                self.captureOnCommitCallbacks(execute=True) as callbacks:
+            agente.process_question.return_value = {'response': 'Respuesta', 'papers_used': []}
+            response = client.post(f'/api/ai/chat/{self.chat.id}/send_message/', {'message': 'Pregunta'}, format='json')
+            self.assertEqual(response.status_code, 200)
+            update_summary.assert_not_called()
+        self.assertEqual(len(callbacks), 1)
+        hilo.assert_called_once()
+        self.assertEqual(hilo.call_args.kwargs['args'], (self.chat.id,))
@@ -26,10 +26,10 @@ from .views import (
     apply_rubric, quick_feedback, improve_comment_with_ai, audio_evaluation,
     student_recommendations, record_attendance, download_student_report_pdf,
     download_evaluation_summary_pdf, student_analytics_data, student_datos_completos,
-    dashboard_resumen, proximas_clases, evolucion_rendimiento, analizar_tendencias,
+    dashboard_resumen, dashboard_compuesto, proximas_clases, evolucion_rendimiento, analizar_tendencias,
     comentarios_recientes, insights_ia, rubricas_estadisticas, evaluaciones_pendientes,
-    noticias_educacion, corregir_texto, obtener_estadisticas_texto,
-    procesar_imagen_ocr, procesar_y_corregir_imagen, idiomas_ocr_soportados, validar_imagen_ocr,
+    noticias_educacion, corregir_texto, obtener_estadisticas_texto, estado_languagetool,
+    procesar_imagen_ocr, procesar_y_corregir_imagen, procesar_lote_ocr, idiomas_ocr_soportados, validar_imagen_ocr, estado_ocr,
     guardar_correccion_como_evidencia, evidencias_correccion_estudiante, evidencias_correccion_profesor,
     actualizar_evidencia_correccion, estadisticas_correccion_estudiante,
     CustomEventViewSet, user_settings, change_password, test_notification, non_school_days,
@@ -44,7 +44,8 @@ from .admin_views import cleanup_duplicates_view
 from .migration_views import run_migrations_view, check_migrations_view
 from .views_informes import (
     informe_grupo, informe_estudiante, generar_comentarios_ia, guardar_borrador_informe,
-    exportar_pdf_grupo, exportar_excel_grupo, exportar_pdf_individual, exportar_excel_individual
+    exportar_pdf_grupo, exportar_excel_grupo, exportar_pdf_individual, exportar_excel_individual,
+    exportar_datos, exportar_pdf_zip_grupo, estado_exportacion_pdf_zip, descargar_exportacion_pdf_zip
 )
 
 router = DefaultRouter()
@@ -174,6 +175,7 @@ urlpatterns = [
     path('ping/', ping_view, name='ping'),
     
     # Dashboard endpoints
+    path('dashboard/', dashboard_compuesto, name='dashboard-compuesto'),
     path('dashboard/resumen/', dashboard_resumen, name='dashboard-resumen'),
     path('dashboard/proximas_clases/', proximas_clases, name='proximas-clases'),
     path('dashboard/evolucion/', evolucion_rendimiento, name='evolucion-rendimiento'),
@@ -187,11 +189,14 @@ urlpatterns = [
     # LanguageTool endpoints
     path('correccion/texto/', corregir_texto, name='corregir-texto'),
     path('correccion/estadisticas/', obtener_estadisticas_texto, name='estadisticas-texto'),
+    path('correccion/estado/', estado_languagetool, name='estado-languagetool'),
     
     # OCR endpoints
     path('ocr/procesar/', procesar_imagen_ocr, name='procesar-imagen-ocr'),
     path('ocr/procesar-y-corregir/', procesar_y_corregir_imagen, name='procesar-y-corregir-imagen'),
+    path('ocr/procesar-lote/', procesar_lote_ocr, name='procesar-lote-ocr'),
     path('ocr/idiomas/', idiomas_ocr_soportados, name='idiomas-ocr-soportados'),
+    path('ocr/estado/', estado_ocr, name='estado-ocr'),
     path('ocr/validar/', validar_imagen_ocr, name='validar-imagen-ocr'),
     
     # Corrección como evidencia endpoints
@@ -234,4 +239,8 @@ urlpatterns = [
     path('informes/grupo/excel/', exportar_excel_grupo, name='exportar-excel-grupo'),
     path('informes/estudiante/pdf/', exportar_pdf_individual, name='exportar-pdf-individual'),
     path('informes/estudiante/excel/', exportar_excel_individual, name='exportar-excel-individual'),
+    path('informes/datos/', exportar_datos, name='exportar-datos'),
+    path('informes/grupo/pdf-zip/', exportar_pdf_zip_grupo, name='exportar-pdf-zip-grupo'),
+    path('informes/grupo/pdf-zip/<uuid:export_id>/', estado_exportacion_pdf_zip, name='estado-exportacion-pdf-zip'),
+    path('informes/grupo/pdf-zip/<uuid:export_id>/descargar/', descargar_exportacion_pdf_zip, name='descargar-exportacion-pdf-zip'),
 ]
@@ -3,12 +3,14 @@ from rest_framework.decorators import api_view, action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.throttling import UserRateThrottle
+from rest_framework.exceptions import NotFound
+from rest_framework.utils.urls import replace_query_param
 from django.contrib.auth.models import User
 from django.utils import timezone
 from django.db.models import Avg, Count, Sum
 from django.core.cache import cache
 from datetime import datetime, timedelta
-from dateutil.rrule import rrule, WEEKLY, MO, TU, WE, TH, FR, SA, SU
+from dateutil.rrule import rrule, WEEKLY
 import uuid
 import hashlib
 import json
@@ -25,7 +27,7 @@ from .models import (
     Student, Subject, Group, CalendarEvent,
     Rubric, RubricCriterion, RubricLevel, RubricScore, Comment, Evaluation,
     Objective, Evidence, SelfEvaluation, Notification, Attendance, CorrectionEvidence,
-    UserSettings, CustomEvent, CustomEvaluation, EvaluationResponse
+    UserSettings, CustomEvent, CustomEvaluation, EvaluationResponse, GroupMembership
 )
 from .serializers import (
     StudentSerializer, SubjectSerializer, SubjectCreateSerializer, GroupSerializer, CalendarEventSerializer,
@@ -38,31 +40,35 @@ from .serializers import (
     UserSerializer
 )
 from .services.google_vision_ocr_service import google_vision_ocr_client, GoogleVisionOCRError
+from .services.local_ocr_service import LocalOCRError
+from .services.ocr_router import ocr_router
 from .services.whisper_loader import get_whisper_service
 from .services.openrouter_service import openrouter_client, OpenRouterServiceError
 from .services.languagetool_service import languagetool_service
+from .services.custom_evaluation_service import custom_evaluation_service, SubmissionError
+from .services.pdf_service import PDFReportService, PDFServiceError
+from .services.access_scope import access_scope_service
+from .pagination import DateCursorPagination, EvaluationResponseCursorPagination, TimestampCursorPagination
+from .permissions import CanAccessStudent
+from .sparse_fieldsets import SparseFieldsetViewMixin
 
 
-class StudentViewSet(viewsets.ModelViewSet):
+class StudentViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     serializer_class = StudentSerializer
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        from django.db.models import Q
-        
         # Base queryset según permisos
         if self.request.user.is_superuser:
             queryset = Student.objects.all()
         else:
-            # Filtrar estudiantes que pertenecen a grupos del profesor actual
-            queryset = Student.objects.filter(grupo_principal__teacher=self.request.user).distinct()
+            # Estudiantes de los grupos del profesor actual (ámbito calculado una vez por petición)
+            queryset = access_scope_service.for_request(self.request).students()
         
         # Aplicar filtro exclude_from_group si se proporciona
         exclude_group_id = self.request.query_params.get('exclude_from_group')
         if exclude_group_id:
-            queryset = queryset.exclude(
-                Q(grupo_principal_id=exclude_group_id) | Q(subgrupos__id=exclude_group_id)
-            ).distinct()
+            queryset = queryset.exclude(id__in=GroupMembership.student_ids_for_group(exclude_group_id))
         
         # Optimización: select_related para reducir queries
         return queryset.select_related('grupo_principal')
@@ -153,7 +159,7 @@ class StudentViewSet(viewsets.ModelViewSet):
         try:
             instance = self.get_object()
             # Verificar permisos antes de eliminar
-            if not request.user.is_superuser and instance.grupo_principal.teacher != request.user:
+            if not access_scope_service.for_request(request).can_manage_student(instance.pk):
                 return Response(
                     {'error': 'No tienes permisos para eliminar este estudiante'},
                     status=status.HTTP_403_FORBIDDEN
@@ -229,8 +235,7 @@ class StudentViewSet(viewsets.ModelViewSet):
         else:
             # Si no se especifica asignatura, obtener todas las del día para el grupo del estudiante
             # Obtener grupos del estudiante
-            student_groups = [student.grupo_principal]
-            student_groups.extend(student.subgrupos.all())
+            student_groups = list(GroupMembership.group_ids_for_student(student.id).values_list('group_id', flat=True))
             
             if not student_groups:
                 return Response({
@@ -240,18 +245,11 @@ class StudentViewSet(viewsets.ModelViewSet):
             # Mapeo de día de la semana a nombre en inglés (según Python weekday)
             day_names = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
             day_of_week = attendance_date.weekday()
-            day_name = day_names[day_of_week]
-            
-            # Obtener todas las asignaturas de los grupos del estudiante que tienen clase este día
-            subjects_for_day = []
-            for group in student_groups:
-                for subject in group.subjects.all():
-                    # Verificar si la asignatura tiene clase este día
-                    if subject.days and day_name in subject.days:
-                        subjects_for_day.append(subject)
             
-            # Eliminar duplicados
-            subjects_for_day = list(set(subjects_for_day))
+            # Asignaturas de los grupos del estudiante que tienen clase este día (una consulta)
+            subjects_for_day = list(
+                Subject.meeting_on(day_of_week).filter(groups__id__in=student_groups).distinct()
+            )
             
             if not subjects_for_day:
                 return Response({
@@ -281,23 +279,25 @@ class StudentViewSet(viewsets.ModelViewSet):
             'data': serializer.data
         }, status=status.HTTP_201_CREATED)
     
-    @action(detail=True, methods=['get'], url_path='attendance')
+    @add_attendance.mapping.get
     def get_attendance(self, request, pk=None):
         """
-        Obtiene el historial de asistencia de un estudiante.
+        Obtiene el historial de asistencia de un estudiante, paginado por cursor (?page_size=, enlace 'next').
         
         GET /api/students/{id}/attendance/
         """
         from .serializers_attendance import AttendanceSerializer
         
         student = self.get_object()
-        attendances = Attendance.objects.filter(student=student).order_by('-date')
-        serializer = AttendanceSerializer(attendances, many=True, context={'request': request})
+        attendances = Attendance.objects.filter(student=student).select_related('student', 'subject', 'recorded_by')
+        paginator = DateCursorPagination()
+        page = paginator.paginate_queryset(attendances, request, view=self)
+        serializer = AttendanceSerializer(page, many=True, context={'request': request})
         
-        return Response(serializer.data)
+        return paginator.get_paginated_response(serializer.data)
 
 
-class SubjectViewSet(viewsets.ModelViewSet):
+class SubjectViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
 
     def get_serializer_class(self):
@@ -360,16 +360,8 @@ class SubjectViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
         
-        if not subject.days:
-            return Response([])
-        
-        # Mapeo de días
-        day_map = {
-            'monday': MO, 'tuesday': TU, 'wednesday': WE,
-            'thursday': TH, 'friday': FR, 'saturday': SA, 'sunday': SU
-        }
-        
-        weekdays = [day_map[day] for day in subject.days if day in day_map]
+        # Días de clase desde la máscara precalculada (0 = lunes, como MO en rrule)
+        weekdays = subject.weekdays
         if not weekdays:
             return Response([])
         
@@ -390,7 +382,7 @@ class SubjectViewSet(viewsets.ModelViewSet):
         return Response(events)
 
 
-class GroupViewSet(viewsets.ModelViewSet):
+class GroupViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     serializer_class = GroupSerializer
     permission_classes = [IsAuthenticated]
     
@@ -474,7 +466,7 @@ class GeminiGenerateThrottle(UserRateThrottle):
     rate = '10/min'
 
 
-class RubricViewSet(viewsets.ModelViewSet):
+class RubricViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     serializer_class = RubricSerializer
     permission_classes = [IsAuthenticated]
     
@@ -687,9 +679,10 @@ class RubricScoreViewSet(viewsets.ModelViewSet):
         serializer.save(evaluator=self.request.user)
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     serializer_class = CommentSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = TimestampCursorPagination
     
     def get_queryset(self):
         # Superusers ven todo
@@ -709,7 +702,7 @@ class CommentViewSet(viewsets.ModelViewSet):
         if subject_id:
             queryset = queryset.filter(subject_id=subject_id)
         
-        return queryset.order_by('-created_at')
+        return queryset.select_related('student', 'subject', 'author').order_by('-created_at')
     
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
@@ -751,17 +744,6 @@ def get_calendar_events(request):
     
     events = []
     
-    # Mapeo de días de la semana
-    day_map = {
-        'monday': MO,
-        'tuesday': TU,
-        'wednesday': WE,
-        'thursday': TH,
-        'friday': FR,
-        'saturday': SA,
-        'sunday': SU
-    }
-    
     # Obtener días no lectivos
     non_lective_dates = set(
         CalendarEvent.objects.filter(
@@ -771,17 +753,11 @@ def get_calendar_events(request):
         ).values_list('date', flat=True)
     )
     
-    # Generar eventos recurrentes desde las asignaturas
-    subjects = Subject.objects.all()
+    # Generar eventos recurrentes desde las asignaturas con algún día de clase
+    subjects = Subject.objects.filter(weekday_mask__gt=0).select_related('teacher')
     for subject in subjects:
-        if not subject.days:
-            continue
-        
-        # Convertir días a constantes de dateutil
-        weekdays = [day_map[day] for day in subject.days if day in day_map]
-        
-        if not weekdays:
-            continue
+        # Días como enteros de weekday() (0 = lunes, como MO en rrule)
+        weekdays = subject.weekdays
         
         # Generar fechas recurrentes
         dates = rrule(
@@ -1095,6 +1071,9 @@ def student_datos_completos(request, student_id):
     Devuelve un objeto agregado con todos los datos necesarios del alumno
     para la página de Informes y para el análisis con IA.
 
+    Cada historial trae su primera página (200 filas) y en 'paginacion' el enlace a la
+    siguiente; ?seccion=<nombre>&cursor=... devuelve solo esa sección paginada por cursor.
+
     GET /api/alumnos/{student_id}/datos_completos/
     """
     try:
@@ -1102,38 +1081,54 @@ def student_datos_completos(request, student_id):
     except Student.DoesNotExist:
         return Response({'error': 'Alumno no encontrado'}, status=status.HTTP_404_NOT_FOUND)
 
-    # Serializar datos básicos de perfil
-    student_data = StudentDetailSerializer(student, context={'request': request}).data
-
-    # Evaluaciones (notas, rúbricas aplicadas)
-    evaluations = Evaluation.objects.filter(student=student).order_by('-date')[:200]
-    evaluations_data = EvaluationSerializer(evaluations, many=True, context={'request': request}).data
-
-    # Asistencia
-    attendances = Attendance.objects.filter(student=student).order_by('-date')[:200]
-    attendance_data = AttendanceSerializer(attendances, many=True, context={'request': request}).data
-
-    # Evidencias y archivos adjuntos
-    evidences = Evidence.objects.filter(student=student).order_by('-created_at')[:200]
-    evidences_data = EvidenceSerializer(evidences, many=True, context={'request': request}).data
-
-    # Autoevaluaciones
-    self_evals = SelfEvaluation.objects.filter(student=student).order_by('-created_at')[:200]
-    self_evals_data = SelfEvaluationSerializer(self_evals, many=True, context={'request': request}).data
-
-    # Comentarios
-    comments = Comment.objects.filter(student=student).order_by('-created_at')[:200]
-    comments_data = CommentSerializer(comments, many=True, context={'request': request}).data
-
-    # Datos adicionales (por ejemplo, analytics o audios si existen en evidences)
-    result = {
-        'student': student_data,
-        'evaluaciones': evaluations_data,
-        'asistencia': attendance_data,
-        'evidencias': evidences_data,
-        'autoevaluaciones': self_evals_data,
-        'comentarios': comments_data,
+    # (queryset, serializer, paginación) de cada historial
+    secciones = {
+        # Evaluaciones (notas, rúbricas aplicadas)
+        'evaluaciones': (
+            Evaluation.objects.filter(student=student).select_related('student', 'subject', 'evaluator'),
+            EvaluationSerializer, DateCursorPagination,
+        ),
+        'asistencia': (
+            Attendance.objects.filter(student=student).select_related('student', 'subject', 'recorded_by'),
+            AttendanceSerializer, DateCursorPagination,
+        ),
+        # Evidencias y archivos adjuntos
+        'evidencias': (
+            Evidence.objects.filter(student=student).select_related('student', 'subject', 'uploaded_by'),
+            EvidenceSerializer, TimestampCursorPagination,
+        ),
+        'autoevaluaciones': (
+            SelfEvaluation.objects.filter(student=student).select_related('student', 'subject'),
+            SelfEvaluationSerializer, TimestampCursorPagination,
+        ),
+        'comentarios': (
+            Comment.objects.filter(student=student).select_related('student', 'subject', 'author'),
+            CommentSerializer, TimestampCursorPagination,
+        ),
     }
+    seccion = request.query_params.get('seccion')
+    if seccion and seccion not in secciones:
+        return Response({'error': f'Sección no válida: {seccion}'}, status=status.HTTP_400_BAD_REQUEST)
+    if not seccion and request.query_params.get('cursor'):
+        return Response({'error': 'El parámetro cursor requiere seccion'}, status=status.HTTP_400_BAD_REQUEST)
+
+    def pagina(nombre):
+        queryset, serializer_class, pagination_class = secciones[nombre]
+        paginator = pagination_class()
+        paginator.page_size = 200
+        page = paginator.paginate_queryset(queryset, request)
+        return paginator, serializer_class(page, many=True, context={'request': request}).data
+
+    if seccion:
+        paginator, data = pagina(seccion)
+        return paginator.get_paginated_response(data)
+
+    # Serializar datos básicos de perfil
+    result = {'student': StudentDetailSerializer(student, context={'request': request}).data, 'paginacion': {}}
+    for nombre in secciones:
+        paginator, result[nombre] = pagina(nombre)
+        siguiente = paginator.get_next_link()
+        result['paginacion'][nombre] = replace_query_param(siguiente, 'seccion', nombre) if siguiente else None
 
     return Response(result, status=status.HTTP_200_OK)
 
@@ -1189,54 +1184,34 @@ def dashboard_stats_activity_last_7_days(request):
 @permission_classes([IsAuthenticated])
 def dashboard_stats_rubrics_distribution(request):
     """
-    Returns distribution of rubrics with their counts.
+    Returns distribution of the teacher's rubrics with their evaluation session counts.
+    Optional ?days=N restricts the count to the last N days.
     """
-    rubrics = Rubric.objects.all()
-    distribution = []
-    
-    for rubric in rubrics:
-        distribution.append({
-            'name': rubric.title,
-            'count': RubricScore.objects.filter(criterion__rubric=rubric).count()
-        })
-    
-    return Response(distribution)
+    from core.services.dashboard_service import dashboard_service, parse_days
+    usage = dashboard_service.rubric_usage(request.user, parse_days(request.GET.get('days')))
+    return Response([{'name': rubric['title'], 'count': rubric['usage_count']} for rubric in usage])
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def dashboard_schedule_today(request):
     """
-    Returns today's schedule based on the current weekday.
+    Returns today's schedule for the current teacher based on the current weekday.
     """
     from datetime import date
     
-    today = date.today()
-    weekday_map = {
-        0: 'monday',
-        1: 'tuesday',
-        2: 'wednesday',
-        3: 'thursday',
-        4: 'friday',
-        5: 'saturday',
-        6: 'sunday'
-    }
-    
-    today_name = weekday_map.get(today.weekday())
-    # Get all subjects and filter in Python (SQLite doesn't support __contains on JSON)
-    all_subjects = Subject.objects.all()
+    # Indexed weekday bitmask lookup instead of parsing every subject's days in Python
+    subjects = Subject.meeting_on(date.today(), teacher=request.user).order_by('start_time')
     
     schedule = []
-    for subject in all_subjects:
-        # Check if today_name is in the days array
-        if subject.days and today_name in subject.days:
-            schedule.append({
-                'id': subject.id,
-                'name': subject.name,
-                'start_time': str(subject.start_time) if subject.start_time else None,
-                'end_time': str(subject.end_time) if subject.end_time else None,
-                'color': subject.color
-            })
+    for subject in subjects:
+        schedule.append({
+            'id': subject.id,
+            'name': subject.name,
+            'start_time': str(subject.start_time) if subject.start_time else None,
+            'end_time': str(subject.end_time) if subject.end_time else None,
+            'color': subject.color
+        })
     
     return Response(schedule)
 
@@ -1287,7 +1262,7 @@ def groups_stats(request):
 
 # ===================== EVALUATION ENDPOINTS =====================
 
-class EvaluationViewSet(viewsets.ModelViewSet):
+class EvaluationViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     serializer_class = EvaluationSerializer
     permission_classes = [IsAuthenticated]
 
@@ -1360,7 +1335,7 @@ class GroupStudentsViewSet(viewsets.ReadOnlyModelViewSet):
 class StudentEvaluationsViewSet(viewsets.ModelViewSet):
     """ViewSet para evaluaciones de un estudiante específico"""
     serializer_class = EvaluationSerializer
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, CanAccessStudent]
 
     def get_queryset(self):
         student_id = self.kwargs.get('student_pk')
@@ -1447,7 +1422,7 @@ class StudentDetailViewSet(viewsets.ReadOnlyModelViewSet):
 
 # ===================== NUEVOS VIEWSETS PARA FUNCIONALIDADES AVANZADAS =====================
 
-class ObjectiveViewSet(viewsets.ModelViewSet):
+class ObjectiveViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """ViewSet para objetivos/metas de estudiantes"""
     serializer_class = ObjectiveSerializer
     permission_classes = [IsAuthenticated]
@@ -1469,7 +1444,7 @@ class ObjectiveViewSet(viewsets.ModelViewSet):
             raise
 
 
-class EvidenceViewSet(viewsets.ModelViewSet):
+class EvidenceViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """ViewSet para evidencias/archivos adjuntos"""
     serializer_class = EvidenceSerializer
     permission_classes = [IsAuthenticated]
@@ -1575,7 +1550,7 @@ class EvidenceViewSet(viewsets.ModelViewSet):
         serializer.save(uploaded_by=self.request.user)
 
 
-class SelfEvaluationViewSet(viewsets.ModelViewSet):
+class SelfEvaluationViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """ViewSet para autoevaluaciones"""
     serializer_class = SelfEvaluationSerializer
     permission_classes = [IsAuthenticated]
@@ -1587,17 +1562,20 @@ class SelfEvaluationViewSet(viewsets.ModelViewSet):
         return SelfEvaluation.objects.filter(student__grupo_principal__subjects__teacher=self.request.user).select_related('student', 'subject')
 
 
-class NotificationViewSet(viewsets.ModelViewSet):
+class NotificationViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """ViewSet para notificaciones push"""
     serializer_class = NotificationSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = TimestampCursorPagination
     
     def get_queryset(self):
         # Superusers ven todo
         if self.request.user.is_superuser:
-            return Notification.objects.all()
-        # Usuarios normales solo ven sus notificaciones
-        return Notification.objects.filter(recipient=self.request.user)
+            queryset = Notification.objects.all()
+        else:
+            # Usuarios normales solo ven sus notificaciones
+            queryset = Notification.objects.filter(recipient=self.request.user)
+        return queryset.select_related('recipient', 'related_student', 'related_objective')
 
     def perform_create(self, serializer):
         serializer.save(recipient=self.request.user)
@@ -2154,6 +2132,27 @@ def record_attendance(request):
 
 # ===================== ENDPOINTS PARA EXPORTACIÓN PDF =====================
 
+def _pdf_artifact_response(request, artifact, filename):
+    """
+    Respuesta con un PDF del almacén de documentos y ETag fuerte.
+    Si el cliente ya tiene esa versión (If-None-Match) se responde 304 sin enviar el PDF.
+    """
+    from django.http import HttpResponse, HttpResponseNotModified
+    from django.utils.http import parse_etags, quote_etag
+
+    etag = quote_etag(artifact.etag)
+    if_none_match = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+    if etag in if_none_match or '*' in if_none_match:
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(artifact.content, content_type='application/pdf')
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response['ETag'] = etag
+    # Revalidar siempre: si cambian los datos cambia el documento (y su ETag)
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
 @api_view(['GET'])
 def download_student_report_pdf(request, student_id):
     """
@@ -2164,32 +2163,25 @@ def download_student_report_pdf(request, student_id):
         student = Student.objects.get(id=student_id)
 
         # Verificar que el usuario tenga acceso a este estudiante
-        has_access = (
-            request.user.is_staff or
-            student.grupo_principal.teacher == request.user or
-            student.subgrupos.filter(teacher=request.user).exists()
-        )
+        has_access = access_scope_service.for_request(request).can_view_student(student.id)
 
         if not has_access:
             return Response({'error': 'No tienes permisos para acceder a este informe'}, status=status.HTTP_403_FORBIDDEN)
 
-        # Generar PDF
+        # PDF desde el almacén de documentos generados (solo se renderiza si cambian los datos)
         pdf_service = PDFReportService()
         include_objectives = request.GET.get('include_objectives', 'true').lower() == 'true'
         include_self_evaluations = request.GET.get('include_self_evaluations', 'true').lower() == 'true'
 
-        pdf_content = pdf_service.generate_student_report(
+        artifact = pdf_service.get_student_report(
             student_id=student_id,
             include_objectives=include_objectives,
             include_self_evaluations=include_self_evaluations
         )
 
-        # Preparar respuesta con PDF
-        from django.http import HttpResponse
-        response = HttpResponse(pdf_content, content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="informe_{student.name.replace(" ", "_")}_{datetime.now().strftime("%Y%m%d")}.pdf"'
-
-        return response
+        return _pdf_artifact_response(
+            request, artifact, f'informe_{student.name.replace(" ", "_")}_{datetime.now().strftime("%Y%m%d")}.pdf'
+        )
 
     except Student.DoesNotExist:
         return Response({'error': 'Estudiante no encontrado'}, status=status.HTTP_404_NOT_FOUND)
@@ -2208,11 +2200,7 @@ def download_evaluation_summary_pdf(request, student_id):
         student = Student.objects.get(id=student_id)
 
         # Verificar permisos
-        has_access = (
-            request.user.is_staff or
-            student.grupo_principal.teacher == request.user or
-            student.subgrupos.filter(teacher=request.user).exists()
-        )
+        has_access = access_scope_service.for_request(request).can_view_student(student.id)
 
         if not has_access:
             return Response({'error': 'No tienes permisos para acceder a este informe'}, status=status.HTTP_403_FORBIDDEN)
@@ -2234,22 +2222,19 @@ def download_evaluation_summary_pdf(request, student_id):
             except ValueError:
                 return Response({'error': 'Formato de fecha de fin inválido (use YYYY-MM-DD)'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Generar PDF
+        # PDF desde el almacén de documentos generados
         pdf_service = PDFReportService()
-        pdf_content = pdf_service.generate_evaluation_summary_pdf(
+        artifact = pdf_service.get_evaluation_summary(
             student_id=student_id,
             subject_id=subject_id,
             start_date=start_date,
             end_date=end_date
         )
 
-        # Preparar respuesta
-        from django.http import HttpResponse
         filename_suffix = f"_{start_date.strftime('%Y%m%d') if start_date else 'inicio'}_a_{end_date.strftime('%Y%m%d') if end_date else 'hoy'}"
-        response = HttpResponse(pdf_content, content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="resumen_evaluaciones_{student.name.replace(" ", "_")}{filename_suffix}.pdf"'
-
-        return response
+        return _pdf_artifact_response(
+            request, artifact, f'resumen_evaluaciones_{student.name.replace(" ", "_")}{filename_suffix}.pdf'
+        )
 
     except Student.DoesNotExist:
         return Response({'error': 'Estudiante no encontrado'}, status=status.HTTP_404_NOT_FOUND)
@@ -2267,44 +2252,32 @@ def student_analytics_data(request, student_id):
     Obtener datos analíticos del estudiante para gráficos.
     """
     try:
-        from django.db.models import Avg, Count, Q
+        from django.db.models import Count, Q, Sum
         from datetime import timedelta
         from django.utils import timezone
 
         student = Student.objects.get(id=student_id)
 
         # Verificar permisos
-        has_access = (
-            request.user.is_staff or
-            student.grupo_principal.teacher == request.user or
-            student.subgrupos.filter(teacher=request.user).exists()
-        )
+        has_access = access_scope_service.for_request(request).can_view_student(student.id)
 
         if not has_access:
             return Response({'error': 'No tienes permisos para acceder a estos datos'}, status=status.HTTP_403_FORBIDDEN)
 
-        # Datos de evaluaciones por mes (últimos 6 meses)
+        # Datos de evaluaciones por mes (últimos 6 meses), desde el agregado mensual del alumno
+        from core.services.rollups import rollup_service
         six_months_ago = timezone.now().date() - timedelta(days=180)
-
-        from django.db.models.functions import TruncMonth
-        
-        evaluations_by_month = Evaluation.objects.filter(
-            student=student,
-            date__gte=six_months_ago
-        ).annotate(
-            month=TruncMonth('date')
-        ).values('month').annotate(
-            count=Count('id'),
-            avg_score=Avg('score')
-        ).order_by('month')
+        monthly_rollups = list(rollup_service.student_monthly(student, six_months_ago))
 
         # Convertir a formato para gráficos
         evaluation_trend = []
-        for item in evaluations_by_month:
+        for item in monthly_rollups:
+            if not item.eval_count:
+                continue
             evaluation_trend.append({
-                'month': item['month'].strftime('%Y-%m') if item['month'] else None,
-                'count': item['count'],
-                'avg_score': round(float(item['avg_score']), 1) if item['avg_score'] else None
+                'month': item.month.strftime('%Y-%m'),
+                'count': item.eval_count,
+                'avg_score': round(item.score_sum / item.score_count, 1) if item.score_count else None
             })
 
         # Distribución de puntuaciones (últimas 20 evaluaciones)
@@ -2354,31 +2327,22 @@ def student_analytics_data(request, student_id):
             })
 
         # Autoevaluaciones por mes
-        from django.db.models.functions import TruncMonth
-        
-        self_evaluations_by_month = SelfEvaluation.objects.filter(
-            student=student,
-            created_at__gte=six_months_ago
-        ).annotate(
-            month=TruncMonth('created_at')
-        ).values('month').annotate(
-            count=Count('id'),
-            avg_score=Avg('score')
-        ).order_by('month')
-
         self_evaluation_trend = []
-        for item in self_evaluations_by_month:
+        for item in monthly_rollups:
+            if not item.self_eval_count:
+                continue
             self_evaluation_trend.append({
-                'month': item['month'].strftime('%Y-%m') if item['month'] else None,
-                'count': item['count'],
-                'avg_score': round(float(item['avg_score']), 1) if item['avg_score'] else None
+                'month': item.month.strftime('%Y-%m'),
+                'count': item.self_eval_count,
+                'avg_score': round(item.self_eval_score_sum / item.self_eval_count, 1)
             })
 
-        # Estadísticas generales
-        total_evaluations = Evaluation.objects.filter(student=student).count()
-        avg_evaluation_score = Evaluation.objects.filter(
-            student=student, score__isnull=False
-        ).aggregate(avg=Avg('score'))['avg']
+        # Estadísticas generales (todos los meses del agregado)
+        totales = student.monthly_rollups.aggregate(
+            total=Sum('eval_count'), con_nota=Sum('score_count'), suma=Sum('score_sum')
+        )
+        total_evaluations = totales['total'] or 0
+        avg_evaluation_score = totales['suma'] / totales['con_nota'] if totales['con_nota'] else None
 
         total_objectives = objectives.count()
         completed_objectives = objectives.filter(status='completed').count()
@@ -2409,226 +2373,63 @@ def student_analytics_data(request, student_id):
 
 # ==================== DASHBOARD VIEWS ====================
 
-@api_view(['GET'])
-@permission_classes([IsAuthenticated])
-def dashboard_resumen(request):
-    """Resumen general del dashboard del docente"""
+def _dashboard_section_response(request, name):
+    """Endpoint antiguo de una sola sección: delega en dashboard_service"""
+    from core.services.dashboard_service import DashboardScope, dashboard_service
     try:
-        user = request.user
-        today = timezone.now().date()
-        week_ago = today - timedelta(days=7)
-        
-        # Total de alumnos activos (del profesor)
-        total_alumnos = Student.objects.filter(grupo_principal__teacher=user).distinct().count()
-        
-        # Total de asignaturas (del profesor)
-        total_asignaturas = Subject.objects.filter(teacher=user).count()
-        
-        # Evaluaciones registradas esta semana (del profesor)
-        evaluaciones_semana = Evaluation.objects.filter(
-            evaluator=user,
-            created_at__gte=week_ago
-        ).count()
-        
-        # Asistencias de hoy (de los estudiantes del profesor)
-        student_ids = Student.objects.filter(grupo_principal__teacher=user).values_list('id', flat=True)
-        asistencias_hoy = Attendance.objects.filter(
-            student_id__in=student_ids,
-            date=today,
-            status='presente'
-        ).count()
-        
-        total_asistencias_hoy = Attendance.objects.filter(
-            student_id__in=student_ids,
-            date=today
-        ).count()
-        porcentaje_asistencia = round((asistencias_hoy / total_asistencias_hoy * 100), 1) if total_asistencias_hoy > 0 else 0
-        
-        return Response({
-            'total_alumnos': total_alumnos,
-            'total_asignaturas': total_asignaturas,
-            'evaluaciones_semana': evaluaciones_semana,
-            'asistencias_hoy': asistencias_hoy,
-            'total_asistencias_hoy': total_asistencias_hoy,
-            'porcentaje_asistencia': porcentaje_asistencia
-        })
-        
+        scope = DashboardScope(request.user, request.GET, access_scope_service.for_request(request))
+        return Response(dashboard_service.section(name, scope))
     except Exception as e:
+        logger.error(f"[DASHBOARD] Error en la sección {name}: {str(e)}")
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def dashboard_compuesto(request):
+    """
+    Dashboard completo en una sola petición, con las secciones calculadas en paralelo.
+    
+    Query params:
+    - sections: secciones separadas por comas (por defecto todas): resumen, proximas_clases,
+      evolucion, comentarios_recientes, rubricas_estadisticas, evaluaciones_pendientes,
+      insights, noticias
+    - subject_id: filtro de la sección evolucion
+    - limit: número de comentarios recientes
+    """
+    from core.services.dashboard_service import dashboard_service
+    
+    sections = request.GET.get('sections')
+    names = [n.strip() for n in sections.split(',') if n.strip()] if sections else None
+    if names:
+        desconocidas = [n for n in names if n not in dashboard_service.sections]
+        if desconocidas:
+            return Response(
+                {'error': f"Secciones no válidas: {', '.join(desconocidas)}", 'disponibles': list(dashboard_service.sections)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+    return Response(dashboard_service.build(request.user, names, request.GET, access_scope_service.for_request(request)))
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def dashboard_resumen(request):
+    """Resumen general del dashboard del docente (sección 'resumen' del dashboard compuesto)"""
+    return _dashboard_section_response(request, 'resumen')
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def proximas_clases(request):
-    """Próximas clases del día - incluye clases recurrentes de asignaturas"""
-    try:
-        today = timezone.now().date()
-        today_weekday = today.strftime('%A').lower()  # 'monday', 'tuesday', etc.
-        
-        print(f"[PROXIMAS_CLASES] Today: {today}, Weekday: {today_weekday}", file=sys.stderr, flush=True)
-        
-        # Mapeo español -> inglés de días
-        day_map_es_to_en = {
-            'lunes': 'monday',
-            'martes': 'tuesday',
-            'miércoles': 'wednesday',
-            'miercoles': 'wednesday',
-            'jueves': 'thursday',
-            'viernes': 'friday',
-            'sábado': 'saturday',
-            'sabado': 'saturday',
-            'domingo': 'sunday'
-        }
-        
-        # Mapeo catalán -> inglés de días
-        day_map_ca_to_en = {
-            'dilluns': 'monday',
-            'dimarts': 'tuesday',
-            'dimecres': 'wednesday',
-            'dijous': 'thursday',
-            'divendres': 'friday',
-            'dissabte': 'saturday',
-            'diumenge': 'sunday'
-        }
-        
-        # Combinar ambos mapeos
-        day_map_to_en = {**day_map_es_to_en, **day_map_ca_to_en}
-        
-        clases_data = []
-        
-        # 1. Obtener clases recurrentes de asignaturas del usuario
-        user_subjects = Subject.objects.filter(teacher=request.user)
-        
-        print(f"[PROXIMAS_CLASES] User subjects count: {user_subjects.count()}", file=sys.stderr, flush=True)
-        
-        for subject in user_subjects:
-            # Verificar si la asignatura tiene clase hoy
-            subject_days = subject.days or []
-            
-            print(f"[PROXIMAS_CLASES] Subject: {subject.name}, Days: {subject_days}", file=sys.stderr, flush=True)
-            
-            # Normalizar días a minúsculas
-            subject_days_normalized = [day.lower() for day in subject_days]
-            
-            # Mapear a inglés usando diccionario combinado
-            subject_days_normalized_en = []
-            for day in subject_days_normalized:
-                if day in day_map_to_en:
-                    subject_days_normalized_en.append(day_map_to_en[day])
-                else:
-                    # Si ya está en inglés, mantener
-                    subject_days_normalized_en.append(day)
-            
-            print(f"[PROXIMAS_CLASES] Normalized: {subject_days_normalized}, EN: {subject_days_normalized_en}", file=sys.stderr, flush=True)
-            print(f"[PROXIMAS_CLASES] Checking if {today_weekday} in {subject_days_normalized_en}", file=sys.stderr, flush=True)
-            
-            if today_weekday in subject_days_normalized_en:
-                # Obtener los grupos asociados a esta asignatura
-                groups = subject.groups.all()
-                group_names = ', '.join([g.name for g in groups]) if groups.exists() else 'Sin grupo'
-                
-                clases_data.append({
-                    'id': f'subject-{subject.id}',
-                    'title': subject.name,
-                    'subject_name': subject.name,
-                    'group_name': group_names,
-                    'start_time': subject.start_time.strftime('%H:%M') if subject.start_time else '--:--',
-                    'end_time': subject.end_time.strftime('%H:%M') if subject.end_time else '--:--',
-                    'event_type': 'class',
-                    'description': f'Clase recurrente - {group_names}',
-                    'color': subject.color
-                })
-        
-        # 2. Obtener eventos personalizados del calendario para hoy
-        eventos_hoy = CalendarEvent.objects.filter(
-            date=today,
-            created_by=request.user
-        ).select_related('subject').order_by('start_time')
-        
-        for evento in eventos_hoy:
-            clases_data.append({
-                'id': f'event-{evento.id}',
-                'title': evento.title,
-                'subject_name': evento.subject.name if evento.subject else evento.title,
-                'group_name': evento.event_type,
-                'start_time': evento.start_time.strftime('%H:%M') if evento.start_time else '--:--',
-                'end_time': evento.end_time.strftime('%H:%M') if evento.end_time else '--:--',
-                'event_type': evento.event_type,
-                'description': evento.description or '',
-                'color': evento.color
-            })
-        
-        # Ordenar por hora de inicio
-        clases_data.sort(key=lambda x: x['start_time'])
-        
-        return Response({
-            'clases': clases_data,
-            'total_clases': len(clases_data),
-            'today': today.strftime('%Y-%m-%d'),
-            'weekday': today_weekday
-        })
-        
-    except Exception as e:
-        import traceback
-        return Response({
-            'error': str(e),
-            'traceback': traceback.format_exc()
-        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    """Próximas clases del día - incluye clases recurrentes de asignaturas (sección 'proximas_clases' del dashboard compuesto)"""
+    return _dashboard_section_response(request, 'proximas_clases')
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def evolucion_rendimiento(request):
-    """Evolución del rendimiento de los últimos 30 días"""
-    try:
-        from django.db.models.functions import TruncDate
-        
-        user = request.user
-        thirty_days_ago = timezone.now().date() - timedelta(days=30)
-        subject_id = request.GET.get('subject_id')
-        
-        # Filtro por asignatura si se especifica (del profesor)
-        evaluations_filter = Evaluation.objects.filter(
-            evaluator=user,
-            created_at__gte=thirty_days_ago,
-            score__isnull=False
-        )
-        
-        if subject_id:
-            evaluations_filter = evaluations_filter.filter(subject_id=subject_id)
-        
-        # Agrupar por día y calcular promedio (compatible con PostgreSQL)
-        evolucion_data = evaluations_filter.annotate(
-            day=TruncDate('created_at')
-        ).values('day').annotate(
-            avg_score=Avg('score'),
-            total_evaluations=Count('id')
-        ).order_by('day')
-        
-        # Formatear datos para el gráfico
-        chart_data = []
-        for item in evolucion_data:
-            chart_data.append({
-                'date': item['day'].strftime('%Y-%m-%d') if item['day'] else None,
-                'avg_score': round(float(item['avg_score']), 1),
-                'total_evaluations': item['total_evaluations']
-            })
-        
-        # Calcular tendencia general
-        total_evaluations = evaluations_filter.count()
-        avg_score_general = evaluations_filter.aggregate(avg=Avg('score'))['avg']
-        
-        return Response({
-            'chart_data': chart_data,
-            'summary': {
-                'total_evaluations': total_evaluations,
-                'avg_score_general': round(float(avg_score_general), 1) if avg_score_general else 0,
-                'period_days': 30
-            }
-        })
-        
-    except Exception as e:
-        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    """Evolución del rendimiento de los últimos 30 días (sección 'evolucion' del dashboard compuesto)"""
+    return _dashboard_section_response(request, 'evolucion')
 
 
 @api_view(['POST'])
@@ -2712,291 +2513,36 @@ def analizar_tendencias(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def comentarios_recientes(request):
-    """Comentarios recientes de evaluaciones"""
-    try:
-        limit = int(request.GET.get('limit', 5))
-        
-        # Obtener comentarios recientes
-        comentarios = Comment.objects.select_related(
-            'student', 'subject', 'author'
-        ).order_by('-created_at')[:limit]
-        
-        comentarios_data = []
-        for comentario in comentarios:
-            comentarios_data.append({
-                'id': comentario.id,
-                'student_name': comentario.student.name,
-                'student_id': comentario.student.id,
-                'subject_name': comentario.subject.name if comentario.subject else 'Sin asignatura',
-                'text': comentario.text[:100] + '...' if len(comentario.text) > 100 else comentario.text,
-                'author_name': comentario.author.username if comentario.author else 'Sistema',
-                'created_at': comentario.created_at.strftime('%d/%m/%Y %H:%M')
-            })
-        
-        return Response({
-            'comentarios': comentarios_data,
-            'total': len(comentarios_data)
-        })
-        
-    except Exception as e:
-        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    """Comentarios recientes de evaluaciones (sección 'comentarios_recientes' del dashboard compuesto)"""
+    return _dashboard_section_response(request, 'comentarios_recientes')
 
 
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated])
 def insights_ia(request):
-    """Insights del aula generados por IA"""
-    try:
-        if request.method == 'GET':
-            # Obtener insights existentes o generar nuevos
-            user = request.user
-            thirty_days_ago = timezone.now() - timedelta(days=30)
-            
-            logger.info(f"[INSIGHTS] Generando insights para usuario: {user.username}")
-            
-            # Obtener datos del aula (del profesor)
-            total_students = Student.objects.filter(grupo_principal__teacher=user).distinct().count()
-            logger.info(f"[INSIGHTS] Total estudiantes: {total_students}")
-            
-            total_evaluations = Evaluation.objects.filter(
-                evaluator=user,
-                created_at__gte=thirty_days_ago
-            ).count()
-            logger.info(f"[INSIGHTS] Total evaluaciones: {total_evaluations}")
-            
-            avg_score = Evaluation.objects.filter(
-                evaluator=user,
-                created_at__gte=thirty_days_ago,
-                score__isnull=False
-            ).aggregate(avg=Avg('score'))['avg'] or 0
-            logger.info(f"[INSIGHTS] Promedio calificaciones: {avg_score}")
-            
-            # Convertir avg_score a float de forma segura
-            try:
-                avg_score_float = float(avg_score) if avg_score is not None else 0.0
-            except (TypeError, ValueError):
-                avg_score_float = 0.0
-                logger.warning(f"[INSIGHTS] Error convirtiendo avg_score {avg_score} a float")
-            
-            student_ids = Student.objects.filter(grupo_principal__teacher=user).values_list('id', flat=True)
-            logger.info(f"[INSIGHTS] IDs estudiantes: {list(student_ids)}")
-            
-            total_attendance = Attendance.objects.filter(
-                student_id__in=student_ids,
-                date__gte=thirty_days_ago.date()
-            ).count()
-            
-            present_attendance = Attendance.objects.filter(
-                student_id__in=student_ids,
-                date__gte=thirty_days_ago.date(),
-                status='presente'
-            ).count()
-            
-            attendance_rate = (present_attendance / max(total_attendance, 1)) * 100
-            logger.info(f"[INSIGHTS] Tasa asistencia: {attendance_rate}%")
-            
-            # Generar insights estáticos basados en los datos
-            insights = []
-            
-            if total_students > 0:
-                insights.append(f"📊 Tienes {total_students} estudiantes en tu aula")
-            
-            if total_evaluations > 0:
-                insights.append(f"📝 Se han registrado {total_evaluations} evaluaciones en los últimos 30 días")
-            
-            if avg_score_float > 0:
-                if avg_score_float >= 7:
-                    insights.append("🎉 ¡Excelente! El promedio de calificaciones es muy bueno")
-                elif avg_score_float >= 5:
-                    insights.append("📈 El rendimiento académico está en un nivel aceptable")
-                else:
-                    insights.append("⚠️ Considera reforzar el apoyo académico")
-            
-            if attendance_rate > 0:
-                if attendance_rate >= 90:
-                    insights.append("✅ La asistencia es excelente")
-                elif attendance_rate >= 75:
-                    insights.append("📅 La asistencia es buena")
-                else:
-                    insights.append("🔍 Revisa la asistencia de los estudiantes")
-            
-            if not insights:
-                insights.append("📚 Comienza a registrar evaluaciones y asistencias para obtener insights personalizados")
-            
-            logger.info(f"[INSIGHTS] Insights generados: {insights}")
-            
-            return Response({
-                'insights': insights,
-                'data': {
-                    'total_students': total_students,
-                    'total_evaluations': total_evaluations,
-                    'avg_score': round(avg_score_float, 1),
-                    'attendance_rate': round(attendance_rate, 1)
-                }
-            })
-            
-    except Exception as e:
-        logger.error(f"[INSIGHTS] Error generando insights: {str(e)}")
-        logger.error(f"[INSIGHTS] Traceback: {traceback.format_exc()}")
-        return Response({'error': f'Error generando insights: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    """Insights del aula generados por IA (sección 'insights' del dashboard compuesto)"""
+    return _dashboard_section_response(request, 'insights')
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def rubricas_estadisticas(request):
-    """Estadísticas de rúbricas más usadas"""
-    try:
-        # Obtener rúbricas con número de usos
-        rubricas_stats = Rubric.objects.annotate(
-            usage_count=Count('scores')
-        ).order_by('-usage_count')[:10]
-        
-        rubricas_data = []
-        for rubrica in rubricas_stats:
-            rubricas_data.append({
-                'id': rubrica.id,
-                'name': rubrica.title,
-                'description': rubrica.description[:100] + '...' if len(rubrica.description) > 100 else rubrica.description,
-                'usage_count': rubrica.usage_count,
-                'created_at': rubrica.created_at.strftime('%d/%m/%Y')
-            })
-        
-        return Response({
-            'rubricas': rubricas_data,
-            'total_rubricas': len(rubricas_data)
-        })
-        
-    except Exception as e:
-        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    """Estadísticas de rúbricas más usadas (sección 'rubricas_estadisticas' del dashboard compuesto)"""
+    return _dashboard_section_response(request, 'rubricas_estadisticas')
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def evaluaciones_pendientes(request):
-    """Alumnos sin evaluación en la última semana"""
-    try:
-        user = request.user
-        week_ago = timezone.now().date() - timedelta(days=7)
-        
-        # Obtener alumnos del profesor que no han sido evaluados en la última semana
-        students_without_evaluation = Student.objects.filter(
-            grupo_principal__teacher=user
-        ).exclude(
-            evaluations__created_at__gte=week_ago,
-            evaluations__evaluator=user
-        ).distinct().order_by('name')
-        
-        pendientes_data = []
-        for student in students_without_evaluation:
-            # Obtener la última evaluación
-            last_evaluation = Evaluation.objects.filter(
-                student=student
-            ).order_by('-created_at').first()
-            
-            pendientes_data.append({
-                'id': student.id,
-                'name': student.name,
-                'group_name': student.grupo_principal.name if student.grupo_principal else 'Sin grupo',
-                'last_evaluation_date': last_evaluation.created_at.strftime('%d/%m/%Y') if last_evaluation else 'Nunca',
-                'last_evaluation_score': last_evaluation.score if last_evaluation else None
-            })
-        
-        return Response({
-            'pendientes': pendientes_data,
-            'total_pendientes': len(pendientes_data)
-        })
-        
-    except Exception as e:
-        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    """Alumnos sin evaluación en la última semana (sección 'evaluaciones_pendientes' del dashboard compuesto)"""
+    return _dashboard_section_response(request, 'evaluaciones_pendientes')
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def noticias_educacion(request):
-    """Noticias educativas sobre evaluación educativa y educación en español/catalán"""
-    try:
-        from datetime import timedelta
-        import hashlib
-        
-        logger.info("[NOTICIAS] Solicitando noticias educativas")
-        
-        # Cache de 2 días (48 horas)
-        cache_key = 'noticias_educacion_cache'
-        cache_timeout = 60 * 60 * 48  # 48 horas en segundos
-        
-        # Intentar obtener del cache
-        cached_data = cache.get(cache_key)
-        if cached_data:
-            logger.info("[NOTICIAS] Devolviendo datos del cache")
-            return Response(cached_data)
-        
-        logger.info("[NOTICIAS] Generando noticias nuevas")
-        
-        # Generar noticias actualizadas (aquí se conectaría a un RSS/API real)
-        # Por ahora usamos datos simulados con fecha dinámica
-        today = timezone.now()
-        
-        noticias_data = [
-            {
-                'id': 1,
-                'title': 'Nuevas tendencias en evaluación educativa competencial',
-                'summary': 'Análisis de metodologías innovadoras en evaluación por competencias y su impacto en el aprendizaje del alumnado...',
-                'source': 'Revista Educación 3.0',
-                'date': (today - timedelta(days=1)).strftime('%Y-%m-%d'),
-                'url': 'https://www.educaciontrespuntocero.com'
-            },
-            {
-                'id': 2,
-                'title': 'Evaluación formativa: claves para la mejora educativa',
-                'summary': 'Estrategias y herramientas para implementar una evaluación formativa efectiva en el aula...',
-                'source': 'Diari de l\'Educació',
-                'date': (today - timedelta(days=2)).strftime('%Y-%m-%d'),
-                'url': 'https://diarieducacio.cat'
-            },
-            {
-                'id': 3,
-                'title': 'Innovación pedagógica en centros educativos',
-                'summary': 'Experiencias de éxito en la implementación de metodologías activas y evaluación auténtica...',
-                'source': 'EducaLab',
-                'date': (today - timedelta(days=3)).strftime('%Y-%m-%d'),
-                'url': 'https://intef.es/recursos-educativos/recursos-para-el-aprendizaje-en-linea'
-            },
-            {
-                'id': 4,
-                'title': 'Rúbricas de evaluación: diseño y aplicación práctica',
-                'summary': 'Guía completa sobre el diseño e implementación de rúbricas en diferentes etapas educativas...',
-                'source': 'Blog XTEC',
-                'date': (today - timedelta(days=4)).strftime('%Y-%m-%d'),
-                'url': 'https://bloc.xtec.cat'
-            },
-            {
-                'id': 5,
-                'title': 'Autoevaluación y coevaluación en el aula',
-                'summary': 'Herramientas y estrategias para fomentar la autoevaluación y la evaluación entre pares...',
-                'source': 'EducaBcn',
-                'date': (today - timedelta(days=5)).strftime('%Y-%m-%d'),
-                'url': 'https://ajuntament.barcelona.cat/educacio'
-            }
-        ]
-        
-        response_data = {
-            'noticias': noticias_data,
-            'total': len(noticias_data),
-            'last_updated': today.isoformat(),
-            'next_update': (today + timedelta(days=2)).isoformat()
-        }
-        
-        logger.info(f"[NOTICIAS] Generadas {len(noticias_data)} noticias")
-        
-        # Guardar en cache por 2 días
-        cache.set(cache_key, response_data, cache_timeout)
-        
-        return Response(response_data)
-        
-    except Exception as e:
-        logger.error(f"[NOTICIAS] Error generando noticias: {str(e)}")
-        logger.error(f"[NOTICIAS] Traceback: {traceback.format_exc()}")
-        return Response({'error': f'Error obteniendo noticias: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    """Noticias educativas sobre evaluación educativa y educación en español/catalán (sección 'noticias' del dashboard compuesto)"""
+    return _dashboard_section_response(request, 'noticias')
 
 
 # ===================== LANGUAGE TOOL ENDPOINTS =====================
@@ -3017,8 +2563,8 @@ def corregir_texto(request):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Corregir texto usando LanguageTool
-        resultado = languagetool_service.corregir_texto(texto, idioma)
+        # Corregir texto usando LanguageTool (solo se reenvían los párrafos modificados)
+        resultado = languagetool_service.corregir_texto_incremental(texto, idioma)
         
         # Obtener estadísticas del texto
         estadisticas = languagetool_service.obtener_estadisticas_texto(texto)
@@ -3060,6 +2606,20 @@ def obtener_estadisticas_texto(request):
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def estado_languagetool(request):
+    """
+    Estado (health check) de los servidores LanguageTool configurados; cada servidor se
+    comprueba como mucho una vez por LANGUAGETOOL_HEALTH_TTL
+    """
+    backends = languagetool_service.health_status()
+    return Response({
+        'backends': backends,
+        'disponible': any(backend['healthy'] for backend in backends)
+    })
+
+
 # ===================== OCR ENDPOINTS =====================
 
 @api_view(['POST'])
@@ -3070,8 +2630,8 @@ def procesar_imagen_ocr(request):
     """
     temp_file_path = None
     try:
-        # Verificar si Google Vision está disponible
-        if not google_vision_ocr_client.client:
+        # Verificar si hay algún motor OCR disponible (Google Vision o Tesseract local)
+        if not ocr_router.is_available():
             return Response({
                 'error': 'OCR no disponible. Las credenciales de Google Cloud Vision no están configuradas.',
                 'help': 'Para habilitar OCR, configura GOOGLE_APPLICATION_CREDENTIALS en Render.'
@@ -3087,6 +2647,8 @@ def procesar_imagen_ocr(request):
             return Response({'error': 'No se proporcionó imagen (usa campo "imagen" o "image")'}, status=status.HTTP_400_BAD_REQUEST)
         image_file = request.FILES[image_field]
         idioma = request.data.get('idioma', 'es')
+        # manuscrito (por defecto), impreso o auto
+        tipo_texto = request.data.get('tipo_texto', 'manuscrito')
         
         # Guardar archivo temporalmente
         with tempfile.NamedTemporaryFile(delete=False, suffix='.png') as temp_file:
@@ -3095,9 +2657,9 @@ def procesar_imagen_ocr(request):
             temp_file_path = temp_file.name
         
         # Procesar imagen
-        resultado = google_vision_ocr_client.detect_handwritten_text(temp_file_path, idioma)
+        resultado = ocr_router.detect_text(temp_file_path, idioma, tipo_texto)
         return Response(resultado)
-    except GoogleVisionOCRError as e:
+    except (GoogleVisionOCRError, LocalOCRError) as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     except Exception as e:
         return Response({'error': f'Error procesando imagen: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -3118,8 +2680,8 @@ def procesar_y_corregir_imagen(request):
     """
     temp_file_path = None
     try:
-        # Verificar si Google Vision está disponible
-        if not google_vision_ocr_client.client:
+        # Verificar si hay algún motor OCR disponible (Google Vision o Tesseract local)
+        if not ocr_router.is_available():
             return Response({
                 'error': 'OCR no disponible. Las credenciales de Google Cloud Vision no están configuradas.',
                 'help': 'Para habilitar OCR, configura GOOGLE_APPLICATION_CREDENTIALS en Render.'
@@ -3135,6 +2697,8 @@ def procesar_y_corregir_imagen(request):
             return Response({'error': 'No se proporcionó imagen (usa campo "imagen" o "image")'}, status=status.HTTP_400_BAD_REQUEST)
         image_file = request.FILES[image_field]
         idioma = request.data.get('idioma', 'es')
+        # manuscrito (por defecto), impreso o auto
+        tipo_texto = request.data.get('tipo_texto', 'manuscrito')
         
         # Guardar archivo temporalmente
         with tempfile.NamedTemporaryFile(delete=False, suffix='.png') as temp_file:
@@ -3143,7 +2707,7 @@ def procesar_y_corregir_imagen(request):
             temp_file_path = temp_file.name
         
         # OCR
-        resultado_ocr = google_vision_ocr_client.detect_handwritten_text(temp_file_path, idioma)
+        resultado_ocr = ocr_router.detect_text(temp_file_path, idioma, tipo_texto)
         texto_extraido = resultado_ocr.get('text', '')
         
         if not texto_extraido:
@@ -3155,9 +2719,11 @@ def procesar_y_corregir_imagen(request):
         return Response({
             'texto_original': texto_extraido,
             'texto_corregido': texto_corregido,
-            'confianza': resultado_ocr.get('confidence', 0)
+            'confianza': resultado_ocr.get('confidence', 0),
+            'motor': resultado_ocr['processing_info'].get('engine'),
+            'processing_info': resultado_ocr['processing_info'],
         })
-    except GoogleVisionOCRError as e:
+    except (GoogleVisionOCRError, LocalOCRError) as e:
         return Response({'error': f'Error OCR: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     except Exception as e:
         return Response({'error': f'Error procesando imagen: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -3170,6 +2736,136 @@ def procesar_y_corregir_imagen(request):
                 logger.warning(f"Error eliminando archivo temporal: {str(e)}")
 
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def procesar_lote_ocr(request):
+    """
+    OCR por lotes de varias imágenes (campo "imagenes"/"images") o de un PDF multipágina (campo "pdf").
+
+    Devuelve NDJSON en streaming: una línea por página en cuanto termina su lote y una línea
+    final de resumen. Con crear_evidencias=true crea las CorrectionEvidence en un único bulk_create
+    (student_ids: un id por imagen/página, o student_id para asignar todo a un alumno).
+
+    El OCR y el bulk_create se ejecutan dentro del generador, después de que la vista haya
+    devuelto la respuesta: las evidencias se guardan al terminar el último lote, justo antes de
+    la línea de resumen. Si el cliente corta la conexión antes, no se crea ninguna.
+    """
+    from django.http import StreamingHttpResponse
+
+    if not ocr_router.is_available():
+        return Response({
+            'error': 'OCR no disponible. Las credenciales de Google Cloud Vision no están configuradas.',
+            'help': 'Para habilitar OCR, configura GOOGLE_APPLICATION_CREDENTIALS en Render.'
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    image_files = request.FILES.getlist('imagenes') or request.FILES.getlist('images')
+    pdf_file = request.FILES.get('pdf')
+    if not image_files and not pdf_file:
+        return Response({'error': 'No se proporcionaron imágenes ("imagenes") ni PDF ("pdf")'}, status=status.HTTP_400_BAD_REQUEST)
+
+    idioma = request.data.get('idioma', 'es')
+    crear_evidencias = str(request.data.get('crear_evidencias', 'false')).lower() in ('true', '1')
+
+    # Alumno por imagen/página (posición 0 = imagen 0 o página 1)
+    students_by_position = {}
+    if crear_evidencias:
+        student_ids = request.data.getlist('student_ids') if hasattr(request.data, 'getlist') else request.data.get('student_ids', [])
+        if len(student_ids) == 1 and isinstance(student_ids[0], str) and ',' in student_ids[0]:
+            student_ids = student_ids[0].split(',')
+        if not student_ids and request.data.get('student_id'):
+            student_ids = [request.data.get('student_id')] * (len(image_files) or 1)
+        if not student_ids:
+            return Response({'error': 'student_ids o student_id es requerido para crear evidencias'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            ids_by_position = {
+                position: int(sid) for position, sid in enumerate(student_ids) if str(sid).strip()
+            }
+        except (TypeError, ValueError):
+            return Response({'error': 'student_ids debe contener ids numéricos'}, status=status.HTTP_400_BAD_REQUEST)
+        students = Student.objects.in_bulk(set(ids_by_position.values()))
+        students_by_position = {position: students.get(sid) for position, sid in ids_by_position.items()}
+    subject_id = request.data.get('subject_id') or None
+    title = request.data.get('title', '')
+
+    # Leer los ficheros antes de empezar el streaming
+    if pdf_file:
+        # El OCR local no rasteriza PDF: los PDF siempre van a Google Vision
+        if not google_vision_ocr_client.client:
+            return Response({'error': 'El OCR de PDF requiere Google Cloud Vision'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        pages_iter = (
+            (page - 1, result) for page, result in
+            google_vision_ocr_client.iter_pdf_handwritten_text(pdf_file.read(), idioma)
+        )
+        total = None
+    else:
+        pages_iter = ocr_router.iter_batch_handwritten_text([f.read() for f in image_files], idioma)
+        total = len(image_files)
+
+    def stream():
+        completed = []
+        failed = 0
+        try:
+            for position, resultado in pages_iter:
+                if not resultado['processing_info']['success']:
+                    failed += 1
+                completed.append((position, resultado))
+                yield json.dumps({'pagina': position + 1, 'resultado': resultado}, ensure_ascii=False) + '\n'
+        except (GoogleVisionOCRError, LocalOCRError) as e:
+            yield json.dumps({'error': str(e)}, ensure_ascii=False) + '\n'
+
+        created = 0
+        if crear_evidencias:
+            evidences = []
+            for position, resultado in sorted(completed, key=lambda item: item[0]):
+                # Si hay un único alumno para todo el PDF, se usa para todas las páginas
+                student = students_by_position.get(position) or (
+                    students_by_position.get(0) if pdf_file and len(students_by_position) == 1 else None
+                )
+                if not student or not resultado['text']:
+                    continue
+                evidences.append(CorrectionEvidence(
+                    student=student,
+                    teacher=request.user,
+                    subject_id=subject_id,
+                    title=title or f"OCR de {student.name} - página {position + 1}",
+                    original_text=resultado['text'],
+                    corrected_text=resultado['text'],
+                    correction_type='ocr',
+                    ocr_info={
+                        'confidence': resultado['confidence'],
+                        'word_count': resultado['word_count'],
+                        'language_hint': resultado['language_hint'],
+                        'engine': resultado['processing_info'].get('engine', 'google_vision'),
+                        'page': position + 1,
+                    },
+                    statistics={'num_palabras': resultado['word_count']},
+                ))
+            created = len(CorrectionEvidence.objects.bulk_create(evidences))
+
+        yield json.dumps({
+            'resumen': {
+                'total': total if total is not None else len(completed),
+                'procesadas': len(completed),
+                'fallidas': failed,
+                'evidencias_creadas': created,
+            }
+        }, ensure_ascii=False) + '\n'
+
+    response = StreamingHttpResponse(stream(), content_type='application/x-ndjson')
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def estado_ocr(request):
+    """
+    Estado del OCR: motores configurados, pausa de Google Vision tras cuota agotada o error
+    de red, y número de peticiones servidas por cada motor
+    """
+    return Response(ocr_router.get_status())
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def idiomas_ocr_soportados(request):
@@ -3260,6 +2956,15 @@ def guardar_correccion_como_evidencia(request):
             except:
                 language_tool_matches = []
         
+        # Parsear ocr_info si es string (incluye el motor que sirvió el OCR: 'engine')
+        ocr_info = request.data.get('ocr_info', {})
+        if isinstance(ocr_info, str):
+            try:
+                import json
+                ocr_info = json.loads(ocr_info)
+            except:
+                ocr_info = {}
+        
         # Parsear statistics si es string
         statistics = request.data.get('statistics', '{}')
         if isinstance(statistics, str):
@@ -3272,13 +2977,14 @@ def guardar_correccion_como_evidencia(request):
         # Crear evidencia directamente
         evidence = CorrectionEvidence.objects.create(
             student=student,
+            teacher=request.user,
             subject=subject,
             title=title or f"Corrección de {student.name} - {correction_type}",
             original_text=original_text,
             corrected_text=corrected_text,
             correction_type=correction_type,
             language_tool_matches=language_tool_matches,
-            ocr_info=request.data.get('ocr_info', {}),
+            ocr_info=ocr_info,
             statistics=statistics,
             teacher_feedback=request.data.get('teacher_feedback', ''),
         )
@@ -3316,7 +3022,8 @@ def guardar_correccion_como_evidencia(request):
 @permission_classes([IsAuthenticated])
 def evidencias_correccion_estudiante(request, student_id):
     """
-    Obtiene todas las evidencias de corrección de un estudiante
+    Obtiene las evidencias de corrección de un estudiante, paginadas por cursor
+    (?page_size=, enlace 'next'; total_count solo en la primera página)
     """
     try:
         # Verificar que el estudiante existe
@@ -3335,21 +3042,28 @@ def evidencias_correccion_estudiante(request, student_id):
         if status_filter:
             queryset = queryset.filter(status=status_filter)
         
-        # Ordenar por fecha de creación (más recientes primero)
-        queryset = queryset.order_by('-created_at')
-        
-        serializer = CorrectionEvidenceSerializer(queryset, many=True)
+        # Más recientes primero, por cursor (created_at, id)
+        paginator = TimestampCursorPagination()
+        page = paginator.paginate_queryset(queryset, request)
+        serializer = CorrectionEvidenceSerializer(page, many=True)
         
-        return Response({
+        data = {
             'student': {
                 'id': student.id,
                 'name': student.name,
                 'email': student.email
             },
             'evidences': serializer.data,
-            'total_count': queryset.count()
-        })
+            'next': paginator.get_next_link(),
+            'previous': paginator.get_previous_link(),
+        }
+        if not request.GET.get(paginator.cursor_query_param):
+            data['total_count'] = queryset.count()
+        return Response(data)
         
+    except NotFound as e:
+        # Cursor no válido
+        return Response({'error': str(e.detail)}, status=status.HTTP_404_NOT_FOUND)
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -3358,7 +3072,8 @@ def evidencias_correccion_estudiante(request, student_id):
 @permission_classes([IsAuthenticated])
 def evidencias_correccion_profesor(request):
     """
-    Obtiene todas las evidencias de corrección del profesor autenticado
+    Obtiene las evidencias de corrección del profesor autenticado, paginadas por cursor
+    (?page_size=, enlace 'next'; total_count solo en la primera página)
     """
     try:
         # Filtrar por estado si se proporciona
@@ -3368,21 +3083,28 @@ def evidencias_correccion_profesor(request):
         if status_filter:
             queryset = queryset.filter(status=status_filter)
         
-        # Ordenar por fecha de creación (más recientes primero)
-        queryset = queryset.order_by('-created_at')
+        # Más recientes primero, por cursor (created_at, id)
+        paginator = TimestampCursorPagination()
+        page = paginator.paginate_queryset(queryset, request)
+        serializer = CorrectionEvidenceSerializer(page, many=True)
         
-        serializer = CorrectionEvidenceSerializer(queryset, many=True)
-        
-        return Response({
+        data = {
             'teacher': {
                 'id': request.user.id,
                 'username': request.user.username,
                 'email': request.user.email
             },
             'evidences': serializer.data,
-            'total_count': queryset.count()
-        })
+            'next': paginator.get_next_link(),
+            'previous': paginator.get_previous_link(),
+        }
+        if not request.GET.get(paginator.cursor_query_param):
+            data['total_count'] = queryset.count()
+        return Response(data)
         
+    except NotFound as e:
+        # Cursor no válido
+        return Response({'error': str(e.detail)}, status=status.HTTP_404_NOT_FOUND)
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -3768,37 +3490,24 @@ class CustomEvaluationViewSet(viewsets.ModelViewSet):
     def public(self, request, pk=None):
         """Endpoint público para que alumnos vean la autoevaluación (sin login)"""
         try:
-            evaluation = self.get_object()
-            
-            print(f"[PUBLIC] Evaluation ID: {evaluation.id}")
-            print(f"[PUBLIC] Is Active: {evaluation.is_active}")
-            print(f"[PUBLIC] Group: {evaluation.group}")
-            
-            if not evaluation.is_active:
+            # Definición cacheada: todos los alumnos del grupo abren el QR a la vez
+            definition = custom_evaluation_service.get_definition(pk)
+            if definition is None or not definition['is_active']:
                 return Response(
                     {'error': 'Esta autoevaluación ya no está disponible'},
                     status=status.HTTP_404_NOT_FOUND
                 )
             
-            # Obtener lista de estudiantes del grupo
-            students = Student.objects.filter(grupo_principal=evaluation.group).values(
-                'id', 'name', 'apellidos'
-            ).order_by('apellidos', 'name')
-            
-            print(f"[PUBLIC] Students count: {students.count()}")
-            
             return Response({
-                'id': evaluation.id,
-                'title': evaluation.title,
-                'description': evaluation.description,
-                'questions': evaluation.questions,
-                'students': list(students),
-                'allow_multiple_attempts': evaluation.allow_multiple_attempts
+                'id': definition['id'],
+                'title': definition['title'],
+                'description': definition['description'],
+                'questions': definition['questions'],
+                'students': definition['students'],
+                'allow_multiple_attempts': definition['allow_multiple_attempts']
             })
         except Exception as e:
-            print(f"[PUBLIC ERROR] {type(e).__name__}: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.error(f"[CUSTOM_EVAL] Error en public: {str(e)}", exc_info=True)
             return Response(
                 {'error': str(e)},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -3806,113 +3515,32 @@ class CustomEvaluationViewSet(viewsets.ModelViewSet):
     
     @action(detail=True, methods=['post'], permission_classes=[AllowAny])
     def submit(self, request, pk=None):
-        """Endpoint público para enviar respuestas (sin login)"""
+        """
+        Endpoint público para enviar respuestas (sin login)
+        
+        Reenviar las mismas respuestas (reintento del móvil) devuelve 200 con el envío
+        ya guardado; un envío nuevo devuelve 201.
+        """
         try:
-            evaluation = self.get_object()
-            
-            if not evaluation.is_active:
-                return Response(
-                    {'error': 'Esta autoevaluación ya no está disponible'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
-            student_id = request.data.get('student_id')
-            responses = request.data.get('responses')
-            
-            if not student_id or not responses:
-                return Response(
-                    {'error': 'Faltan datos: student_id y responses son requeridos'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
-            # Verificar que el estudiante pertenezca al grupo
-            student = Student.objects.filter(id=student_id, grupo_principal=evaluation.group).first()
-            if not student:
-                return Response(
-                    {'error': 'Estudiante no encontrado en este grupo'},
-                    status=status.HTTP_404_NOT_FOUND
-                )
-            
-            # Verificar si ya respondió
-            existing_response = EvaluationResponse.objects.filter(
-                evaluation=evaluation,
-                student=student
-            ).first()
-            
-            if existing_response and not evaluation.allow_multiple_attempts:
-                return Response(
-                    {'error': 'Ya has respondido esta autoevaluación'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
-            # Crear o actualizar respuesta
-            if existing_response and evaluation.allow_multiple_attempts:
-                existing_response.responses = responses
-                existing_response.save()
-                response_obj = existing_response
-            else:
-                response_obj = EvaluationResponse.objects.create(
-                    evaluation=evaluation,
-                    student=student,
-                    responses=responses
-                )
-            
-            # 🔗 CONECTAR CON WIDGET: Crear SelfEvaluation automáticamente
-            try:
-                # Calcular score promedio de preguntas tipo likert (1-5)
-                likert_scores = []
-                comment_parts = []
-                
-                for question in evaluation.questions:
-                    question_id = str(question['id'])
-                    answer = responses.get(question_id, '')
-                    
-                    if question['type'] == 'likert':
-                        try:
-                            likert_scores.append(int(answer))
-                        except (ValueError, TypeError):
-                            pass
-                    elif question['type'] in ['multiple_choice', 'text']:
-                        if answer:
-                            comment_parts.append(f"{question['text']}: {answer}")
-                
-                # Calcular score promedio (1-5) o usar 3 por defecto
-                average_score = int(sum(likert_scores) / len(likert_scores)) if likert_scores else 3
-                average_score = max(1, min(5, average_score))  # Asegurar rango 1-5
-                
-                # Construir comentario
-                comment = f"Autoevaluación: {evaluation.title}\n"
-                if comment_parts:
-                    comment += "\n".join(comment_parts[:3])  # Máximo 3 respuestas en el comentario
-                
-                # Buscar subject relacionado (primer subject del grupo, o None)
-                subject = evaluation.group.subjects.first() if evaluation.group.subjects.exists() else None
-                
-                # Crear SelfEvaluation
-                from .models import SelfEvaluation
-                SelfEvaluation.objects.create(
-                    student=student,
-                    subject=subject,
-                    score=average_score,
-                    comment=comment,
-                    evaluation_type='autoevaluacion'
-                )
-                print(f"[CUSTOM_EVAL] ✅ SelfEvaluation creado para {student.full_name} con score {average_score}")
-            except Exception as e:
-                # No fallar si hay error creando SelfEvaluation, solo loguearlo
-                print(f"[CUSTOM_EVAL] ⚠️ Error creando SelfEvaluation: {str(e)}")
-            
-            return Response({
-                'id': response_obj.id,
-                'message': '¡Gracias! Tu autoevaluación ha sido enviada correctamente.'
-            }, status=status.HTTP_201_CREATED)
-            
+            result = custom_evaluation_service.submit(
+                pk,
+                request.data.get('student_id'),
+                request.data.get('responses')
+            )
+        except SubmissionError as e:
+            return Response({'error': str(e)}, status=e.status_code)
         except Exception as e:
-            print(f"[CUSTOM_EVAL] Error en submit: {str(e)}", file=sys.stderr, flush=True)
+            logger.error(f"[CUSTOM_EVAL] Error en submit: {str(e)}", exc_info=True)
             return Response(
                 {'error': str(e)},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+        
+        return Response({
+            'id': result['response'].id,
+            'duplicate': result['duplicate'],
+            'message': '¡Gracias! Tu autoevaluación ha sido enviada correctamente.'
+        }, status=status.HTTP_200_OK if result['duplicate'] else status.HTTP_201_CREATED)
     
     @action(detail=True, methods=['get'], permission_classes=[AllowAny])
     def qr(self, request, pk=None):
@@ -3980,17 +3608,57 @@ class CustomEvaluationViewSet(viewsets.ModelViewSet):
     
     @action(detail=True, methods=['get'])
     def responses(self, request, pk=None):
-        """Ver todas las respuestas de una autoevaluación"""
+        """Respuestas de una autoevaluación, paginadas por cursor (?page_size=, enlace 'next')"""
         try:
             evaluation = self.get_object()
-            responses = EvaluationResponse.objects.filter(evaluation=evaluation).select_related('student')
-            serializer = EvaluationResponseSerializer(responses, many=True)
-            return Response(serializer.data)
+            responses = EvaluationResponse.objects.filter(evaluation=evaluation).select_related('student', 'evaluation')
+            paginator = EvaluationResponseCursorPagination()
+            page = paginator.paginate_queryset(responses, request, view=self)
+            serializer = EvaluationResponseSerializer(page, many=True)
+            return paginator.get_paginated_response(serializer.data)
         except Exception as e:
             return Response(
                 {'error': str(e)},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+    
+    @action(detail=True, methods=['get'])
+    def results(self, request, pk=None):
+        """
+        Resultados agregados por pregunta (recuento, media y histograma likert, recuento por opción).
+        Se sirven desde CustomEvaluationStats, mantenidas en cada envío.
+        """
+        evaluation = self.get_object()
+        return Response(custom_evaluation_service.get_results(evaluation))
+    
+    @action(detail=True, methods=['get'])
+    def export(self, request, pk=None):
+        """
+        Exportar las respuestas en bruto en streaming
+        
+        GET /api/custom-evaluations/{id}/export/?formato=csv|ndjson (por defecto csv)
+        """
+        from django.http import StreamingHttpResponse
+        from core.services.streaming_export_service import csv_response
+        
+        evaluation = self.get_object()
+        formato = request.query_params.get('formato', 'csv')
+        rows = custom_evaluation_service.iter_export_rows(evaluation)
+        filename = f"autoevaluacion_{evaluation.id}"
+        
+        if formato == 'ndjson':
+            stream = (json.dumps(row, ensure_ascii=False) + '\n' for row in rows)
+            response = StreamingHttpResponse(stream, content_type='application/x-ndjson')
+            response['Content-Disposition'] = f'attachment; filename="{filename}.ndjson"'
+            return response
+        
+        questions = evaluation.questions
+        headers = ['student_id', 'alumno', 'enviado'] + [q.get('text', str(q['id'])) for q in questions]
+        return csv_response(headers, (
+            [row['student_id'], row['student_name'], row['submitted_at']]
+            + [row['responses'].get(str(q['id']), '') for q in questions]
+            for row in rows
+        ), filename)
 
 
 class EvaluationResponseViewSet(viewsets.ReadOnlyModelViewSet):
@@ -12,7 +12,9 @@ import re
 
 from .models import ChatSession, ChatMessage
 from .serializers_chat import ChatSessionSerializer, ChatSessionListSerializer, ChatMessageSerializer
+from .pagination import ChatSessionCursorPagination, ChatMessageCursorPagination
 from .services.educational_research_agent import educational_research_agent
+from .services.conversation_memory import conversation_memory
 
 logger = logging.getLogger(__name__)
 
@@ -63,6 +65,7 @@ def generate_smart_title(message_text):
 class ChatSessionViewSet(viewsets.ModelViewSet):
     """ViewSet para gestionar sesiones de chat"""
     permission_classes = [IsAuthenticated]
+    pagination_class = ChatSessionCursorPagination
     
     def get_serializer_class(self):
         if self.action == 'list':
@@ -71,14 +74,29 @@ class ChatSessionViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         """Filtrar sesiones por usuario"""
-        queryset = ChatSession.objects.filter(user=self.request.user).order_by('-updated_at')
-        logger.info(f"Loading chat sessions for user {self.request.user.username}: found {queryset.count()} sessions")
+        queryset = ChatSession.objects.filter(user=self.request.user).order_by('-updated_at', '-id')
+        if self.action == 'list':
+            # El listado solo necesita los campos desnormalizados, no el resumen de memoria
+            queryset = queryset.select_related('user').defer('summary')
         return queryset
     
     def perform_create(self, serializer):
         """Crear nueva sesión asignada al usuario actual"""
         serializer.save(user=self.request.user)
     
+    @action(detail=True, methods=['get'])
+    def messages(self, request, pk=None):
+        """
+        Mensajes de la sesión paginados por cursor, del más reciente al más antiguo
+        
+        GET /api/ai/chat/{chat_id}/messages/?page_size=50
+        Para cargar mensajes anteriores seguir el enlace 'next'.
+        """
+        chat = self.get_object()
+        paginator = ChatMessageCursorPagination()
+        page = paginator.paginate_queryset(chat.messages.all(), request, view=self)
+        return paginator.get_paginated_response(ChatMessageSerializer(page, many=True).data)
+    
     @action(detail=True, methods=['post'])
     def send_message(self, request, pk=None):
         """
@@ -104,20 +122,16 @@ class ChatSessionViewSet(viewsets.ModelViewSet):
                 content=message_text
             )
             
-            # Obtener historial de conversación
-            chat_history = []
-            previous_messages = chat.messages.order_by('timestamp')[:10]  # Últimos 10 mensajes
-            for msg in previous_messages:
-                chat_history.append({
-                    'sender': 'assistant' if msg.sender == 'assistant' else 'user',
-                    'content': msg.content
-                })
+            # Memoria de la conversación: resumen acumulado + mensajes recientes
+            # (anteriores a la pregunta actual) ajustados al presupuesto de tokens
+            memory = conversation_memory.build_context(chat, before_id=user_message.id)
             
             # Procesar pregunta con el agente IA
             logger.info(f"Processing question for chat {chat.id}: {message_text}")
             result = educational_research_agent.process_question(
                 question=message_text,
-                chat_history=chat_history
+                chat_history=memory['history'],
+                conversation_summary=memory['summary']
             )
             
             # Verificar si el modelo quiere llamar a una función
@@ -146,12 +160,17 @@ class ChatSessionViewSet(viewsets.ModelViewSet):
                     papers=result.get('papers_used', [])
                 )
             
+            # Cada N turnos, condensar los mensajes antiguos en el resumen de la sesión
+            # (en segundo plano, después de responder)
+            conversation_memory.schedule_summary(chat)
+            
             # Actualizar título del chat si es el primer mensaje
-            if chat.message_count == 2:  # Usuario + Asistente
+            # (message_count es el valor leído antes de guardar los mensajes de este turno)
+            if chat.message_count == 0:
                 # Generar título inteligente basado en contenido
                 title = generate_smart_title(message_text)
                 chat.title = title
-                chat.save()
+                chat.save(update_fields=['title', 'updated_at'])
                 logger.info(f"📝 Updated chat title to: {title}")
             
             # Serializar respuesta
@@ -235,7 +254,8 @@ class ChatSessionViewSet(viewsets.ModelViewSet):
                     papers=result.get('papers_used', [])
                 )
             
-            # Serializar respuesta completa
+            # Serializar respuesta completa (recargando los contadores actualizados por las señales)
+            chat.refresh_from_db()
             chat_data = ChatSessionSerializer(chat).data
             
             return Response({
@@ -278,8 +278,7 @@ class StudentContextualViewSet(viewsets.ReadOnlyModelViewSet):
         asignatura_id = request.query_params.get('asignatura', None)
         
         # Grupos del estudiante
-        grupos = [estudiante.grupo_principal]
-        grupos.extend(estudiante.subgrupos.all())
+        grupos = estudiante.all_groups
         grupos_data = [{'id': g.id, 'name': g.name} for g in grupos]
         
         # Asignaturas que cursa (a través de sus grupos)
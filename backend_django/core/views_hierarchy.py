@@ -3,12 +3,11 @@ from rest_framework.decorators import api_view, action, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from django.contrib.auth.models import User
-from django.db.models import Q
 import sys
 import datetime
 import traceback
 import logging
-from .models import Student, Group, Subject
+from .models import Student, Group, GroupMembership, Subject
 from .serializers import StudentSerializer, GroupCreateSerializer, GroupSerializer, GroupSimpleSerializer
 
 logger = logging.getLogger(__name__)
@@ -425,10 +424,7 @@ class StudentHierarchyViewSet(viewsets.ModelViewSet):
             queryset = Student.objects.all()
             logger.info(f"StudentHierarchyViewSet - ADMINISTRATOR: returning all students: {queryset.count()}")
         else:
-            queryset = Student.objects.filter(
-                Q(grupo_principal__teacher=self.request.user) |
-                Q(subgrupos__teacher=self.request.user)
-            ).distinct()
+            queryset = Student.objects.filter(id__in=GroupMembership.student_ids_for_teacher(self.request.user))
             logger.info(f"StudentHierarchyViewSet - User: {self.request.user.username} - returning own students: {queryset.count()}")
         return queryset
     
@@ -455,16 +451,13 @@ class StudentHierarchyViewSet(viewsets.ModelViewSet):
                 )
             
             # Estudiantes que NO pertenecen a este grupo (ni como principal ni como subgrupo)
-            available_students = Student.objects.exclude(
-                Q(grupo_principal=group) | Q(subgrupos=group)
-            )
+            available_students = Student.objects.exclude(id__in=GroupMembership.student_ids_for_group(group.id))
             
             # Si no es superuser, filtrar solo estudiantes de sus grupos
             if not self.request.user.is_superuser:
                 available_students = available_students.filter(
-                    Q(grupo_principal__teacher=self.request.user) | 
-                    Q(subgrupos__teacher=self.request.user)
-                ).distinct()
+                    id__in=GroupMembership.student_ids_for_teacher(self.request.user)
+                )
             
             serializer = StudentSerializer(available_students, many=True, context={'request': request})
             
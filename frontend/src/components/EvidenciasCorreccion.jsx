@@ -9,6 +9,9 @@ import { toast } from 'react-hot-toast';
 
 const EvidenciasCorreccion = ({ studentId }) => {
   const [evidencias, setEvidencias] = useState([]);
+  const [evidenciasNext, setEvidenciasNext] = useState(null);
+  const [totalEvidencias, setTotalEvidencias] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [estadisticas, setEstadisticas] = useState(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
@@ -26,7 +29,9 @@ const EvidenciasCorreccion = ({ studentId }) => {
       setLoading(true);
       const params = filtroEstado ? { status: filtroEstado } : {};
       const response = await api.get(`/correccion/evidencias/estudiante/${studentId}/`, { params });
-      setEvidencias(response.data.evidences);
+      setEvidencias(response.data.evidences || []);
+      setEvidenciasNext(response.data.next || null);
+      setTotalEvidencias(response.data.total_count ?? null);
     } catch (err) {
       console.error('Error cargando evidencias:', err);
       setError('Error al cargar las evidencias de corrección');
@@ -35,6 +40,22 @@ const EvidenciasCorreccion = ({ studentId }) => {
     }
   };
 
+  // La lista está paginada por cursor: 'next' ya incluye el filtro de estado
+  const cargarMasEvidencias = async () => {
+    if (!evidenciasNext) return;
+    try {
+      setLoadingMore(true);
+      const response = await api.get(evidenciasNext);
+      setEvidencias((prev) => [...prev, ...(response.data.evidences || [])]);
+      setEvidenciasNext(response.data.next || null);
+    } catch (err) {
+      console.error('Error cargando más evidencias:', err);
+      toast.error('Error al cargar más evidencias');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const cargarEstadisticas = async () => {
     try {
       const response = await api.get(`/correccion/estadisticas/estudiante/${studentId}/`);
@@ -146,7 +167,14 @@ const EvidenciasCorreccion = ({ studentId }) => {
       {/* Filtros */}
       <div className="bg-white rounded-lg shadow-sm border border-gray-200 p-4">
         <div className="flex items-center justify-between">
-          <h3 className="text-lg font-semibold text-gray-900">Evidencias de Corrección</h3>
+          <h3 className="text-lg font-semibold text-gray-900">
+            Evidencias de Corrección
+            {totalEvidencias !== null && (
+              <span className="ml-2 text-sm font-normal text-gray-500">
+                ({evidencias.length} de {totalEvidencias})
+              </span>
+            )}
+          </h3>
           <select
             value={filtroEstado}
             onChange={(e) => setFiltroEstado(e.target.value)}
@@ -280,6 +308,17 @@ const EvidenciasCorreccion = ({ studentId }) => {
             );
           })
         )}
+        {evidenciasNext && (
+          <div className="text-center">
+            <button
+              onClick={cargarMasEvidencias}
+              disabled={loadingMore}
+              className="px-4 py-2 text-sm text-blue-700 border border-blue-300 rounded-lg hover:bg-blue-50 disabled:opacity-50"
+            >
+              {loadingMore ? 'Cargando...' : 'Cargar más evidencias'}
+            </button>
+          </div>
+        )}
       </div>
     </div>
   );
@@ -308,7 +308,9 @@ const OCRImagen = () => {
       formData.append('ocr_info', JSON.stringify({
         idioma: idioma,
         tipo: tipoTexto,
-        confianza: 0.9 // Valor por defecto
+        confianza: ocrResult?.confidence ?? ocrResult?.confianza ?? 0.9,
+        // Motor que sirvió el OCR (google_vision o tesseract)
+        engine: ocrResult?.processing_info?.engine || ocrResult?.motor || null
       }));
       formData.append('statistics', JSON.stringify(estadisticas || {}));
       formData.append('teacher_feedback', comentarioProfesor);
@@ -10,7 +10,10 @@ const TeacherEvaluations = () => {
   const [showQR, setShowQR] = useState(null);
   const [showResponses, setShowResponses] = useState(null);
   const [responses, setResponses] = useState([]);
+  const [responsesNext, setResponsesNext] = useState(null);
+  const [responsesSummary, setResponsesSummary] = useState(null);
   const [loadingResponses, setLoadingResponses] = useState(false);
+  const [loadingMoreResponses, setLoadingMoreResponses] = useState(false);
 
   // URL base del API para acceso directo (sin token)
   const API_BASE = import.meta.env.VITE_API_URL || 'https://evalai2.onrender.com/api';
@@ -111,8 +114,17 @@ const TeacherEvaluations = () => {
     try {
       setLoadingResponses(true);
       setShowResponses(evaluation);
-      const response = await api.get(`/custom-evaluations/${evaluation.id}/responses/`);
-      setResponses(response.data);
+      setResponses([]);
+      setResponsesNext(null);
+      setResponsesSummary(null);
+      // Resumen agregado por pregunta + primera página de respuestas (paginadas por cursor)
+      const [summaryResponse, response] = await Promise.all([
+        api.get(`/custom-evaluations/${evaluation.id}/results/`),
+        api.get(`/custom-evaluations/${evaluation.id}/responses/`, { params: { page_size: 50 } })
+      ]);
+      setResponsesSummary(summaryResponse.data);
+      setResponses(response.data.results || []);
+      setResponsesNext(response.data.next || null);
     } catch (error) {
       console.error('Error cargando respuestas:', error);
       toast.error('Error al cargar respuestas');
@@ -121,6 +133,21 @@ const TeacherEvaluations = () => {
     }
   };
 
+  const handleLoadMoreResponses = async () => {
+    if (!responsesNext) return;
+    try {
+      setLoadingMoreResponses(true);
+      const response = await api.get(responsesNext);
+      setResponses((prev) => [...prev, ...(response.data.results || [])]);
+      setResponsesNext(response.data.next || null);
+    } catch (error) {
+      console.error('Error cargando más respuestas:', error);
+      toast.error('Error al cargar más respuestas');
+    } finally {
+      setLoadingMoreResponses(false);
+    }
+  };
+
   const formatDate = (dateString) => {
     return new Date(dateString).toLocaleDateString('es-ES', {
       year: 'numeric',
@@ -337,6 +364,37 @@ const TeacherEvaluations = () => {
               </div>
             ) : (
               <div className="space-y-4">
+                {responsesSummary && (
+                  <div className="bg-purple-50 border border-purple-200 rounded-lg p-4">
+                    <h4 className="font-semibold text-purple-900 mb-3">
+                      Resumen ({responsesSummary.response_count} respuestas)
+                    </h4>
+                    <div className="space-y-2">
+                      {responsesSummary.questions.map((question) => (
+                        <div key={question.id} className="text-sm">
+                          <p className="font-medium text-gray-700">{question.text}</p>
+                          {question.type === 'likert' && (
+                            <p className="text-gray-900">
+                              Media: {question.mean ?? '-'} · {Object.entries(question.histogram)
+                                .map(([value, count]) => `${value}: ${count}`)
+                                .join(' · ')}
+                            </p>
+                          )}
+                          {question.type === 'multiple_choice' && (
+                            <p className="text-gray-900">
+                              {Object.entries(question.options)
+                                .map(([option, count]) => `${option}: ${count}`)
+                                .join(' · ')}
+                            </p>
+                          )}
+                          {question.type === 'text' && (
+                            <p className="text-gray-900">{question.count} respuestas de texto</p>
+                          )}
+                        </div>
+                      ))}
+                    </div>
+                  </div>
+                )}
                 {responses.map((response) => (
                   <div key={response.id} className="border border-gray-200 rounded-lg p-4">
                     <div className="flex justify-between items-start mb-3">
@@ -364,6 +422,17 @@ const TeacherEvaluations = () => {
                     </div>
                   </div>
                 ))}
+                {responsesNext && (
+                  <div className="text-center">
+                    <button
+                      onClick={handleLoadMoreResponses}
+                      disabled={loadingMoreResponses}
+                      className="px-4 py-2 text-sm text-purple-700 border border-purple-300 rounded-lg hover:bg-purple-50 disabled:opacity-50"
+                    >
+                      {loadingMoreResponses ? 'Cargando...' : 'Cargar más respuestas'}
+                    </button>
+                  </div>
+                )}
               </div>
             )}
           </div>